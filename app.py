@@ -1,43 +1,36 @@
 import os
 from datetime import datetime
-from flask import Flask, render_template, jsonify, request, make_response, send_from_directory
-from flask_socketio import SocketIO, emit
-import azure.cognitiveservices.speech as speechsdk
-import requests
+from flask import Flask, Response, render_template, jsonify, request, make_response, send_from_directory, stream_with_context
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from dotenv import load_dotenv
 import sys
+import threading
 import traceback
 import time
 import json
-import sqlite3
-from pathlib import Path
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from config import validate_config, AZURE_SPEECH_KEY, AZURE_SPEECH_REGION, AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_VERSION, AZURE_OPENAI_DEPLOYMENT
-from database import init_db, get_all_meetings, update_meeting_participants, save_meeting
+from config import validate_config, AZURE_SPEECH_KEY, AZURE_SPEECH_REGION, AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_VERSION, AZURE_OPENAI_DEPLOYMENT, SECRETS_TTL_SECONDS, SECRETS_REFRESH_MARGIN_SECONDS, SECRETS_CACHE_PATH, SECRETS_CACHE_KEY, BATCH_RECOGNIZER, SOCKETIO_ASYNC_MODE, SOCKETIO_MESSAGE_QUEUE, SOCKETIO_CHANNEL, WORKER_COUNT, WORKER_ID, SUMMARY_STREAM_ENABLED, METRICS_ENABLED
+from database import DATABASE_PATH, init_db, get_all_meetings, get_meetings_page, get_meeting, search_meetings, rebuild_search_index, update_meeting_participants, save_meeting, backfill_normalized_tables, find_meetings_by_participant, get_speaker_segments, MAX_PAGE_SIZE
 from transcriber import MeetingTranscriber
-from email_service import send_meeting_summary
+from session_manager import SessionManager, SessionLimitError
+from outbox import SMTPConnectionPool, EmailOutbox
+from export import export_meetings, EXPORT_FORMATS
+from azure_clients import clients
+from secret_store import SecretStore, KeyVaultSecretBackend, LocalSecretBackend, OPENAI_SECRET_NAMES
+from llm import OpenAIChatBackend
+from llm_gateway import gateway as llm_gateway
+from summary_cache import SummaryCache, CachedChatBackend
+from batch_transcriber import BatchTranscriber, BatchJobManager, RECOGNIZERS, resolve_input_path
+from emitter import TranscriptEmitter, SummaryStreamer
+from pubsub import make_client_manager
+from segment_writer import SegmentWriter
+from jobs import JobQueue, post_meeting_pipeline, POST_MEETING
+from metrics import REGISTRY, Exporter, CONTENT_TYPE, ACTIVE_SESSIONS, SOCKETIO_PENDING_ENTRIES
+from tracing import tracer
 import logging
 from werkzeug.exceptions import HTTPException
-import openai
-from azure.identity import DefaultAzureCredential
-from azure.keyvault.secrets import SecretClient
-from azure.ai.openai import OpenAIClient
-from azure.storage.blob import BlobServiceClient
-from azure.cosmos import CosmosClient
-from azure.search.documents import SearchClient
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.ai.textanalytics import TextAnalyticsClient
-from azure.ai.translation.document import DocumentTranslationClient
-from azure.ai.language.conversations import ConversationAnalysisClient
-from azure.ai.personalizer import PersonalizerClient
-from azure.ai.metricsadvisor import MetricsAdvisorClient
-from azure.ai.anomalydetector import AnomalyDetectorClient
-from azure.ai.contentsafety import ContentSafetyClient
-from azure.ai.generative import GenerativeClient
-from azure.ai.ml import MLClient
-from azure.ai.documentintelligence import DocumentIntelligenceClient
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -88,15 +81,26 @@ validate_config()
 # Initialize Flask app
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 app.config['SECRET_KEY'] = os.urandom(24)
-
-# Initialize SocketIO with default settings
-socketio = SocketIO(app, cors_allowed_origins="*")
+app.config['DATABASE_PATH'] = DATABASE_PATH
+
+# Initialize SocketIO. With a message queue configured, events emitted by one
+# worker reach clients connected to the others.
+socketio_options = {'async_mode': SOCKETIO_ASYNC_MODE}
+client_manager = make_client_manager(SOCKETIO_MESSAGE_QUEUE, channel=SOCKETIO_CHANNEL)
+if client_manager is not None:
+    socketio_options['client_manager'] = client_manager
+elif WORKER_COUNT > 1:
+    logger.warning(f"WORKER_COUNT is {WORKER_COUNT} but SOCKETIO_MESSAGE_QUEUE is not set; "
+                   "room events will not reach other workers")
+socketio = SocketIO(app, cors_allowed_origins="*", **socketio_options)
 
 # Initialize database
 init_db()
 
-# Global transcriber instance
-transcriber = None
+# Index meetings that predate the search index without delaying startup
+threading.Thread(target=rebuild_search_index, name='search-backfill', daemon=True).start()
+# Likewise for the participants and segments tables added by migration 1
+threading.Thread(target=backfill_normalized_tables, name='normalized-backfill', daemon=True).start()
 
 # Email configuration
 EMAIL_USER = os.getenv('EMAIL_USER')
@@ -104,201 +108,93 @@ EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
 EMAIL_SMTP_SERVER = os.getenv('EMAIL_SMTP_SERVER')
 EMAIL_SMTP_PORT = int(os.getenv('EMAIL_SMTP_PORT'))
 
-# Initialize Azure Key Vault client
-key_vault_url = os.getenv('AZURE_KEY_VAULT_URL')
-credential = DefaultAzureCredential()
-secret_client = SecretClient(vault_url=key_vault_url, credential=credential)
-
-# Get secrets from Key Vault
-openai_api_key = secret_client.get_secret('openai-api-key').value
-openai_api_base = secret_client.get_secret('openai-api-base').value
-openai_api_version = secret_client.get_secret('openai-api-version').value
-openai_api_type = secret_client.get_secret('openai-api-type').value
-
-# Configure OpenAI client
-openai.api_key = openai_api_key
-openai.api_base = openai_api_base
-openai.api_version = openai_api_version
-openai.api_type = openai_api_type
-
-# Initialize transcriber
-transcriber = MeetingTranscriber(socketio)
-
-# Azure OpenAI Configuration
-try:
-    client = OpenAIClient(
-        endpoint=os.environ.get("AZURE_OPENAI_ENDPOINT"),
-        credential=os.environ.get("AZURE_OPENAI_API_KEY")
+# Load OpenAI settings once per worker: from Key Vault when one is configured,
+# otherwise from the environment. Secrets are fetched in parallel, cached with
+# a TTL and refreshed in the background before they expire. Every LLM call goes
+# through the gateway, which picks up new settings on its next request.
+def apply_openai_secrets(store):
+    llm_gateway.configure(
+        api_key=store.get('openai-api-key'),
+        api_base=store.get('openai-api-base'),
+        api_version=store.get('openai-api-version'),
+        api_type=store.get('openai-api-type')
     )
-    logger.info("Azure OpenAI client initialized successfully")
-except Exception as e:
-    logger.error(f"Error initializing Azure OpenAI client: {str(e)}")
-    client = None
 
-# Azure Speech Configuration
+if clients.is_configured('key_vault'):
+    secret_backend = KeyVaultSecretBackend(clients.get('key_vault'))
+else:
+    secret_backend = LocalSecretBackend({
+        'openai-api-key': AZURE_OPENAI_API_KEY,
+        'openai-api-base': AZURE_OPENAI_ENDPOINT,
+        'openai-api-version': AZURE_OPENAI_API_VERSION,
+        'openai-api-type': 'azure',
+    })
+
+secrets = SecretStore(
+    secret_backend,
+    OPENAI_SECRET_NAMES,
+    ttl=SECRETS_TTL_SECONDS,
+    refresh_margin=SECRETS_REFRESH_MARGIN_SECONDS,
+    cache_path=SECRETS_CACHE_PATH,
+    cache_key=SECRETS_CACHE_KEY,
+    on_refresh=apply_openai_secrets
+)
 try:
-    speech_config = speechsdk.SpeechConfig(
-        subscription=os.environ.get("AZURE_SPEECH_KEY"),
-        region=os.environ.get("AZURE_SPEECH_REGION")
-    )
-    logger.info("Azure Speech client initialized successfully")
+    secrets.load()
 except Exception as e:
-    logger.error(f"Error initializing Azure Speech client: {str(e)}")
-    speech_config = None
-
-# Initialize other Azure clients
-try:
-    # Azure Key Vault
-    credential = DefaultAzureCredential()
-    key_vault_url = os.environ.get("AZURE_KEY_VAULT_URL")
-    if key_vault_url:
-        secret_client = SecretClient(vault_url=key_vault_url, credential=credential)
-        logger.info("Azure Key Vault client initialized successfully")
-    else:
-        secret_client = None
-        logger.warning("Azure Key Vault URL not provided")
-
-    # Azure Blob Storage
-    blob_connection_string = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
-    if blob_connection_string:
-        blob_service_client = BlobServiceClient.from_connection_string(blob_connection_string)
-        logger.info("Azure Blob Storage client initialized successfully")
-    else:
-        blob_service_client = None
-        logger.warning("Azure Storage connection string not provided")
-
-    # Azure Cosmos DB
-    cosmos_endpoint = os.environ.get("AZURE_COSMOS_ENDPOINT")
-    cosmos_key = os.environ.get("AZURE_COSMOS_KEY")
-    if cosmos_endpoint and cosmos_key:
-        cosmos_client = CosmosClient(cosmos_endpoint, cosmos_key)
-        logger.info("Azure Cosmos DB client initialized successfully")
-    else:
-        cosmos_client = None
-        logger.warning("Azure Cosmos DB credentials not provided")
-
-    # Azure Cognitive Search
-    search_endpoint = os.environ.get("AZURE_SEARCH_ENDPOINT")
-    search_key = os.environ.get("AZURE_SEARCH_KEY")
-    if search_endpoint and search_key:
-        search_client = SearchClient(endpoint=search_endpoint, credential=search_key)
-        logger.info("Azure Cognitive Search client initialized successfully")
-    else:
-        search_client = None
-        logger.warning("Azure Cognitive Search credentials not provided")
-
-    # Azure Form Recognizer
-    form_endpoint = os.environ.get("AZURE_FORM_RECOGNIZER_ENDPOINT")
-    form_key = os.environ.get("AZURE_FORM_RECOGNIZER_KEY")
-    if form_endpoint and form_key:
-        form_client = DocumentAnalysisClient(endpoint=form_endpoint, credential=form_key)
-        logger.info("Azure Form Recognizer client initialized successfully")
-    else:
-        form_client = None
-        logger.warning("Azure Form Recognizer credentials not provided")
-
-    # Azure Text Analytics
-    text_endpoint = os.environ.get("AZURE_TEXT_ANALYTICS_ENDPOINT")
-    text_key = os.environ.get("AZURE_TEXT_ANALYTICS_KEY")
-    if text_endpoint and text_key:
-        text_client = TextAnalyticsClient(endpoint=text_endpoint, credential=text_key)
-        logger.info("Azure Text Analytics client initialized successfully")
-    else:
-        text_client = None
-        logger.warning("Azure Text Analytics credentials not provided")
-
-    # Azure Document Translation
-    translation_endpoint = os.environ.get("AZURE_TRANSLATION_ENDPOINT")
-    translation_key = os.environ.get("AZURE_TRANSLATION_KEY")
-    if translation_endpoint and translation_key:
-        translation_client = DocumentTranslationClient(endpoint=translation_endpoint, credential=translation_key)
-        logger.info("Azure Document Translation client initialized successfully")
-    else:
-        translation_client = None
-        logger.warning("Azure Document Translation credentials not provided")
-
-    # Azure Language Understanding
-    language_endpoint = os.environ.get("AZURE_LANGUAGE_ENDPOINT")
-    language_key = os.environ.get("AZURE_LANGUAGE_KEY")
-    if language_endpoint and language_key:
-        language_client = ConversationAnalysisClient(endpoint=language_endpoint, credential=language_key)
-        logger.info("Azure Language Understanding client initialized successfully")
-    else:
-        language_client = None
-        logger.warning("Azure Language Understanding credentials not provided")
-
-    # Azure Personalizer
-    personalizer_endpoint = os.environ.get("AZURE_PERSONALIZER_ENDPOINT")
-    personalizer_key = os.environ.get("AZURE_PERSONALIZER_KEY")
-    if personalizer_endpoint and personalizer_key:
-        personalizer_client = PersonalizerClient(endpoint=personalizer_endpoint, credential=personalizer_key)
-        logger.info("Azure Personalizer client initialized successfully")
-    else:
-        personalizer_client = None
-        logger.warning("Azure Personalizer credentials not provided")
-
-    # Azure Metrics Advisor
-    metrics_endpoint = os.environ.get("AZURE_METRICS_ADVISOR_ENDPOINT")
-    metrics_key = os.environ.get("AZURE_METRICS_ADVISOR_KEY")
-    if metrics_endpoint and metrics_key:
-        metrics_client = MetricsAdvisorClient(endpoint=metrics_endpoint, credential=metrics_key)
-        logger.info("Azure Metrics Advisor client initialized successfully")
-    else:
-        metrics_client = None
-        logger.warning("Azure Metrics Advisor credentials not provided")
-
-    # Azure Anomaly Detector
-    anomaly_endpoint = os.environ.get("AZURE_ANOMALY_DETECTOR_ENDPOINT")
-    anomaly_key = os.environ.get("AZURE_ANOMALY_DETECTOR_KEY")
-    if anomaly_endpoint and anomaly_key:
-        anomaly_client = AnomalyDetectorClient(endpoint=anomaly_endpoint, credential=anomaly_key)
-        logger.info("Azure Anomaly Detector client initialized successfully")
-    else:
-        anomaly_client = None
-        logger.warning("Azure Anomaly Detector credentials not provided")
-
-    # Azure Content Safety
-    safety_endpoint = os.environ.get("AZURE_CONTENT_SAFETY_ENDPOINT")
-    safety_key = os.environ.get("AZURE_CONTENT_SAFETY_KEY")
-    if safety_endpoint and safety_key:
-        safety_client = ContentSafetyClient(endpoint=safety_endpoint, credential=safety_key)
-        logger.info("Azure Content Safety client initialized successfully")
-    else:
-        safety_client = None
-        logger.warning("Azure Content Safety credentials not provided")
-
-    # Azure AI Generative
-    generative_endpoint = os.environ.get("AZURE_AI_GENERATIVE_ENDPOINT")
-    generative_key = os.environ.get("AZURE_AI_GENERATIVE_KEY")
-    if generative_endpoint and generative_key:
-        generative_client = GenerativeClient(endpoint=generative_endpoint, credential=generative_key)
-        logger.info("Azure AI Generative client initialized successfully")
-    else:
-        generative_client = None
-        logger.warning("Azure AI Generative credentials not provided")
-
-    # Azure Machine Learning
-    ml_endpoint = os.environ.get("AZURE_ML_ENDPOINT")
-    ml_key = os.environ.get("AZURE_ML_KEY")
-    if ml_endpoint and ml_key:
-        ml_client = MLClient(endpoint=ml_endpoint, credential=ml_key)
-        logger.info("Azure Machine Learning client initialized successfully")
+    logger.error(f"Error loading secrets, retrying in the background: {str(e)}")
+# Started either way: after a failed first load the loop keeps retrying with backoff
+secrets.start_refresh()
+
+# Identical summary requests (retries, reloads) are answered from the cache
+summary_cache = SummaryCache()
+llm_backend = CachedChatBackend(OpenAIChatBackend(), summary_cache)
+
+# Transcript updates go out to each meeting room in small batches
+transcript_emitter = TranscriptEmitter(socketio)
+
+# Summary emails are queued and sent in the background over pooled SMTP connections
+email_outbox = EmailOutbox(SMTPConnectionPool())
+email_outbox.start()
+
+# Live transcript segments are written behind to the database, so a meeting
+# interrupted by a crash or redeploy resumes with what it had recorded
+segment_writer = SegmentWriter()
+segment_writer.start()
+unfinished_meetings = segment_writer.unfinished()
+if unfinished_meetings:
+    logger.info(f"{len(unfinished_meetings)} interrupted meetings can be resumed")
+
+# Live transcription sessions hosted by this worker, one per meeting room
+sessions = SessionManager(lambda meeting_id: MeetingTranscriber(
+    socketio, meeting_id=meeting_id, llm=llm_backend, emitter=transcript_emitter,
+    segment_writer=segment_writer))
+sessions.start_reaper()
+
+# After a meeting stops, summarizing, saving and emailing it run as a background
+# job on this worker (which holds the session); progress goes to the meeting room
+def emit_job_progress(job, payload):
+    room = payload.get('meeting_id')
+    if room:
+        socketio.emit('job_progress', job, to=room)
     else:
-        ml_client = None
-        logger.warning("Azure Machine Learning credentials not provided")
-
-    # Azure Document Intelligence
-    doc_intel_endpoint = os.environ.get("AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT")
-    doc_intel_key = os.environ.get("AZURE_DOCUMENT_INTELLIGENCE_KEY")
-    if doc_intel_endpoint and doc_intel_key:
-        doc_intel_client = DocumentIntelligenceClient(endpoint=doc_intel_endpoint, credential=doc_intel_key)
-        logger.info("Azure Document Intelligence client initialized successfully")
-    else:
-        doc_intel_client = None
-        logger.warning("Azure Document Intelligence credentials not provided")
+        socketio.emit('job_progress', job)
 
-except Exception as e:
-    logger.error(f"Error initializing Azure clients: {str(e)}")
+job_queue = JobQueue(worker_id=WORKER_ID, on_progress=emit_job_progress)
+summary_streamer = SummaryStreamer(socketio) if SUMMARY_STREAM_ENABLED else None
+job_queue.register(post_meeting_pipeline(sessions, segment_writer, email_outbox, llm_backend, summary_streamer))
+job_queue.start()
+
+# Prometheus metrics; with several workers on the host, each one's /metrics reports all of them
+ACTIVE_SESSIONS.set_function(lambda: len(sessions))
+SOCKETIO_PENDING_ENTRIES.set_function(transcript_emitter.pending)
+metrics_exporter = Exporter(REGISTRY)
+if METRICS_ENABLED:
+    metrics_exporter.start()
+
+# Offline transcription of recorded meetings, run in the background
+batch_jobs = BatchJobManager(lambda: BatchTranscriber(
+    RECOGNIZERS[BATCH_RECOGNIZER](), db_path=app.config['DATABASE_PATH']))
 
 def send_email(to_emails, subject, body):
     try:
@@ -319,22 +215,6 @@ def send_email(to_emails, subject, body):
         print(f"Error sending email: {str(e)}")
         return False, str(e)
 
-# Azure Speech Services configuration
-print("\nInitializing Speech Services...")
-speech_key = os.getenv('AZURE_SPEECH_KEY')
-speech_region = os.getenv('AZURE_SPEECH_REGION')
-print(f"Speech Region: {speech_region}")
-
-speech_config = speechsdk.SpeechConfig(
-    subscription=speech_key,
-    region=speech_region
-)
-
-# Configure speech recognition settings
-speech_config.speech_recognition_language = "en-US"
-speech_config.set_property(speechsdk.PropertyId.SpeechServiceConnection_InitialSilenceTimeoutMs, "5000")
-speech_config.set_property(speechsdk.PropertyId.SpeechServiceConnection_EndSilenceTimeoutMs, "1000")
-
 # Azure OpenAI configuration
 API_KEY = os.getenv('AZURE_OPENAI_API_KEY')
 API_ENDPOINT = os.getenv('AZURE_OPENAI_ENDPOINT')
@@ -357,23 +237,166 @@ def index():
 
 @app.route('/meetings')
 def list_meetings():
-    meetings = get_all_meetings()
-    return make_response(jsonify(meetings))
+    """List meetings newest first, one page at a time.
+
+    Query parameters: ``limit`` (page size), ``cursor`` (the ``next_cursor``
+    of the previous page) and ``fields`` (comma-separated projection; defaults
+    to id, timestamp, participants and a summary snippet).
+    """
+    fields = request.args.get('fields')
+    try:
+        meetings, next_cursor = get_meetings_page(
+            limit=request.args.get('limit', 20),
+            cursor=request.args.get('cursor'),
+            fields=fields.split(',') if fields else None,
+            db_path=app.config['DATABASE_PATH']
+        )
+    except ValueError as e:
+        return make_response(jsonify({'status': 'error', 'message': str(e)}), 400)
+    return make_response(jsonify({'meetings': meetings, 'next_cursor': next_cursor}))
+
+@app.route('/meetings/export')
+def export_meetings_route():
+    """Stream every meeting as NDJSON or CSV (``format``), optionally gzipped (``gzip=1``)."""
+    fmt = request.args.get('format', 'ndjson')
+    compress = request.args.get('gzip') in ('1', 'true')
+    if fmt not in EXPORT_FORMATS:
+        return make_response(jsonify({'status': 'error', 'message': f"Unsupported export format: {fmt}"}), 400)
+
+    filename = f"meetings.{fmt}" + ('.gz' if compress else '')
+    chunks = export_meetings(fmt, compress, app.config['DATABASE_PATH'])
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/meetings/search')
+def search_meetings_route():
+    """Full-text search: ``q`` plus optional ``participant``, ``from``, ``to`` and ``limit``.
+
+    ``truncated`` is true when only the newest matches were ranked; a date range ranks them all.
+    """
+    try:
+        results, truncated = search_meetings(
+            request.args.get('q', ''),
+            participant=request.args.get('participant'),
+            start=request.args.get('from'),
+            end=request.args.get('to'),
+            limit=request.args.get('limit', 20),
+            db_path=app.config['DATABASE_PATH']
+        )
+    except ValueError as e:
+        return make_response(jsonify({'status': 'error', 'message': str(e)}), 400)
+    return make_response(jsonify({'results': results, 'truncated': truncated}))
+
+@app.route('/meetings/by-participant')
+def meetings_by_participant_route():
+    """Meetings with a participant: ``email`` (a full address, or ``alice@`` for any domain) and ``limit``."""
+    try:
+        meetings = find_meetings_by_participant(
+            request.args.get('email', ''),
+            limit=request.args.get('limit', 20),
+            db_path=app.config['DATABASE_PATH']
+        )
+    except ValueError as e:
+        return make_response(jsonify({'status': 'error', 'message': str(e)}), 400)
+    return make_response(jsonify({'meetings': meetings}))
+
+@app.route('/segments')
+def speaker_segments_route():
+    """What one speaker said: ``speaker_id`` plus optional ``meeting_id`` and ``limit`` (at most ``MAX_PAGE_SIZE``)."""
+    speaker_id = request.args.get('speaker_id')
+    if speaker_id is None:
+        return make_response(jsonify({'status': 'error', 'message': 'speaker_id is required'}), 400)
+    try:
+        segments = get_speaker_segments(
+            speaker_id,
+            meeting_id=request.args.get('meeting_id'),
+            limit=request.args.get('limit', MAX_PAGE_SIZE),
+            db_path=app.config['DATABASE_PATH']
+        )
+    except ValueError:
+        return make_response(jsonify({'status': 'error', 'message': 'speaker_id, meeting_id and limit must be integers'}), 400)
+    return make_response(jsonify({'segments': segments}))
+
+@app.route('/meetings/<int:meeting_id>')
+def meeting_detail(meeting_id):
+    meeting = get_meeting(meeting_id, app.config['DATABASE_PATH'])
+    if meeting is None:
+        return make_response(jsonify({'status': 'error', 'message': 'Meeting not found'}), 404)
+    return make_response(jsonify(meeting))
+
+def get_meeting_id(data=None):
+    """Meeting ID sent by the client, defaulting to its own Socket.IO session."""
+    if isinstance(data, dict) and data.get('meeting_id'):
+        return str(data['meeting_id'])
+    return request.sid
 
 @socketio.on('start_meeting')
-def handle_start_meeting():
+def handle_start_meeting(data=None):
     try:
-        transcriber.start_transcription()
-        emit('meeting_started', {'status': 'success'})
+        meeting_id = get_meeting_id(data)
+        join_room(meeting_id)
+        transcriber = sessions.get_or_create(meeting_id)
+        # A client resuming after a reconnect or restart continues the same meeting
+        resumed = transcriber.is_recording or transcriber.recovered_entries > 0
+        if not transcriber.is_recording:
+            transcriber.start_recording()
+        emit('meeting_started', {'status': 'success', 'meeting_id': meeting_id,
+                                 'audio_input': transcriber.audio_input, 'resumed': resumed})
+    except SessionLimitError as e:
+        logger.warning(str(e))
+        emit('error', {'message': str(e)})
     except Exception as e:
         logger.error(f"Error starting meeting: {str(e)}")
         emit('error', {'message': str(e)})
 
+@socketio.on('join_meeting')
+def handle_join_meeting(data=None):
+    meeting_id = get_meeting_id(data)
+    join_room(meeting_id)
+    emit('meeting_joined', {'status': 'success', 'meeting_id': meeting_id})
+
+@socketio.on('transcript_resync')
+def handle_transcript_resync(data=None):
+    """Send a client the entries after the last sequence number it has ({meeting_id, since})."""
+    meeting_id = get_meeting_id(data)
+    try:
+        since = int((data or {}).get('since') or 0)
+    except (TypeError, ValueError):
+        since = 0
+    entries = transcript_emitter.since(meeting_id, since)
+    if entries is None:
+        # Older than the emitter's history: fall back to the session's transcript
+        transcriber = sessions.get(meeting_id)
+        entries = transcriber.segments.since(since) if transcriber is not None else []
+    emit('transcript_resync', {
+        'meeting_id': meeting_id,
+        'entries': entries,
+        'last_seq': transcript_emitter.last_seq(meeting_id),
+    })
+
+@socketio.on('leave_meeting')
+def handle_leave_meeting(data=None):
+    leave_room(get_meeting_id(data))
+
 @socketio.on('stop_meeting')
-def handle_stop_meeting():
+def handle_stop_meeting(data=None):
     try:
-        transcriber.stop_transcription()
-        emit('meeting_stopped', {'status': 'success'})
+        meeting_id = get_meeting_id(data)
+        transcriber = sessions.get(meeting_id)
+        if transcriber is None:
+            emit('error', {'message': f"Unknown meeting: {meeting_id}"})
+            return
+        # Only queue the post-meeting job here, so the client hears back at once
+        # however long summarizing takes; a repeated stop gets the same job
+        participants = data.get('participants') if isinstance(data, dict) else None
+        idempotency_key = (data.get('idempotency_key') if isinstance(data, dict) else None) \
+            or f"{POST_MEETING}:{meeting_id}:{transcriber.session_id}"
+        payload = {'meeting_id': meeting_id, 'session_id': transcriber.session_id, 'participants': participants or []}
+        job_id = job_queue.submit(POST_MEETING, payload, idempotency_key=idempotency_key, worker=WORKER_ID)
+        emit('meeting_stopped', {'status': 'success', 'meeting_id': meeting_id, 'job_id': job_id})
     except Exception as e:
         logger.error(f"Error stopping meeting: {str(e)}")
         emit('error', {'message': str(e)})
@@ -383,20 +406,104 @@ def handle_transcription(data):
     try:
         text = data.get('text', '')
         if text:
-            transcriber.process_transcription(text)
+            sessions.get_or_create(get_meeting_id(data)).process_transcription(text)
     except Exception as e:
         logger.error(f"Error processing transcription: {str(e)}")
         emit('error', {'message': str(e)})
 
 @app.route('/api/summary', methods=['GET'])
 def get_summary():
+    """Summarize a live meeting so far; the meeting is saved by the job queued when it stops."""
     try:
-        summary = transcriber.get_summary()
-        return jsonify({"status": "success", "summary": summary})
+        meeting_id = request.args.get('meeting_id')
+        transcriber = sessions.get(meeting_id) if meeting_id else None
+        if transcriber is None:
+            return jsonify({"status": "error", "message": "Unknown meeting"}), 404
+        return jsonify({"status": "success", "summary": transcriber.generate_summary()})
     except Exception as e:
         logger.error(f"Error getting summary: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/sessions', methods=['GET'])
+def get_session_stats():
+    """Report the live meetings hosted by this worker."""
+    return jsonify({"status": "success", **sessions.stats(), "emitter": transcript_emitter.stats(),
+                    "summary_stream": summary_streamer.stats() if summary_streamer else None,
+                    "worker": {"id": WORKER_ID, "count": WORKER_COUNT, "async_mode": socketio.async_mode,
+                               "message_queue": getattr(client_manager, 'name', None)}})
+
+@app.route('/api/live-meetings', methods=['GET'])
+def get_live_meetings():
+    """List meetings whose segments are persisted but that were never finished."""
+    return jsonify({"status": "success", "meetings": segment_writer.unfinished(),
+                    "writer": segment_writer.stats()})
+
+@app.route('/batch/jobs', methods=['POST'])
+def submit_batch_job():
+    """Transcribe recordings from the batch input directory: {"files": [...]}."""
+    data = request.get_json(silent=True) or {}
+    files = data.get('files')
+    if not files or not isinstance(files, list):
+        return jsonify({"status": "error", "message": "files must be a non-empty list"}), 400
+    try:
+        paths = [resolve_input_path(name) for name in files]
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    job_id = batch_jobs.submit(paths)
+    return jsonify({"status": "success", "job_id": job_id}), 202
+
+@app.route('/batch/jobs/<job_id>', methods=['GET'])
+def get_batch_job(job_id):
+    """Report a batch job's progress and, once done, its throughput."""
+    job = batch_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    return jsonify({"status": "success", "job": job})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Report a background job's stages and the results of those that finished."""
+    job = job_queue.job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    return jsonify({"status": "success", "job": job})
+
+@app.route('/api/audio', methods=['GET'])
+def get_audio_stats():
+    """Report audio ingestion counters for a meeting streaming its audio."""
+    meeting_id = request.args.get('meeting_id')
+    transcriber = sessions.get(meeting_id) if meeting_id else None
+    if transcriber is None or transcriber.audio_ingest is None:
+        return jsonify({"status": "error", "message": "Unknown meeting"}), 404
+    return jsonify({"status": "success", **transcriber.audio_ingest.stats()})
+
+@app.route('/api/llm', methods=['GET'])
+def get_llm_stats():
+    """Report the LLM gateway's concurrency, quota, retries and circuit state."""
+    return jsonify({"status": "success", **llm_gateway.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics of this worker and its siblings."""
+    if not METRICS_ENABLED:
+        return jsonify({"status": "error", "message": "Metrics are disabled"}), 404
+    return Response(metrics_exporter.render(), content_type=CONTENT_TYPE)
+
+@app.route('/api/tracing', methods=['GET'])
+def get_tracing_stats():
+    """Report whether tracing is on, its sample rate and how many spans were exported or dropped."""
+    return jsonify({"status": "success", **tracer.stats()})
+
+@app.route('/api/summary-cache', methods=['GET'])
+def get_summary_cache_stats():
+    """Report summary cache hits, misses and size."""
+    return jsonify({"status": "success", **summary_cache.stats()})
+
+@app.route('/api/clients', methods=['GET'])
+def get_client_stats():
+    """Report which Azure clients this worker has built and how long each took."""
+    return jsonify({"status": "success", "clients": clients.stats()})
+
 @app.route('/send_email', methods=['POST'])
 def send_email():
     try:
@@ -410,12 +517,20 @@ def send_email():
         if not participants or not summary:
             return make_response(jsonify({'status': 'error', 'message': 'Participants and summary are required'}), 400)
         
-        result = send_meeting_summary(participants, summary)
-        return make_response(jsonify(result))
+        job_id = email_outbox.enqueue(participants, summary)
+        return make_response(jsonify({'status': 'success', 'job_id': job_id}), 202)
     except Exception as e:
         logger.error(f"Error sending email: {str(e)}")
         return make_response(jsonify({'status': 'error', 'message': str(e)}), 500)
 
+@app.route('/email/jobs/<job_id>', methods=['GET'])
+def get_email_job(job_id):
+    """Report which recipients of an email job have been sent their summary."""
+    job = email_outbox.job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    return jsonify({"status": "success", "job": job})
+
 @app.route('/static/<path:filename>')
 def serve_static(filename):
     try:
@@ -434,11 +549,12 @@ def handle_disconnect():
 
 @socketio.on('audio_data')
 def handle_audio_data(data):
+    """Queue a frame of browser audio ({meeting_id, seq, audio}) for recognition."""
     try:
-        # Process audio data
-        logger.info('Received audio data')
-        # Add your audio processing logic here
-        socketio.emit('processing_status', {'status': 'processing'})
+        transcriber = sessions.get(get_meeting_id(data))
+        if transcriber is None or not isinstance(data, dict) or data.get('audio') is None:
+            return
+        transcriber.feed_audio(data['audio'], data.get('seq'))
     except Exception as e:
         logger.error(f"Error processing audio data: {str(e)}")
         socketio.emit('error', {'message': str(e)})
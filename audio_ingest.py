@@ -0,0 +1,228 @@
+import ctypes
+import logging
+import threading
+from config import AUDIO_FORMAT, AUDIO_SAMPLE_RATE, AUDIO_BUFFER_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Buffer fill levels at which the client is asked to pause and to resume
+HIGH_WATERMARK = 0.75
+LOW_WATERMARK = 0.25
+AUDIO_FORMATS = ('pcm', 'ogg_opus')
+
+
+class AudioRingBuffer:
+    """Fixed-size byte ring shared by one producer and one consumer.
+
+    Incoming frames are copied once, straight from the caller's buffer into
+    the ring. The consumer gets memoryviews over the ring itself with
+    ``peek()`` and releases the space with ``consume()`` once the bytes have
+    been handed on, so nothing is copied on the way out.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def write(self, data):
+        """Append a whole frame; returns False (writing nothing) if it does not fit."""
+        frame = memoryview(data).cast('B')
+        n = len(frame)
+        with self._cond:
+            if self._closed or n > self.capacity - self._size:
+                return False
+            end = (self._start + self._size) % self.capacity
+            first = min(n, self.capacity - end)
+            self._view[end:end + first] = frame[:first]
+            if first < n:
+                self._view[:n - first] = frame[first:]
+            self._size += n
+            self._cond.notify()
+        return True
+
+    def peek(self, max_bytes=None, timeout=None):
+        """Wait for data and return a view of the next contiguous run of it.
+
+        Returns None if nothing arrived within ``timeout`` or the buffer was
+        closed and is empty.
+        """
+        with self._cond:
+            if not self._size and not self._closed:
+                self._cond.wait(timeout)
+            if not self._size:
+                return None
+            n = min(self._size, self.capacity - self._start)
+            if max_bytes:
+                n = min(n, max_bytes)
+            return self._view[self._start:self._start + n]
+
+    def consume(self, n):
+        """Free the first ``n`` buffered bytes."""
+        with self._cond:
+            self._start = (self._start + n) % self.capacity
+            self._size -= n
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class SpeechPushSink:
+    """Feed audio into the Speech SDK through a ``PushAudioInputStream``."""
+
+    def __init__(self, audio_format=AUDIO_FORMAT, sample_rate=AUDIO_SAMPLE_RATE):
+        import azure.cognitiveservices.speech as speechsdk
+
+        if audio_format == 'ogg_opus':
+            stream_format = speechsdk.audio.AudioStreamFormat(
+                compressed_stream_format=speechsdk.AudioStreamContainerFormat.OGG_OPUS
+            )
+        else:
+            stream_format = speechsdk.audio.AudioStreamFormat(
+                samples_per_second=sample_rate, bits_per_sample=16, channels=1
+            )
+        self.stream = speechsdk.audio.PushAudioInputStream(stream_format)
+        self.audio_config = speechsdk.audio.AudioConfig(stream=self.stream)
+
+    def write(self, view):
+        # Hand the SDK a pointer into the ring buffer; it makes its own copy
+        self.stream.write((ctypes.c_char * len(view)).from_buffer(view))
+
+    def close(self):
+        self.stream.close()
+
+
+class BufferSink:
+    """Collect audio in memory; used by tests and replay benchmarks."""
+
+    audio_config = None
+
+    def __init__(self):
+        self.data = bytearray()
+        self.closed = False
+
+    def write(self, view):
+        self.data += view
+
+    def close(self):
+        self.closed = True
+
+
+class AudioIngestSession:
+    """Buffer one meeting's incoming audio frames and pump them into a sink.
+
+    ``feed()`` runs on the Socket.IO handler and only copies the frame into a
+    ring buffer; a pump thread forwards buffered audio to ``sink``. When the
+    buffer fills past HIGH_WATERMARK ``on_backpressure(True)`` asks the client
+    to hold back, and ``on_backpressure(False)`` lets it resume once the pump
+    has drained it below LOW_WATERMARK. Frames that do not fit are dropped
+    whole and counted, as are gaps in the client's sequence numbers.
+    """
+
+    def __init__(self, sink, capacity=AUDIO_BUFFER_BYTES, on_backpressure=None):
+        self.sink = sink
+        self.buffer = AudioRingBuffer(capacity)
+        self.on_backpressure = on_backpressure
+        self.paused = False
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_missing = 0
+        self.bytes_received = 0
+        self.bytes_dropped = 0
+        self.bytes_written = 0
+        self.peak_buffered = 0
+        self._last_seq = None
+        self._lock = threading.Lock()
+        self._pump = threading.Thread(target=self._run, name='audio-pump', daemon=True)
+        self._pump.start()
+
+    def feed(self, data, seq=None):
+        """Queue one frame from the client; returns False if it was dropped."""
+        with self._lock:
+            self.frames_received += 1
+            self.bytes_received += len(data)
+            if seq is not None:
+                if self._last_seq is not None and seq > self._last_seq + 1:
+                    self.frames_missing += seq - self._last_seq - 1
+                self._last_seq = seq
+
+            accepted = self.buffer.write(data)
+            if not accepted:
+                self.frames_dropped += 1
+                self.bytes_dropped += len(data)
+            buffered = len(self.buffer)
+            self.peak_buffered = max(self.peak_buffered, buffered)
+            pause = not self.paused and buffered >= self.buffer.capacity * HIGH_WATERMARK
+            if pause:
+                self.paused = True
+        if pause:
+            self._notify(True)
+        return accepted
+
+    def _notify(self, paused):
+        if self.on_backpressure:
+            try:
+                self.on_backpressure(paused)
+            except Exception as e:
+                logger.error(f"Error signalling audio backpressure: {str(e)}")
+
+    def _run(self):
+        while True:
+            view = self.buffer.peek(timeout=0.5)
+            if view is None:
+                if self.buffer.closed:
+                    break
+                continue
+            n = len(view)
+            try:
+                self.sink.write(view)
+            except Exception as e:
+                logger.error(f"Error writing audio to recognizer: {str(e)}")
+            self.buffer.consume(n)
+
+            with self._lock:
+                self.bytes_written += n
+                resume = self.paused and len(self.buffer) <= self.buffer.capacity * LOW_WATERMARK
+                if resume:
+                    self.paused = False
+            if resume:
+                self._notify(False)
+
+    def close(self, timeout=5):
+        """Flush what is buffered, then close the sink (ending the audio stream)."""
+        if self.buffer.closed:
+            return
+        self.buffer.close()
+        self._pump.join(timeout)
+        try:
+            self.sink.close()
+        except Exception as e:
+            logger.error(f"Error closing audio stream: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'frames_received': self.frames_received,
+                'frames_dropped': self.frames_dropped,
+                'frames_missing': self.frames_missing,
+                'bytes_received': self.bytes_received,
+                'bytes_dropped': self.bytes_dropped,
+                'bytes_written': self.bytes_written,
+                'buffered': len(self.buffer),
+                'peak_buffered': self.peak_buffered,
+                'capacity': self.buffer.capacity,
+                'paused': self.paused,
+            }
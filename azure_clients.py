@@ -0,0 +1,159 @@
+import importlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _endpoint_credential(cls, endpoint, key):
+    return cls(endpoint=endpoint, credential=key)
+
+
+def _key_vault(cls, vault_url):
+    from azure.identity import DefaultAzureCredential
+    return cls(vault_url=vault_url, credential=DefaultAzureCredential())
+
+
+def _blob_service(cls, connection_string):
+    return cls.from_connection_string(connection_string)
+
+
+def _cosmos(cls, endpoint, key):
+    return cls(endpoint, key)
+
+
+class ClientSpec:
+    """Describes how to build one Azure SDK client on demand."""
+
+    def __init__(self, name, module, class_name, env, factory=_endpoint_credential):
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        self.env = tuple(env)
+        self.factory = factory
+
+
+class ClientRegistry:
+    """Per-process registry that imports and builds Azure clients lazily.
+
+    Nothing is imported until ``get()`` is called for a client. The built client
+    (or ``None`` when its settings are missing or construction fails) is cached
+    for the life of the process, and the time spent importing and constructing
+    it is recorded in ``init_times()``.
+    """
+
+    def __init__(self):
+        self._specs = {}
+        self._clients = {}
+        self._init_times = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, module, class_name, env, factory=_endpoint_credential):
+        """Register a client without importing its SDK."""
+        self._specs[name] = ClientSpec(name, module, class_name, env, factory)
+
+    def names(self):
+        return list(self._specs)
+
+    def is_configured(self, name):
+        """Return True if every environment variable the client needs is set."""
+        spec = self._specs[name]
+        return all(os.environ.get(var) for var in spec.env)
+
+    def get(self, name):
+        """Return the client called ``name``, building it on first use."""
+        try:
+            return self._clients[name]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if name in self._clients:
+                return self._clients[name]
+            spec = self._specs[name]
+            self._clients[name] = self._build(spec)
+            return self._clients[name]
+
+    def _build(self, spec):
+        values = [os.environ.get(var) for var in spec.env]
+        if not all(values):
+            logger.warning(f"{spec.name} client not configured (missing {', '.join(spec.env)})")
+            return None
+
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(spec.module)
+            client = spec.factory(getattr(module, spec.class_name), *values)
+            logger.info(f"{spec.name} client initialized successfully")
+        except Exception as e:
+            logger.error(f"Error initializing {spec.name} client: {str(e)}")
+            client = None
+        self._init_times[spec.name] = time.perf_counter() - start
+        return client
+
+    def loaded(self):
+        """Names of clients that have been built (or attempted) so far."""
+        return list(self._clients)
+
+    def init_times(self):
+        """Seconds spent importing and constructing each client built so far."""
+        return dict(self._init_times)
+
+    def stats(self):
+        return {
+            name: {
+                'loaded': name in self._clients,
+                'available': self._clients.get(name) is not None,
+                'init_ms': round(self._init_times[name] * 1000, 3) if name in self._init_times else None,
+            }
+            for name in self._specs
+        }
+
+    def reset(self):
+        """Drop all cached clients (used by tests and after fork)."""
+        with self._lock:
+            self._clients.clear()
+            self._init_times.clear()
+
+
+def register_default_clients(registry):
+    """Register every Azure client the app knows how to build."""
+    registry.register('openai', 'azure.ai.openai', 'OpenAIClient',
+                      ['AZURE_OPENAI_ENDPOINT', 'AZURE_OPENAI_API_KEY'])
+    registry.register('key_vault', 'azure.keyvault.secrets', 'SecretClient',
+                      ['AZURE_KEY_VAULT_URL'], factory=_key_vault)
+    registry.register('blob_service', 'azure.storage.blob', 'BlobServiceClient',
+                      ['AZURE_STORAGE_CONNECTION_STRING'], factory=_blob_service)
+    registry.register('cosmos', 'azure.cosmos', 'CosmosClient',
+                      ['AZURE_COSMOS_ENDPOINT', 'AZURE_COSMOS_KEY'], factory=_cosmos)
+    registry.register('search', 'azure.search.documents', 'SearchClient',
+                      ['AZURE_SEARCH_ENDPOINT', 'AZURE_SEARCH_KEY'])
+    registry.register('form_recognizer', 'azure.ai.formrecognizer', 'DocumentAnalysisClient',
+                      ['AZURE_FORM_RECOGNIZER_ENDPOINT', 'AZURE_FORM_RECOGNIZER_KEY'])
+    registry.register('text_analytics', 'azure.ai.textanalytics', 'TextAnalyticsClient',
+                      ['AZURE_TEXT_ANALYTICS_ENDPOINT', 'AZURE_TEXT_ANALYTICS_KEY'])
+    registry.register('translation', 'azure.ai.translation.document', 'DocumentTranslationClient',
+                      ['AZURE_TRANSLATION_ENDPOINT', 'AZURE_TRANSLATION_KEY'])
+    registry.register('language', 'azure.ai.language.conversations', 'ConversationAnalysisClient',
+                      ['AZURE_LANGUAGE_ENDPOINT', 'AZURE_LANGUAGE_KEY'])
+    registry.register('personalizer', 'azure.ai.personalizer', 'PersonalizerClient',
+                      ['AZURE_PERSONALIZER_ENDPOINT', 'AZURE_PERSONALIZER_KEY'])
+    registry.register('metrics_advisor', 'azure.ai.metricsadvisor', 'MetricsAdvisorClient',
+                      ['AZURE_METRICS_ADVISOR_ENDPOINT', 'AZURE_METRICS_ADVISOR_KEY'])
+    registry.register('anomaly_detector', 'azure.ai.anomalydetector', 'AnomalyDetectorClient',
+                      ['AZURE_ANOMALY_DETECTOR_ENDPOINT', 'AZURE_ANOMALY_DETECTOR_KEY'])
+    registry.register('content_safety', 'azure.ai.contentsafety', 'ContentSafetyClient',
+                      ['AZURE_CONTENT_SAFETY_ENDPOINT', 'AZURE_CONTENT_SAFETY_KEY'])
+    registry.register('generative', 'azure.ai.generative', 'GenerativeClient',
+                      ['AZURE_AI_GENERATIVE_ENDPOINT', 'AZURE_AI_GENERATIVE_KEY'])
+    registry.register('ml', 'azure.ai.ml', 'MLClient',
+                      ['AZURE_ML_ENDPOINT', 'AZURE_ML_KEY'])
+    registry.register('document_intelligence', 'azure.ai.documentintelligence', 'DocumentIntelligenceClient',
+                      ['AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT', 'AZURE_DOCUMENT_INTELLIGENCE_KEY'])
+    return registry
+
+
+# Process-wide registry used by the app
+clients = register_default_clients(ClientRegistry())
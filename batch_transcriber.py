@@ -0,0 +1,425 @@
+"""Transcribe recorded meetings offline.
+
+Long recordings are split on silence, the segments are recognized
+concurrently by a pool of workers, and the reassembled transcript is saved
+like a live meeting:
+
+    python batch_transcriber.py recordings/*.wav --workers 8 --backend azure
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+import uuid
+import wave
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy
+from config import (
+    AZURE_SPEECH_KEY,
+    AZURE_SPEECH_REGION,
+    BATCH_MAX_WORKERS,
+    BATCH_PREFETCH_FILES,
+    BATCH_INPUT_DIR
+)
+from database import init_db, save_meeting
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_WIDTH = 2  # everything is converted to 16-bit mono PCM
+FRAME_MS = 30
+SILENCE_DBFS = -35
+MIN_SILENCE_MS = 500
+MIN_SEGMENT_SECONDS = 5
+MAX_SEGMENT_SECONDS = 60
+AUDIO_EXTENSIONS = ('.wav', '.flac')
+
+Segment = namedtuple('Segment', 'index start end pcm')
+
+
+class SegmentError(Exception):
+    """Raised when segments of a file could not be recognized; the file is not saved."""
+
+    def __init__(self, segments, failed):
+        super().__init__(f"{len(failed)} of {segments} segments could not be transcribed")
+        self.segments = segments
+        self.failed = failed  # [{'start': offset, 'error': message}]
+
+
+def _pcm_samples(pcm):
+    """The samples of 16-bit little-endian PCM."""
+    return numpy.frombuffer(pcm, dtype='<i2', count=len(pcm) // SAMPLE_WIDTH)
+
+
+def _rms(samples, frame_samples):
+    """The RMS of each ``frame_samples``-long frame of ``samples`` (the last one may be shorter)."""
+    if not len(samples):
+        return numpy.empty(0)
+    offsets = numpy.arange(0, len(samples), frame_samples)
+    squares = numpy.add.reduceat(numpy.square(samples, dtype=numpy.float64), offsets)
+    return numpy.sqrt(squares / numpy.diff(offsets, append=len(samples)))
+
+
+def _to_16_bit(pcm, width):
+    """Little-endian PCM with ``width`` bytes per sample (unsigned if 8-bit, as in WAV) as 16-bit."""
+    frames = numpy.frombuffer(pcm, dtype=numpy.uint8, count=len(pcm) - len(pcm) % width).reshape(-1, width)
+    if width == 1:
+        # Unsigned 8-bit samples become the high byte, with the sign bit flipped
+        samples = (frames[:, 0].astype(numpy.int16) - 128) << 8
+    else:
+        # Keep the two most significant bytes
+        samples = numpy.ascontiguousarray(frames[:, width - 2:]).view('<i2')
+    return samples.astype('<i2').tobytes()
+
+
+def _to_mono(pcm):
+    samples = _pcm_samples(pcm)
+    stereo = samples[:len(samples) - len(samples) % 2].reshape(-1, 2).astype(numpy.int32)
+    return (stereo.sum(axis=1) >> 1).astype('<i2').tobytes()
+
+
+def load_audio(path):
+    """Read a WAV or FLAC file as ``(pcm, sample_rate)``, 16-bit mono."""
+    if path.lower().endswith('.flac'):
+        try:
+            import soundfile
+        except ImportError:
+            raise RuntimeError("Reading FLAC files requires the soundfile package")
+        with soundfile.SoundFile(path) as audio:
+            sample_rate, channels = audio.samplerate, audio.channels
+            pcm = audio.read(dtype='int16').tobytes()
+        width = SAMPLE_WIDTH
+    else:
+        with wave.open(path, 'rb') as audio:
+            sample_rate, channels, width = audio.getframerate(), audio.getnchannels(), audio.getsampwidth()
+            pcm = audio.readframes(audio.getnframes())
+
+    if width != SAMPLE_WIDTH:
+        pcm = _to_16_bit(pcm, width)
+    if channels == 2:
+        pcm = _to_mono(pcm)
+    elif channels != 1:
+        raise ValueError(f"Unsupported channel count {channels} in {path}")
+    return pcm, sample_rate
+
+
+def split_on_silence(pcm, sample_rate, silence_dbfs=SILENCE_DBFS, min_silence_ms=MIN_SILENCE_MS,
+                     min_segment=MIN_SEGMENT_SECONDS, max_segment=MAX_SEGMENT_SECONDS):
+    """Split 16-bit mono PCM into segments at pauses in the speech.
+
+    Cuts fall in the middle of silences of at least ``min_silence_ms`` once a
+    segment is ``min_segment`` seconds long; a segment with no such pause is
+    cut at ``max_segment`` seconds. Segments that are silent throughout are
+    left out.
+    """
+    frame_samples = sample_rate * FRAME_MS // 1000
+    frame_bytes = frame_samples * SAMPLE_WIDTH
+    threshold = 32768 * 10 ** (silence_dbfs / 20)
+    samples = _pcm_samples(pcm)
+    voiced = (_rms(samples, frame_samples) >= threshold).tolist()
+
+    min_silence_frames = max(1, min_silence_ms // FRAME_MS)
+    min_frames = int(min_segment * 1000 / FRAME_MS)
+    max_frames = int(max_segment * 1000 / FRAME_MS)
+
+    cuts, start, silent_run = [], 0, 0
+    for i, is_voiced in enumerate(voiced):
+        silent_run = 0 if is_voiced else silent_run + 1
+        if silent_run >= min_silence_frames and i + 1 - start >= min_frames and (
+                i + 1 == len(voiced) or voiced[i + 1]):
+            # End of a long enough pause: cut in its middle (or in the part of it
+            # after the previous cut)
+            cut = i + 1 - min(silent_run, i + 1 - start) // 2
+            cuts.append(cut)
+            start = cut
+        elif i + 1 - start >= max_frames:
+            cuts.append(i + 1)
+            start = i + 1
+
+    segments = []
+    bounds = [0] + cuts + [len(voiced)]
+    for first, last in zip(bounds, bounds[1:]):
+        if last > first and any(voiced[first:last]):
+            segments.append(Segment(
+                index=len(segments),
+                start=first * FRAME_MS / 1000,
+                end=min(last * FRAME_MS / 1000, len(pcm) / (sample_rate * SAMPLE_WIDTH)),
+                pcm=pcm[first * frame_bytes:last * frame_bytes]
+            ))
+    return segments
+
+
+def format_offset(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class StubRecognizer:
+    """Local stand-in that "recognizes" a segment in ``realtime_factor`` x its duration."""
+
+    def __init__(self, realtime_factor=0.0):
+        self.realtime_factor = realtime_factor
+
+    def transcribe(self, pcm, sample_rate):
+        seconds = len(pcm) / (sample_rate * SAMPLE_WIDTH)
+        if self.realtime_factor:
+            time.sleep(seconds * self.realtime_factor)
+        return f"Speech lasting {seconds:.1f} seconds"
+
+
+class AzureRecognizer:
+    """Recognize a segment with Azure Speech continuous recognition over a push stream."""
+
+    def __init__(self, key=AZURE_SPEECH_KEY, region=AZURE_SPEECH_REGION, language="en-US", timeout=300):
+        import azure.cognitiveservices.speech as speechsdk
+
+        self.speechsdk = speechsdk
+        self.speech_config = speechsdk.SpeechConfig(subscription=key, region=region)
+        self.speech_config.speech_recognition_language = language
+        self.timeout = timeout
+
+    def transcribe(self, pcm, sample_rate):
+        speechsdk = self.speechsdk
+        stream = speechsdk.audio.PushAudioInputStream(speechsdk.audio.AudioStreamFormat(
+            samples_per_second=sample_rate, bits_per_sample=16, channels=1
+        ))
+        recognizer = speechsdk.SpeechRecognizer(
+            speech_config=self.speech_config,
+            audio_config=speechsdk.audio.AudioConfig(stream=stream)
+        )
+        texts, errors, done = [], [], threading.Event()
+
+        def on_canceled(evt):
+            if evt.cancellation_details.reason == speechsdk.CancellationReason.Error:
+                errors.append(evt.cancellation_details.error_details)
+            done.set()
+
+        recognizer.recognized.connect(lambda evt: evt.result.text and texts.append(evt.result.text))
+        recognizer.canceled.connect(on_canceled)
+        recognizer.session_stopped.connect(lambda evt: done.set())
+        recognizer.start_continuous_recognition()
+        stream.write(pcm)
+        stream.close()
+        finished = done.wait(self.timeout)
+        recognizer.stop_continuous_recognition()
+        if errors:
+            raise RuntimeError(errors[0])
+        if not finished:
+            raise TimeoutError(f"Recognition did not finish within {self.timeout} seconds")
+        return " ".join(texts)
+
+
+RECOGNIZERS = {
+    'stub': StubRecognizer,
+    'azure': AzureRecognizer,
+}
+
+
+class BatchTranscriber:
+    """Transcribe recorded files, recognizing their segments on a shared worker pool."""
+
+    def __init__(self, recognizer, max_workers=BATCH_MAX_WORKERS, db_path=None, summarize=None,
+                 prefetch_files=BATCH_PREFETCH_FILES):
+        self.recognizer = recognizer
+        self.max_workers = max_workers
+        self.prefetch_files = prefetch_files
+        self.db_path = db_path
+        self.summarize = summarize  # optional callable: transcript -> summary
+
+    def _transcribe_segment(self, segment, sample_rate):
+        try:
+            return self.recognizer.transcribe(segment.pcm, sample_rate)
+        except Exception as e:
+            logger.error(f"Error transcribing segment at {format_offset(segment.start)}: {str(e)}")
+            raise
+
+    def _submit(self, executor, path):
+        pcm, sample_rate = load_audio(path)
+        segments = split_on_silence(pcm, sample_rate)
+        futures = [executor.submit(self._transcribe_segment, segment, sample_rate) for segment in segments]
+        return segments, futures, len(pcm) / (sample_rate * SAMPLE_WIDTH)
+
+    def _finish(self, path, segments, futures, audio_seconds):
+        texts, failed = [], []
+        for segment, future in zip(segments, futures):
+            try:
+                texts.append(future.result())
+            except Exception as e:
+                texts.append("")
+                failed.append({'start': format_offset(segment.start), 'error': str(e)})
+        if failed:
+            raise SegmentError(len(segments), failed)
+
+        # Reassemble in timestamp order, whatever order the workers finished in
+        lines = [
+            f"[{format_offset(segment.start)}] {text}"
+            for segment, text in sorted(zip(segments, texts), key=lambda pair: pair[0].start)
+            if text
+        ]
+        transcript = "\n".join(lines)
+        summary = self.summarize(transcript) if self.summarize and transcript else ""
+        meeting_id = save_meeting(transcript, summary, self.db_path)
+        return {
+            'path': path,
+            'meeting_id': meeting_id,
+            'segments': len(segments),
+            'failed_segments': 0,
+            'audio_seconds': round(audio_seconds, 1),
+        }
+
+    def transcribe_files(self, paths, on_file_done=None):
+        """Transcribe ``paths``; returns per-file results and overall throughput.
+
+        The segments of the next ``prefetch_files`` files are queued while a
+        file is being finished, so the pool stays busy across file boundaries
+        without holding every recording in memory. ``on_file_done(result)``
+        is called as each file is saved. A file with segments that could not
+        be recognized is reported in ``errors`` with the failed segments,
+        instead of being saved with gaps.
+        """
+        start = time.perf_counter()
+        results, errors = [], []
+        failed_segments = 0
+        remaining = iter(paths)
+        pending = deque()
+
+        def prefetch(executor):
+            while len(pending) < self.prefetch_files:
+                path = next(remaining, None)
+                if path is None:
+                    return
+                try:
+                    pending.append((path, *self._submit(executor, path)))
+                except Exception as e:
+                    logger.error(f"Error reading {path}: {str(e)}")
+                    errors.append({'path': path, 'error': str(e)})
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='batch-stt') as executor:
+            prefetch(executor)
+            while pending:
+                path, segments, futures, audio_seconds = pending.popleft()
+                prefetch(executor)
+                try:
+                    result = self._finish(path, segments, futures, audio_seconds)
+                except SegmentError as e:
+                    logger.error(f"Not saving {path}: {str(e)}")
+                    errors.append({'path': path, 'error': str(e), 'segments': e.segments,
+                                   'failed_segments': len(e.failed), 'segment_errors': e.failed})
+                    failed_segments += len(e.failed)
+                    continue
+                except Exception as e:
+                    logger.error(f"Error saving {path}: {str(e)}")
+                    errors.append({'path': path, 'error': str(e)})
+                    continue
+                results.append(result)
+                if on_file_done:
+                    on_file_done(result)
+
+        wall_seconds = time.perf_counter() - start
+        audio_seconds = sum(result['audio_seconds'] for result in results)
+        return {
+            'files': results,
+            'errors': errors,
+            'failed_segments': failed_segments,
+            'audio_seconds': round(audio_seconds, 1),
+            'wall_seconds': round(wall_seconds, 2),
+            # audio-hours per wall-hour
+            'throughput': round(audio_seconds / wall_seconds, 1) if wall_seconds else 0.0,
+        }
+
+
+def resolve_input_path(name, input_dir=BATCH_INPUT_DIR):
+    """Resolve a job's file name inside ``input_dir``, refusing anything outside it."""
+    root = os.path.realpath(input_dir)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"{name} is outside the batch input directory")
+    if not path.lower().endswith(AUDIO_EXTENSIONS):
+        raise ValueError(f"{name} is not a WAV or FLAC file")
+    if not os.path.isfile(path):
+        raise ValueError(f"{name} does not exist")
+    return path
+
+
+class BatchJobManager:
+    """Run batch transcriptions in the background and report their progress."""
+
+    def __init__(self, transcriber_factory):
+        self.transcriber_factory = transcriber_factory
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, paths):
+        """Start transcribing ``paths``; returns the job ID."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                'id': job_id,
+                'status': 'queued',
+                'files_total': len(paths),
+                'files_done': 0,
+                'meeting_ids': [],
+            }
+        threading.Thread(target=self._run, args=(job_id, paths), name=f'batch-{job_id[:8]}', daemon=True).start()
+        return job_id
+
+    def _run(self, job_id, paths):
+        def on_file_done(result):
+            with self._lock:
+                self._jobs[job_id]['files_done'] += 1
+                self._jobs[job_id]['meeting_ids'].append(result['meeting_id'])
+
+        self._update(job_id, status='running')
+        try:
+            report = self.transcriber_factory().transcribe_files(paths, on_file_done=on_file_done)
+            self._update(job_id, status='completed', errors=report['errors'],
+                         failed_segments=report['failed_segments'], audio_seconds=report['audio_seconds'], wall_seconds=report['wall_seconds'],
+                         throughput=report['throughput'])
+        except Exception as e:
+            logger.error(f"Batch job {job_id} failed: {str(e)}")
+            self._update(job_id, status='failed', error=str(e))
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job, meeting_ids=list(job['meeting_ids'])) if job else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='WAV or FLAC recordings')
+    parser.add_argument('--workers', type=int, default=BATCH_MAX_WORKERS)
+    parser.add_argument('--backend', choices=sorted(RECOGNIZERS), default='azure')
+    parser.add_argument('--summarize', action='store_true', help='also summarize each transcript with Azure OpenAI')
+    parser.add_argument('--db', default=None, help='database path (defaults to the app database)')
+    args = parser.parse_args(argv)
+
+    summarize = None
+    if args.summarize:
+        from llm import OpenAIChatBackend
+        from summarizer import summarize_transcript
+        backend = OpenAIChatBackend()
+        summarize = lambda transcript: summarize_transcript(backend, transcript)
+
+    init_db(args.db)
+    batch = BatchTranscriber(RECOGNIZERS[args.backend](), max_workers=args.workers, db_path=args.db,
+                             summarize=summarize)
+    report = batch.transcribe_files(
+        args.paths,
+        on_file_done=lambda result: print(f"{result['path']}: meeting {result['meeting_id']}, "
+                                          f"{result['segments']} segments, {result['audio_seconds']} s of audio")
+    )
+    for error in report['errors']:
+        print(f"{error['path']}: {error['error']}")
+    print(f"Transcribed {report['audio_seconds'] / 3600:.2f} h of audio in {report['wall_seconds']:.1f} s "
+          f"({report['throughput']} audio-hours per wall-hour)")
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+"""Measure batch transcription throughput against worker count.
+
+Synthesizes recordings (speech-like tone bursts separated by pauses) and
+transcribes them with the stub recognizer, which takes --realtime-factor x
+each segment's duration, roughly like a remote recognition service.
+
+    python benchmarks/bench_batch.py --files 20 --minutes 30 --workers 1 4 16
+"""
+import argparse
+import math
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_transcriber import BatchTranscriber, StubRecognizer
+from database import init_db
+
+SAMPLE_RATE = 16000
+
+
+def write_recording(path, minutes, rng):
+    burst = b''.join(struct.pack('<h', int(6000 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE)))
+                     for i in range(SAMPLE_RATE))
+    pause = b'\x00\x00' * SAMPLE_RATE
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        seconds = 0
+        while seconds < minutes * 60:
+            speech = rng.randint(3, 20)
+            wav.writeframes(burst * speech + pause)
+            seconds += speech + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--minutes', type=int, default=30)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--realtime-factor', type=float, default=0.002)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    test_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(test_dir, 'bench.db')
+        init_db(db_path)
+        paths = []
+        for i in range(args.files):
+            paths.append(os.path.join(test_dir, f"meeting{i}.wav"))
+            write_recording(paths[-1], args.minutes, rng)
+
+        for workers in args.workers:
+            batch = BatchTranscriber(StubRecognizer(args.realtime_factor), max_workers=workers, db_path=db_path)
+            report = batch.transcribe_files(paths)
+            print(f"{workers:>3} workers: {report['audio_seconds'] / 3600:6.1f} h of audio in "
+                  f"{report['wall_seconds']:6.1f} s = {report['throughput']:8.1f} audio-hours per wall-hour")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+if __name__ == '__main__':
+    main()
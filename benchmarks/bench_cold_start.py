@@ -0,0 +1,49 @@
+"""Measure cold start: importing app.py and serving the first GET /.
+
+Each run happens in a fresh interpreter so module caches do not help.
+
+    python benchmarks/bench_cold_start.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/')
+done = time.perf_counter()
+assert response.status_code == 200
+print(f"RESULT {imported - start:.6f} {done - start:.6f}")
+"""
+
+
+def run_once():
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    line = next(line for line in output.splitlines() if line.startswith('RESULT'))
+    _, imported, first_response = line.split()
+    return float(imported), float(first_response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    imports = [r[0] * 1000 for r in results]
+    firsts = [r[1] * 1000 for r in results]
+    print(f"import app:        median {statistics.median(imports):8.1f} ms  max {max(imports):8.1f} ms")
+    print(f"first GET / done:  median {statistics.median(firsts):8.1f} ms  max {max(firsts):8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
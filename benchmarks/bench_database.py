@@ -0,0 +1,106 @@
+"""Compare connect-per-call SQLite access with the pooled WAL connections.
+
+Runs N concurrent writer threads (and the same number of readers) against a
+fresh database for each mode and reports inserts/sec and reads/sec.
+
+    python benchmarks/bench_database.py --writers 4 --ops 500
+"""
+import argparse
+import datetime
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS meetings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME NOT NULL,
+        transcript TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        participants TEXT
+    )
+'''
+TRANSCRIPT = "[10:00:00] Speaker 1: Let's go through the action items. " * 20
+
+
+def legacy_save(db_path, transcript, summary):
+    """save_meeting as it was: a new rollback-journal connection per call."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO meetings (timestamp, transcript, summary) VALUES (?, ?, ?)",
+        (datetime.datetime.now(), transcript, summary)
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_read(db_path, meeting_id):
+    conn = sqlite3.connect(db_path, timeout=30)
+    row = conn.execute("SELECT * FROM meetings WHERE id = ?", (meeting_id,)).fetchone()
+    conn.close()
+    return row
+
+
+def pooled_save(db_path, transcript, summary):
+    database.save_meeting(transcript, summary, db_path)
+
+
+def pooled_read(db_path, meeting_id):
+    return database.get_connection(db_path).execute(
+        "SELECT * FROM meetings WHERE id = ?", (meeting_id,)
+    ).fetchone()
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def bench(mode, save, read, writers, ops):
+    test_dir = tempfile.mkdtemp()
+    db_path = os.path.join(test_dir, 'bench.db')
+    try:
+        if mode == 'pooled':
+            database.init_db(db_path)
+        else:
+            conn = sqlite3.connect(db_path)
+            conn.execute(SCHEMA)
+            conn.close()
+
+        write_time = run_threads(writers, lambda: [save(db_path, TRANSCRIPT, "Summary") for _ in range(ops)])
+        total = writers * ops
+        read_time = run_threads(writers, lambda: [read(db_path, (i % total) + 1) for i in range(ops)])
+
+        print(f"{mode:>7}: {total / write_time:10.0f} inserts/sec  {total / read_time:10.0f} reads/sec")
+    finally:
+        database.close_connections()
+        shutil.rmtree(test_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--ops', type=int, default=500, help='operations per thread')
+    args = parser.parse_args()
+
+    print(f"{args.writers} concurrent threads x {args.ops} ops")
+    bench('legacy', legacy_save, legacy_read, args.writers, args.ops)
+    bench('pooled', pooled_save, pooled_read, args.writers, args.ops)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Diarization error rate of the speaker labelling backends.
+
+Scores three ways of labelling speakers against reference turns: the old
+heuristic (a new speaker after every utterance that follows more than two
+seconds without one, cycling through four labels), the local diarizer
+streaming the audio in 20 ms chunks as a meeting would, and the offline
+``diarize()`` pass over the whole recording. Reports DER with its missed,
+false alarm and confusion parts, and how fast each runs relative to the
+audio's duration. The ConversationTranscriber backend needs the Speech
+service and is not measured here.
+
+Without --wav the audio is a synthetic conversation; a real recording needs
+16-bit mono PCM and a reference file with one "start end speaker" line per
+turn (seconds).
+
+    python benchmarks/bench_diarization.py --speakers 3 --turns 16
+    python benchmarks/bench_diarization.py --wav meeting.wav --reference meeting.turns
+"""
+import argparse
+import os
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diarization import LocalDiarizer, diarize, diarization_error_rate, restrict_turns, speech_regions
+from tests.synthetic_voices import synthetic_conversation
+
+CHUNK_MS = 20
+RECOGNITION_LATENCY = 0.5  # seconds between the end of an utterance and its final result
+
+
+def load_reference(path):
+    turns = []
+    with open(path) as f:
+        for line in f:
+            if line.strip() and not line.startswith('#'):
+                start, end, speaker = line.split()[:3]
+                turns.append((float(start), float(end), speaker))
+    return turns
+
+
+def silence_heuristic(reference):
+    """The labels MeetingTranscriber used to give, treating each reference turn as one utterance."""
+    turns, speaker_count, last_result = [], 0, None
+    for start, end, _ in reference:
+        arrived = end + RECOGNITION_LATENCY
+        if last_result is None or arrived - last_result > 2.0:
+            speaker_count = (speaker_count + 1) % 4
+        last_result = arrived
+        turns.append((start, end, speaker_count))
+    return turns
+
+
+def report(name, reference, hypothesis, elapsed, duration):
+    result = diarization_error_rate(reference, hypothesis)
+    speakers = len({speaker for _, _, speaker in hypothesis})
+    print(f"{name:>10}: DER {result['der'] * 100:5.1f}%  (missed {result['missed']:5.1f} s, "
+          f"false alarm {result['false_alarm']:5.1f} s, confusion {result['confusion']:5.1f} s)  "
+          f"{speakers} speakers" + (f"  {elapsed / duration:.4f}x real time" if elapsed is not None else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--wav', help='16-bit mono PCM recording')
+    parser.add_argument('--reference', help='reference turns for --wav')
+    parser.add_argument('--speakers', type=int, default=3)
+    parser.add_argument('--turns', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.wav:
+        with wave.open(args.wav, 'rb') as wav:
+            if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+                parser.error('--wav must be 16-bit mono PCM')
+            sample_rate = wav.getframerate()
+            pcm = wav.readframes(wav.getnframes())
+        reference = load_reference(args.reference)
+    else:
+        sample_rate = 16000
+        pcm, reference = synthetic_conversation(args.turns, args.speakers, sample_rate, args.seed)
+    duration = len(pcm) / (sample_rate * 2)
+    speech = sum(end - start for start, end, _ in reference)
+    print(f"{duration:.1f} s of audio, {speech:.1f} s of speech by "
+          f"{len({speaker for _, _, speaker in reference})} speakers in {len(reference)} turns")
+
+    report('heuristic', reference, silence_heuristic(reference), None, duration)
+
+    diarizer = LocalDiarizer(sample_rate)
+    chunk = sample_rate * 2 * CHUNK_MS // 1000
+    feed_times = []
+    start = time.perf_counter()
+    for offset in range(0, len(pcm), chunk):
+        fed = time.perf_counter()
+        diarizer.feed(pcm[offset:offset + chunk])
+        feed_times.append(time.perf_counter() - fed)
+    diarizer.wait()
+    elapsed = time.perf_counter() - start
+    diarizer.close()
+    streamed = restrict_turns(diarizer.turns(), speech_regions(pcm, sample_rate))
+    report('streaming', reference, streamed, elapsed, duration)
+
+    start = time.perf_counter()
+    offline = diarize(pcm, sample_rate)
+    report('offline', reference, offline, time.perf_counter() - start, duration)
+
+    feed_times.sort()
+    print(f"feed() per {CHUNK_MS} ms chunk: median {feed_times[len(feed_times) // 2] * 1e6:.1f} us, "
+          f"max {feed_times[-1] * 1e6:.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Measure transcript fan-out cost with many listeners in one meeting room.
+
+Connects --listeners Socket.IO test clients to one room and publishes
+transcript entries at --rate per second, first sending each entry on its own
+(window 0, the old behaviour) and then coalesced over several batch windows.
+Reports the Socket.IO messages delivered per second and the CPU they cost.
+
+    python benchmarks/bench_emitter.py --listeners 500 --rate 20 --seconds 5
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_socketio import SocketIO, join_room
+from emitter import TranscriptEmitter
+
+ROOM = 'bench-meeting'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--listeners', type=int, default=500)
+    parser.add_argument('--rate', type=float, default=20, help='entries published per second')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--windows', type=int, nargs='+', default=[0, 50, 100, 200], help='batch windows in ms')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    app = Flask(__name__)
+    socketio = SocketIO(app)
+
+    @socketio.on('join')
+    def on_join(data):
+        join_room(ROOM)
+
+    clients = [socketio.test_client(app) for _ in range(args.listeners)]
+    for client in clients:
+        client.emit('join', {})
+        client.get_received()
+
+    print(f"{args.listeners} listeners, {args.rate:g} entries/s for {args.seconds:g} s")
+    print(f"{'window':>8} {'entries':>8} {'messages':>9} {'messages/s':>11} {'CPU s':>7} {'CPU %':>6} {'µs/entry':>9}")
+    for window_ms in args.windows:
+        emitter = TranscriptEmitter(socketio, window=window_ms / 1000)
+        count = int(args.rate * args.seconds)
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        for i in range(count):
+            emitter.publish(ROOM, {'text': f"Entry {i} of the benchmark meeting", 'speaker': 'Speaker 1',
+                                   'timestamp': '10:00:00', 'speaker_id': 1})
+            time.sleep(max(0, wall_start + (i + 1) / args.rate - time.perf_counter()))
+        emitter.close()
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+
+        messages = sum(len(client.get_received()) for client in clients)
+        print(f"{window_ms:>6}ms {count:>8} {messages:>9} {messages / wall:>11.0f} {cpu:>7.2f} "
+              f"{cpu / wall * 100:>5.0f}% {cpu / count * 1e6:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
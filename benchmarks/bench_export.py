@@ -0,0 +1,86 @@
+"""Check that exporting stays at a flat RSS as the archive grows.
+
+Builds a database of roughly --size-mb of hour-long transcripts, then exports
+it while sampling the process RSS every 50 ms.
+
+    python benchmarks/bench_export.py --size-mb 500 --format ndjson --gzip
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import init_db, get_connection, close_connections
+from export import export_meetings
+
+TRANSCRIPT = "[10:00:00] Speaker 1: We should ship the export before Friday.\n" * 800  # ~50 KB
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def build_database(db_path, size_mb):
+    init_db(db_path)
+    conn = get_connection(db_path)
+    rows = max(1, int(size_mb * 1024 * 1024 / len(TRANSCRIPT)))
+    batch = [("2025-01-01 10:00:00", TRANSCRIPT, "Summary of the meeting")] * 500
+    with conn:
+        for _ in range(0, rows, len(batch)):
+            conn.executemany(
+                "INSERT INTO meetings (timestamp, transcript, summary) VALUES (?, ?, ?)", batch
+            )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size-mb', type=int, default=200)
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+    parser.add_argument('--gzip', action='store_true')
+    args = parser.parse_args()
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(test_dir, 'bench.db')
+        rows = build_database(db_path, args.size_mb)
+        close_connections()
+
+        samples = []
+        done = threading.Event()
+
+        def sample():
+            while not done.wait(0.05):
+                samples.append(rss_mb())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        start_rss = rss_mb()
+        sampler.start()
+        start = time.perf_counter()
+        written = 0
+        for chunk in export_meetings(args.format, args.gzip, db_path):
+            written += len(chunk)
+        elapsed = time.perf_counter() - start
+        done.set()
+        sampler.join()
+
+        print(f"rows exported:  {rows}")
+        print(f"bytes written:  {written / 1024 / 1024:.1f} MiB in {elapsed:.2f} s "
+              f"({written / 1024 / 1024 / elapsed:.1f} MiB/s)")
+        print(f"RSS start:      {start_rss:.1f} MiB")
+        print(f"RSS max:        {max(samples or [start_rss]):.1f} MiB")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Measure transcript fan-out throughput as Socket.IO workers are added.
+
+Starts --workers server processes that relay room events through a
+cross-process broker (standing in for Redis), and --listeners long-polling
+clients spread over --meetings rooms. Meetings are hosted round robin
+over the workers, and each meeting's host emits --events transcript
+batches to the room. With --placement affinity every listener connects to
+its meeting's host, as the proxy routes them. With --placement spread
+listeners are assigned round robin, so most events cross the message queue.
+Reports deliveries per second for each worker count. Throughput only grows
+with workers while there are free CPU cores for them.
+
+    python benchmarks/bench_fanout.py --workers 1 2 4 --listeners 200 --meetings 8 --events 200
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engineio.payload
+import socketio
+from flask import Flask
+from flask_socketio import SocketIO, join_room
+from werkzeug.serving import make_server
+from pubsub import InProcessManager
+
+
+class QueueBroker:
+    """Broker across processes: one multiprocessing queue per worker."""
+
+    def __init__(self, queues, index):
+        self.queues = queues
+        self.index = index
+
+    def subscribe(self, channel):
+        return self.queues[self.index]
+
+    def unsubscribe(self, channel, subscription):
+        pass
+
+    def publish(self, channel, message):
+        for q in self.queues:
+            q.put(message)
+        return len(self.queues)
+
+
+def meeting_ids(count):
+    return [f"m{i}.bench" for i in range(count)]
+
+
+def host_of(meetings, meeting_id, workers):
+    return meetings.index(meeting_id) % workers
+
+
+def serve(index, queues, port, meetings, events, ready, start):
+    logging.disable(logging.INFO)
+    app = Flask(__name__)
+    sio = SocketIO(app, async_mode='threading',
+                   client_manager=InProcessManager(QueueBroker(queues, index), channel='bench'))
+
+    @sio.on('join_meeting')
+    def on_join(data):
+        join_room(data['meeting_id'])
+        return True
+
+    owned = [m for m in meetings if host_of(meetings, m, len(queues)) == index]
+
+    def emit_transcripts():
+        start.wait()
+        for seq in range(1, events + 1):
+            for meeting_id in owned:
+                sio.emit('transcript_batch', {'meeting_id': meeting_id, 'from_seq': seq, 'to_seq': seq,
+                                              'entries': [{'seq': seq, 'speaker': 'Speaker 1',
+                                                           'text': f"Entry {seq} of the benchmark meeting"}]},
+                         to=meeting_id)
+
+    threading.Thread(target=emit_transcripts, daemon=True).start()
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    ready.set()
+    server.serve_forever()
+
+
+def listen(assignments, events, timeout, connected, results):
+    logging.disable(logging.INFO)
+    # Browsers take any number of packets per poll; the Python client stops at 16
+    engineio.payload.Payload.max_decode_packets = 1 << 20
+    counts = [0] * len(assignments)
+    last = [0.0]
+    clients = []
+    for i, (url, meeting_id) in enumerate(assignments):
+        client = socketio.Client()
+
+        def on_batch(data, i=i):
+            counts[i] += 1
+            last[0] = time.time()
+
+        client.on('transcript_batch', on_batch)
+        client.connect(url, transports=['polling'])
+        client.call('join_meeting', {'meeting_id': meeting_id}, timeout=30)
+        clients.append(client)
+    connected.set()
+
+    deadline = time.time() + timeout
+    while sum(counts) < events * len(assignments) and time.time() < deadline:
+        time.sleep(0.01)
+    results.put((sum(counts), last[0]))
+    time.sleep(3600)  # the parent terminates this process along with the servers
+
+
+def run(args, workers):
+    ctx = multiprocessing.get_context('spawn')
+    meetings = meeting_ids(args.meetings)
+    queues = [ctx.Queue() for _ in range(workers)]
+    start = ctx.Event()
+    servers, ready = [], []
+    for index in range(workers):
+        event = ctx.Event()
+        process = ctx.Process(target=serve, daemon=True,
+                              args=(index, queues, args.port + index, meetings, args.events, event, start))
+        process.start()
+        servers.append(process)
+        ready.append(event)
+    for event in ready:
+        event.wait(30)
+
+    assignments = []
+    for i in range(args.listeners):
+        meeting_id = meetings[i % len(meetings)]
+        if args.placement == 'affinity':
+            worker = host_of(meetings, meeting_id, workers)
+        else:
+            worker = i % workers
+        assignments.append((f"http://127.0.0.1:{args.port + worker}", meeting_id))
+
+    results = ctx.Queue()
+    listeners, connected = [], []
+    for c in range(args.client_processes):
+        event = ctx.Event()
+        process = ctx.Process(target=listen, daemon=True,
+                              args=(assignments[c::args.client_processes], args.events, args.timeout, event, results))
+        process.start()
+        listeners.append(process)
+        connected.append(event)
+    for event in connected:
+        event.wait(120)
+
+    started = time.time()
+    start.set()
+    delivered, finished = 0, started
+    for _ in listeners:
+        count, last = results.get()
+        delivered += count
+        finished = max(finished, last)
+
+    for process in listeners + servers:
+        process.terminate()
+        process.join()
+    return delivered, finished - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--listeners', type=int, default=200)
+    parser.add_argument('--meetings', type=int, default=8)
+    parser.add_argument('--events', type=int, default=200, help='transcript batches per meeting')
+    parser.add_argument('--placement', choices=['affinity', 'spread'], default='affinity')
+    parser.add_argument('--client-processes', type=int, default=4)
+    parser.add_argument('--port', type=int, default=18000)
+    parser.add_argument('--timeout', type=float, default=120)
+    args = parser.parse_args()
+
+    print(f"{args.listeners} listeners in {args.meetings} meetings, {args.events} events per meeting, "
+          f"{args.placement} placement, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'delivered':>10} {'expected':>9} {'seconds':>8} {'deliveries/s':>13}")
+    for workers in args.workers:
+        delivered, elapsed = run(args, workers)
+        print(f"{workers:>8} {delivered:>10} {args.listeners * args.events:>9} {elapsed:>8.2f} "
+              f"{delivered / elapsed if elapsed > 0 else 0:>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
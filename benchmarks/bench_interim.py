@@ -0,0 +1,130 @@
+"""Measure speech-to-first-visible-text latency with and without interim results.
+
+A simulated recognizer "hears" utterances word by word: it raises a
+recognizing event per word and the final recognized event --final-delay
+seconds after the last word, like the service does once it detects the end
+of speech. A Socket.IO test client in the meeting room records when each
+utterance first becomes visible, either as an interim line or final text.
+
+    python benchmarks/bench_interim.py --utterances 10 --words 12
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_socketio import SocketIO, join_room
+from audio_ingest import BufferSink
+from llm import FakeChatBackend
+from transcriber import MeetingTranscriber
+
+ROOM = 'bench-meeting'
+
+
+class Signal:
+    def __init__(self):
+        self.handlers = []
+
+    def connect(self, handler):
+        self.handlers.append(handler)
+
+    def fire(self, text):
+        for handler in self.handlers:
+            handler(SimpleNamespace(result=SimpleNamespace(text=text)))
+
+
+class SimulatedRecognizer:
+    def __init__(self, utterances, words, word_seconds, final_delay, pause):
+        self.recognizing, self.recognized = Signal(), Signal()
+        self.canceled, self.session_started, self.session_stopped = Signal(), Signal(), Signal()
+        self.utterances, self.words = utterances, words
+        self.word_seconds, self.final_delay, self.pause = word_seconds, final_delay, pause
+        self.speech_started = []
+        self.thread = None
+
+    def start_continuous_recognition(self):
+        self.thread = threading.Thread(target=self._speak, daemon=True)
+        self.thread.start()
+
+    def stop_continuous_recognition(self):
+        pass
+
+    def _speak(self):
+        for u in range(self.utterances):
+            self.speech_started.append(time.perf_counter())
+            spoken = []
+            for w in range(self.words):
+                # A word is recognized once it has been spoken
+                time.sleep(self.word_seconds)
+                spoken.append(f"word{w}")
+                self.recognizing.fire(" ".join(spoken))
+            time.sleep(self.final_delay)
+            self.recognized.fire(" ".join(spoken))
+            time.sleep(self.pause)
+
+
+def run(args, interim):
+    app = Flask(__name__)
+    socketio = SocketIO(app)
+
+    @socketio.on('join')
+    def on_join(data):
+        join_room(ROOM)
+
+    client = socketio.test_client(app)
+    client.emit('join', {})
+    client.get_received()
+
+    recognizer = SimulatedRecognizer(args.utterances, args.words, args.word_seconds, args.final_delay, args.pause)
+    transcriber = MeetingTranscriber(
+        socketio, meeting_id=ROOM, llm=FakeChatBackend(), summarizer=None, audio_input='push',
+        audio_sink_factory=BufferSink, recognizer_factory=lambda **kwargs: recognizer, interim_results=interim
+    )
+    transcriber.start_recording()
+
+    visible = {}
+    deadline = time.perf_counter() + args.utterances * (args.words * args.word_seconds + args.final_delay + args.pause) + 5
+    while len(visible) < args.utterances and time.perf_counter() < deadline:
+        now = time.perf_counter()
+        for message in client.get_received():
+            payload = message['args'][0]
+            if message['name'] == 'transcript_interim':
+                visible.setdefault(payload['utterance_id'], now)
+            elif message['name'] == 'transcript_batch':
+                for entry in payload['entries']:
+                    visible.setdefault(entry['utterance_id'], now)
+        time.sleep(0.001)
+
+    with contextlib.redirect_stdout(io.StringIO()):  # stop_recording prints the transcript
+        transcriber.stop_recording()
+    transcriber.close()
+    return [(visible[u + 1] - started) * 1000 for u, started in enumerate(recognizer.speech_started) if u + 1 in visible]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--utterances', type=int, default=10)
+    parser.add_argument('--words', type=int, default=12)
+    parser.add_argument('--word-seconds', type=float, default=0.3)
+    parser.add_argument('--final-delay', type=float, default=0.8, help='end-of-speech detection delay')
+    parser.add_argument('--pause', type=float, default=0.3)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    for label, interim in (('final only', False), ('interim', True)):
+        latencies = run(args, interim)
+        print(f"{label:>10}: median {statistics.median(latencies):7.0f} ms  max {max(latencies):7.0f} ms "
+              f"({len(latencies)} utterances)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Measure full-text search latency over a large synthetic archive.
+
+    python benchmarks/bench_search.py --meetings 100000
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import init_db, get_connection, search_meetings
+
+WORDS = (
+    "budget roadmap hiring launch customer outage migration pricing design review "
+    "security compliance onboarding marketing sales forecast retention latency database "
+    "release sprint backlog incident postmortem contract vendor analytics dashboard"
+).split()
+FILLER = "we talked about it and agreed to follow up next week with the team".split()
+
+
+def fake_transcript(rng, lines=60):
+    # Each meeting sticks to a few topics, like real ones do
+    topics = rng.sample(WORDS, 3)
+    return "\n".join(
+        f"[10:{i % 60:02d}:00] Speaker {rng.randint(1, 4)}: "
+        + " ".join(rng.choice(FILLER if rng.random() < 0.9 else topics) for _ in range(15))
+        for i in range(lines)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--meetings', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    test_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(test_dir, 'bench.db')
+        init_db(db_path)
+        conn = get_connection(db_path)
+        start = time.perf_counter()
+        for offset in range(0, args.meetings, 1000):
+            rows = [
+                (f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 10:00:00",
+                 fake_transcript(rng), f"Summary about {rng.choice(WORDS)} and {rng.choice(WORDS)}",
+                 f"user{rng.randint(1, 500)}@example.com,user{rng.randint(1, 500)}@example.com")
+                for _ in range(min(1000, args.meetings - offset))
+            ]
+            with conn:
+                conn.executemany(
+                    "INSERT INTO meetings (timestamp, transcript, summary, participants) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+        print(f"loaded {args.meetings} meetings in {time.perf_counter() - start:.1f} s")
+
+        cases = {
+            'single term': lambda: search_meetings(rng.choice(WORDS), db_path=db_path),
+            'two terms': lambda: search_meetings(f"{rng.choice(WORDS)} {rng.choice(WORDS)}", db_path=db_path),
+            'participant': lambda: search_meetings(
+                rng.choice(WORDS), participant=f"user{rng.randint(1, 500)}@example.com", db_path=db_path),
+            'date range': lambda: search_meetings(
+                rng.choice(WORDS), start="2025-03-01", end="2025-03-31", db_path=db_path),
+        }
+        for name, run in cases.items():
+            timings = []
+            for _ in range(args.queries):
+                start = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(f"{name:>12}: median {statistics.median(timings):7.2f} ms  "
+                  f"p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+if __name__ == '__main__':
+    main()
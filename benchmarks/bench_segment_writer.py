@@ -0,0 +1,87 @@
+"""Measure what persisting live transcript segments costs the recognition callback.
+
+Appends N entries the way MeetingTranscriber.add_entry() does, either
+committing each one synchronously or handing it to the write-behind
+SegmentWriter, and reports the per-entry latency on the calling thread plus
+the time until everything is on disk.
+
+    python benchmarks/bench_segment_writer.py --entries 5000 --batch 50 --interval-ms 500
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from segment_writer import SegmentWriter, INSERT_LIVE_SEGMENT_SQL, UPSERT_LIVE_MEETING_SQL
+
+ROOM = 'bench-meeting'
+
+
+def make_entry(seq):
+    return {'text': f"Let's go through action item number {seq} before the break.",
+            'speaker': f"Speaker {seq % 4 + 1}", 'timestamp': '10:00:00',
+            'speaker_id': seq % 4 + 1, 'utterance_id': seq}
+
+
+def sync_append(db_path):
+    def append(room, entry):
+        conn = database.get_connection(db_path)
+        with conn:
+            conn.execute(UPSERT_LIVE_MEETING_SQL, (room, 'now', 'now', entry['utterance_id']))
+            conn.execute(INSERT_LIVE_SEGMENT_SQL, (room, entry['utterance_id'], entry['speaker_id'],
+                                                   entry['speaker'], entry['timestamp'], entry['text']))
+    return append, lambda: None
+
+
+def bench(mode, entries, batch, interval):
+    test_dir = tempfile.mkdtemp()
+    db_path = os.path.join(test_dir, 'meetings.db')
+    try:
+        database.init_db(db_path)
+        if mode == 'sync':
+            append, drain = sync_append(db_path)
+        else:
+            writer = SegmentWriter(db_path, batch_size=batch, interval=interval)
+            writer.start()
+            append, drain = writer.append, writer.close
+
+        latencies = []
+        start = time.perf_counter()
+        for seq in range(1, entries + 1):
+            entry = make_entry(seq)
+            t0 = time.perf_counter()
+            append(ROOM, entry)
+            latencies.append(time.perf_counter() - t0)
+        drain()
+        total = time.perf_counter() - start
+
+        stored = database.get_connection(db_path).execute("SELECT COUNT(*) FROM live_segments").fetchone()[0]
+        latencies.sort()
+        print(f"{mode:>12}: median {statistics.median(latencies) * 1e6:8.1f} us  "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:8.1f} us  "
+              f"all stored in {total:6.2f} s ({stored} rows)")
+    finally:
+        database.close_connections()
+        shutil.rmtree(test_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=50, help='entries per transaction')
+    parser.add_argument('--interval-ms', type=int, default=500, help='longest an entry waits to be written')
+    args = parser.parse_args()
+
+    print(f"{args.entries} transcript entries")
+    bench('sync', args.entries, args.batch, args.interval_ms / 1000)
+    bench('write-behind', args.entries, args.batch, args.interval_ms / 1000)
+
+
+if __name__ == '__main__':
+    main()
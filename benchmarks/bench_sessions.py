@@ -0,0 +1,73 @@
+"""Measure per-session overhead of hosting many meetings in one worker.
+
+Creates N MeetingTranscriber sessions through the SessionManager, feeds each
+the same number of utterances, and reports creation time, per-utterance cost
+and memory per session.
+
+    python benchmarks/bench_sessions.py --sessions 50 --utterances 500
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_manager import SessionManager
+from transcriber import MeetingTranscriber
+
+
+class NullSocketIO:
+    """Discards emits so the benchmark measures the session, not the transport."""
+
+    def emit(self, *args, **kwargs):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--utterances', type=int, default=500)
+    parser.add_argument('--max-entries', type=int, default=20000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    socketio = NullSocketIO()
+    manager = SessionManager(
+        lambda meeting_id: MeetingTranscriber(socketio, meeting_id=meeting_id, max_entries=args.max_entries),
+        max_sessions=args.sessions
+    )
+
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+
+    start = time.perf_counter()
+    for i in range(args.sessions):
+        manager.get_or_create(f'meeting-{i}')
+    created = time.perf_counter() - start
+    after_create, _ = tracemalloc.get_traced_memory()
+
+    event = SimpleNamespace(result=SimpleNamespace(text="This is a typical sentence spoken in a meeting."))
+    start = time.perf_counter()
+    for _ in range(args.utterances):
+        for i in range(args.sessions):
+            manager.get(f'meeting-{i}').handle_result(event)
+    fed = time.perf_counter() - start
+    after_feed, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = args.sessions * args.utterances
+    print(f"sessions:                {args.sessions}", file=sys.stderr)
+    print(f"create per session:      {created / args.sessions * 1000:8.3f} ms", file=sys.stderr)
+    print(f"memory per empty session:{(after_create - base) / args.sessions / 1024:8.1f} KiB", file=sys.stderr)
+    print(f"handle_result:           {fed / total * 1e6:8.1f} us/utterance", file=sys.stderr)
+    print(f"memory per session after {args.utterances} utterances: "
+          f"{(after_feed - base) / args.sessions / 1024:.1f} KiB (peak {peak / 1024 / 1024:.1f} MiB total)",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Measure summary wall time against transcript length and concurrency.
+
+Runs a local mock of the Azure OpenAI chat completions endpoint that sleeps
+for a time proportional to the prompt and completion size, then summarizes
+synthetic transcripts through the real openai client, one-shot and with the
+map-reduce summarizer at several pool sizes. With --stream it also reports
+how long the user waits for the first summary token when the completion is
+streamed, against waiting for the whole response.
+
+    python benchmarks/bench_summarize.py --lines 500 2000 8000 --workers 1 4 8
+    python benchmarks/bench_summarize.py --stream --lines 500 8000
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openai
+from llm import OpenAIChatBackend
+from llm_gateway import LLMGateway
+from summarizer import count_tokens, summarize_transcript
+
+
+def make_handler(args):
+    class CompletionHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            prompt_tokens = sum(count_tokens(m['content']) for m in body['messages'])
+            if prompt_tokens > args.context_tokens:
+                self.reply(400, {'error': {
+                    'code': 'context_length_exceeded',
+                    'message': f"This model's maximum context length is {args.context_tokens} tokens, "
+                               f"however you requested {prompt_tokens} tokens."
+                }})
+                return
+            completion_tokens = min(body.get('max_tokens', 1000), args.completion_tokens)
+            if body.get('stream'):
+                self.stream(prompt_tokens, completion_tokens)
+                return
+            time.sleep((args.base_ms + prompt_tokens * args.prompt_token_ms
+                        + completion_tokens * args.completion_token_ms) / 1000 * args.time_scale)
+            self.reply(200, {
+                'id': 'bench', 'object': 'chat.completion', 'created': int(time.time()),
+                'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {
+                    'role': 'assistant', 'content': 'Key point. ' * (completion_tokens // 3)}}],
+                'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens},
+            })
+
+        def stream(self, prompt_tokens, completion_tokens):
+            # The prompt is processed up front, then tokens come out one at a time
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            time.sleep((args.base_ms + prompt_tokens * args.prompt_token_ms) / 1000 * args.time_scale)
+            for i in range(completion_tokens):
+                if i:
+                    time.sleep(args.completion_token_ms / 1000 * args.time_scale)
+                chunk = {'id': 'bench', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                         'choices': [{'index': 0, 'finish_reason': None,
+                                      'delta': {'content': ('Key', ' point.', ' ')[i % 3]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def reply(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return CompletionHandler
+
+
+def fake_transcript(lines):
+    return "\n".join(
+        f"[10:{i // 60 % 60:02d}:{i % 60:02d}] Speaker {(i // 4) % 5 + 1}: "
+        f"We should revisit item {i} of the launch plan before the review on Friday"
+        for i in range(lines)
+    )
+
+
+def timed(run):
+    start = time.perf_counter()
+    try:
+        run()
+        return f"{time.perf_counter() - start:8.2f} s"
+    except openai.error.InvalidRequestError:
+        return "  too long"
+
+
+def time_to_first_token(backend, transcript, chunk_tokens):
+    start = time.perf_counter()
+    first = []
+    try:
+        summarize_transcript(backend, transcript, chunk_tokens=chunk_tokens,
+                             on_token=lambda token: first or first.append(time.perf_counter() - start))
+    except openai.error.InvalidRequestError:
+        return "  too long", "  too long"
+    return f"{first[0]:8.2f} s", f"{time.perf_counter() - start:8.2f} s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, nargs='+', default=[500, 2000, 8000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--chunk-tokens', type=int, default=3000)
+    parser.add_argument('--context-tokens', type=int, default=16384)
+    parser.add_argument('--base-ms', type=float, default=300)
+    parser.add_argument('--prompt-token-ms', type=float, default=0.05)
+    parser.add_argument('--completion-tokens', type=int, default=300)
+    parser.add_argument('--completion-token-ms', type=float, default=15)
+    parser.add_argument('--time-scale', type=float, default=0.1, help='shrink every simulated delay')
+    parser.add_argument('--stream', action='store_true', help='report time to the first streamed summary token')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # No quota, so only the simulated service time is measured
+    gateway = LLMGateway(api_key='bench', api_base=f"http://127.0.0.1:{server.server_port}",
+                         api_version='2023-05-15', max_concurrency=max(args.workers),
+                         requests_per_minute=0, tokens_per_minute=0, max_retries=0, hedge=False)
+    backend = OpenAIChatBackend(gateway=gateway)
+
+    print(f"{'lines':>6} {'tokens':>7} {'one-shot':>10} "
+          + " ".join(f"{f'{n} workers':>10}" for n in args.workers))
+    try:
+        for lines in args.lines:
+            transcript = fake_transcript(lines)
+            row = [timed(lambda: summarize_transcript(backend, transcript, chunk_tokens=10 ** 9))]
+            for workers in args.workers:
+                row.append(timed(lambda: summarize_transcript(
+                    backend, transcript, chunk_tokens=args.chunk_tokens, max_workers=workers)))
+            print(f"{lines:>6} {count_tokens(transcript):>7} " + " ".join(f"{cell:>10}" for cell in row))
+
+        if args.stream:
+            # The blocking figure is when the summary first appears without streaming
+            print(f"\n{'lines':>6} {'blocking':>10} {'1st token':>10} {'streamed':>10}")
+            for lines in args.lines:
+                transcript = fake_transcript(lines)
+                blocking = timed(lambda: summarize_transcript(backend, transcript, chunk_tokens=args.chunk_tokens))
+                first, total = time_to_first_token(backend, transcript, args.chunk_tokens)
+                print(f"{lines:>6} {blocking:>10} {first:>10} {total:>10}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
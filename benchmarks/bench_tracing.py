@@ -0,0 +1,108 @@
+"""Measure what tracing adds to the recognition callback.
+
+Calls MeetingTranscriber.handle_result for synthetic final results, with the
+transcript emitter and the segment writer attached as in production, once
+with tracing disabled, once enabled with every trace sampled out and once
+with every trace exported to a JSON-lines file. Also times an empty span on
+its own, against a loop that does nothing.
+
+    python benchmarks/bench_tracing.py --utterances 20000
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transcriber as transcriber_module
+from audio_ingest import BufferSink
+from database import init_db
+from emitter import TranscriptEmitter
+from llm import FakeChatBackend
+from segment_writer import SegmentWriter
+from tracing import Tracer, JsonLinesExporter
+
+ROOM = 'bench-meeting'
+
+
+class NullSocketIO:
+    def emit(self, event, payload, to=None):
+        pass
+
+
+def result(i):
+    # Offsets and durations are in 100 ns ticks
+    return SimpleNamespace(result=SimpleNamespace(
+        text=f"We should revisit item {i} of the launch plan before the review on Friday",
+        offset=i * 30_000_000, duration=25_000_000, speaker_id=None, properties={}))
+
+
+def callback_cost(tracer, args, db_path):
+    transcriber_module.tracer = tracer
+    writer = SegmentWriter(db_path=db_path)
+    writer.start()
+    transcriber = transcriber_module.MeetingTranscriber(
+        NullSocketIO(), meeting_id=ROOM, llm=FakeChatBackend(), summarizer=None, audio_input='push',
+        audio_sink_factory=BufferSink, emitter=TranscriptEmitter(NullSocketIO()), segment_writer=writer,
+        interim_results=False, diarization='none')
+    events = [result(i) for i in range(args.utterances)]
+    start = time.perf_counter()
+    for evt in events:
+        transcriber.handle_result(evt)
+    elapsed = time.perf_counter() - start
+    transcriber.close()
+    writer.close()
+    tracer.close()
+    return elapsed / args.utterances * 1e6
+
+
+def span_cost(tracer, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with tracer.span('utterance', baggage={'meeting_id': ROOM}) as span:
+            if span.sampled:
+                pass
+    spans = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    empty = time.perf_counter() - start
+    return (spans - empty) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--utterances', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=200000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(test_dir, 'meetings.db')
+        init_db(db_path)
+        traces = os.path.join(test_dir, 'traces.jsonl')
+        configurations = (
+            ('disabled', lambda: Tracer(enabled=False)),
+            ('sampled out', lambda: Tracer(JsonLinesExporter(traces), enabled=True, sample_rate=0)),
+            ('exported', lambda: Tracer(JsonLinesExporter(traces), enabled=True, sample_rate=1,
+                                        queue_size=args.utterances * 4)),
+        )
+        print(f"{'tracing':>12} {'callback':>12} {'span alone':>12}")
+        for label, make_tracer in configurations:
+            callback = callback_cost(make_tracer(), args, db_path)
+            tracer = make_tracer()
+            alone = span_cost(tracer, args.iterations)
+            tracer.close()
+            print(f"{label:>12} {callback:9.2f} us {alone:9.2f} us")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Compare transcript memory of the old parallel lists with SegmentStore.
+
+Simulates a long meeting (one utterance every --interval seconds for
+--hours) and stores it three ways: the two lists MeetingTranscriber used to
+keep (raw text plus one dict per entry), a SegmentStore without a memory
+budget, and a SegmentStore with one. Reports retained memory and the time
+to build the formatted transcript.
+
+    python benchmarks/bench_transcript_memory.py --hours 8 --interval 3 --budget-kib 1024
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from segment_store import SegmentStore
+
+WORDS = ("we need to ship the release next week so let us review the open action items "
+         "budget design customer feedback roadmap migration testing deadline owner").split()
+
+
+def utterances(count, seed=7):
+    rng = random.Random(seed)
+    for i in range(count):
+        speaker_id = rng.randint(1, 4)
+        seconds = i * 3
+        timestamp = f"{9 + seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 30))).capitalize() + "."
+        yield i + 1, speaker_id, timestamp, text
+
+
+class ListTranscript:
+    """The storage MeetingTranscriber used before: two growing lists, joined on demand."""
+
+    def __init__(self):
+        self.transcript = []
+        self.speaker_transcript = []
+
+    def append(self, seq, speaker_id, timestamp, text):
+        self.transcript.append(text)
+        self.speaker_transcript.append({
+            'text': text,
+            'speaker': f"Speaker {speaker_id}",
+            'timestamp': "".join(timestamp),  # a fresh string per entry, as strftime() returned
+            'speaker_id': speaker_id,
+            'utterance_id': seq,
+            'seq': seq,
+        })
+
+    def formatted(self):
+        return "\n".join(f"[{e['timestamp']}] {e['speaker']}: {e['text']}" for e in self.speaker_transcript)
+
+
+class StoreTranscript:
+    def __init__(self, budget):
+        self.store = SegmentStore(memory_budget=budget, max_segments=None)
+
+    def append(self, seq, speaker_id, timestamp, text):
+        self.store.append(seq, speaker_id, f"Speaker {speaker_id}", timestamp, text)
+
+    def formatted(self):
+        return self.store.formatted()
+
+
+def bench(name, make, entries):
+    # Build the inputs first so only what the storage retains is measured
+    items = [(seq, speaker_id, timestamp, "".join(text)) for seq, speaker_id, timestamp, text in entries]
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    transcript = make()
+    start = time.perf_counter()
+    for item in items:
+        transcript.append(*item)
+    append_time = time.perf_counter() - start
+    del items
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    text = transcript.formatted()
+    format_time = time.perf_counter() - start
+    print(f"{name:>16}: {(retained - base) / 1024 / 1024:7.2f} MiB retained  "
+          f"append {append_time / len(text.splitlines()) * 1e6:5.2f} us/entry  "
+          f"formatted {len(text) / 1024 / 1024:5.2f} MiB in {format_time * 1000:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--hours', type=float, default=8)
+    parser.add_argument('--interval', type=float, default=3, help='seconds between utterances')
+    parser.add_argument('--budget-kib', type=int, default=1024, help='memory budget of the spilling store')
+    args = parser.parse_args()
+
+    count = int(args.hours * 3600 / args.interval)
+    entries = list(utterances(count))
+    print(f"{count} utterances ({args.hours:g} h, one every {args.interval:g} s)")
+    bench('lists', ListTranscript, entries)
+    bench('store', lambda: StoreTranscript(None), entries)
+    bench('store + spill', lambda: StoreTranscript(args.budget_kib * 1024), entries)
+
+
+if __name__ == '__main__':
+    main()
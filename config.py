@@ -16,11 +16,142 @@ AZURE_OPENAI_ENDPOINT = os.getenv('AZURE_OPENAI_ENDPOINT')
 AZURE_OPENAI_API_VERSION = "2023-05-15"
 AZURE_OPENAI_DEPLOYMENT = "gpt-35-turbo"
 
+# Local SQLite database
+DATABASE_PATH = os.getenv('DATABASE_PATH', 'meetings.db')
+
 # Email configuration
 EMAIL_USER = os.getenv('EMAIL_USER')
 EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
 EMAIL_SMTP_SERVER = os.getenv('EMAIL_SMTP_SERVER')
 EMAIL_SMTP_PORT = int(os.getenv('EMAIL_SMTP_PORT', '587'))
+EMAIL_STARTTLS = os.getenv('EMAIL_STARTTLS', 'true').lower() == 'true'
+
+# Email outbox: queued in SQLite and sent in the background over pooled connections
+EMAIL_OUTBOX_WORKERS = int(os.getenv('EMAIL_OUTBOX_WORKERS', '2'))  # sender threads per process
+EMAIL_POOL_SIZE = int(os.getenv('EMAIL_POOL_SIZE', '2'))  # open SMTP connections per process
+EMAIL_POOL_IDLE_CHECK_SECONDS = int(os.getenv('EMAIL_POOL_IDLE_CHECK_SECONDS', '30'))  # NOOP before reusing older ones
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', '6'))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv('EMAIL_RETRY_BASE_SECONDS', '30'))  # doubles after each failure
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv('EMAIL_RETRY_MAX_SECONDS', '3600'))
+EMAIL_RATE_PER_MINUTE = float(os.getenv('EMAIL_RATE_PER_MINUTE', '60'))
+
+# Secret loading configuration
+AZURE_KEY_VAULT_URL = os.getenv('AZURE_KEY_VAULT_URL')
+SECRETS_TTL_SECONDS = int(os.getenv('SECRETS_TTL_SECONDS', '3600'))
+SECRETS_REFRESH_MARGIN_SECONDS = int(os.getenv('SECRETS_REFRESH_MARGIN_SECONDS', '300'))
+SECRETS_CACHE_PATH = os.getenv('SECRETS_CACHE_PATH')  # encrypted file cache, off by default
+SECRETS_CACHE_KEY = os.getenv('SECRETS_CACHE_KEY')  # Fernet key for the file cache
+
+# Meeting session configuration (per worker process)
+MAX_SESSIONS_PER_WORKER = int(os.getenv('MAX_SESSIONS_PER_WORKER', '50'))
+SESSION_IDLE_TIMEOUT_SECONDS = int(os.getenv('SESSION_IDLE_TIMEOUT_SECONDS', '1800'))
+# Transcript entries kept in memory per session; older ones spill to a temp file
+SESSION_MAX_TRANSCRIPT_ENTRIES = int(os.getenv('SESSION_MAX_TRANSCRIPT_ENTRIES', '20000'))
+SESSION_TRANSCRIPT_MEMORY_BYTES = int(os.getenv('SESSION_TRANSCRIPT_MEMORY_BYTES', str(1024 * 1024)))
+SEGMENT_SPILL_DIR = os.getenv('SEGMENT_SPILL_DIR') or None  # system temp dir if unset
+
+# Rolling summarization during the meeting
+ROLLING_SUMMARY_ENABLED = os.getenv('ROLLING_SUMMARY_ENABLED', 'true').lower() == 'true'
+ROLLING_SUMMARY_WINDOW = int(os.getenv('ROLLING_SUMMARY_WINDOW', '40'))  # entries per window
+ROLLING_SUMMARY_FAN_IN = int(os.getenv('ROLLING_SUMMARY_FAN_IN', '8'))  # notes merged per level
+SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', '3000'))  # transcript tokens per request
+SUMMARY_MAX_WORKERS = int(os.getenv('SUMMARY_MAX_WORKERS', '4'))  # concurrent chunk requests
+
+# Audio input: 'microphone' records on the server host, 'push' takes audio
+# streamed by the browser over Socket.IO ('pcm' 16-bit mono or 'ogg_opus')
+AUDIO_INPUT_MODE = os.getenv('AUDIO_INPUT_MODE', 'microphone')
+AUDIO_FORMAT = os.getenv('AUDIO_FORMAT', 'pcm')
+AUDIO_SAMPLE_RATE = int(os.getenv('AUDIO_SAMPLE_RATE', '16000'))
+AUDIO_BUFFER_BYTES = int(os.getenv('AUDIO_BUFFER_BYTES', str(16000 * 2 * 5)))  # 5 s of 16 kHz PCM
+
+# Transcript updates are coalesced per meeting room for this long before sending
+TRANSCRIPT_BATCH_WINDOW_MS = int(os.getenv('TRANSCRIPT_BATCH_WINDOW_MS', '100'))  # 50-200 works well
+TRANSCRIPT_RESYNC_HISTORY = int(os.getenv('TRANSCRIPT_RESYNC_HISTORY', '500'))  # entries kept for gap resync
+
+# The final summary is streamed to the meeting room as it is generated, with
+# tokens coalesced for this long per event
+SUMMARY_STREAM_ENABLED = os.getenv('SUMMARY_STREAM_ENABLED', 'true').lower() == 'true'
+SUMMARY_STREAM_WINDOW_MS = int(os.getenv('SUMMARY_STREAM_WINDOW_MS', '50'))
+
+# Interim (partial) recognition results, throttled per meeting
+INTERIM_RESULTS_ENABLED = os.getenv('INTERIM_RESULTS_ENABLED', 'true').lower() == 'true'
+INTERIM_MIN_INTERVAL_MS = int(os.getenv('INTERIM_MIN_INTERVAL_MS', '250'))
+
+# Offline batch transcription of recorded meetings
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', '8'))  # concurrent segment recognitions
+BATCH_PREFETCH_FILES = int(os.getenv('BATCH_PREFETCH_FILES', '2'))  # files decoded ahead of the pool
+BATCH_INPUT_DIR = os.getenv('BATCH_INPUT_DIR', 'recordings')  # files the job API may read
+BATCH_RECOGNIZER = os.getenv('BATCH_RECOGNIZER', 'azure')  # 'azure' or 'stub'
+
+# LLM response cache
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv('SUMMARY_CACHE_MAX_ENTRIES', '256'))  # in-memory LRU
+SUMMARY_CACHE_PATH = os.getenv('SUMMARY_CACHE_PATH', 'summary_cache.db')  # empty disables the disk tier
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv('SUMMARY_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Azure OpenAI calls go through one gateway per worker: a shared keep-alive
+# connection pool, limits matching the deployment's quota (0 = unlimited),
+# jittered retries that honour Retry-After, and a circuit breaker
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))  # requests in flight, also the pool size
+LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', '720'))
+LLM_TOKENS_PER_MINUTE = int(os.getenv('LLM_TOKENS_PER_MINUTE', '120000'))  # prompt plus max_tokens
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv('LLM_REQUEST_TIMEOUT_SECONDS', '90'))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv('LLM_QUEUE_TIMEOUT_SECONDS', '60'))  # wait for a slot and quota
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+LLM_RETRY_BASE_SECONDS = float(os.getenv('LLM_RETRY_BASE_SECONDS', '1'))
+LLM_RETRY_MAX_SECONDS = float(os.getenv('LLM_RETRY_MAX_SECONDS', '30'))
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))  # consecutive failures that open it
+LLM_BREAKER_RESET_SECONDS = float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+# A slow request is duplicated once it runs past the 95th percentile latency
+LLM_HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', 'true').lower() == 'true'
+LLM_HEDGE_MIN_SECONDS = float(os.getenv('LLM_HEDGE_MIN_SECONDS', '2'))
+
+# Running several Socket.IO workers: events are relayed between them through
+# the message queue, and clients are routed to a worker by affinity key
+SOCKETIO_ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE') or None  # threading, eventlet, gevent; auto if unset
+SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')  # redis://host:6379/0, memory:// for tests
+SOCKETIO_CHANNEL = os.getenv('SOCKETIO_CHANNEL', 'meeting-assistant')
+WORKER_COUNT = int(os.getenv('WORKER_COUNT', '1'))
+WORKER_ID = int(os.getenv('WORKER_ID', '0'))
+
+# Prometheus metrics at /metrics. With several worker processes on one host,
+# each writes its metrics to METRICS_DIR every METRICS_SNAPSHOT_SECONDS and any
+# worker's /metrics reports all of them
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_DIR = os.getenv('METRICS_DIR') or None
+METRICS_SNAPSHOT_SECONDS = float(os.getenv('METRICS_SNAPSHOT_SECONDS', '5'))
+
+# Tracing of each utterance (recognition, callback, emit, persistence) and of
+# the summary and email jobs. Spans go to a JSON-lines file or an OTLP/HTTP
+# collector; TRACING_SAMPLE_RATE is the share of traces kept
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'false').lower() == 'true'
+TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'jsonl')  # jsonl or otlp
+TRACING_FILE = os.getenv('TRACING_FILE', 'traces.jsonl')
+TRACING_OTLP_ENDPOINT = os.getenv('TRACING_OTLP_ENDPOINT', 'http://localhost:4318')
+TRACING_SAMPLE_RATE = min(1.0, max(0.0, float(os.getenv('TRACING_SAMPLE_RATE', '1'))))
+TRACING_SERVICE_NAME = os.getenv('TRACING_SERVICE_NAME', 'meeting-assistant')
+TRACING_QUEUE_SIZE = int(os.getenv('TRACING_QUEUE_SIZE', '2048'))
+TRACING_EXPORT_INTERVAL_SECONDS = float(os.getenv('TRACING_EXPORT_INTERVAL_SECONDS', '2'))
+
+# Write-behind persistence of live transcript segments: a batch is committed
+# once it holds SEGMENT_FLUSH_ENTRIES or its oldest entry is this many ms old
+SEGMENT_FLUSH_ENTRIES = int(os.getenv('SEGMENT_FLUSH_ENTRIES', '50'))
+SEGMENT_FLUSH_INTERVAL_MS = int(os.getenv('SEGMENT_FLUSH_INTERVAL_MS', '500'))
+
+# Speaker diarization: 'conversation' uses the Speech SDK ConversationTranscriber,
+# 'local' clusters voice embeddings of the pushed PCM audio, 'none' keeps one speaker
+DIARIZATION_BACKEND = os.getenv('DIARIZATION_BACKEND', 'conversation')
+DIARIZATION_WINDOW_MS = int(os.getenv('DIARIZATION_WINDOW_MS', '1000'))  # audio per embedding
+DIARIZATION_HOP_MS = int(os.getenv('DIARIZATION_HOP_MS', '500'))
+DIARIZATION_THRESHOLD = float(os.getenv('DIARIZATION_THRESHOLD', '0.5'))  # cosine distance that starts a new speaker
+DIARIZATION_MAX_SPEAKERS = int(os.getenv('DIARIZATION_MAX_SPEAKERS', '8'))
+
+# Background jobs, e.g. the pipeline that summarizes, saves and emails a
+# meeting after it stops; each stage is retried with exponential backoff
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))  # job threads per process
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '4'))  # per stage
+JOB_RETRY_BASE_SECONDS = float(os.getenv('JOB_RETRY_BASE_SECONDS', '5'))  # doubles after each failure
+JOB_RETRY_MAX_SECONDS = float(os.getenv('JOB_RETRY_MAX_SECONDS', '300'))
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '900'))  # a stage running longer is assumed dead
 
 def validate_config():
     """Validate that all required environment variables are set."""
@@ -1,89 +1,233 @@
 import sqlite3
+import base64
 import datetime
 import json
 import os
+import re
+import threading
 from pathlib import Path
+from config import DATABASE_PATH
+from metrics import DB_QUERY_SECONDS, timed
+from migrations import migrate, run_backfills, pending_backfills, write_segments, write_participants, BACKFILL_BATCH_SIZE
 
-# Use a local SQLite database
-DATABASE_PATH = 'meetings.db'
+# Applied to every new connection. WAL lets readers run alongside a writer,
+# synchronous=NORMAL is durable across application crashes in WAL mode, and
+# the mmap/cache sizes keep hot pages out of read() syscalls.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
 
-def get_connection():
-    """Get a connection to the SQLite database."""
-    return sqlite3.connect(DATABASE_PATH)
+# Connections live for the whole thread, so sqlite3's per-connection statement
+# cache turns every query below into a prepared-statement reuse.
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT_SECONDS = 10
 
-def init_db():
+INSERT_MEETING_SQL = "INSERT INTO meetings (timestamp, transcript, summary) VALUES (?, ?, ?)"
+LATEST_MEETING_ID_SQL = "SELECT id FROM meetings ORDER BY id DESC LIMIT 1"
+UPDATE_PARTICIPANTS_SQL = "UPDATE meetings SET participants = ? WHERE id = ?"
+SELECT_ALL_MEETINGS_SQL = "SELECT * FROM meetings ORDER BY timestamp DESC"
+
+# Columns (or expressions) that can be requested through get_meetings_page()
+SUMMARY_SNIPPET_LENGTH = 200
+MEETING_FIELDS = {
+    'id': 'id',
+    'timestamp': 'timestamp',
+    'transcript': 'transcript',
+    'summary': 'summary',
+    'summary_snippet': f"substr(summary, 1, {SUMMARY_SNIPPET_LENGTH})",
+    'participants': 'participants',
+}
+LIST_FIELDS = ('id', 'timestamp', 'participants', 'summary_snippet')
+MAX_PAGE_SIZE = 100
+
+# Full-text index over meetings, kept in sync by triggers. Rows that existed
+# before the index was created (id <= backfill_target) are indexed in batches
+# by rebuild_search_index(); the triggers only touch rows already indexed.
+SEARCH_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS search_index_state (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        backfill_target INTEGER NOT NULL,
+        backfilled_through INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS meetings_fts_insert AFTER INSERT ON meetings BEGIN
+        INSERT INTO meetings_fts (rowid, transcript, summary, participants)
+        VALUES (new.id, new.transcript, new.summary, new.participants);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS meetings_fts_delete AFTER DELETE ON meetings
+    WHEN old.id > (SELECT backfill_target FROM search_index_state)
+      OR old.id <= (SELECT backfilled_through FROM search_index_state)
+    BEGIN
+        INSERT INTO meetings_fts (meetings_fts, rowid, transcript, summary, participants)
+        VALUES ('delete', old.id, old.transcript, old.summary, old.participants);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS meetings_fts_update AFTER UPDATE ON meetings
+    WHEN old.id > (SELECT backfill_target FROM search_index_state)
+      OR old.id <= (SELECT backfilled_through FROM search_index_state)
+    BEGIN
+        INSERT INTO meetings_fts (meetings_fts, rowid, transcript, summary, participants)
+        VALUES ('delete', old.id, old.transcript, old.summary, old.participants);
+        INSERT INTO meetings_fts (rowid, transcript, summary, participants)
+        VALUES (new.id, new.transcript, new.summary, new.participants);
+    END
+    ''',
+)
+SEARCH_BATCH_SIZE = 500
+# Broad queries without a date range are ranked among their newest matches
+# only, which keeps BM25 cost bounded however many meetings contain a term.
+SEARCH_RANK_WINDOW = 1000
+SEARCH_WINDOW_SQL = "SELECT rowid FROM meetings_fts WHERE meetings_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?"
+SEARCH_SNIPPET_SQL = '''
+    SELECT snippet(meetings_fts, 0, '<mark>', '</mark>', '...', 12),
+           snippet(meetings_fts, 1, '<mark>', '</mark>', '...', 12)
+    FROM meetings_fts WHERE meetings_fts MATCH ? AND rowid = ?
+'''
+
+
+class ConnectionManager:
+    """Hand out one long-lived, tuned connection per thread and database file.
+
+    Connections are opened lazily, configured once with CONNECTION_PRAGMAS and
+    then reused for every call made from the same thread. After a fork the
+    child process starts with a fresh set of connections.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._pid = os.getpid()
+
+    def get(self, db_path):
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        conn = connections.get(db_path)
+        if conn is None:
+            conn = self._open(db_path)
+            connections[db_path] = conn
+        return conn
+
+    def _open(self, db_path):
+        conn = sqlite3.connect(
+            db_path,
+            timeout=BUSY_TIMEOUT_SECONDS,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _reset_after_fork(self):
+        # Connections inherited from the parent must not be used (or closed) here
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._pid = os.getpid()
+
+    def close_all(self):
+        """Close every connection opened by this manager (e.g. at shutdown)."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+
+_connections = ConnectionManager()
+
+def get_connection(db_path=None):
+    """Get this thread's pooled connection to the SQLite database."""
+    return _connections.get(db_path or DATABASE_PATH)
+
+def close_connections():
+    """Close all pooled database connections."""
+    _connections.close_all()
+
+def init_db(db_path=None):
     """Initialize the SQLite database."""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS meetings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME NOT NULL,
-                transcript TEXT NOT NULL,
-                summary TEXT NOT NULL,
-                participants TEXT
+        conn = get_connection(db_path)
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS meetings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp DATETIME NOT NULL,
+                    transcript TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    participants TEXT
+                )
+            ''')
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_meetings_timestamp ON meetings (timestamp, id)"
             )
-        ''')
-        conn.commit()
-        conn.close()
+            _init_search_index(conn)
+        migrate(conn)
         print("Database initialized successfully")
     except Exception as e:
         print(f"Error initializing database: {str(e)}")
         raise e
 
-def save_meeting(transcript, summary):
+@timed(DB_QUERY_SECONDS)
+def save_meeting(transcript, summary, db_path=None):
     """Save a meeting's transcript and summary to the database."""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        conn = get_connection(db_path)
         timestamp = datetime.datetime.now()
-        cursor.execute(
-            "INSERT INTO meetings (timestamp, transcript, summary) VALUES (?, ?, ?)",
-            (timestamp, transcript, summary)
-        )
-        conn.commit()
-        meeting_id = cursor.lastrowid
-        conn.close()
-        return meeting_id
+        with conn:
+            cursor = conn.execute(INSERT_MEETING_SQL, (timestamp, transcript, summary))
+            write_segments(conn, cursor.lastrowid, transcript)
+        return cursor.lastrowid
     except Exception as e:
         print(f"Error saving meeting: {str(e)}")
-        if conn:
-            conn.close()
         raise e
 
-def update_meeting_participants(participants):
+@timed(DB_QUERY_SECONDS)
+def update_meeting_participants(participants, db_path=None):
     """Update the most recent meeting with participant information."""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM meetings ORDER BY id DESC LIMIT 1")
-        result = cursor.fetchone()
-        if result:
-            meeting_id = result[0]
-            participants_str = ",".join(participants)
-            cursor.execute(
-                "UPDATE meetings SET participants = ? WHERE id = ?",
-                (participants_str, meeting_id)
-            )
-            conn.commit()
-        else:
-            print("No meetings found to update participants")
-        conn.close()
+        conn = get_connection(db_path)
+        with conn:
+            result = conn.execute(LATEST_MEETING_ID_SQL).fetchone()
+            if result:
+                meeting_id = result[0]
+                participants_str = ",".join(participants)
+                conn.execute(UPDATE_PARTICIPANTS_SQL, (participants_str, meeting_id))
+                write_participants(conn, meeting_id, participants)
+            else:
+                print("No meetings found to update participants")
     except Exception as e:
         print(f"Error updating participants: {str(e)}")
-        if conn:
-            conn.close()
         raise e
 
-def get_all_meetings():
+@timed(DB_QUERY_SECONDS)
+def get_all_meetings(db_path=None):
     """Get all meetings from the database."""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM meetings ORDER BY timestamp DESC")
+        conn = get_connection(db_path)
         meetings = []
-        for row in cursor.fetchall():
+        for row in conn.execute(SELECT_ALL_MEETINGS_SQL).fetchall():
             meetings.append({
                 'id': row[0],
                 'timestamp': row[1],
@@ -91,10 +235,306 @@ def get_all_meetings():
                 'summary': row[3],
                 'participants': row[4].split(',') if row[4] else []
             })
-        conn.close()
         return meetings
     except Exception as e:
         print(f"Error getting meetings: {str(e)}")
-        if conn:
-            conn.close()
-        raise e 
\ No newline at end of file
+        raise e
+
+def encode_cursor(timestamp, meeting_id):
+    """Encode a (timestamp, id) position as an opaque pagination cursor."""
+    raw = json.dumps([str(timestamp), meeting_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor(); raises ValueError if invalid."""
+    try:
+        timestamp, meeting_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(timestamp), int(meeting_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def _row_to_meeting(fields, row):
+    meeting = dict(zip(fields, row))
+    if 'participants' in meeting:
+        meeting['participants'] = meeting['participants'].split(',') if meeting['participants'] else []
+    return meeting
+
+@timed(DB_QUERY_SECONDS)
+def get_meetings_page(limit=20, cursor=None, fields=LIST_FIELDS, db_path=None):
+    """Get one page of meetings, newest first, using keyset pagination.
+
+    Returns ``(meetings, next_cursor)``; ``next_cursor`` is None on the last
+    page. Only the requested ``fields`` are read, so list views never load
+    full transcripts.
+    """
+    fields = list(fields or LIST_FIELDS)
+    unknown = [field for field in fields if field not in MEETING_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # The cursor needs the sort key of the last row, so always select it
+    selected = fields + [key for key in ('timestamp', 'id') if key not in fields]
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    sql = f"SELECT {', '.join(MEETING_FIELDS[field] for field in selected)} FROM meetings"
+    params = []
+    if cursor:
+        sql += " WHERE (timestamp, id) < (?, ?)"
+        params.extend(decode_cursor(cursor))
+    sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    try:
+        conn = get_connection(db_path)
+        rows = conn.execute(sql, params).fetchall()
+    except Exception as e:
+        print(f"Error getting meetings page: {str(e)}")
+        raise e
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = dict(zip(selected, rows[-1]))
+        next_cursor = encode_cursor(last['timestamp'], last['id'])
+
+    meetings = [_row_to_meeting(fields, row[:len(fields)]) for row in rows]
+    return meetings, next_cursor
+
+@timed(DB_QUERY_SECONDS)
+def get_meeting(meeting_id, db_path=None):
+    """Get a single meeting with its full transcript and summary, or None."""
+    try:
+        conn = get_connection(db_path)
+        row = conn.execute(
+            "SELECT id, timestamp, transcript, summary, participants FROM meetings WHERE id = ?",
+            (meeting_id,)
+        ).fetchone()
+    except Exception as e:
+        print(f"Error getting meeting {meeting_id}: {str(e)}")
+        raise e
+    if row is None:
+        return None
+    return _row_to_meeting(['id', 'timestamp', 'transcript', 'summary', 'participants'], row)
+
+@timed(DB_QUERY_SECONDS)
+def backfill_normalized_tables(db_path=None, batch_size=BACKFILL_BATCH_SIZE):
+    """Fill the participants and segments tables for meetings saved before they existed.
+
+    Runs one transaction per batch, is safe to run from several workers and
+    resumes where it stopped. Returns the number of meetings processed.
+    """
+    try:
+        return run_backfills(get_connection(db_path), batch_size)
+    except Exception as e:
+        print(f"Error backfilling normalized tables: {str(e)}")
+        raise e
+
+@timed(DB_QUERY_SECONDS)
+def backfill_status(db_path=None):
+    """Meetings still waiting for each unfinished backfill, by migration version."""
+    return pending_backfills(get_connection(db_path))
+
+@timed(DB_QUERY_SECONDS)
+def find_meetings_by_participant(email, limit=20, db_path=None):
+    """Meetings a participant attended, newest first, via the participants index.
+
+    A full address matches exactly; ``alice@`` (or just ``alice``) matches
+    that mailbox at any domain.
+    """
+    email = (email or '').strip().lower()
+    if not email:
+        raise ValueError("Participant is empty")
+    if '@' not in email:
+        email += '@'
+    if email.endswith('@'):
+        # Range scan over every address that starts with the mailbox
+        condition, params = "email >= ? AND email < ?", [email, email[:-1] + chr(ord('@') + 1)]
+    else:
+        condition, params = "email = ?", [email]
+    sql = (
+        f"SELECT id, timestamp, participants, {MEETING_FIELDS['summary_snippet']} FROM meetings "
+        f"WHERE id IN (SELECT meeting_id FROM participants WHERE {condition}) "
+        "ORDER BY timestamp DESC, id DESC LIMIT ?"
+    )
+    params.append(max(1, min(int(limit), MAX_PAGE_SIZE)))
+    try:
+        rows = get_connection(db_path).execute(sql, params).fetchall()
+    except Exception as e:
+        print(f"Error finding meetings for {email}: {str(e)}")
+        raise e
+    return [_row_to_meeting(['id', 'timestamp', 'participants', 'summary_snippet'], row) for row in rows]
+
+@timed(DB_QUERY_SECONDS)
+def get_speaker_segments(speaker_id, meeting_id=None, limit=None, db_path=None):
+    """Everything one speaker said, by meeting and then transcript order, via the speaker index.
+
+    A ``limit`` is capped at ``MAX_PAGE_SIZE``; without one every segment is returned.
+    """
+    sql = "SELECT meeting_id, seq, speaker_id, ts, text FROM segments WHERE speaker_id = ?"
+    params = [int(speaker_id)]
+    if meeting_id is not None:
+        sql += " AND meeting_id = ?"
+        params.append(int(meeting_id))
+    sql += " ORDER BY meeting_id, seq"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(max(1, min(int(limit), MAX_PAGE_SIZE)))
+    try:
+        rows = get_connection(db_path).execute(sql, params).fetchall()
+    except Exception as e:
+        print(f"Error getting segments for speaker {speaker_id}: {str(e)}")
+        raise e
+    return [dict(zip(('meeting_id', 'seq', 'speaker_id', 'ts', 'text'), row)) for row in rows]
+
+def _init_search_index(conn):
+    """Create the FTS5 index and its triggers if they do not exist yet."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'meetings_fts'"
+    ).fetchone()
+    if not exists:
+        conn.execute('''
+            CREATE VIRTUAL TABLE meetings_fts USING fts5(
+                transcript, summary, participants,
+                content='meetings', content_rowid='id'
+            )
+        ''')
+    for statement in SEARCH_SCHEMA:
+        conn.execute(statement)
+    if not exists:
+        # Everything already in the table still needs to be backfilled
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM meetings").fetchone()[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO search_index_state (id, backfill_target, backfilled_through) VALUES (0, ?, 0)",
+            (max_id,)
+        )
+
+@timed(DB_QUERY_SECONDS)
+def rebuild_search_index(db_path=None, batch_size=SEARCH_BATCH_SIZE, full=False):
+    """Index meetings that predate the search index, one batch per transaction.
+
+    Safe to run from several workers at once and to interrupt; progress is
+    stored in search_index_state. With ``full=True`` the whole index is
+    rebuilt from the meetings table in one go. Returns the number of meetings
+    indexed.
+    """
+    conn = get_connection(db_path)
+    try:
+        if full:
+            with conn:
+                conn.execute("INSERT INTO meetings_fts (meetings_fts) VALUES ('rebuild')")
+                conn.execute("UPDATE search_index_state SET backfilled_through = backfill_target")
+            return conn.execute("SELECT COUNT(*) FROM meetings").fetchone()[0]
+
+        indexed = 0
+        while True:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                target, done = conn.execute(
+                    "SELECT backfill_target, backfilled_through FROM search_index_state"
+                ).fetchone()
+                if done >= target:
+                    break
+                rows = conn.execute(
+                    "SELECT id, transcript, summary, participants FROM meetings "
+                    "WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+                    (done, target, batch_size)
+                ).fetchall()
+                conn.executemany(
+                    "INSERT INTO meetings_fts (rowid, transcript, summary, participants) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                last_id = rows[-1][0] if len(rows) == batch_size else target
+                conn.execute("UPDATE search_index_state SET backfilled_through = ?", (last_id,))
+                indexed += len(rows)
+        return indexed
+    except Exception as e:
+        print(f"Error rebuilding search index: {str(e)}")
+        raise e
+
+def _fts_query(text):
+    """Turn free text into an FTS5 query: every term must match, ``term*`` is a prefix."""
+    terms = re.findall(r'[\w@.\-]+\*?', text or '')
+    phrases = []
+    for term in terms:
+        prefix = term.endswith('*')
+        term = term.rstrip('*').replace('"', '')
+        if term:
+            phrases.append(f'"{term}"*' if prefix else f'"{term}"')
+    return ' '.join(phrases)
+
+def _end_of_day(value):
+    # A bare date as the upper bound should include the whole day
+    return f"{value} 23:59:59.999999" if value and len(value) == 10 else value
+
+@timed(DB_QUERY_SECONDS)
+def search_meetings(query, participant=None, start=None, end=None, limit=20, db_path=None):
+    """Full-text search over transcripts, summaries and participants.
+
+    Results are ranked by BM25 (summary matches weigh more than transcript
+    matches) and carry highlighted snippets. ``participant`` restricts to
+    meetings with that participant, ``start``/``end`` to a timestamp range.
+
+    Returns ``(results, truncated)``. Without a date range only the newest
+    SEARCH_RANK_WINDOW matches are ranked; ``truncated`` is True when older
+    matches were left out.
+    """
+    match = _fts_query(query)
+    if not match:
+        raise ValueError("Search query is empty")
+    if participant:
+        participant = participant.strip()
+        # Match on the mailbox name in the index (selective, unlike "com"),
+        # then require the exact address below
+        mailbox = _fts_query(participant.split('@')[0])
+        if mailbox:
+            match = f"({match}) AND participants : ({mailbox})"
+
+    # Rank first, then build snippets only for the rows on the page: snippet()
+    # is far more expensive than bm25() and would otherwise run for every match.
+    sql = '''
+        SELECT m.id, m.timestamp, m.participants, bm25(meetings_fts, 1.0, 2.0, 0.5) AS score
+        FROM meetings_fts
+        JOIN meetings m ON m.id = meetings_fts.rowid
+        WHERE meetings_fts MATCH ?
+    '''
+    params = [match]
+    if participant:
+        sql += " AND instr(',' || m.participants || ',', ?) > 0"
+        params.append(f",{participant},")
+    if start:
+        sql += " AND m.timestamp >= ?"
+        params.append(start)
+    if end:
+        sql += " AND m.timestamp <= ?"
+        params.append(_end_of_day(end))
+
+    truncated = False
+    try:
+        conn = get_connection(db_path)
+        if not start and not end:
+            # The newest match beyond the window, if any, bounds the ranked rows
+            beyond = conn.execute(SEARCH_WINDOW_SQL, (match, SEARCH_RANK_WINDOW)).fetchone()
+            if beyond:
+                sql += " AND meetings_fts.rowid > ?"
+                params.append(beyond[0])
+                truncated = True
+        sql += " ORDER BY score LIMIT ?"
+        params.append(max(1, min(int(limit), MAX_PAGE_SIZE)))
+        rows = []
+        for meeting_id, timestamp, participants, score in conn.execute(sql, params).fetchall():
+            snippets = conn.execute(SEARCH_SNIPPET_SQL, (match, meeting_id)).fetchone()
+            rows.append((meeting_id, timestamp, participants, snippets[0], snippets[1], score))
+    except sqlite3.OperationalError as e:
+        raise ValueError(f"Invalid search query: {str(e)}")
+
+    results = [
+        {
+            'id': row[0],
+            'timestamp': row[1],
+            'participants': row[2].split(',') if row[2] else [],
+            'transcript_snippet': row[3],
+            'summary_snippet': row[4],
+            'score': row[5],
+        }
+        for row in rows
+    ]
+    return results, truncated
@@ -0,0 +1,625 @@
+"""Speaker diarization: who spoke when.
+
+Two backends label the speakers of a live meeting:
+
+* ``conversation`` runs recognition through the Speech SDK's
+  ``ConversationTranscriber``, which reports a speaker ID with every result.
+* ``local`` listens to the PCM audio the client streams in and clusters
+  per-window voice embeddings itself, on a background thread, so it works
+  offline and with any recognizer. ``diarize()`` runs the same pipeline over
+  a whole recording.
+
+``diarization_error_rate()`` scores a hypothesis against reference turns.
+"""
+import logging
+import math
+import queue
+import threading
+from bisect import bisect_right
+from collections import deque
+import numpy
+from numpy.lib.stride_tricks import sliding_window_view
+from config import (
+    AUDIO_SAMPLE_RATE,
+    DIARIZATION_WINDOW_MS,
+    DIARIZATION_HOP_MS,
+    DIARIZATION_THRESHOLD,
+    DIARIZATION_MAX_SPEAKERS
+)
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_WIDTH = 2
+SPEECH_DBFS = -40  # quieter windows are treated as silence
+SPEECH_RMS = 32768 * 10 ** (SPEECH_DBFS / 20)
+ANALYSIS_RATE = 8000  # features look at the telephone band
+LPC_ORDER = 12
+PITCH_FRAME_MS = 40
+PITCH_MIN_HZ, PITCH_MAX_HZ = 60, 400
+PITCH_BINS = 24  # log-spaced pitch profile bins, about 9% apart
+CEPSTRUM_WEIGHT = 0.15  # of each standardized cepstral coefficient, next to the unit-length pitch profile
+WARMUP_WINDOWS = 10  # clustering starts once this many speech windows are in
+MIN_SPEAKER_WINDOWS = 3  # diarize() folds smaller clusters into their nearest speaker
+TIMELINE_WINDOWS = 2400  # labelled windows kept for lookups (20 min at the default hop)
+UNKNOWN_SPEAKER = 'Unknown'
+EMBEDDING_WEIGHTS = numpy.array([1.0] * PITCH_BINS + [CEPSTRUM_WEIGHT] * LPC_ORDER)
+_PITCH_BIN_CENTRES = numpy.linspace(math.log(PITCH_MIN_HZ), math.log(PITCH_MAX_HZ), PITCH_BINS)
+
+
+def _pcm_samples(pcm):
+    """The samples of 16-bit little-endian PCM, as floats."""
+    return numpy.frombuffer(pcm, dtype='<i2', count=len(pcm) // SAMPLE_WIDTH).astype(float)
+
+
+def _rms(x):
+    return math.sqrt(numpy.dot(x, x) / len(x)) if len(x) else 0.0
+
+
+def _frame_pitches(x, rate):
+    """Fundamental frequency (Hz) of each voiced frame of samples ``x``.
+
+    Every frame's reference stretch is correlated with the stretches 1 to
+    ``rate / PITCH_MIN_HZ`` samples later in one step; the period is the lag
+    where a scaled copy of the reference fits best.
+    """
+    frame = rate * PITCH_FRAME_MS // 1000
+    min_lag, max_lag = rate // PITCH_MAX_HZ, rate // PITCH_MIN_HZ
+    reference = max_lag - min_lag
+    starts = numpy.arange(0, len(x) - min_lag - 2 * reference, frame)
+    if not len(starts):
+        return numpy.empty(0)
+    stretches = sliding_window_view(x, reference)
+    refs = stretches[starts]
+    ref_energy = numpy.einsum('fn,fn->f', refs, refs)
+    voiced = ref_energy / reference >= SPEECH_RMS ** 2
+    if not voiced.any():
+        return numpy.empty(0)
+    starts, refs, ref_energy = starts[voiced], refs[voiced], ref_energy[voiced]
+
+    # products[f, lag] = dot(ref, stretch lag samples later), for lags 0..max_lag + 1
+    lags = numpy.arange(max_lag + 2)
+    products = numpy.einsum('fn,fln->fl', refs, stretches[starts[:, None] + lags])
+    squares = numpy.concatenate(([0.0], numpy.cumsum(x * x)))
+    energy = squares[starts[:, None] + lags + reference] - squares[starts[:, None] + lags]
+    fit = numpy.divide(products ** 2, energy, out=numpy.zeros_like(energy), where=energy > 0)
+    # Relative error left after fitting the reference with the stretch at each lag
+    residual = numpy.maximum(ref_energy[:, None] - fit, 0.0)
+    errors = numpy.sqrt(residual / ref_energy[:, None])
+    errors[:, 0] = numpy.inf
+    # Tolerate an off-by-one period: the error at a lag is the best of its neighbours
+    errors = numpy.minimum(numpy.minimum(errors[:, :-2], errors[:, 1:-1]), errors[:, 2:])
+    errors = numpy.concatenate((numpy.full((len(starts), 1), numpy.inf), errors), axis=1)
+
+    rows = numpy.arange(len(starts))
+    lag = fit[:, min_lag:max_lag + 1].argmax(axis=1) + min_lag
+    # The best fit is often a multiple of the period: prefer a fraction of it that fits almost as well
+    error = errors[rows, lag]
+    chosen = lag.copy()
+    undecided = numpy.ones(len(starts), dtype=bool)
+    for divisor in (3, 2):
+        candidate = numpy.round(lag / divisor).astype(int)
+        better = undecided & (candidate >= min_lag) & (errors[rows, numpy.maximum(candidate, 1)] < error * 2 + 0.1)
+        chosen[better] = candidate[better]
+        undecided &= ~better
+    return rate / chosen
+
+
+def _pitch_profile(pitches):
+    """Unit-length histogram of ``pitches`` over log-spaced bins, each pitch smeared over its neighbours."""
+    if not len(pitches):
+        return numpy.zeros(PITCH_BINS)
+    width = _PITCH_BIN_CENTRES[1] - _PITCH_BIN_CENTRES[0]
+    offsets = (numpy.log(pitches)[:, None] - _PITCH_BIN_CENTRES) / width
+    profile = numpy.exp(-0.5 * offsets ** 2).sum(axis=0)
+    return profile / numpy.linalg.norm(profile)
+
+
+def _lpc_cepstrum(x, order):
+    """Cepstrum of the all-pole (LPC) model of samples ``x``: its spectral envelope."""
+    n = len(x)
+    r = numpy.array([numpy.dot(x[:n - k], x[k:]) for k in range(order + 1)])
+    r[0] *= 1.0001  # a touch of white noise keeps the recursion stable
+    # Levinson-Durbin recursion for the predictor coefficients
+    a, error = numpy.zeros(order + 1), r[0]
+    a[0] = 1.0
+    for i in range(1, order + 1):
+        k = -(r[i] + numpy.dot(a[1:i], r[i - 1:0:-1])) / error
+        if abs(k) >= 1:
+            break  # the model would be unstable: keep the lower order
+        a[1:i] = a[1:i] + k * a[i - 1:0:-1]
+        a[i] = k
+        error *= 1 - k * k
+    cepstrum = numpy.zeros(order)
+    for m in range(1, order + 1):
+        k = numpy.arange(1, m)
+        cepstrum[m - 1] = -a[m] - numpy.dot(k / m * cepstrum[k - 1], a[m - k])
+    return cepstrum
+
+
+def _resample(x, rate, target):
+    """Samples ``x`` at ``target`` Hz, linearly interpolated."""
+    if rate % target == 0:
+        return x[::rate // target]
+    positions = numpy.arange(int((len(x) - 1) * target / rate) + 1) * (rate / target)
+    return numpy.interp(positions, numpy.arange(len(x)), x)
+
+
+def extract_embedding(pcm, sample_rate):
+    """Voice features of a window of 16-bit mono PCM, or None if it is silent.
+
+    The features are the window's pitch profile, a histogram of its frames'
+    pitch over ``PITCH_BINS`` log-spaced bins, followed by the LPC cepstrum
+    of its spectral envelope, which follows the speaker's vocal tract.
+    """
+    x = _pcm_samples(pcm)
+    if _rms(x) < SPEECH_RMS:
+        return None
+    if sample_rate != ANALYSIS_RATE:
+        x = _resample(x, sample_rate, ANALYSIS_RATE)
+    pitches = _frame_pitches(x, ANALYSIS_RATE)
+    # Pre-emphasis flattens the spectral tilt so the formants dominate the envelope
+    emphasized = x[1:] - 0.95 * x[:-1]
+    if not _rms(emphasized):
+        return None
+    return numpy.concatenate((_pitch_profile(pitches), _lpc_cepstrum(emphasized, LPC_ORDER)))
+
+
+class OnlineSpeakerClustering:
+    """Assign embeddings to speakers as they arrive.
+
+    The cepstral features are centred and standardized with running
+    statistics, embeddings are scaled by ``feature_weights`` and compared by
+    cosine distance. A window joins the nearest speaker centroid if it is
+    within ``threshold``; otherwise it starts a new speaker, up to
+    ``max_speakers``. As the statistics settle, speakers whose centroids end
+    up within ``threshold`` of each other are merged; ``resolve()`` maps a
+    merged speaker to the one that absorbed it.
+    """
+
+    def __init__(self, threshold=DIARIZATION_THRESHOLD, max_speakers=DIARIZATION_MAX_SPEAKERS,
+                 warmup=WARMUP_WINDOWS, max_weight=100, feature_weights=EMBEDDING_WEIGHTS):
+        self.threshold = threshold
+        self.max_speakers = max_speakers
+        self.warmup = warmup
+        self.max_weight = max_weight
+        self.feature_weights = numpy.asarray(feature_weights, dtype=float)
+        self.centroids = numpy.empty((0, len(self.feature_weights)))
+        self.weights = numpy.empty(0, dtype=int)  # 0 for speakers that were merged into another
+        self.merged = {}
+        self._count = 0
+        self._mean = None
+        self._m2 = None
+
+    def observe(self, embedding):
+        """Add ``embedding`` to the feature statistics; True once clustering can start."""
+        # Welford's running mean and variance per feature
+        self._count += 1
+        if self._mean is None:
+            self._mean = numpy.array(embedding, dtype=float)
+            self._m2 = numpy.zeros(len(embedding))
+        else:
+            delta = embedding - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (embedding - self._mean)
+        return self._count >= self.warmup
+
+    def _scale(self):
+        scale = numpy.sqrt(self._m2 / max(1, self._count - 1))
+        scale[scale == 0] = 1.0
+        return scale
+
+    def _standardize(self, vectors):
+        # The pitch profile already points one way per voice; the cepstrum only does once centred
+        vectors = numpy.array(vectors, dtype=float)
+        cepstrum = vectors[..., PITCH_BINS:]
+        cepstrum[:] = (cepstrum - self._mean[PITCH_BINS:]) / self._scale()[PITCH_BINS:]
+        return vectors * self.feature_weights
+
+    def _unstandardize(self, vectors):
+        vectors = vectors / self.feature_weights
+        cepstrum = vectors[..., PITCH_BINS:]
+        cepstrum[:] = cepstrum * self._scale()[PITCH_BINS:] + self._mean[PITCH_BINS:]
+        return vectors
+
+    def mean_direction(self, embeddings):
+        """The embedding in the mean standardized direction of ``embeddings`` (a spherical k-means centroid)."""
+        vectors = self._standardize(numpy.asarray(embeddings))
+        norms = numpy.linalg.norm(vectors, axis=1, keepdims=True)
+        direction = numpy.mean(numpy.divide(vectors, norms, out=numpy.zeros_like(vectors), where=norms > 0), axis=0)
+        return self._unstandardize(direction)
+
+    def distances(self, embedding):
+        """Cosine distance of standardized ``embedding`` to every speaker centroid (inf if merged)."""
+        if not len(self.centroids):
+            return numpy.empty(0)
+        centroids = self._standardize(self.centroids)
+        vector = self._standardize(numpy.asarray(embedding))
+        norms = numpy.linalg.norm(centroids, axis=1) * numpy.linalg.norm(vector)
+        similarity = numpy.divide(centroids @ vector, norms, out=numpy.zeros(len(centroids)), where=norms > 0)
+        distances = 1.0 - similarity
+        distances[self.weights == 0] = numpy.inf
+        return distances
+
+    @property
+    def speakers(self):
+        return int(numpy.count_nonzero(self.weights))
+
+    def resolve(self, index):
+        """The speaker that speaker ``index`` was merged into, or ``index`` itself."""
+        while index in self.merged:
+            index = self.merged[index]
+        return index
+
+    def nearest(self, embedding):
+        distances = self.distances(embedding)
+        best = int(distances.argmin())
+        return best, float(distances[best])
+
+    def assign(self, embedding):
+        """Index of the speaker ``embedding`` belongs to (creating one if needed)."""
+        if len(self.centroids):
+            best, distance = self.nearest(embedding)
+        if not len(self.centroids) or (distance > self.threshold and self.speakers < self.max_speakers):
+            self.centroids = numpy.vstack((self.centroids, embedding))
+            self.weights = numpy.append(self.weights, 1)
+            return len(self.centroids) - 1
+        # Running mean, turning into a moving average once the speaker has max_weight windows
+        weight = min(self.weights[best] + 1, self.max_weight)
+        self.weights[best] = weight
+        self.centroids[best] += (embedding - self.centroids[best]) / weight
+        return self._merge_into(best)
+
+    def _merge_into(self, index):
+        """Merge speakers that ``index``'s centroid has moved close to into the heavier of the two."""
+        while self.speakers > 1:
+            distances = self.distances(self.centroids[index])
+            distances[index] = numpy.inf
+            other = int(distances.argmin())
+            if distances[other] > self.threshold:
+                break
+            keep, drop = (index, other) if self.weights[index] >= self.weights[other] else (other, index)
+            total = self.weights[keep] + self.weights[drop]
+            self.centroids[keep] = (self.centroids[keep] * self.weights[keep]
+                                    + self.centroids[drop] * self.weights[drop]) / total
+            self.weights[keep], self.weights[drop] = min(total, self.max_weight), 0
+            self.merged[drop] = keep
+            index = keep
+        return index
+
+
+class SpeakerTimeline:
+    """Speaker of each analysed window, looked up by time range.
+
+    ``resolve`` maps the speaker stored for a window to its current identity
+    (clustering may merge speakers after their windows were recorded).
+    """
+
+    def __init__(self, maxlen=TIMELINE_WINDOWS, resolve=None):
+        self.resolve = resolve or (lambda speaker: speaker)
+        self._starts = deque(maxlen=maxlen)
+        self._windows = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.processed_until = 0.0
+
+    def add(self, start, end, speaker):
+        with self._lock:
+            self._starts.append(start)
+            self._windows.append((start, end, speaker))
+            self.processed_until = end
+
+    def windows(self):
+        with self._lock:
+            return [(start, end, self.resolve(speaker) if speaker is not None else None)
+                    for start, end, speaker in self._windows]
+
+    def speaker_at(self, start, end):
+        """The speaker covering most of ``[start, end)``, or None if unknown."""
+        with self._lock:
+            last = bisect_right(self._starts, end)
+            votes = {}
+            for i in range(last - 1, -1, -1):
+                w_start, w_end, speaker = self._windows[i]
+                if w_end <= start:
+                    break
+                if speaker is not None:
+                    speaker = self.resolve(speaker)
+                    votes[speaker] = votes.get(speaker, 0) + min(end, w_end) - max(start, w_start)
+        if not votes:
+            return None
+        return max(votes, key=votes.get)
+
+
+class LocalDiarizer:
+    """Diarize streamed 16-bit mono PCM on a background thread.
+
+    ``feed()`` copies a chunk of audio onto a queue and returns. The worker
+    cuts the stream into ``window``-second windows every ``hop`` seconds,
+    embeds each one and assigns it to a speaker. ``speaker_at(start, end)``
+    answers from what has been analysed so far and never waits; times are
+    seconds since the first byte fed, the same clock the Speech SDK uses for
+    result offsets on a push stream.
+    """
+
+    def __init__(self, sample_rate=AUDIO_SAMPLE_RATE, window=DIARIZATION_WINDOW_MS / 1000,
+                 hop=DIARIZATION_HOP_MS / 1000, clustering=None):
+        self.sample_rate = sample_rate
+        self.window_bytes = int(window * sample_rate) * SAMPLE_WIDTH
+        self.hop_bytes = int(hop * sample_rate) * SAMPLE_WIDTH
+        self.clustering = clustering or OnlineSpeakerClustering()
+        self.timeline = SpeakerTimeline(resolve=self.clustering.resolve)
+        self.windows_analysed = 0
+        self._queue = queue.SimpleQueue()
+        self._buffer = bytearray()
+        self._offset = 0  # stream position of _buffer[0], in bytes
+        self._pending = []  # speech windows seen during warm-up
+        self._thread = threading.Thread(target=self._run, name='diarizer', daemon=True)
+        self._thread.start()
+
+    def feed(self, data):
+        self._queue.put(bytes(data))
+
+    def _run(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, threading.Event):
+                chunk.set()
+                continue
+            try:
+                self._process(chunk)
+            except Exception as e:
+                logger.error(f"Error diarizing audio: {str(e)}")
+
+    def _process(self, chunk):
+        self._buffer += chunk
+        while len(self._buffer) >= self.window_bytes:
+            start = self._offset / (self.sample_rate * SAMPLE_WIDTH)
+            end = start + self.window_bytes / (self.sample_rate * SAMPLE_WIDTH)
+            self._analyse(start, end, bytes(self._buffer[:self.window_bytes]))
+            del self._buffer[:self.hop_bytes]
+            self._offset += self.hop_bytes
+
+    def _analyse(self, start, end, pcm):
+        self.windows_analysed += 1
+        embedding = extract_embedding(pcm, self.sample_rate)
+        if embedding is None:
+            self.timeline.add(start, end, None)
+            return
+        if not self.clustering.observe(embedding):
+            self._pending.append((start, end, embedding))
+            self.timeline.add(start, end, None)
+            return
+        for pending in self._pending:
+            self.timeline.add(pending[0], pending[1], self.clustering.assign(pending[2]))
+        self._pending = []
+        self.timeline.add(start, end, self.clustering.assign(embedding))
+
+    def speaker_at(self, start, end):
+        return self.timeline.speaker_at(start, end)
+
+    def turns(self):
+        """Speaker turns of the audio analysed so far (and still in the timeline)."""
+        return merge_turns(self.timeline.windows(), hop=self.hop_bytes / (self.sample_rate * SAMPLE_WIDTH))
+
+    def wait(self, timeout=None):
+        """Block until everything fed so far is analysed (used by tests and benchmarks)."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stats(self):
+        return {
+            'windows_analysed': self.windows_analysed,
+            'speakers': self.clustering.speakers,
+            'processed_seconds': round(self.timeline.processed_until, 2),
+            'queued_chunks': self._queue.qsize(),
+        }
+
+    def close(self):
+        self._queue.put(None)
+
+
+class DiarizingSink:
+    """Audio sink that also feeds what it writes to a LocalDiarizer."""
+
+    def __init__(self, sink, diarizer):
+        self.sink = sink
+        self.diarizer = diarizer
+        self.audio_config = getattr(sink, 'audio_config', None)
+
+    def write(self, view):
+        self.sink.write(view)
+        self.diarizer.feed(view)
+
+    def close(self):
+        self.sink.close()
+
+
+class ConversationRecognizer:
+    """A Speech SDK ``ConversationTranscriber`` behind the SpeechRecognizer interface.
+
+    MeetingTranscriber connects to ``recognized``/``recognizing`` and calls
+    ``start_continuous_recognition()``; results carry a ``speaker_id``
+    ("Guest-1", ...) assigned by the service.
+    """
+
+    def __init__(self, speech_config, audio_config=None):
+        import azure.cognitiveservices.speech as speechsdk
+
+        self.transcriber = speechsdk.transcription.ConversationTranscriber(
+            speech_config=speech_config, audio_config=audio_config)
+        self.recognized = self.transcriber.transcribed
+        self.recognizing = self.transcriber.transcribing
+        self.canceled = self.transcriber.canceled
+        self.session_started = self.transcriber.session_started
+        self.session_stopped = self.transcriber.session_stopped
+
+    def start_continuous_recognition(self):
+        self.transcriber.start_transcribing_async().get()
+
+    def stop_continuous_recognition(self):
+        self.transcriber.stop_transcribing_async().get()
+
+
+class SpeakerLabels:
+    """Number speakers 1, 2, ... in the order a backend first reports them."""
+
+    def __init__(self):
+        self._numbers = {}
+
+    def number(self, key):
+        if key is None or key == UNKNOWN_SPEAKER:
+            return None
+        number = self._numbers.get(key)
+        if number is None:
+            number = self._numbers[key] = len(self._numbers) + 1
+        return number
+
+    def __len__(self):
+        return len(self._numbers)
+
+
+def merge_turns(windows, hop=None):
+    """Collapse consecutive ``(start, end, speaker)`` windows of one speaker into turns.
+
+    With ``hop``, each window only speaks for the ``hop`` seconds at its
+    centre, so overlapping windows tile the timeline without double counting.
+    """
+    turns = []
+    for start, end, speaker in windows:
+        if hop is not None:
+            start, end = (start + end - hop) / 2, (start + end + hop) / 2
+        if speaker is None:
+            continue
+        if turns and turns[-1][2] == speaker and start <= turns[-1][1] + 1e-6:
+            turns[-1] = (turns[-1][0], max(turns[-1][1], end), speaker)
+        else:
+            if turns and start < turns[-1][1]:
+                # Overlapping windows of different speakers: split the overlap
+                middle = (start + turns[-1][1]) / 2
+                turns[-1] = (turns[-1][0], middle, turns[-1][2])
+                start = middle
+            turns.append((start, end, speaker))
+    return turns
+
+
+def speech_regions(pcm, sample_rate, frame=0.1):
+    """``(start, end)`` spans of ``pcm`` louder than the silence threshold, in ``frame``-second steps."""
+    x = _pcm_samples(pcm)
+    frame_samples = int(frame * sample_rate)
+    offsets = numpy.arange(0, len(x), frame_samples)
+    if not len(offsets):
+        return []
+    # Mean square of each frame, the last one possibly short
+    squares = numpy.add.reduceat(x * x, offsets) / numpy.diff(numpy.append(offsets, len(x)))
+    regions = []
+    for offset in offsets[squares >= SPEECH_RMS ** 2]:
+        start = offset / sample_rate
+        end = min(offset + frame_samples, len(x)) / sample_rate
+        if regions and regions[-1][1] >= start - 1e-6:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+
+def restrict_turns(turns, regions):
+    """The parts of ``turns`` that fall inside ``regions`` (both sorted by time)."""
+    restricted = []
+    i = 0
+    for start, end, speaker in turns:
+        while i < len(regions) and regions[i][1] <= start:
+            i += 1
+        j = i
+        while j < len(regions) and regions[j][0] < end:
+            restricted.append((max(start, regions[j][0]), min(end, regions[j][1]), speaker))
+            j += 1
+    return restricted
+
+
+def diarize(pcm, sample_rate, window=DIARIZATION_WINDOW_MS / 1000, hop=DIARIZATION_HOP_MS / 1000,
+            threshold=DIARIZATION_THRESHOLD, max_speakers=DIARIZATION_MAX_SPEAKERS, refine=5):
+    """Speaker turns ``(start, end, speaker)`` of a whole recording of 16-bit mono PCM.
+
+    One online clustering pass finds the speakers; ``refine`` passes then
+    drop speakers with fewer than ``MIN_SPEAKER_WINDOWS`` windows and
+    reassign every window to its nearest final centroid (spherical k-means),
+    isolated single-window switches are smoothed away, and the turns are
+    trimmed to the stretches of audio that are not silent.
+    """
+    window_bytes = int(window * sample_rate) * SAMPLE_WIDTH
+    hop_bytes = int(hop * sample_rate) * SAMPLE_WIDTH
+    spans, embeddings = [], []
+    for offset in range(0, max(0, len(pcm) - window_bytes) + 1, hop_bytes):
+        start = offset / (sample_rate * SAMPLE_WIDTH)
+        spans.append((start, start + window))
+        embeddings.append(extract_embedding(pcm[offset:offset + window_bytes], sample_rate))
+
+    clustering = OnlineSpeakerClustering(threshold, max_speakers, warmup=1)
+    for embedding in embeddings:
+        if embedding is not None:
+            clustering.observe(embedding)
+    labels = [clustering.assign(e) if e is not None else None for e in embeddings]
+    labels = [clustering.resolve(label) if label is not None else None for label in labels]
+
+    for _ in range(refine):
+        labels = [clustering.nearest(e)[0] if e is not None else None for e in embeddings]
+        members = {}
+        for label, embedding in zip(labels, embeddings):
+            if label is not None:
+                members.setdefault(label, []).append(embedding)
+        # Speakers with only a stray window or two are transitions, not voices
+        kept = sorted(label for label in members if len(members[label]) >= MIN_SPEAKER_WINDOWS) or sorted(members)
+        if not kept:
+            break
+        clustering.centroids = numpy.array([clustering.mean_direction(members[label]) for label in kept])
+        clustering.weights = numpy.array([len(members[label]) for label in kept])
+    if refine:
+        labels = [clustering.nearest(e)[0] if e is not None else None for e in embeddings]
+
+    for i in range(1, len(labels) - 1):
+        if labels[i] is not None and labels[i - 1] == labels[i + 1] != labels[i]:
+            labels[i] = labels[i - 1]
+    turns = merge_turns([(start, end, label) for (start, end), label in zip(spans, labels)], hop=hop)
+    return restrict_turns(turns, speech_regions(pcm, sample_rate))
+
+
+def diarization_error_rate(reference, hypothesis, step=0.01):
+    """Diarization error rate of ``hypothesis`` turns against ``reference`` turns.
+
+    Both are lists of ``(start, end, speaker)``. Time is scored in ``step``
+    second frames; hypothesis speakers are mapped one-to-one onto reference
+    speakers greedily by overlap. Returns ``{'der', 'missed', 'false_alarm',
+    'confusion', 'speech'}``, the last four in seconds.
+    """
+    def frames(turns):
+        labels = {}
+        for start, end, speaker in turns:
+            for frame in range(int(round(start / step)), int(round(end / step))):
+                labels[frame] = speaker
+        return labels
+
+    ref, hyp = frames(reference), frames(hypothesis)
+    overlap = {}
+    for frame, speaker in ref.items():
+        if frame in hyp:
+            key = (hyp[frame], speaker)
+            overlap[key] = overlap.get(key, 0) + 1
+    mapping, used = {}, set()
+    for (hyp_speaker, ref_speaker), _ in sorted(overlap.items(), key=lambda item: -item[1]):
+        if hyp_speaker not in mapping and ref_speaker not in used:
+            mapping[hyp_speaker] = ref_speaker
+            used.add(ref_speaker)
+
+    missed = sum(1 for frame in ref if frame not in hyp)
+    false_alarm = sum(1 for frame in hyp if frame not in ref)
+    confusion = sum(1 for frame, speaker in ref.items() if frame in hyp and mapping.get(hyp[frame]) != speaker)
+    speech = len(ref)
+    return {
+        'der': (missed + false_alarm + confusion) / speech if speech else 0.0,
+        'missed': missed * step,
+        'false_alarm': false_alarm * step,
+        'confusion': confusion * step,
+        'speech': speech * step,
+    }
@@ -1,6 +1,7 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.utils import formataddr, formatdate, make_msgid, parseaddr
 from datetime import datetime
 from config import (
     EMAIL_USER,
@@ -22,7 +23,7 @@ def send_meeting_summary(participants, summary):
         msg = MIMEMultipart()
         msg['From'] = EMAIL_USER
         msg['To'] = ", ".join(participants)
-        msg['Subject'] = f"Meeting Summary - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        msg['Subject'] = summary_subject()
         
         # Add body
         msg.attach(MIMEText(summary, 'plain'))
@@ -43,4 +44,33 @@ def send_meeting_summary(participants, summary):
         return False, f"SMTP error: {str(e)}"
     except Exception as e:
         print(f"Error sending email: {str(e)}")
-        return False, f"Failed to send email: {str(e)}" 
\ No newline at end of file
+        return False, f"Failed to send email: {str(e)}"
+
+def summary_subject(when=None):
+    return f"Meeting Summary - {(when or datetime.now()).strftime('%Y-%m-%d %H:%M')}"
+
+def recipient_name(participant):
+    """Display name of a participant given as 'Name <address>' or a bare address."""
+    name, address = parseaddr(participant)
+    if name:
+        return name
+    local = address.split('@', 1)[0]
+    return " ".join(part.capitalize() for part in local.replace('_', '.').split('.') if part)
+
+def personalize_summary(participant, summary):
+    """The summary as sent to one participant, greeting them by name."""
+    name = recipient_name(participant)
+    greeting = f"Hi {name}," if name else "Hello,"
+    return f"{greeting}\n\nHere is the summary of your meeting:\n\n{summary}"
+
+def build_summary_message(sender, participant, subject, body):
+    """A message addressed to a single participant."""
+    name, address = parseaddr(participant)
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = formataddr((name, address))
+    msg['Subject'] = subject
+    msg['Date'] = formatdate(localtime=True)
+    msg['Message-ID'] = make_msgid()
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
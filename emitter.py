@@ -0,0 +1,381 @@
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from config import (
+    TRANSCRIPT_BATCH_WINDOW_MS,
+    TRANSCRIPT_RESYNC_HISTORY,
+    INTERIM_MIN_INTERVAL_MS,
+    SUMMARY_STREAM_WINDOW_MS
+)
+from metrics import SOCKETIO_EMIT_SECONDS
+from tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+
+class RoomStream:
+    """Sequence counter, unsent entries (with the sampled spans they were published in)
+    and recent history of one meeting room."""
+
+    __slots__ = ('seq', 'pending', 'spans', 'history')
+
+    def __init__(self, history_size):
+        self.seq = 0
+        self.pending = []
+        self.spans = []
+        self.history = deque(maxlen=history_size)
+
+
+class TranscriptEmitter:
+    """Coalesce transcript entries into per-room ``transcript_batch`` events.
+
+    Every entry published to a room gets the room's next sequence number and
+    is sent with the other entries published within the same ``window``
+    seconds, as ``{meeting_id, from_seq, to_seq, entries}``. A client that
+    sees ``from_seq`` jump past the last sequence number it has asks for the
+    missing entries with ``since()``. With a window of 0 every entry is sent
+    immediately.
+    """
+
+    def __init__(self, socketio, window=TRANSCRIPT_BATCH_WINDOW_MS / 1000,
+                 history_size=TRANSCRIPT_RESYNC_HISTORY, event='transcript_batch'):
+        self.socketio = socketio
+        self.window = window
+        self.history_size = history_size
+        self.event = event
+        self.batches_sent = 0
+        self.entries_sent = 0
+        self._rooms = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flusher = None
+
+    def publish(self, room, entry):
+        """Queue ``entry`` for ``room`` and return its sequence number."""
+        with self._lock:
+            stream = self._rooms.get(room)
+            if stream is None:
+                stream = self._rooms[room] = RoomStream(self.history_size)
+            stream.seq += 1
+            entry['seq'] = stream.seq
+            stream.pending.append(entry)
+            stream.history.append(entry)
+            span = current_span()
+            if span is not None and span.sampled:
+                stream.spans.append(span)
+            self._dirty.add(room)
+        if self.window <= 0:
+            self.flush(room)
+        else:
+            self._ensure_flusher()
+            self._wake.set()
+        return entry['seq']
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._stop.clear()
+            self._flusher = threading.Thread(target=self._run, name='transcript-emitter', daemon=True)
+            self._flusher.start()
+
+    def _run(self):
+        # Sleep until something is published, then flush every window until idle
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            while not self._stop.wait(self.window):
+                if not self.flush():
+                    break
+
+    def flush(self, room=None):
+        """Send the pending entries of ``room`` (or of every room); returns batches sent."""
+        with self._lock:
+            rooms = [room] if room is not None else list(self._dirty)
+            batches = []
+            for name in rooms:
+                self._dirty.discard(name)
+                stream = self._rooms.get(name)
+                if stream is None or not stream.pending:
+                    continue
+                batches.append((name, stream.pending, stream.spans))
+                stream.pending = []
+                stream.spans = []
+
+        for name, entries, spans in batches:
+            payload = {
+                'meeting_id': name,
+                'from_seq': entries[0]['seq'],
+                'to_seq': entries[-1]['seq'],
+                'entries': entries,
+            }
+            start_ns = time.time_ns()
+            try:
+                with SOCKETIO_EMIT_SECONDS.labels(self.event).time():
+                    if name is None:
+                        self.socketio.emit(self.event, payload)
+                    else:
+                        self.socketio.emit(self.event, payload, to=name)
+            except Exception as e:
+                logger.error(f"Error emitting transcript batch to {name}: {str(e)}")
+                continue
+            end_ns = time.time_ns()
+            for span in spans:
+                span.record('transcript.emit', start_ns, end_ns, event=self.event, batch_entries=len(entries))
+            with self._lock:
+                self.batches_sent += 1
+                self.entries_sent += len(entries)
+        return len(batches)
+
+    def last_seq(self, room):
+        with self._lock:
+            stream = self._rooms.get(room)
+            return stream.seq if stream else 0
+
+    def since(self, room, seq):
+        """Entries of ``room`` after ``seq``, or None if they are no longer in the history."""
+        with self._lock:
+            stream = self._rooms.get(room)
+            if stream is None:
+                return [] if seq == 0 else None
+            if seq >= stream.seq:
+                return []
+            if not stream.history or stream.history[0]['seq'] > seq + 1:
+                return None
+            return [entry for entry in stream.history if entry['seq'] > seq]
+
+    def resume(self, room, entries):
+        """Continue ``room``'s numbering after already-numbered ``entries`` (e.g. recovered
+        after a restart) and keep them for resync, without sending them again."""
+        if not entries:
+            return
+        with self._lock:
+            stream = self._rooms.get(room)
+            if stream is None:
+                stream = self._rooms[room] = RoomStream(self.history_size)
+            for entry in entries:
+                if entry['seq'] > stream.seq:
+                    stream.history.append(entry)
+            stream.seq = max(stream.seq, entries[-1]['seq'])
+
+    def discard(self, room):
+        """Send anything pending for ``room`` and forget it."""
+        self.flush(room)
+        with self._lock:
+            self._rooms.pop(room, None)
+
+    def close(self):
+        self.flush()
+        self._stop.set()
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+
+    def pending(self):
+        """Entries published and not sent yet, over every room."""
+        with self._lock:
+            return sum(len(stream.pending) for stream in self._rooms.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rooms': len(self._rooms),
+                'window_ms': round(self.window * 1000),
+                'batches_sent': self.batches_sent,
+                'entries_sent': self.entries_sent,
+            }
+
+
+class InterimThrottle:
+    """Deliver interim hypotheses at most once per ``interval`` seconds, latest first.
+
+    ``send(utterance_id, text)`` is called right away when the last delivery
+    is old enough; otherwise the newest hypothesis is held and sent when the
+    interval is up, so the client always ends up with the latest text.
+    ``finalize()`` drops whatever is still held once the utterance is final.
+    """
+
+    def __init__(self, send, interval=INTERIM_MIN_INTERVAL_MS / 1000):
+        self.send = send
+        self.interval = interval
+        self.offered = 0
+        self.sent = 0
+        self._latest = None
+        self._last_sent = 0.0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def offer(self, utterance_id, text):
+        with self._lock:
+            self.offered += 1
+            self._latest = (utterance_id, text)
+            if self._timer is not None:
+                return
+            wait = self._last_sent + self.interval - time.monotonic()
+            if wait > 0:
+                self._timer = threading.Timer(wait, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+            item, self._latest = self._latest, None
+            self._last_sent = time.monotonic()
+            self.sent += 1
+        self._deliver(item)
+
+    def _flush(self):
+        with self._lock:
+            self._timer = None
+            item, self._latest = self._latest, None
+            if item is None:
+                return
+            self._last_sent = time.monotonic()
+            self.sent += 1
+        self._deliver(item)
+
+    def _deliver(self, item):
+        try:
+            self.send(*item)
+        except Exception as e:
+            logger.error(f"Error emitting interim result: {str(e)}")
+
+    def finalize(self):
+        """Drop any held hypothesis; the next utterance's first one goes out at once."""
+        with self._lock:
+            self._latest = None
+            self._last_sent = 0.0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+class SummaryStream:
+    """One summary on its way to a meeting room; created by ``SummaryStreamer.open()``.
+
+    The first piece passed to ``write()`` is sent at once; later pieces are
+    coalesced until ``window`` seconds have passed since the last event.
+    ``finish()`` sends what is left and the full text.
+    """
+
+    def __init__(self, streamer, room):
+        self.streamer = streamer
+        self.room = room
+        self.stream_id = uuid.uuid4().hex
+        self.started = time.monotonic()
+        self.first_token_at = None
+        self.index = 0
+        self._pending = []
+        self._last_sent = None
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        if not text:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self.first_token_at is None:
+                self.first_token_at = now
+            self._pending.append(text)
+            if self._last_sent is not None and now - self._last_sent < self.streamer.window:
+                return
+            chunk = self._take(now)
+        self.streamer._emit('summary_chunk', self.room, chunk)
+
+    def _take(self, now):
+        chunk = {'meeting_id': self.room, 'stream_id': self.stream_id, 'index': self.index,
+                 'text': ''.join(self._pending)}
+        self.index += 1
+        self._pending = []
+        self._last_sent = now
+        return chunk
+
+    def time_to_first_token(self):
+        """Seconds from opening the stream to its first piece, or None before it arrives."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    def finish(self, summary):
+        """Send the remaining pieces and ``summary_done`` with the assembled ``summary``."""
+        with self._lock:
+            chunk = self._take(time.monotonic()) if self._pending else None
+        if chunk:
+            self.streamer._emit('summary_chunk', self.room, chunk)
+        ttft = self.time_to_first_token()
+        total = time.monotonic() - self.started
+        self.streamer._record(ttft, total)
+        self.streamer._emit('summary_done', self.room, {
+            'meeting_id': self.room,
+            'stream_id': self.stream_id,
+            'summary': summary,
+            'time_to_first_token_ms': round(ttft * 1000) if ttft is not None else None,
+            'total_ms': round(total * 1000),
+        })
+
+
+class SummaryStreamer:
+    """Stream summaries to meeting rooms as ``summary_chunk`` events while they are generated.
+
+    Each chunk is ``{meeting_id, stream_id, index, text}``; a new
+    ``stream_id`` (e.g. a retried summary) replaces whatever the client has
+    shown so far. ``summary_done`` carries the full text. Time to the first
+    token of recent summaries is kept for ``stats()``.
+    """
+
+    def __init__(self, socketio, window=SUMMARY_STREAM_WINDOW_MS / 1000, history_size=100):
+        self.socketio = socketio
+        self.window = window
+        self.streams = 0
+        self.chunks_sent = 0
+        self._first_token_times = deque(maxlen=history_size)
+        self._total_times = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+
+    def open(self, room):
+        with self._lock:
+            self.streams += 1
+        return SummaryStream(self, room)
+
+    def _emit(self, event, room, payload):
+        try:
+            with SOCKETIO_EMIT_SECONDS.labels(event).time():
+                if room is None:
+                    self.socketio.emit(event, payload)
+                else:
+                    self.socketio.emit(event, payload, to=room)
+        except Exception as e:
+            logger.error(f"Error emitting {event} to {room}: {str(e)}")
+            return
+        if event == 'summary_chunk':
+            with self._lock:
+                self.chunks_sent += 1
+
+    def _record(self, ttft, total):
+        with self._lock:
+            if ttft is not None:
+                self._first_token_times.append(ttft)
+            self._total_times.append(total)
+
+    def stats(self):
+        with self._lock:
+            first = sorted(self._first_token_times)
+            total = sorted(self._total_times)
+            streams, chunks_sent = self.streams, self.chunks_sent
+
+        def percentiles(values):
+            if not values:
+                return None
+            return {'p50': round(values[len(values) // 2] * 1000), 'max': round(values[-1] * 1000)}
+
+        return {
+            'streams': streams,
+            'chunks_sent': chunks_sent,
+            'window_ms': round(self.window * 1000),
+            'time_to_first_token_ms': percentiles(first),
+            'total_ms': percentiles(total),
+        }
@@ -0,0 +1,108 @@
+"""Stream meetings out of the database as NDJSON or CSV.
+
+Rows are read from a dedicated SQLite cursor with ``fetchmany`` and encoded
+one batch at a time, so memory stays flat however large the archive is.
+
+    python export.py --format ndjson --gzip --output meetings.ndjson.gz
+"""
+import argparse
+import csv
+import io
+import json
+import sqlite3
+import sys
+import zlib
+from database import DATABASE_PATH
+
+EXPORT_FIELDS = ('id', 'timestamp', 'participants', 'summary', 'transcript')
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+DEFAULT_CHUNK_SIZE = 200
+
+
+def iter_meeting_batches(db_path=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield lists of meeting dicts, ``chunk_size`` rows at a time, oldest first."""
+    # A separate read-only connection: in WAL mode this long-running read sees
+    # a consistent snapshot without blocking writers on the pooled connections.
+    conn = sqlite3.connect(f"file:{db_path or DATABASE_PATH}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(f"SELECT {', '.join(EXPORT_FIELDS)} FROM meetings ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            batch = []
+            for row in rows:
+                meeting = dict(zip(EXPORT_FIELDS, row))
+                meeting['participants'] = meeting['participants'].split(',') if meeting['participants'] else []
+                batch.append(meeting)
+            yield batch
+    finally:
+        conn.close()
+
+
+def ndjson_chunks(batches):
+    """Encode each batch as newline-delimited JSON."""
+    for batch in batches:
+        yield ''.join(json.dumps(meeting) + '\n' for meeting in batch).encode('utf-8')
+
+
+def csv_chunks(batches):
+    """Encode each batch as CSV rows, preceded by a header row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in batches:
+        for meeting in batch:
+            writer.writerow([
+                ';'.join(meeting[field]) if field == 'participants' else meeting[field]
+                for field in EXPORT_FIELDS
+            ])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of byte chunks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_meetings(fmt='ndjson', compress=False, db_path=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return an iterator of bytes exporting every meeting in ``fmt``."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    batches = iter_meeting_batches(db_path, chunk_size)
+    chunks = ndjson_chunks(batches) if fmt == 'ndjson' else csv_chunks(batches)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export meetings as NDJSON or CSV.")
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+    parser.add_argument('--gzip', action='store_true', help='gzip-compress the output')
+    parser.add_argument('--db', default=DATABASE_PATH, help='path to the SQLite database')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--output', '-o', help='output file (defaults to stdout)')
+    args = parser.parse_args(argv)
+
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in export_meetings(args.format, args.gzip, args.db, args.chunk_size):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
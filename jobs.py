@@ -0,0 +1,405 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import namedtuple
+from config import (
+    JOB_WORKERS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BASE_SECONDS,
+    JOB_RETRY_MAX_SECONDS,
+    JOB_LEASE_SECONDS
+)
+from database import get_connection
+from outbox import backoff_delay
+from summarizer import format_entry, summarize_transcript
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+INSERT_JOB_SQL = '''
+    INSERT INTO jobs (id, kind, idempotency_key, payload, worker, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+INSERT_STAGE_SQL = '''
+    INSERT INTO job_stages (job_id, position, name, depends, next_attempt_at) VALUES (?, ?, ?, ?, ?)
+'''
+# A stage is ready once none of the stages it depends on is unfinished.
+# Claiming leases it until ?; if the worker dies mid-stage the lease runs
+# out and the stage is claimed again (by any worker allowed to run the job)
+CLAIM_STAGES_SQL = '''
+    UPDATE job_stages SET status = 'running', attempts = attempts + 1, next_attempt_at = ?, started_at = ?
+    WHERE (job_id, name) IN (
+        SELECT s.job_id, s.name FROM job_stages s JOIN jobs j ON j.id = s.job_id
+        WHERE s.status IN ('pending', 'running') AND s.next_attempt_at <= ?
+          AND j.status IN ('queued', 'running')
+          AND (j.worker IS NULL OR j.worker = ?)
+          AND instr(?, ' ' || j.kind || ' ') > 0
+          AND NOT EXISTS (
+              SELECT 1 FROM job_stages d
+              WHERE d.job_id = s.job_id AND d.status != 'completed'
+                AND instr(' ' || s.depends || ' ', ' ' || d.name || ' ') > 0
+          )
+        ORDER BY s.next_attempt_at LIMIT ?
+    )
+    RETURNING job_id, name, attempts
+'''
+MARK_COMPLETED_SQL = '''
+    UPDATE job_stages SET status = 'completed', result = ?, error = NULL, finished_at = ?
+    WHERE job_id = ? AND name = ? AND attempts = ?
+'''
+MARK_RETRY_SQL = '''
+    UPDATE job_stages SET status = 'pending', next_attempt_at = ?, error = ?
+    WHERE job_id = ? AND name = ? AND attempts = ?
+'''
+MARK_FAILED_SQL = '''
+    UPDATE job_stages SET status = 'failed', error = ?, finished_at = ? WHERE job_id = ? AND name = ? AND attempts = ?
+'''
+CANCEL_STAGES_SQL = "UPDATE job_stages SET status = 'cancelled' WHERE job_id = ? AND status = 'pending'"
+UPDATE_JOB_SQL = "UPDATE jobs SET status = ?, error = COALESCE(?, error), updated_at = ?, finished_at = ? WHERE id = ?"
+JOB_SQL = '''
+    SELECT id, kind, payload, status, error, created_at, updated_at, finished_at FROM jobs WHERE id = ?
+'''
+JOB_STAGES_SQL = '''
+    SELECT name, status, attempts, result, error, started_at, finished_at FROM job_stages
+    WHERE job_id = ? ORDER BY position
+'''
+NEXT_DUE_SQL = "SELECT MIN(next_attempt_at) FROM job_stages WHERE status IN ('pending', 'running')"
+STATUS_COUNTS_SQL = "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+
+CLAIM_BATCH_SIZE = 4
+POST_MEETING = 'post_meeting'
+
+Stage = namedtuple('Stage', 'name run depends max_attempts', defaults=((), None))
+Stage.__doc__ = """A step of a pipeline: ``run(context)`` returns a JSON-serializable result."""
+
+StageContext = namedtuple('StageContext', 'job_id payload results attempt')
+StageContext.__doc__ = """What a stage runs with: the job's payload and the results of the stages before it."""
+
+
+class Pipeline:
+    """A named DAG of stages; each stage may only depend on stages listed before it."""
+
+    def __init__(self, kind, stages):
+        self.kind = kind
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage {stage.name} in pipeline {kind}")
+            unknown = [name for name in stage.depends if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage {stage.name} of pipeline {kind} depends on unknown or later stages: {unknown}")
+            self.stages[stage.name] = stage
+
+
+class JobQueue:
+    """Durable background jobs, each a pipeline of stages run by worker threads.
+
+    ``submit()`` stores a job and its stages in the ``jobs`` and
+    ``job_stages`` tables and returns the job ID straight away; submitting
+    again with the same ``idempotency_key`` returns the first job instead of
+    starting another. Worker threads claim stages whose dependencies have
+    completed, run them and store their results, so stages of one job that
+    do not depend on each other run in parallel and a finished stage is
+    never repeated. A failing stage is retried with exponential backoff up
+    to its ``max_attempts``; after that the job fails and its remaining
+    stages are cancelled. ``on_progress(job, payload)`` is called after
+    every stage transition. Jobs survive restarts. A job submitted with a
+    ``worker`` is only run by the process with that ``worker_id``, for
+    pipelines that need state held in memory there.
+    """
+
+    def __init__(self, db_path=None, workers=JOB_WORKERS, worker_id=None, max_attempts=JOB_MAX_ATTEMPTS,
+                 retry_base=JOB_RETRY_BASE_SECONDS, retry_max=JOB_RETRY_MAX_SECONDS,
+                 lease_seconds=JOB_LEASE_SECONDS, poll_interval=5, on_progress=None):
+        self.db_path = db_path
+        self.workers = workers
+        self.worker_id = worker_id
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.on_progress = on_progress
+        self.pipelines = {}
+        self.metrics = {'stages_completed': 0, 'stages_retried': 0, 'stages_failed': 0}
+        self._threads = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def register(self, pipeline):
+        self.pipelines[pipeline.kind] = pipeline
+        self._wake.set()
+
+    def submit(self, kind, payload=None, idempotency_key=None, worker=None):
+        """Queue a ``kind`` job with a JSON-serializable ``payload`` and return its ID."""
+        pipeline = self.pipelines.get(kind)
+        if pipeline is None:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        stages = [(job_id, position, stage.name, ' '.join(stage.depends), now)
+                  for position, stage in enumerate(pipeline.stages.values())]
+        conn = get_connection(self.db_path)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if idempotency_key is not None:
+                row = conn.execute("SELECT id FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+                if row is not None:
+                    return row[0]
+            conn.execute(INSERT_JOB_SQL, (job_id, kind, idempotency_key, json.dumps(payload or {}), worker, now, now))
+            conn.executemany(INSERT_STAGE_SQL, stages)
+        self._wake.set()
+        return job_id
+
+    def start(self):
+        """Start the worker threads (once)."""
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'jobs-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                claimed = self._claim()
+            except Exception as e:
+                logger.error(f"Error claiming job stages: {str(e)}")
+                claimed = []
+            if not claimed:
+                self._wake.wait(self._idle_wait())
+                continue
+            for job_id, name, attempt in claimed:
+                if self._stop.is_set():
+                    break
+                self._execute(job_id, name, attempt)
+
+    def _claim(self, limit=CLAIM_BATCH_SIZE):
+        if not self.pipelines:
+            return []
+        now = time.time()
+        kinds = ' ' + ' '.join(self.pipelines) + ' '
+        conn = get_connection(self.db_path)
+        with conn:
+            return conn.execute(CLAIM_STAGES_SQL, (now + self.lease_seconds, now, now, self.worker_id,
+                                                   kinds, limit)).fetchall()
+
+    def _idle_wait(self):
+        try:
+            next_due = get_connection(self.db_path).execute(NEXT_DUE_SQL).fetchone()[0]
+        except Exception:
+            next_due = None
+        if next_due is None:
+            return self.poll_interval
+        return min(self.poll_interval, max(0.01, next_due - time.time()))
+
+    def run_pending(self):
+        """Run every stage that is ready, in this thread, until none is left; returns how many ran."""
+        ran = 0
+        while True:
+            claimed = self._claim()
+            if not claimed:
+                return ran
+            for job_id, name, attempt in claimed:
+                self._execute(job_id, name, attempt)
+                ran += 1
+
+    def _execute(self, job_id, name, attempt):
+        conn = get_connection(self.db_path)
+        _, kind, payload, _, _, _, _, _ = conn.execute(JOB_SQL, (job_id,)).fetchone()
+        stage = self.pipelines[kind].stages[name]
+        max_attempts = stage.max_attempts or self.max_attempts
+        results = {
+            stage_name: json.loads(result) if result is not None else None
+            for stage_name, status, _, result, _, _, _ in conn.execute(JOB_STAGES_SQL, (job_id,)).fetchall()
+            if status == 'completed'
+        }
+        self._update_job(job_id)
+        try:
+            if attempt > max_attempts:
+                # Claimed again after its worker died on the last attempt
+                raise RuntimeError(f"Stage {name} did not finish in {max_attempts} attempts")
+            payload = json.loads(payload)
+            # Every stage of a job, whichever worker runs it, is traced in the job's trace
+            meeting_id = payload.get('meeting_id') if isinstance(payload, dict) else None
+            baggage = {'meeting_id': meeting_id} if meeting_id else None
+            with tracer.span(f"job.{name}", trace_key=job_id, baggage=baggage, job_id=job_id, pipeline=kind,
+                             attempt=attempt):
+                result = stage.run(StageContext(job_id, payload, results, attempt))
+            encoded = json.dumps(result)
+        except Exception as e:
+            self._record_failure(job_id, name, attempt, max_attempts, e)
+        else:
+            with conn:
+                conn.execute(MARK_COMPLETED_SQL, (encoded, time.time(), job_id, name, attempt))
+            self._count('stages_completed')
+            # Stages that were waiting for this one may be ready now
+            self._wake.set()
+        self._update_job(job_id)
+
+    def _record_failure(self, job_id, name, attempt, max_attempts, error):
+        conn = get_connection(self.db_path)
+        if attempt >= max_attempts:
+            logger.error(f"Job {job_id} failed: stage {name} gave up after {attempt} attempts: {str(error)}")
+            with conn:
+                conn.execute(MARK_FAILED_SQL, (str(error), time.time(), job_id, name, attempt))
+                conn.execute(CANCEL_STAGES_SQL, (job_id,))
+            self._count('stages_failed')
+        else:
+            delay = backoff_delay(attempt, self.retry_base, self.retry_max)
+            logger.warning(f"Stage {name} of job {job_id} failed ({str(error)}), retrying in {delay:.1f}s")
+            with conn:
+                conn.execute(MARK_RETRY_SQL, (time.time() + delay, str(error), job_id, name, attempt))
+            self._count('stages_retried')
+
+    def _update_job(self, job_id):
+        """Derive the job's status from its stages, store it and report progress."""
+        conn = get_connection(self.db_path)
+        stages = conn.execute(JOB_STAGES_SQL, (job_id,)).fetchall()
+        errors = [f"{name}: {stage_error}" for name, stage_status, _, _, stage_error, _, _ in stages
+                  if stage_status == 'failed']
+        if errors:
+            status = 'failed'
+        elif all(stage_status == 'completed' for _, stage_status, _, _, _, _, _ in stages):
+            status = 'completed'
+        elif any(stage_status != 'pending' or attempts for _, stage_status, attempts, _, _, _, _ in stages):
+            status = 'running'
+        else:
+            status = 'queued'
+        error = errors[0] if errors else None
+        now = time.time()
+        with conn:
+            conn.execute(UPDATE_JOB_SQL, (status, error, now, now if status in ('completed', 'failed') else None,
+                                          job_id))
+        if self.on_progress:
+            try:
+                payload = conn.execute(JOB_SQL, (job_id,)).fetchone()[2]
+                self.on_progress(self.job(job_id), json.loads(payload))
+            except Exception as e:
+                logger.error(f"Error reporting progress of job {job_id}: {str(e)}")
+
+    def _count(self, metric):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def job(self, job_id):
+        """Status of a job and the results of its completed stages, or None if it is unknown."""
+        conn = get_connection(self.db_path)
+        row = conn.execute(JOB_SQL, (job_id,)).fetchone()
+        if row is None:
+            return None
+        job_id, kind, _, status, error, created_at, updated_at, finished_at = row
+        stages = conn.execute(JOB_STAGES_SQL, (job_id,)).fetchall()
+        return {
+            'job_id': job_id,
+            'kind': kind,
+            'status': status,
+            'error': error,
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'finished_at': finished_at,
+            'stages': [
+                {'name': name, 'status': stage_status, 'attempts': attempts, 'error': stage_error,
+                 'started_at': started_at, 'finished_at': stage_finished_at}
+                for name, stage_status, attempts, _, stage_error, started_at, stage_finished_at in stages
+            ],
+            'results': {name: json.loads(result) for name, stage_status, _, result, _, _, _ in stages
+                        if stage_status == 'completed' and result is not None},
+        }
+
+    def wait(self, job_id, timeout=None):
+        """Block until ``job_id`` has completed or failed; returns its status."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.job(job_id)
+            if job is None or job['status'] in ('completed', 'failed'):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(0.02)
+
+    def stats(self):
+        counts = dict(get_connection(self.db_path).execute(STATUS_COUNTS_SQL).fetchall())
+        with self._lock:
+            metrics = dict(self.metrics)
+        return {'jobs': counts, **metrics, 'workers': len(self._threads)}
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout=5)
+
+
+def post_meeting_pipeline(sessions, segment_writer, email_outbox, llm, summary_streamer=None):
+    """What happens after a meeting stops: stop recognition, summarize, then save and email in parallel.
+
+    The job's payload is ``{"meeting_id": ..., "session_id": ...,
+    "participants": [...]}``; the session is removed once the meeting is
+    saved. If the worker restarted in between and the live session is gone,
+    the transcript is summarized from the segments persisted for the meeting.
+    With a ``summary_streamer`` the summary is streamed to the meeting room
+    as it is generated; it is still saved only once, by the save stage.
+    """
+
+    def stop(context):
+        transcriber = sessions.get(context.payload['meeting_id'])
+        if transcriber is not None and transcriber.is_recording:
+            transcriber.stop_recording()
+        # Later stages read the persisted segments
+        segment_writer.flush()
+        return {'stopped': transcriber is not None}
+
+    def summarize(context):
+        meeting_id = context.payload['meeting_id']
+        stream = summary_streamer.open(meeting_id) if summary_streamer else None
+        on_token = stream.write if stream else None
+        transcriber = sessions.get(meeting_id)
+        if transcriber is not None:
+            summary = transcriber.generate_summary(on_token=on_token, raise_errors=True)
+        else:
+            transcript = "\n".join(format_entry(entry) for entry in segment_writer.recover(meeting_id))
+            if transcript:
+                summary = summarize_transcript(llm, transcript, on_token=on_token)
+            else:
+                summary = "No transcript available to summarize."
+        result = {'summary': summary}
+        if stream:
+            stream.finish(summary)
+            ttft = stream.time_to_first_token()
+            result['time_to_first_token_ms'] = round(ttft * 1000) if ttft is not None else None
+        return result
+
+    def save(context):
+        meeting_id = context.payload['meeting_id']
+        saved_meeting_id = segment_writer.finish(meeting_id, context.results['summarize']['summary'])
+        # The meeting is over: release its session, unless the room has started a new one since
+        transcriber = sessions.get(meeting_id)
+        if transcriber is not None and context.payload.get('session_id') in (None, transcriber.session_id):
+            sessions.remove(meeting_id)
+        return {'saved_meeting_id': saved_meeting_id}
+
+    def email(context):
+        participants = context.payload.get('participants')
+        if not participants:
+            return {'email_job_id': None}
+        # Keyed by this job, so a retried stage does not queue the emails twice
+        email_job_id = email_outbox.enqueue(participants, context.results['summarize']['summary'],
+                                            job_id=f"{context.job_id}-email")
+        return {'email_job_id': email_job_id}
+
+    return Pipeline(POST_MEETING, [
+        Stage('stop', stop),
+        Stage('summarize', summarize, ('stop',)),
+        Stage('save', save, ('summarize',)),
+        Stage('email', email, ('summarize',)),
+    ])
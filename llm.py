@@ -0,0 +1,57 @@
+import logging
+import threading
+import time
+import llm_gateway
+from config import AZURE_OPENAI_DEPLOYMENT
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAIChatBackend:
+    """Chat completions on an Azure OpenAI deployment, through an ``LLMGateway``."""
+
+    def __init__(self, deployment=AZURE_OPENAI_DEPLOYMENT, gateway=None):
+        self.deployment = deployment
+        self.gateway = gateway or llm_gateway.gateway
+
+    def complete(self, messages, temperature=0.7, max_tokens=1000):
+        """Return the assistant message for ``messages``."""
+        return self.gateway.chat(self.deployment, messages, temperature=temperature, max_tokens=max_tokens)
+
+    def stream(self, messages, temperature=0.7, max_tokens=1000):
+        """Yield the assistant message for ``messages`` piece by piece as it is generated."""
+        return self.gateway.stream_chat(self.deployment, messages, temperature=temperature, max_tokens=max_tokens)
+
+
+class FakeChatBackend:
+    """Local stand-in for the LLM, used in tests and benchmarks.
+
+    Returns ``responder(messages)`` (by default a short description of the
+    prompt) after sleeping ``delay`` seconds, and records every call.
+    ``stream()`` yields the same response word by word, ``token_delay``
+    seconds apart.
+    """
+
+    def __init__(self, delay=0.0, responder=None, token_delay=0.0):
+        self.delay = delay
+        self.responder = responder
+        self.token_delay = token_delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def complete(self, messages, temperature=0.7, max_tokens=1000):
+        with self._lock:
+            self.calls.append(messages)
+        if self.delay:
+            time.sleep(self.delay)
+        if self.responder:
+            return self.responder(messages)
+        prompt = messages[-1]['content']
+        return f"Summary of {len(prompt.splitlines())} lines"
+
+    def stream(self, messages, temperature=0.7, max_tokens=1000):
+        response = self.complete(messages, temperature=temperature, max_tokens=max_tokens)
+        for i, word in enumerate(response.split(' ')):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else ' ' + word
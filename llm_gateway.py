@@ -0,0 +1,437 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    AZURE_OPENAI_API_KEY,
+    AZURE_OPENAI_ENDPOINT,
+    AZURE_OPENAI_API_VERSION,
+    LLM_MAX_CONCURRENCY,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_REQUEST_TIMEOUT_SECONDS,
+    LLM_QUEUE_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_RETRY_MAX_SECONDS,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_SECONDS,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_MIN_SECONDS
+)
+from metrics import LLM_TOKENS
+from outbox import backoff_delay
+from ratelimit import TokenBucket
+from summarizer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Azure enforces per-minute quotas over ~10 second windows, so that is the most
+# a bucket lets through in one burst
+QUOTA_BURST_SECONDS = 10
+HEDGE_MIN_SAMPLES = 20  # latencies seen before hedging starts
+LATENCY_HISTORY = 200
+
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.Timeout,
+    openai.error.APIConnectionError,
+    openai.error.TryAgain,
+)
+
+
+class LLMUnavailableError(Exception):
+    """Raised when a request is refused without being sent: no slot or quota in time."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised while the circuit breaker is open after repeated failures."""
+
+
+class PooledSession(requests.Session):
+    """The requests session behind every openai call in the process.
+
+    openai closes its per-thread sessions every few minutes; this one is
+    shared, so its keep-alive connections stay open until ``shutdown()``.
+    """
+
+    def __init__(self, pool_size):
+        super().__init__()
+        # Retries are the gateway's job
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        super().close()
+
+
+def is_retryable(error):
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    status = getattr(error, 'http_status', None)
+    return isinstance(error, openai.error.APIError) and (status is None or status >= 500)
+
+
+def retry_after(error):
+    """Seconds the service asked us to wait (``retry-after-ms`` or ``retry-after``), or None."""
+    headers = {k.lower(): v for k, v in (getattr(error, 'headers', None) or {}).items()}
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000
+        if 'retry-after' in headers:
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class CircuitBreaker:
+    """Fail fast after ``failure_threshold`` consecutive failures.
+
+    The circuit stays open for ``reset_timeout`` seconds, then lets one trial
+    call through (half-open): its success closes the circuit, its failure
+    opens it again.
+    """
+
+    def __init__(self, failure_threshold=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET_SECONDS,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if self.clock() - self._opened_at < self.reset_timeout:
+            return 'open'
+        return 'half_open'
+
+    def allow(self):
+        """Whether a call may go ahead now."""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def abandon(self):
+        """The call ``allow()`` let through was not made after all."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial:
+                    self.opened += 1
+                    logger.warning(f"LLM circuit breaker opened after {self.failures} failures")
+                self._opened_at = self.clock()
+                self._trial = False
+
+
+class LLMGateway:
+    """Every Azure OpenAI chat call of a worker goes through here.
+
+    Calls share one pool of keep-alive connections and at most
+    ``max_concurrency`` are in flight. Requests per minute and tokens per
+    minute (prompt plus ``max_tokens``) are drawn from token buckets first,
+    so the worker stays within the deployment's quota instead of collecting
+    429s. Throttled, timed out and failed calls are retried with jittered
+    backoff; a ``Retry-After`` from the service pauses every call until it
+    has passed. After repeated failures the circuit breaker fails calls at
+    once. A non-streamed call still running past the 95th percentile of
+    recent latencies is hedged: a second copy is sent if there is a free
+    slot and quota, and whichever answers first wins.
+
+    Credentials default to the environment; ``configure()`` replaces them,
+    e.g. when secrets are refreshed.
+    """
+
+    def __init__(self, api_key=AZURE_OPENAI_API_KEY, api_base=AZURE_OPENAI_ENDPOINT,
+                 api_version=AZURE_OPENAI_API_VERSION, api_type='azure', max_concurrency=LLM_MAX_CONCURRENCY,
+                 requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                 request_timeout=LLM_REQUEST_TIMEOUT_SECONDS, queue_timeout=LLM_QUEUE_TIMEOUT_SECONDS,
+                 max_retries=LLM_MAX_RETRIES, retry_base=LLM_RETRY_BASE_SECONDS, retry_max=LLM_RETRY_MAX_SECONDS,
+                 breaker=None, hedge=LLM_HEDGE_ENABLED, hedge_min=LLM_HEDGE_MIN_SECONDS):
+        self.credentials = {}
+        self.configure(api_key, api_base, api_version, api_type)
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_min = hedge_min
+        self.request_bucket = self._bucket(requests_per_minute)
+        self.token_bucket = self._bucket(tokens_per_minute)
+        self.metrics = {'requests': 0, 'retried': 0, 'throttled': 0, 'failed': 0, 'rejected': 0,
+                        'hedged': 0, 'hedge_wins': 0}
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._latencies = deque(maxlen=LATENCY_HISTORY)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bucket(per_minute):
+        if per_minute <= 0:
+            return None
+        return TokenBucket(per_minute / 60, capacity=max(1.0, per_minute * QUOTA_BURST_SECONDS / 60))
+
+    def configure(self, api_key=None, api_base=None, api_version=None, api_type=None):
+        """Set the credentials used from the next call on; unset ones fall back to the openai module's."""
+        self.credentials = {name: value for name, value in (
+            ('api_key', api_key), ('api_base', api_base), ('api_version', api_version), ('api_type', api_type)
+        ) if value}
+
+    def _params(self, deployment, messages, temperature, max_tokens):
+        # Azure addresses the deployment as the engine; openai.com takes a model name
+        api_type = self.credentials.get('api_type', openai.api_type)
+        target = {'engine': deployment} if api_type == 'azure' else {'model': deployment}
+        return {**target, **self.credentials, 'messages': messages, 'temperature': temperature,
+                'max_tokens': max_tokens, 'request_timeout': self.request_timeout}
+
+    def _count(self, metric, n=1):
+        with self._lock:
+            self.metrics[metric] += n
+
+    def _acquire(self, tokens, timeout):
+        """Take a concurrency slot and quota for one request, waiting up to ``timeout`` seconds."""
+        deadline = time.monotonic() + timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise LLMUnavailableError(f"No LLM request slot free within {timeout:.0f}s")
+        try:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                if pause > deadline - time.monotonic():
+                    raise LLMUnavailableError(f"LLM calls are paused for another {pause:.1f}s")
+                time.sleep(pause)
+            if self.request_bucket and not self.request_bucket.acquire(
+                    1, timeout=max(0.0, deadline - time.monotonic())):
+                raise LLMUnavailableError("Requests-per-minute quota exhausted")
+            if self.token_bucket and not self.token_bucket.acquire(
+                    min(tokens, self.token_bucket.capacity), timeout=max(0.0, deadline - time.monotonic())):
+                raise LLMUnavailableError("Tokens-per-minute quota exhausted")
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_flight += 1
+            self.metrics['requests'] += 1
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _retrying(self, attempt):
+        """Run ``attempt()`` until it succeeds, fails for good or runs out of retries."""
+        for n in range(1, self.max_retries + 2):
+            if not self.breaker.allow():
+                self._count('rejected')
+                raise CircuitOpenError("LLM circuit breaker is open")
+            try:
+                result = attempt()
+            except LLMUnavailableError:
+                self._count('rejected')
+                self.breaker.abandon()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # The service answered, it just did not like the request
+                    self.breaker.record_success()
+                    self._count('failed')
+                    raise
+                if isinstance(e, openai.error.RateLimitError):
+                    self._count('throttled')
+                else:
+                    self.breaker.record_failure()
+                if n > self.max_retries:
+                    self._count('failed')
+                    raise
+                delay = retry_after(e)
+                if delay is not None:
+                    # Every call waits, not just this one
+                    self._pause(delay)
+                    delay = 0
+                else:
+                    delay = backoff_delay(n, self.retry_base, self.retry_max)
+                logger.warning(f"LLM request failed ({str(e)}), retry {n} of {self.max_retries}")
+                self._count('retried')
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _estimate(self, messages, max_tokens):
+        return self._prompt_tokens(messages) + max_tokens
+
+    def _prompt_tokens(self, messages):
+        return sum(count_tokens(m['content']) for m in messages)
+
+    def _record_usage(self, prompt_tokens, completion_tokens):
+        LLM_TOKENS.labels('prompt').inc(prompt_tokens)
+        LLM_TOKENS.labels('completion').inc(completion_tokens)
+
+    def _send(self, params, start):
+        try:
+            response = openai.ChatCompletion.create(**params)
+        finally:
+            self._release()
+        with self._lock:
+            self._latencies.append(time.monotonic() - start)
+        content = response.choices[0].message.content
+        usage = response.get('usage')
+        if usage:
+            self._record_usage(usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0))
+        else:
+            self._record_usage(self._prompt_tokens(params['messages']), count_tokens(content or ''))
+        return content
+
+    def hedge_delay(self):
+        """Seconds after which a call is hedged, or None while too few latencies are known."""
+        if not self.hedge:
+            return None
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+        return max(self.hedge_min, latencies[int(len(latencies) * 0.95)])
+
+    def _hedged(self, params, tokens):
+        self._acquire(tokens, self.queue_timeout)
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._send(params, time.monotonic())
+        executor = self._pool()
+        primary = executor.submit(self._send, params, time.monotonic())
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        try:
+            # Only hedge with capacity that is free right now
+            self._acquire(tokens, 0)
+        except LLMUnavailableError:
+            return primary.result()
+        self._count('hedged')
+        hedge = executor.submit(self._send, params, time.monotonic())
+        pending = {primary, hedge}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            succeeded = [future for future in done if future.exception() is None]
+            if succeeded:
+                if primary not in succeeded:
+                    self._count('hedge_wins')
+                return succeeded[0].result()
+            if not pending:
+                return primary.result()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # Every task holds a slot, so this never queues
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                    thread_name_prefix='llm-hedge')
+            return self._executor
+
+    def chat(self, deployment, messages, temperature=0.7, max_tokens=1000):
+        """The assistant message for ``messages``."""
+        params = self._params(deployment, messages, temperature, max_tokens)
+        tokens = self._estimate(messages, max_tokens)
+        return self._retrying(lambda: self._hedged(params, tokens))
+
+    def stream_chat(self, deployment, messages, temperature=0.7, max_tokens=1000):
+        """Yield the assistant message piece by piece; retried only until the first piece arrives."""
+        params = {**self._params(deployment, messages, temperature, max_tokens), 'stream': True}
+        tokens = self._estimate(messages, max_tokens)
+
+        def open_stream():
+            self._acquire(tokens, self.queue_timeout)
+            try:
+                return openai.ChatCompletion.create(**params)
+            except Exception:
+                self._release()
+                raise
+
+        response = self._retrying(open_stream)
+        # Streamed responses carry no usage; each chunk holds one token
+        completion_tokens = 0
+        try:
+            for chunk in response:
+                # Azure sends a first chunk with content filter results and no choices
+                if chunk.choices:
+                    content = chunk.choices[0].delta.get('content')
+                    if content:
+                        completion_tokens += 1
+                        yield content
+        except Exception:
+            self.breaker.record_failure()
+            self._count('failed')
+            raise
+        finally:
+            self._release()
+            self._record_usage(self._prompt_tokens(messages), completion_tokens)
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self.metrics)
+            in_flight = self._in_flight
+            paused = max(0.0, self._paused_until - time.monotonic())
+        return {
+            **metrics,
+            'in_flight': in_flight,
+            'max_concurrency': self.max_concurrency,
+            'paused_seconds': round(paused, 1),
+            'circuit': self.breaker.state,
+            'circuit_opened': self.breaker.opened,
+            'hedge_after_seconds': self.hedge_delay(),
+            'requests_available': round(self.request_bucket.available()) if self.request_bucket else None,
+            'tokens_available': round(self.token_bucket.available()) if self.token_bucket else None,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+# One keep-alive connection pool for the process, used by openai for every request
+http_session = PooledSession(LLM_MAX_CONCURRENCY)
+openai.requestssession = http_session
+
+gateway = LLMGateway()
@@ -0,0 +1,427 @@
+import atexit
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from config import WORKER_ID, METRICS_DIR, METRICS_SNAPSHOT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+SLOW_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+
+class _Owner:
+    """Lives in a thread's local storage, so it dies when the thread exits."""
+
+    __slots__ = ('__weakref__',)
+
+
+class _Cells:
+    """The per-thread cells of one time series.
+
+    Each thread only ever writes its own cell, so recording takes no lock;
+    reading adds the cells up. When a thread exits, its cell is folded into
+    a running total, so thread churn neither grows the list nor keeps
+    finished threads alive.
+    """
+
+    __slots__ = ('size', '_local', '_cells', '_retired', '_lock')
+
+    def __init__(self, size):
+        self.size = size
+        self._local = threading.local()
+        self._cells = {}
+        self._retired = [0] * size
+        # Reentrant: an exiting thread's fold can run while its thread holds the lock
+        self._lock = threading.RLock()
+
+    def cell(self):
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = [0] * self.size
+            owner = self._local.owner = _Owner()
+            with self._lock:
+                self._cells[id(cell)] = cell
+            weakref.finalize(owner, self._retire, id(cell)).atexit = False
+            return cell
+
+    def _retire(self, key):
+        with self._lock:
+            cell = self._cells.pop(key)
+            self._retired = [a + b for a, b in zip(self._retired, cell)]
+
+    def totals(self):
+        with self._lock:
+            totals = list(self._retired)
+            for cell in list(self._cells.values()):
+                totals = [a + b for a, b in zip(totals, cell)]
+        return totals
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class CounterChild:
+    __slots__ = ('_cells',)
+
+    def __init__(self):
+        self._cells = _Cells(1)
+
+    def inc(self, amount=1):
+        self._cells.cell()[0] += amount
+
+    def values(self):
+        return self._cells.totals()
+
+
+class HistogramChild:
+    """Observation counts per bucket (the last one is +Inf) followed by their sum."""
+
+    __slots__ = ('_cells', 'buckets')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._cells = _Cells(len(buckets) + 2)
+
+    def observe(self, value):
+        cell = self._cells.cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def time(self):
+        """Context manager that observes the time spent inside it."""
+        return _Timer(self)
+
+    def values(self):
+        return self._cells.totals()
+
+
+class GaugeChild:
+    __slots__ = ('_value', '_function')
+
+    def __init__(self):
+        self._value = 0
+        self._function = None
+
+    def set(self, value):
+        self._value = value
+
+    def set_function(self, function):
+        """Read the gauge from ``function()`` whenever metrics are collected."""
+        self._function = function
+
+    def values(self):
+        return [self._function() if self._function else self._value]
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        self._default = None if self.labelnames else self.labels()
+
+    def _child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """The time series for these label values, created on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def describe(self):
+        return {'type': self.kind, 'help': self.documentation, 'labelnames': list(self.labelnames)}
+
+    def samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        samples = []
+        for values, child in children:
+            try:
+                samples.append([[str(v) for v in values], child.values()])
+            except Exception as e:
+                logger.error(f"Error collecting metric {self.name}: {str(e)}")
+        return samples
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _child(self):
+        return CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _child(self):
+        return HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def describe(self):
+        return {**super().describe(), 'buckets': list(self.buckets)}
+
+
+class Gauge(Metric):
+    """A value of this worker; reported with a ``worker`` label so workers can be told apart."""
+    kind = 'gauge'
+
+    def _child(self):
+        return GaugeChild()
+
+    def set(self, value):
+        self._default.set(value)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def snapshot(self):
+        """Every metric's description and current samples, JSON-serializable."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: {**metric.describe(), 'samples': metric.samples()} for metric in metrics}
+
+
+def timed(histogram):
+    """Decorator recording each call's duration in ``histogram``, labelled with the function's name."""
+    def decorate(function):
+        child = histogram.labels(function.__name__)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def merge(snapshots):
+    """Combine ``(worker_id, snapshot, fresh)`` snapshots of several workers.
+
+    Counters and histograms are summed per label set. Gauges get a
+    ``worker`` label instead; those of workers whose snapshot is not
+    ``fresh`` (the worker has probably stopped) are left out.
+    """
+    merged = {}
+    for worker_id, snapshot, fresh in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = {**metric, 'samples': {}}
+                if metric['type'] == 'gauge':
+                    target['labelnames'] = metric['labelnames'] + ['worker']
+            elif target['type'] != metric['type'] or target.get('buckets') != metric.get('buckets'):
+                continue  # a worker running a different version
+            for labels, values in metric['samples']:
+                if metric['type'] == 'gauge':
+                    if fresh:
+                        target['samples'][tuple(labels) + (str(worker_id),)] = values
+                    continue
+                key = tuple(labels)
+                current = target['samples'].get(key)
+                target['samples'][key] = values if current is None else [a + b for a, b in zip(current, values)]
+    return merged
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(merged):
+    """Prometheus text exposition format of merged snapshots."""
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        names = metric['labelnames']
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, values in sorted(metric['samples'].items()):
+            if metric['type'] != 'histogram':
+                lines.append(f"{name}{_labels(names, labels)} {_number(values[0])}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric['buckets'] + [float('inf')], values[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(names, labels, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, labels)} {_number(values[-1])}")
+            lines.append(f"{name}_count{_labels(names, labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+class Exporter:
+    """Serves a worker's metrics, together with those of its sibling processes.
+
+    With a ``directory``, the worker's snapshot is written there every
+    ``interval`` seconds (and at exit) as ``worker-<id>.json``, and
+    ``render()`` merges its live metrics with the other workers' latest
+    snapshots, so whichever worker is scraped reports the whole host.
+    """
+
+    def __init__(self, registry, directory=METRICS_DIR, worker_id=WORKER_ID, interval=METRICS_SNAPSHOT_SECONDS):
+        self.registry = registry
+        self.directory = directory
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f"worker-{self.worker_id}.json")
+
+    def write(self):
+        """Write this worker's snapshot atomically."""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        data = json.dumps({'worker': self.worker_id, 'time': time.time(), 'metrics': self.registry.snapshot()})
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def start(self):
+        if not self.directory or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='metrics-snapshot', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except Exception as e:
+                logger.error(f"Error writing metrics snapshot: {str(e)}")
+
+    def _siblings(self):
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        siblings = []
+        now = time.time()
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith('worker-') and filename.endswith('.json')):
+                continue
+            if filename == os.path.basename(self.path):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping metrics snapshot {filename}: {str(e)}")
+                continue
+            siblings.append((data['worker'], data['metrics'], now - data['time'] < 3 * self.interval))
+        return siblings
+
+    def render(self):
+        return render(merge([(self.worker_id, self.registry.snapshot(), True)] + self._siblings()))
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            try:
+                self.write()
+            except Exception as e:
+                logger.error(f"Error writing metrics snapshot: {str(e)}")
+
+
+REGISTRY = Registry()
+
+# Everything /metrics reports
+RECOGNITION_CALLBACK_SECONDS = REGISTRY.histogram(
+    'meeting_recognition_callback_seconds', "Time spent handling a final recognition result",
+    buckets=FAST_BUCKETS)
+SOCKETIO_EMIT_SECONDS = REGISTRY.histogram(
+    'meeting_socketio_emit_seconds', "Time to hand a Socket.IO event to the server or message queue",
+    ('event',), buckets=FAST_BUCKETS)
+SOCKETIO_PENDING_ENTRIES = REGISTRY.gauge(
+    'meeting_socketio_pending_entries', "Transcript entries waiting for the next batch")
+SUMMARY_SECONDS = REGISTRY.histogram(
+    'meeting_summary_seconds', "Time to generate a meeting summary", ('outcome',), buckets=SLOW_BUCKETS)
+LLM_TOKENS = REGISTRY.counter(
+    'meeting_llm_tokens_total', "Tokens used by chat completions (estimated when the service does not say)",
+    ('kind',))
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    'meeting_db_query_seconds', "Time spent in each database.py function", ('function',))
+SMTP_SEND_SECONDS = REGISTRY.histogram(
+    'meeting_smtp_send_seconds', "Time to send one summary email", ('outcome',))
+ACTIVE_SESSIONS = REGISTRY.gauge(
+    'meeting_active_sessions', "Live meetings hosted by the worker")
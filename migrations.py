@@ -0,0 +1,232 @@
+# Versioned schema migrations for the meetings database. The schema version
+# lives in PRAGMA user_version; migrate() applies every newer migration in its
+# own transaction, so it is safe on every startup and from several workers.
+# Migrations that must rewrite existing rows register a backfill instead of
+# doing it inline, and run_backfills() works through those rows one short
+# transaction per batch, resuming where it stopped.
+import re
+from email.utils import parseaddr
+
+BACKFILL_BATCH_SIZE = 500
+
+BACKFILL_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS migration_backfill (
+        version INTEGER PRIMARY KEY,
+        target INTEGER NOT NULL,
+        done INTEGER NOT NULL
+    )
+'''
+
+# A line of a live transcript ("[10:02:11] Speaker 2: text") or of a batch
+# transcript ("[00:01:05] text")
+TRANSCRIPT_LINE = re.compile(r'^\[(?P<ts>[^\]]*)\]\s*(?:Speaker (?P<speaker>\d+):\s*)?(?P<text>.*)$')
+
+INSERT_SEGMENT_SQL = "INSERT OR IGNORE INTO segments (meeting_id, seq, speaker_id, ts, text) VALUES (?, ?, ?, ?, ?)"
+INSERT_PARTICIPANT_SQL = "INSERT OR IGNORE INTO participants (meeting_id, email) VALUES (?, ?)"
+
+
+def parse_transcript(transcript):
+    """Split a transcript into ``(seq, speaker_id, ts, text)`` segments, one per line."""
+    segments = []
+    for line in (transcript or '').splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = TRANSCRIPT_LINE.match(line)
+        if match:
+            speaker = match.group('speaker')
+            segments.append((len(segments) + 1, int(speaker) if speaker else None,
+                             match.group('ts'), match.group('text')))
+        else:
+            segments.append((len(segments) + 1, None, None, line))
+    return segments
+
+
+def normalize_email(participant):
+    """Lower-cased address of ``participant`` ('Name <addr>' or 'addr'), or None."""
+    address = parseaddr(participant or '')[1].strip().lower()
+    return address or None
+
+
+def participant_emails(participants):
+    """Unique normalized addresses from a list or a comma-joined string."""
+    if isinstance(participants, str):
+        participants = participants.split(',')
+    emails = []
+    for participant in participants or []:
+        email = normalize_email(participant)
+        if email and email not in emails:
+            emails.append(email)
+    return emails
+
+
+def write_segments(conn, meeting_id, transcript):
+    conn.executemany(INSERT_SEGMENT_SQL, [(meeting_id, *segment) for segment in parse_transcript(transcript)])
+
+
+def write_participants(conn, meeting_id, participants):
+    conn.execute("DELETE FROM participants WHERE meeting_id = ?", (meeting_id,))
+    conn.executemany(INSERT_PARTICIPANT_SQL, [(meeting_id, email) for email in participant_emails(participants)])
+
+
+def _normalized_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS participants (
+            meeting_id INTEGER NOT NULL REFERENCES meetings (id) ON DELETE CASCADE,
+            email TEXT NOT NULL,
+            PRIMARY KEY (meeting_id, email)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_participants_email ON participants (email, meeting_id)")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS segments (
+            meeting_id INTEGER NOT NULL REFERENCES meetings (id) ON DELETE CASCADE,
+            seq INTEGER NOT NULL,
+            speaker_id INTEGER,
+            ts TEXT,
+            text TEXT NOT NULL,
+            PRIMARY KEY (meeting_id, seq)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_segments_speaker ON segments (speaker_id, meeting_id, seq)")
+
+
+def _backfill_normalized_tables(conn, after_id, through_id, batch_size):
+    rows = conn.execute(
+        "SELECT id, transcript, participants FROM meetings WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+        (after_id, through_id, batch_size)
+    ).fetchall()
+    for meeting_id, transcript, participants in rows:
+        write_segments(conn, meeting_id, transcript)
+        if participants:
+            write_participants(conn, meeting_id, participants)
+    return (rows[-1][0] if len(rows) == batch_size else through_id), len(rows)
+
+
+def _live_meeting_tables(conn):
+    # Segments of meetings still in progress, keyed by their Socket.IO room
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS live_meetings (
+            room TEXT PRIMARY KEY,
+            started_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            last_seq INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS live_segments (
+            room TEXT NOT NULL REFERENCES live_meetings (room) ON DELETE CASCADE,
+            seq INTEGER NOT NULL,
+            speaker_id INTEGER,
+            speaker TEXT,
+            ts TEXT,
+            text TEXT NOT NULL,
+            PRIMARY KEY (room, seq)
+        ) WITHOUT ROWID
+    ''')
+
+
+def _job_tables(conn):
+    # Background jobs: one row per job and one per stage of its pipeline.
+    # A stage runs once every stage named in its space-separated "depends" is done.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            idempotency_key TEXT UNIQUE,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            worker INTEGER,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            finished_at REAL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_stages (
+            job_id TEXT NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            depends TEXT NOT NULL DEFAULT '',
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            result TEXT,
+            error TEXT,
+            started_at REAL,
+            finished_at REAL,
+            PRIMARY KEY (job_id, name)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_stages_due ON job_stages (status, next_attempt_at)")
+
+
+# (version, description, schema change, backfill of rows that predate it or None).
+# A backfill is called with (conn, after_id, through_id, batch_size) and
+# returns (last meeting id covered, rows processed).
+MIGRATIONS = (
+    (1, "participants and transcript segments tables", _normalized_tables, _backfill_normalized_tables),
+    (2, "live meeting segments", _live_meeting_tables, None),
+    (3, "background jobs", _job_tables, None),
+)
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """Apply pending migrations to ``conn``'s database; returns the versions applied."""
+    applied = []
+    with conn:
+        conn.execute(BACKFILL_SCHEMA)
+    for version, description, schema, backfill in migrations:
+        if schema_version(conn) >= version:
+            continue
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Another worker may have got here first
+            if schema_version(conn) >= version:
+                continue
+            schema(conn)
+            if backfill is not None:
+                target = conn.execute("SELECT COALESCE(MAX(id), 0) FROM meetings").fetchone()[0]
+                if target:
+                    conn.execute("INSERT OR REPLACE INTO migration_backfill (version, target, done) VALUES (?, ?, 0)",
+                                 (version, target))
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+        print(f"Applied database migration {version}: {description}")
+        applied.append(version)
+    return applied
+
+
+def pending_backfills(conn):
+    """``{version: rows left}`` for backfills that have not finished."""
+    return {
+        version: conn.execute("SELECT COUNT(*) FROM meetings WHERE id > ? AND id <= ?", (done, target)).fetchone()[0]
+        for version, target, done in conn.execute("SELECT version, target, done FROM migration_backfill").fetchall()
+    }
+
+
+def run_backfills(conn, batch_size=BACKFILL_BATCH_SIZE, migrations=MIGRATIONS):
+    """Backfill rows for every migration that registered one; returns the rows processed."""
+    backfills = {version: backfill for version, _, _, backfill in migrations if backfill is not None}
+    processed = 0
+    for version in sorted(backfills):
+        while True:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT target, done FROM migration_backfill WHERE version = ?",
+                                   (version,)).fetchone()
+                if row is None:
+                    break
+                target, done = row
+                last_id, count = backfills[version](conn, done, target, batch_size)
+                processed += count
+                if last_id >= target:
+                    conn.execute("DELETE FROM migration_backfill WHERE version = ?", (version,))
+                else:
+                    conn.execute("UPDATE migration_backfill SET done = ? WHERE version = ?", (last_id, version))
+    return processed
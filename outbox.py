@@ -0,0 +1,435 @@
+import json
+import logging
+import random
+import smtplib
+import threading
+import time
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+from config import (
+    EMAIL_USER,
+    EMAIL_PASSWORD,
+    EMAIL_SMTP_SERVER,
+    EMAIL_SMTP_PORT,
+    EMAIL_STARTTLS,
+    EMAIL_OUTBOX_WORKERS,
+    EMAIL_POOL_SIZE,
+    EMAIL_POOL_IDLE_CHECK_SECONDS,
+    EMAIL_MAX_ATTEMPTS,
+    EMAIL_RETRY_BASE_SECONDS,
+    EMAIL_RETRY_MAX_SECONDS,
+    EMAIL_RATE_PER_MINUTE
+)
+from database import get_connection
+from email_service import build_summary_message, personalize_summary, summary_subject
+from metrics import SMTP_SEND_SECONDS
+from tracing import current_span, tracer
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_id TEXT NOT NULL,
+        recipient TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        body TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL,
+        last_error TEXT,
+        created_at REAL NOT NULL,
+        sent_at REAL,
+        trace TEXT
+    )
+'''
+OUTBOX_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (status, next_attempt_at)",
+    "CREATE INDEX IF NOT EXISTS idx_email_outbox_job ON email_outbox (job_id)",
+)
+INSERT_MESSAGE_SQL = '''
+    INSERT INTO email_outbox (job_id, recipient, subject, body, next_attempt_at, created_at, trace)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+# Claiming leases a message until ?; if the sender dies mid-send the lease
+# runs out and another sender (in any process) picks the message up again.
+# Each claim is a new attempt, and the outcome is only recorded for the
+# attempt that still holds the message, so a sender that outlived its lease
+# cannot overwrite the result of the one that took over.
+CLAIM_MESSAGES_SQL = '''
+    UPDATE email_outbox SET status = 'sending', attempts = attempts + 1, next_attempt_at = ?
+    WHERE id IN (
+        SELECT id FROM email_outbox
+        WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?
+        ORDER BY next_attempt_at LIMIT ?
+    )
+    RETURNING id, recipient, subject, body, attempts, job_id, trace
+'''
+MARK_SENT_SQL = '''
+    UPDATE email_outbox SET status = 'sent', sent_at = ?, last_error = NULL
+    WHERE id = ? AND attempts = ?
+'''
+MARK_RETRY_SQL = '''
+    UPDATE email_outbox SET status = 'pending', next_attempt_at = ?, last_error = ?
+    WHERE id = ? AND attempts = ?
+'''
+MARK_FAILED_SQL = "UPDATE email_outbox SET status = 'failed', last_error = ? WHERE id = ? AND attempts = ?"
+NEXT_DUE_SQL = "SELECT MIN(next_attempt_at) FROM email_outbox WHERE status IN ('pending', 'sending')"
+JOB_MESSAGES_SQL = '''
+    SELECT recipient, status, attempts, last_error, sent_at FROM email_outbox WHERE job_id = ? ORDER BY id
+'''
+STATUS_COUNTS_SQL = "SELECT status, COUNT(*) FROM email_outbox GROUP BY status"
+JOB_EXISTS_SQL = "SELECT 1 FROM email_outbox WHERE job_id = ? LIMIT 1"
+
+LEASE_SECONDS = 300
+CLAIM_BATCH_SIZE = 10
+
+OutboxMessage = namedtuple('OutboxMessage', 'id recipient subject body attempt job_id trace')
+
+
+def backoff_delay(attempt, base=EMAIL_RETRY_BASE_SECONDS, maximum=EMAIL_RETRY_MAX_SECONDS):
+    """Delay before retry number ``attempt``: doubling from ``base``, capped, half of it jittered."""
+    delay = min(maximum, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def is_permanent(error):
+    """Whether retrying ``error`` is pointless (the server rejected the message for good)."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False  # credentials can be fixed or rotated while we back off
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+
+class SMTPConnectionPool:
+    """Reusable, authenticated SMTP connections.
+
+    At most ``size`` connections are in use at once; finished ones are kept
+    open for the next message. A connection idle for more than
+    ``idle_check`` seconds is probed with NOOP before reuse, and one that
+    dropped or failed the probe is closed and replaced.
+    """
+
+    def __init__(self, host=EMAIL_SMTP_SERVER, port=EMAIL_SMTP_PORT, username=EMAIL_USER,
+                 password=EMAIL_PASSWORD, size=EMAIL_POOL_SIZE, starttls=EMAIL_STARTTLS,
+                 idle_check=EMAIL_POOL_IDLE_CHECK_SECONDS, timeout=30, factory=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.starttls = starttls
+        self.idle_check = idle_check
+        self.timeout = timeout
+        self.factory = factory
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = self.factory(self.host, int(self.port), timeout=self.timeout)
+        try:
+            if self.starttls:
+                conn.starttls()
+            if self.username:
+                conn.login(self.username, self.password)
+        except Exception:
+            self._quit(conn)
+            raise
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    @staticmethod
+    def _quit(conn):
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _discard(self, conn):
+        self._quit(conn)
+        with self._lock:
+            self.discarded += 1
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, last_used = self._idle.pop()
+            if time.monotonic() - last_used < self.idle_check or self._alive(conn):
+                with self._lock:
+                    self.reused += 1
+                return conn
+            self._discard(conn)
+        return self._open()
+
+    def _checkin(self, conn):
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+
+    @staticmethod
+    def _alive(conn):
+        try:
+            return conn.noop()[0] == 250
+        except Exception:
+            return False
+
+    @contextmanager
+    def connection(self):
+        """Borrow a logged-in connection for the duration of the block."""
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+            except smtplib.SMTPServerDisconnected:
+                self._discard(conn)
+                raise
+            except smtplib.SMTPException:
+                # A refused message leaves the session usable once reset
+                try:
+                    conn.rset()
+                    self._checkin(conn)
+                except Exception:
+                    self._discard(conn)
+                raise
+            except BaseException:
+                self._discard(conn)
+                raise
+            else:
+                self._checkin(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._quit(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'opened': self.opened,
+                'reused': self.reused,
+                'discarded': self.discarded,
+            }
+
+
+class EmailOutbox:
+    """Durable queue of outgoing summary emails, sent by background threads.
+
+    ``enqueue()`` stores one personalized message per participant in the
+    ``email_outbox`` table and returns a job ID straight away. Sender
+    threads claim due messages, wait for the rate limiter and send them
+    over pooled connections. Transient failures are retried with
+    exponential backoff up to ``max_attempts``; permanent rejections fail
+    at once. Messages survive restarts and can be sent by any worker
+    process sharing the database.
+    """
+
+    def __init__(self, pool, db_path=None, sender=EMAIL_USER, workers=EMAIL_OUTBOX_WORKERS,
+                 max_attempts=EMAIL_MAX_ATTEMPTS, retry_base=EMAIL_RETRY_BASE_SECONDS,
+                 retry_max=EMAIL_RETRY_MAX_SECONDS, rate_limiter=None, poll_interval=5):
+        self.pool = pool
+        self.db_path = db_path
+        self.sender = sender
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.rate_limiter = rate_limiter or TokenBucket(EMAIL_RATE_PER_MINUTE / 60, capacity=max(1, EMAIL_RATE_PER_MINUTE / 6))
+        self.poll_interval = poll_interval
+        self.metrics = {'sent': 0, 'retried': 0, 'failed': 0}
+        self._threads = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        conn = get_connection(self.db_path)
+        with conn:
+            conn.execute(OUTBOX_SCHEMA)
+            # Tables created before messages carried their trace
+            if 'trace' not in {row[1] for row in conn.execute("PRAGMA table_info(email_outbox)")}:
+                conn.execute("ALTER TABLE email_outbox ADD COLUMN trace TEXT")
+            for statement in OUTBOX_INDEXES:
+                conn.execute(statement)
+
+    def enqueue(self, participants, summary, subject=None, job_id=None):
+        """Queue the summary for every participant and return the job ID.
+
+        Enqueueing again with the ``job_id`` of a job that is already queued
+        adds nothing, so a caller that retries cannot send the emails twice.
+        """
+        if not participants:
+            raise ValueError("No recipients specified")
+        if not summary:
+            raise ValueError("No summary content provided")
+        job_id = job_id or uuid.uuid4().hex
+        subject = subject or summary_subject()
+        now = time.time()
+        # Sending is traced in the trace of whatever queued the emails
+        span = current_span()
+        trace = json.dumps(span.context()) if span is not None else None
+        rows = [(job_id, participant, subject, personalize_summary(participant, summary), now, now, trace)
+                for participant in participants]
+        conn = get_connection(self.db_path)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute(JOB_EXISTS_SQL, (job_id,)).fetchone() is None:
+                conn.executemany(INSERT_MESSAGE_SQL, rows)
+        self._wake.set()
+        return job_id
+
+    def start(self):
+        """Start the sender threads (once)."""
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'email-outbox-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                messages = self._claim()
+            except Exception as e:
+                logger.error(f"Error claiming outgoing email: {str(e)}")
+                messages = []
+            if not messages:
+                self._wake.wait(self._idle_wait())
+                continue
+            for message in messages:
+                if self._stop.is_set():
+                    break
+                try:
+                    self._send(message)
+                except Exception as e:
+                    # The message keeps its lease and is retried when the lease runs out
+                    logger.error(f"Error sending email {message.id}: {str(e)}")
+
+    def _claim(self, limit=CLAIM_BATCH_SIZE):
+        now = time.time()
+        conn = get_connection(self.db_path)
+        with conn:
+            rows = conn.execute(CLAIM_MESSAGES_SQL, (now + LEASE_SECONDS, now, limit)).fetchall()
+        return [OutboxMessage(*row) for row in rows]
+
+    def _idle_wait(self):
+        try:
+            next_due = get_connection(self.db_path).execute(NEXT_DUE_SQL).fetchone()[0]
+        except Exception:
+            next_due = None
+        if next_due is None:
+            return self.poll_interval
+        return min(self.poll_interval, max(0.01, next_due - time.time()))
+
+    def _send(self, message):
+        if message.attempt > self.max_attempts:
+            # Claimed again after its sender died on the last attempt
+            self._record_failure(message, RuntimeError(f"Not sent in {self.max_attempts} attempts"))
+            return
+        self.rate_limiter.acquire()
+        span = tracer.span('email.send', parent=json.loads(message.trace) if message.trace else None,
+                           email_job_id=message.job_id, attempt=message.attempt)
+        start = time.perf_counter()
+        try:
+            msg = build_summary_message(self.sender, message.recipient, message.subject, message.body)
+            with self.pool.connection() as smtp:
+                smtp.send_message(msg)
+        except Exception as e:
+            SMTP_SEND_SECONDS.labels('failed').observe(time.perf_counter() - start)
+            span.record_error(e)
+            span.end()
+            self._record_failure(message, e)
+            return
+        SMTP_SEND_SECONDS.labels('sent').observe(time.perf_counter() - start)
+        span.end()
+        conn = get_connection(self.db_path)
+        with conn:
+            conn.execute(MARK_SENT_SQL, (time.time(), message.id, message.attempt))
+        self._count('sent')
+
+    def _record_failure(self, message, error):
+        attempt = message.attempt
+        conn = get_connection(self.db_path)
+        if is_permanent(error) or attempt >= self.max_attempts:
+            logger.error(f"Giving up on email to {message.recipient} after {attempt} attempts: {str(error)}")
+            with conn:
+                conn.execute(MARK_FAILED_SQL, (str(error), message.id, attempt))
+            self._count('failed')
+        else:
+            delay = backoff_delay(attempt, self.retry_base, self.retry_max)
+            logger.warning(f"Email to {message.recipient} failed ({str(error)}), retrying in {delay:.0f}s")
+            with conn:
+                conn.execute(MARK_RETRY_SQL, (time.time() + delay, str(error), message.id, attempt))
+            self._count('retried')
+
+    def _count(self, metric):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def job(self, job_id):
+        """Delivery status of a job, or None if it is unknown."""
+        rows = get_connection(self.db_path).execute(JOB_MESSAGES_SQL, (job_id,)).fetchall()
+        if not rows:
+            return None
+        messages = [
+            {'recipient': recipient, 'status': status, 'attempts': attempts, 'error': error, 'sent_at': sent_at}
+            for recipient, status, attempts, error, sent_at in rows
+        ]
+        sent = sum(1 for m in messages if m['status'] == 'sent')
+        failed = sum(1 for m in messages if m['status'] == 'failed')
+        pending = len(messages) - sent - failed
+        if pending:
+            status = 'sending' if sent or failed or any(m['attempts'] for m in messages) else 'queued'
+        elif not failed:
+            status = 'completed'
+        else:
+            status = 'failed' if not sent else 'partial'
+        return {'job_id': job_id, 'status': status, 'total': len(messages), 'sent': sent,
+                'failed': failed, 'pending': pending, 'messages': messages}
+
+    def wait(self, job_id, timeout=None):
+        """Block until nothing of ``job_id`` is pending; returns its final status."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.job(job_id)
+            if job is None or not job['pending']:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(0.02)
+
+    def stats(self):
+        counts = dict(get_connection(self.db_path).execute(STATUS_COUNTS_SQL).fetchall())
+        with self._lock:
+            metrics = dict(self.metrics)
+        return {'queue': counts, **metrics, 'pool': self.pool.stats()}
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout=5)
+        self.pool.close()
@@ -0,0 +1,99 @@
+import logging
+import pickle
+import queue
+import threading
+import socketio
+
+logger = logging.getLogger(__name__)
+
+# Sentinel that ends a subscriber's listen loop
+_CLOSED = object()
+
+
+class InProcessBroker:
+    """Pub/sub channels between Socket.IO servers living in the same process.
+
+    Stands in for Redis in tests and benchmarks: every message published on
+    a channel is delivered to every subscriber of that channel, including
+    the publisher's own subscription (the manager skips its own messages).
+    """
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = queue.Queue()
+        with self._lock:
+            self._channels.setdefault(channel, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, channel, subscription):
+        with self._lock:
+            subscribers = self._channels.get(channel, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+        subscription.put(_CLOSED)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, []))
+        for subscription in subscribers:
+            subscription.put(message)
+        return len(subscribers)
+
+
+# Shared by every InProcessManager that is not given its own broker
+default_broker = InProcessBroker()
+
+
+class InProcessManager(socketio.PubSubManager):
+    """Socket.IO client manager that relays events through an ``InProcessBroker``.
+
+    Messages are pickled on the way through, like they are with Redis, so
+    payloads that would not survive a real message queue fail here too.
+    """
+
+    name = 'inprocess'
+
+    def __init__(self, broker=None, channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.broker = broker or default_broker
+        self.subscription = None
+
+    def initialize(self):
+        if not self.write_only:
+            # Subscribe before the listener starts so no early message is missed
+            self.subscription = self.broker.subscribe(self.channel)
+        super().initialize()
+
+    def _publish(self, data):
+        self.broker.publish(self.channel, pickle.dumps(data))
+
+    def _listen(self):
+        while True:
+            message = self.subscription.get()
+            if message is _CLOSED:
+                return
+            yield message
+
+    def close(self):
+        if self.subscription is not None:
+            self.broker.unsubscribe(self.channel, self.subscription)
+            self.subscription = None
+
+
+def make_client_manager(url, channel='socketio', write_only=False):
+    """Client manager for a message queue URL, or None to keep events in this process.
+
+    ``memory://`` uses the in-process broker; ``redis://`` and ``rediss://``
+    use Redis. Any other scheme is a configuration error.
+    """
+    if not url:
+        return None
+    if url.startswith('memory://'):
+        return InProcessManager(channel=channel, write_only=write_only)
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager(url, channel=channel, write_only=write_only)
+    scheme = url.split('://', 1)[0] if '://' in url else url
+    raise ValueError(f"Unsupported SOCKETIO_MESSAGE_QUEUE scheme {scheme!r}: use redis://, rediss:// or memory://")
@@ -0,0 +1,64 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts up to ``capacity``.
+
+    The bucket starts full. ``acquire()`` blocks until enough tokens have
+    accumulated (or ``timeout`` runs out); ``try_acquire()`` never blocks.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take ``tokens`` if they are available right now."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def delay(self, tokens=1):
+        """Seconds until ``tokens`` would be available (0 if they are now)."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def acquire(self, tokens=1, timeout=None):
+        """Wait for ``tokens``; returns False if ``timeout`` seconds pass first."""
+        if tokens > self.capacity:
+            raise ValueError(f"cannot acquire {tokens} tokens from a bucket of {self.capacity}")
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Secrets the app needs to talk to Azure OpenAI
+OPENAI_SECRET_NAMES = [
+    'openai-api-key',
+    'openai-api-base',
+    'openai-api-version',
+    'openai-api-type',
+]
+
+
+class KeyVaultSecretBackend:
+    """Fetch secrets from Azure Key Vault through a SecretClient."""
+
+    def __init__(self, secret_client):
+        self.secret_client = secret_client
+
+    def get_secret(self, name):
+        return self.secret_client.get_secret(name).value
+
+
+class LocalSecretBackend:
+    """In-process stand-in for Key Vault, backed by a plain dict.
+
+    Used when no vault is configured (values come from the environment) and in
+    tests, where ``delay`` simulates the vault round trip.
+    """
+
+    def __init__(self, values, delay=0.0):
+        self.values = dict(values)
+        self.delay = delay
+        self.calls = 0
+
+    def get_secret(self, name):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.values.get(name) is None:
+            raise KeyError(f"Secret not found: {name}")
+        return self.values[name]
+
+
+def _load_fernet(cache_key):
+    """Return a Fernet cipher for the on-disk cache, or None if unavailable."""
+    if not cache_key:
+        return None
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError:
+        logger.warning("cryptography is not installed; secret file cache disabled")
+        return None
+    try:
+        return Fernet(cache_key)
+    except Exception as e:
+        logger.warning(f"Invalid secret cache key; secret file cache disabled: {str(e)}")
+        return None
+
+
+class SecretStore:
+    """Process-wide secret cache with parallel loading and background refresh.
+
+    ``load()`` fetches every secret concurrently (or reads the encrypted file
+    cache when it is still fresh). Values are held for ``ttl`` seconds; a
+    daemon thread refreshes them ``refresh_margin`` seconds before they expire,
+    and a failed refresh keeps serving the last known values.
+    """
+
+    def __init__(self, backend, names, ttl=3600, refresh_margin=300,
+                 cache_path=None, cache_key=None, max_workers=8, on_refresh=None):
+        self.backend = backend
+        self.names = list(names)
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl / 2)
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+        self.on_refresh = on_refresh
+        self._fernet = _load_fernet(cache_key) if cache_path else None
+        self._values = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresh_thread = None
+
+    def load(self):
+        """Populate the cache from the file cache or, failing that, the backend."""
+        if not self._load_file_cache():
+            self.refresh()
+        return self
+
+    def refresh(self):
+        """Fetch all secrets in parallel and replace the cached values."""
+        start = time.perf_counter()
+        workers = max(1, min(self.max_workers, len(self.names)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='secret-fetch') as pool:
+            values = dict(zip(self.names, pool.map(self.backend.get_secret, self.names)))
+
+        with self._lock:
+            self._values = values
+            self._expires_at = time.time() + self.ttl
+        logger.info(f"Loaded {len(values)} secrets in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        self._save_file_cache()
+        if self.on_refresh:
+            self.on_refresh(self)
+        return values
+
+    def get(self, name, default=None):
+        """Return a cached secret; stale values are served until a refresh succeeds."""
+        return self._values.get(name, default)
+
+    def expires_in(self):
+        return self._expires_at - time.time()
+
+    def start_refresh(self):
+        """Start the background thread that refreshes secrets before they expire."""
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+        self._stop.clear()
+        self._refresh_thread = threading.Thread(target=self._refresh_loop, name='secret-refresh', daemon=True)
+        self._refresh_thread.start()
+
+    def stop_refresh(self):
+        self._stop.set()
+        if self._refresh_thread:
+            self._refresh_thread.join(timeout=5)
+
+    def _refresh_loop(self):
+        retry_delay = 1.0
+        while not self._stop.is_set():
+            wait = max(0.0, self.expires_in() - self.refresh_margin)
+            if self._stop.wait(wait):
+                return
+            try:
+                self.refresh()
+                retry_delay = 1.0
+            except Exception as e:
+                logger.error(f"Error refreshing secrets, keeping cached values: {str(e)}")
+                if self._stop.wait(retry_delay):
+                    return
+                retry_delay = min(retry_delay * 2, 60.0)
+
+    def _load_file_cache(self):
+        if not self._fernet or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, 'rb') as f:
+                payload = json.loads(self._fernet.decrypt(f.read()))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable secret cache {self.cache_path}: {str(e)}")
+            return False
+
+        if payload.get('expires_at', 0) - time.time() <= self.refresh_margin:
+            return False
+        if any(name not in payload.get('values', {}) for name in self.names):
+            return False
+
+        with self._lock:
+            self._values = {name: payload['values'][name] for name in self.names}
+            self._expires_at = payload['expires_at']
+        logger.info(f"Loaded {len(self._values)} secrets from {self.cache_path}")
+        if self.on_refresh:
+            self.on_refresh(self)
+        return True
+
+    def _save_file_cache(self):
+        if not self._fernet:
+            return
+        payload = json.dumps({'expires_at': self._expires_at, 'values': self._values}).encode('utf-8')
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self._fernet.encrypt(payload))
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Could not write secret cache {self.cache_path}: {str(e)}")
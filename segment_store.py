@@ -0,0 +1,143 @@
+import sys
+import tempfile
+import threading
+from collections import deque
+from config import SESSION_TRANSCRIPT_MEMORY_BYTES, SESSION_MAX_TRANSCRIPT_ENTRIES, SEGMENT_SPILL_DIR
+
+
+class Segment:
+    """One transcript entry, held as its formatted ``[HH:MM:SS] Speaker N: text`` line.
+
+    The text and timestamp are slices of that line, and the speaker label
+    is interned, so an entry costs one small object plus one string.
+    """
+
+    __slots__ = ('seq', 'speaker_id', 'speaker', 'line', 'offset')
+
+    def __init__(self, seq, speaker_id, speaker, timestamp, text):
+        self.seq = seq
+        self.speaker_id = speaker_id
+        self.speaker = sys.intern(speaker)
+        self.line = f"[{timestamp}] {speaker}: {text}"
+        self.offset = len(self.line) - len(text)
+
+    @property
+    def text(self):
+        return self.line[self.offset:]
+
+    @property
+    def timestamp(self):
+        return self.line[1:self.offset - len(self.speaker) - 4]
+
+    def as_entry(self):
+        """The entry as a dict, shaped like the ones the transcriber emits."""
+        return {'text': self.text, 'speaker': self.speaker, 'timestamp': self.timestamp,
+                'speaker_id': self.speaker_id, 'utterance_id': self.seq, 'seq': self.seq}
+
+
+SEGMENT_OVERHEAD = sys.getsizeof(Segment(0, 0, '', '', '')) + 8  # plus its deque slot
+
+
+class SegmentStore:
+    """Transcript of one meeting with a bounded memory footprint.
+
+    Recent segments stay in memory. Once they take more than
+    ``memory_budget`` bytes (or number more than ``max_segments``), the
+    oldest are appended to a temporary spill file as formatted lines, so
+    ``formatted()`` only joins what is still in memory and copies the rest
+    from disk; no entry is ever formatted twice.
+    """
+
+    def __init__(self, memory_budget=SESSION_TRANSCRIPT_MEMORY_BYTES, max_segments=SESSION_MAX_TRANSCRIPT_ENTRIES,
+                 spill_dir=SEGMENT_SPILL_DIR):
+        self.memory_budget = memory_budget
+        self.max_segments = max_segments
+        self.spill_dir = spill_dir
+        self.spilled = 0
+        self.memory_bytes = 0
+        self._segments = deque()
+        self._spill = None
+        self._spill_bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.spilled + len(self._segments)
+
+    def __iter__(self):
+        """The segments still in memory, oldest first."""
+        with self._lock:
+            return iter(list(self._segments))
+
+    def append(self, seq, speaker_id, speaker, timestamp, text):
+        segment = Segment(seq, speaker_id, speaker, timestamp, text.replace('\n', ' '))
+        with self._lock:
+            self._segments.append(segment)
+            self.memory_bytes += SEGMENT_OVERHEAD + sys.getsizeof(segment.line)
+            if self._over_budget():
+                self._spill_oldest()
+        return segment
+
+    def _over_budget(self):
+        return ((self.memory_budget and self.memory_bytes > self.memory_budget)
+                or (self.max_segments and len(self._segments) > self.max_segments))
+
+    def _spill_oldest(self):
+        # Spill down to 90% of the budget so the file write is amortized across many appends
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(mode='w+', encoding='utf-8', dir=self.spill_dir,
+                                                 prefix='transcript-', suffix='.txt')
+        target_bytes = self.memory_budget * 0.9 if self.memory_budget else None
+        target_segments = int(self.max_segments * 0.9) if self.max_segments else None
+        lines = []
+        while self._segments and ((target_bytes is not None and self.memory_bytes > target_bytes)
+                                  or (target_segments is not None and len(self._segments) > target_segments)):
+            segment = self._segments.popleft()
+            self.memory_bytes -= SEGMENT_OVERHEAD + sys.getsizeof(segment.line)
+            lines.append(segment.line)
+        chunk = "\n".join(lines) + "\n"
+        self._spill.write(chunk)
+        self._spill_bytes += len(chunk)
+        self.spilled += len(lines)
+
+    def texts(self):
+        """Text of the segments still in memory."""
+        with self._lock:
+            return [segment.text for segment in self._segments]
+
+    def since(self, seq):
+        """Entries after ``seq`` that are still in memory."""
+        with self._lock:
+            return [segment.as_entry() for segment in self._segments if segment.seq > seq]
+
+    def last(self):
+        with self._lock:
+            return self._segments[-1] if self._segments else None
+
+    def formatted(self):
+        """The whole transcript, one ``[HH:MM:SS] Speaker N: text`` line per segment."""
+        with self._lock:
+            recent = "\n".join(segment.line for segment in self._segments)
+            if self._spill is None:
+                return recent
+            self._spill.flush()
+            self._spill.seek(0)
+            spilled = self._spill.read()
+            self._spill.seek(0, 2)
+        return spilled + recent if recent else spilled.rstrip("\n")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'segments': self.spilled + len(self._segments),
+                'in_memory': len(self._segments),
+                'spilled': self.spilled,
+                'memory_bytes': self.memory_bytes,
+                'spill_bytes': self._spill_bytes,
+            }
+
+    def close(self):
+        """Delete the spill file."""
+        with self._lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
@@ -0,0 +1,208 @@
+import datetime
+import logging
+import queue
+import threading
+import time
+from config import SEGMENT_FLUSH_ENTRIES, SEGMENT_FLUSH_INTERVAL_MS
+from database import get_connection
+from tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+UPSERT_LIVE_MEETING_SQL = '''
+    INSERT INTO live_meetings (room, started_at, updated_at, last_seq) VALUES (?, ?, ?, ?)
+    ON CONFLICT (room) DO UPDATE SET updated_at = excluded.updated_at,
+                                     last_seq = MAX(last_seq, excluded.last_seq)
+'''
+INSERT_LIVE_SEGMENT_SQL = '''
+    INSERT OR IGNORE INTO live_segments (room, seq, speaker_id, speaker, ts, text) VALUES (?, ?, ?, ?, ?, ?)
+'''
+LIVE_SEGMENTS_SQL = "SELECT seq, speaker_id, speaker, ts, text FROM live_segments WHERE room = ? ORDER BY seq"
+LIVE_MEETINGS_SQL = "SELECT room, started_at, updated_at, last_seq FROM live_meetings ORDER BY updated_at DESC"
+INSERT_MEETING_SQL = "INSERT INTO meetings (timestamp, transcript, summary) VALUES (?, ?, ?)"
+# Segments are numbered 1..n in transcript order, as save_meeting() numbers them
+COPY_SEGMENTS_SQL = '''
+    INSERT INTO segments (meeting_id, seq, speaker_id, ts, text)
+    SELECT ?, ROW_NUMBER() OVER (ORDER BY seq), speaker_id, ts, text FROM live_segments WHERE room = ?
+'''
+DELETE_LIVE_MEETING_SQL = "DELETE FROM live_meetings WHERE room = ?"
+
+_STOP = object()
+
+
+class SegmentWriter:
+    """Write-behind persistence of live transcript segments.
+
+    ``append()`` only pushes a tuple onto a queue, so it is cheap enough for
+    the recognition callback thread. A background thread commits queued
+    segments to the ``live_segments`` table in one transaction per batch,
+    once ``batch_size`` segments are waiting or the oldest has waited
+    ``interval`` seconds. After a restart ``recover()`` returns what a
+    meeting had said so far, and ``finish()`` turns a live meeting into a
+    saved one.
+    """
+
+    def __init__(self, db_path=None, batch_size=SEGMENT_FLUSH_ENTRIES,
+                 interval=SEGMENT_FLUSH_INTERVAL_MS / 1000):
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.metrics = {'segments_written': 0, 'batches_written': 0, 'write_errors': 0}
+        self._queue = queue.SimpleQueue()
+        self._retry = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._thread = None
+
+    def append(self, room, entry):
+        """Queue a transcript entry of ``room`` for writing."""
+        segment = (room, entry['utterance_id'], entry.get('speaker_id'), entry.get('speaker'),
+                   entry.get('timestamp'), entry['text'])
+        span = current_span()
+        if span is not None and span.sampled:
+            # Traced as a child of the span the entry was appended in once it is committed
+            segment += (span,)
+        self._queue.put(segment)
+
+    def start(self):
+        """Start the writer thread (once)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='segment-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, barriers = [], []
+            try:
+                # After a failed write, try again every interval even if nothing new arrives
+                item = self._queue.get(timeout=self.interval if self._retry else None)
+            except queue.Empty:
+                self._write([])
+                continue
+            deadline = time.monotonic() + self.interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                if isinstance(item, threading.Event):
+                    barriers.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for barrier in barriers:
+                barrier.set()
+
+    def _write(self, batch):
+        """Commit ``batch`` (plus anything a failed write left behind) in one transaction."""
+        with self._write_lock:
+            batch, self._retry = self._retry + batch, []
+            if not batch:
+                return True
+            now = str(datetime.datetime.now())
+            last_seq = {}
+            for segment in batch:
+                last_seq[segment[0]] = max(last_seq.get(segment[0], 0), segment[1])
+            start_ns = time.time_ns()
+            try:
+                conn = get_connection(self.db_path)
+                with conn:
+                    conn.executemany(UPSERT_LIVE_MEETING_SQL,
+                                     [(room, now, now, seq) for room, seq in last_seq.items()])
+                    conn.executemany(INSERT_LIVE_SEGMENT_SQL, [segment[:6] for segment in batch])
+            except Exception as e:
+                # Keep the segments for the next batch rather than lose them
+                logger.error(f"Error writing {len(batch)} transcript segments: {str(e)}")
+                self._retry = batch
+                self.metrics['write_errors'] += 1
+                return False
+            end_ns = time.time_ns()
+            for segment in batch:
+                if len(segment) > 6:
+                    segment[6].record('segment.persist', start_ns, end_ns, batch_segments=len(batch))
+            self.metrics['segments_written'] += len(batch)
+            self.metrics['batches_written'] += 1
+            return True
+
+    def flush(self, timeout=None):
+        """Wait until every segment appended so far is committed; returns False on timeout."""
+        if self._thread is not None and self._thread.is_alive():
+            barrier = threading.Event()
+            self._queue.put(barrier)
+            return barrier.wait(timeout) and not self._retry
+        # No writer thread: drain the queue here
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is not _STOP:
+                batch.append(item)
+        return self._write(batch)
+
+    def recover(self, room):
+        """Entries ``room`` had recorded, oldest first, as the transcriber stores them."""
+        self.flush()
+        rows = get_connection(self.db_path).execute(LIVE_SEGMENTS_SQL, (room,)).fetchall()
+        return [
+            {'text': text, 'speaker': speaker, 'timestamp': ts, 'speaker_id': speaker_id,
+             'utterance_id': seq, 'seq': seq}
+            for seq, speaker_id, speaker, ts, text in rows
+        ]
+
+    def unfinished(self):
+        """Live meetings with segments on disk that were never finished."""
+        self.flush()
+        rows = get_connection(self.db_path).execute(LIVE_MEETINGS_SQL).fetchall()
+        return [{'meeting_id': room, 'started_at': started_at, 'updated_at': updated_at, 'last_seq': last_seq}
+                for room, started_at, updated_at, last_seq in rows]
+
+    def finish(self, room, summary):
+        """Save ``room``'s segments as a meeting with ``summary``; returns its ID, or None if it has none."""
+        self.flush()
+        conn = get_connection(self.db_path)
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT started_at FROM live_meetings WHERE room = ?", (room,)).fetchone()
+                if row is None:
+                    return None
+                segments = conn.execute(LIVE_SEGMENTS_SQL, (room,)).fetchall()
+                transcript = "\n".join(f"[{ts}] {speaker}: {text}" for _, _, speaker, ts, text in segments)
+                meeting_id = conn.execute(INSERT_MEETING_SQL, (row[0], transcript, summary)).lastrowid
+                conn.execute(COPY_SEGMENTS_SQL, (meeting_id, room))
+                conn.execute(DELETE_LIVE_MEETING_SQL, (room,))
+            return meeting_id
+        except Exception as e:
+            logger.error(f"Error saving live meeting {room}: {str(e)}")
+            raise
+
+    def discard(self, room):
+        """Forget a live meeting's segments without saving them."""
+        self.flush()
+        conn = get_connection(self.db_path)
+        with conn:
+            conn.execute(DELETE_LIVE_MEETING_SQL, (room,))
+
+    def stats(self):
+        return {'queued': self._queue.qsize(), 'pending_retry': len(self._retry), **self.metrics}
+
+    def close(self, timeout=5):
+        """Commit what is queued and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        self.flush()
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from config import MAX_SESSIONS_PER_WORKER, SESSION_IDLE_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class SessionLimitError(Exception):
+    """Raised when a worker already hosts its maximum number of meetings."""
+
+
+class SessionManager:
+    """Own the live transcription sessions of one worker, keyed by meeting ID.
+
+    ``factory(meeting_id)`` builds a session (normally a ``MeetingTranscriber``).
+    Sessions are kept in least-recently-used order; a session that has had no
+    activity for ``idle_timeout`` seconds is stopped and evicted, and no more
+    than ``max_sessions`` exist at once.
+    """
+
+    def __init__(self, factory, max_sessions=MAX_SESSIONS_PER_WORKER,
+                 idle_timeout=SESSION_IDLE_TIMEOUT_SECONDS):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+        self._reaper = None
+        self._stop = threading.Event()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, meeting_id):
+        return meeting_id in self._sessions
+
+    def get(self, meeting_id):
+        """Return the session for ``meeting_id`` or None."""
+        with self._lock:
+            session = self._sessions.get(meeting_id)
+            if session is not None:
+                self._sessions.move_to_end(meeting_id)
+            return session
+
+    def get_or_create(self, meeting_id):
+        """Return the session for ``meeting_id``, creating it if needed."""
+        with self._lock:
+            session = self.get(meeting_id)
+            if session is not None:
+                return session
+
+            if len(self._sessions) >= self.max_sessions:
+                self.evict_idle()
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitError(
+                    f"This worker is already hosting {self.max_sessions} meetings"
+                )
+
+            session = self.factory(meeting_id)
+            self._sessions[meeting_id] = session
+            logger.info(f"Created session {meeting_id} ({len(self._sessions)} active)")
+            return session
+
+    def remove(self, meeting_id):
+        """Stop and forget a session; returns it (or None if unknown)."""
+        with self._lock:
+            session = self._sessions.pop(meeting_id, None)
+        if session is not None:
+            self._close(meeting_id, session)
+        return session
+
+    def evict_idle(self, now=None):
+        """Stop and drop every session idle for longer than ``idle_timeout``."""
+        now = now or time.time()
+        with self._lock:
+            expired = [
+                meeting_id for meeting_id, session in self._sessions.items()
+                if now - getattr(session, 'last_activity', now) > self.idle_timeout
+            ]
+            evicted = [(meeting_id, self._sessions.pop(meeting_id)) for meeting_id in expired]
+
+        for meeting_id, session in evicted:
+            logger.info(f"Evicting idle session {meeting_id}")
+            self._close(meeting_id, session)
+        return [meeting_id for meeting_id, _ in evicted]
+
+    def _close(self, meeting_id, session):
+        try:
+            if getattr(session, 'is_recording', False):
+                session.stop_recording()
+            if hasattr(session, 'close'):
+                session.close()
+        except Exception as e:
+            logger.error(f"Error stopping session {meeting_id}: {str(e)}")
+
+    def start_reaper(self, interval=60):
+        """Evict idle sessions from a daemon thread every ``interval`` seconds."""
+        if self._reaper and self._reaper.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.evict_idle()
+                except Exception as e:
+                    logger.error(f"Error evicting idle sessions: {str(e)}")
+
+        self._reaper = threading.Thread(target=run, name='session-reaper', daemon=True)
+        self._reaper.start()
+
+    def stop_reaper(self):
+        self._stop.set()
+        if self._reaper:
+            self._reaper.join(timeout=5)
+
+    def stats(self):
+        """Summary of the sessions hosted by this worker."""
+        with self._lock:
+            sessions = list(self._sessions.items())
+        return {
+            'active': len(sessions),
+            'max_sessions': self.max_sessions,
+            'sessions': {
+                meeting_id: {
+                    'recording': getattr(session, 'is_recording', False),
+                    'entries': len(getattr(session, 'segments', ())),
+                    'idle_seconds': round(time.time() - getattr(session, 'last_activity', time.time()), 1),
+                }
+                for meeting_id, session in sessions
+            },
+        }
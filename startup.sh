@@ -36,6 +36,34 @@ python -m pip install --upgrade pip
 pip install setuptools wheel
 pip install -r requirements.txt
 
-# Start the application
+# Start the application. Each process runs one gevent worker (Socket.IO
+# needs one worker per process), which serves up to WORKER_CONNECTIONS
+# concurrent connections. With SOCKETIO_MESSAGE_QUEUE set, WORKER_COUNT
+# processes (4 by default) run on consecutive ports behind a proxy that
+# hashes the "affinity" query argument (see ARCHITECTURE.md), all relaying
+# room events through the same Redis.
 echo "Starting application..."
-gunicorn --bind=0.0.0.0:8000 --timeout 600 --workers 4 --log-level info --chdir /home/site/wwwroot/meeting-assistant-azure wsgi:app 
\ No newline at end of file
+if [ -n "$SOCKETIO_MESSAGE_QUEUE" ]; then
+    WORKER_COUNT=${WORKER_COUNT:-4}
+else
+    WORKER_COUNT=${WORKER_COUNT:-1}
+fi
+WORKER_CONNECTIONS=${WORKER_CONNECTIONS:-1000}
+BASE_PORT=${BASE_PORT:-8000}
+export SOCKETIO_ASYNC_MODE=${SOCKETIO_ASYNC_MODE:-gevent}
+if [ "$WORKER_COUNT" -gt 1 ] && [ -z "$SOCKETIO_MESSAGE_QUEUE" ]; then
+    echo "SOCKETIO_MESSAGE_QUEUE must be set when WORKER_COUNT > 1"
+    exit 1
+fi
+# Every worker's /metrics reports the whole host from the snapshots in METRICS_DIR
+if [ "$WORKER_COUNT" -gt 1 ]; then
+    export METRICS_DIR=${METRICS_DIR:-/tmp/meeting-assistant-metrics}
+    rm -rf "$METRICS_DIR"
+fi
+for ((i = 0; i < WORKER_COUNT; i++)); do
+    WORKER_ID=$i WORKER_COUNT=$WORKER_COUNT gunicorn --bind=0.0.0.0:$((BASE_PORT + i)) --timeout 600 \
+        --workers 1 --worker-class geventwebsocket.gunicorn.workers.GeventWebSocketWorker \
+        --worker-connections "$WORKER_CONNECTIONS" --log-level info \
+        --chdir /home/site/wwwroot/meeting-assistant-azure wsgi:app &
+done
+wait
@@ -1,5 +1,22 @@
+// Meeting to follow when opened as a listener (/?meeting=<id>)
+const joinMeetingId = new URLSearchParams(window.location.search).get('meeting');
+
+// Affinity key: the load balancer hashes it to pick a worker, so every
+// request of this connection (and every listener of a meeting started here)
+// lands on the worker that hosts the meeting. Meeting IDs start with it.
+function affinityKey() {
+    if (joinMeetingId) return joinMeetingId.split('.')[0];
+    let key = sessionStorage.getItem('affinityKey');
+    if (!key) {
+        key = Math.random().toString(36).slice(2, 10);
+        sessionStorage.setItem('affinityKey', key);
+    }
+    return key;
+}
+const clientKey = affinityKey();
+
 // Socket.IO connection
-const socket = io();
+const socket = io({ query: { affinity: clientKey } });
 
 // DOM Elements
 const startButton = document.getElementById('start-meeting');
@@ -10,6 +27,20 @@ const summaryContainer = document.getElementById('summary-container');
 
 // State
 let isRecording = false;
+let meetingId = joinMeetingId;
+let lastSeq = 0;
+let lastFinalUtterance = 0;
+let resyncPending = false;
+let summaryJobId = null;
+let summaryStreamId = null;
+
+// Browser audio streaming (when the server recognizes pushed audio)
+const AUDIO_SAMPLE_RATE = 16000;
+let audioContext = null;
+let audioStream = null;
+let audioProcessor = null;
+let audioSeq = 0;
+let audioPaused = false;
 
 // Event Listeners
 startButton.addEventListener('click', startMeeting);
@@ -19,6 +50,15 @@ endButton.addEventListener('click', endMeeting);
 socket.on('connect', () => {
     console.log('Connected to server');
     updateStatus('Connected to server', 'info');
+    const activeMeetingId = joinMeetingId ? null : sessionStorage.getItem('activeMeetingId');
+    if (activeMeetingId) {
+        // This tab was recording (before a reconnect, reload or server restart): resume the meeting
+        meetingId = activeMeetingId;
+        socket.emit('start_meeting', { meeting_id: meetingId });
+    } else if (meetingId) {
+        // Listeners join on connect; a reconnect gets a new session, so rejoin the room and catch up
+        socket.emit('join_meeting', { meeting_id: meetingId });
+    }
 });
 
 socket.on('disconnect', () => {
@@ -26,75 +66,248 @@ socket.on('disconnect', () => {
     updateStatus('Disconnected from server', 'error');
 });
 
-socket.on('transcript_update', (data) => {
-    console.log('Received transcript update:', data);
-    addTranscriptEntry(data);
+socket.on('transcript_batch', (data) => {
+    if (data.meeting_id !== meetingId) return;
+    if (data.from_seq > lastSeq + 1) {
+        // Missed a batch (e.g. during a reconnect): fetch everything after lastSeq
+        requestResync();
+        return;
+    }
+    if (!resyncPending) {
+        addTranscriptEntries(data.entries);
+    }
+});
+
+socket.on('transcript_interim', (data) => {
+    if (data.meeting_id !== meetingId || data.utterance_id <= lastFinalUtterance) return;
+    // Show (or update) the pending line for the utterance still being spoken
+    let entry = transcriptContainer.querySelector(`.transcript-entry.pending[data-utterance="${data.utterance_id}"]`);
+    if (!entry) {
+        entry = createTranscriptEntry(data);
+        entry.classList.add('pending');
+        entry.dataset.utterance = data.utterance_id;
+        transcriptContainer.appendChild(entry);
+    }
+    entry.querySelector('.text').textContent = data.text;
+    transcriptContainer.scrollTop = transcriptContainer.scrollHeight;
+});
+
+socket.on('transcript_resync', (data) => {
+    if (data.meeting_id !== meetingId) return;
+    resyncPending = false;
+    addTranscriptEntries(data.entries);
+});
+
+socket.on('meeting_joined', (data) => {
+    meetingId = data.meeting_id;
+    requestResync();
+});
+
+socket.on('meeting_started', (data) => {
+    isRecording = true;
+    meetingId = data.meeting_id;
+    sessionStorage.setItem('activeMeetingId', meetingId);
+    updateStatus('Recording in progress...', 'recording');
+    startButton.disabled = true;
+    endButton.disabled = false;
+    if (data.resumed) {
+        // Fetch whatever was recorded while this client was away
+        requestResync();
+    } else {
+        lastSeq = 0;
+        lastFinalUtterance = 0;
+    }
+    if (data.audio_input === 'push' && !audioContext) {
+        startAudioCapture();
+    }
+});
+
+socket.on('audio_backpressure', (data) => {
+    // The server's buffer is filling up; frames are skipped until it drains
+    audioPaused = data.paused;
+});
+
+socket.on('meeting_stopped', (data) => {
+    isRecording = false;
+    sessionStorage.removeItem('activeMeetingId');
+    stopAudioCapture();
+    updateStatus('Meeting ended', 'info');
+    startButton.disabled = false;
+    endButton.disabled = true;
+    if (data.job_id) {
+        // The summary is produced by a background job; catch up on any
+        // progress sent before this event, then follow job_progress
+        summaryJobId = data.job_id;
+        updateStatus('Meeting ended, summarizing...', 'info');
+        fetchJob(data.job_id);
+    } else {
+        fetchSummary(data.meeting_id);
+    }
+});
+
+socket.on('summary_chunk', (data) => {
+    // A new stream (e.g. a retried summary) replaces what was shown so far
+    if (data.stream_id !== summaryStreamId) {
+        summaryStreamId = data.stream_id;
+        displaySummary('');
+    }
+    summaryContent().textContent += data.text;
+});
+
+socket.on('summary_done', (data) => {
+    summaryStreamId = data.stream_id;
+    displaySummary(data.summary);
+});
+
+socket.on('job_progress', (job) => {
+    if (job.job_id === summaryJobId) {
+        showJobProgress(job);
+    }
+});
+
+socket.on('error', (data) => {
+    console.error('Server error:', data.message);
+    updateStatus(`Error: ${data.message}`, 'error');
 });
 
 // Functions
 function startMeeting() {
     if (isRecording) return;
-    
-    fetch('/start_meeting', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json'
-        }
-    })
+
+    meetingId = `${clientKey}.${Date.now()}-${Math.random().toString(36).slice(2, 8)}`;
+    socket.emit('start_meeting', { meeting_id: meetingId });
+}
+
+function endMeeting() {
+    if (!isRecording) return;
+
+    stopAudioCapture();
+    socket.emit('stop_meeting', { meeting_id: meetingId });
+}
+
+async function startAudioCapture() {
+    try {
+        audioStream = await navigator.mediaDevices.getUserMedia({ audio: { channelCount: 1 } });
+        audioContext = new AudioContext({ sampleRate: AUDIO_SAMPLE_RATE });
+        const source = audioContext.createMediaStreamSource(audioStream);
+        audioProcessor = audioContext.createScriptProcessor(4096, 1, 1);
+        audioSeq = 0;
+        audioPaused = false;
+
+        audioProcessor.onaudioprocess = (event) => {
+            const seq = audioSeq++;
+            if (audioPaused) return;  // the gap in seq tells the server a frame was skipped
+            const samples = event.inputBuffer.getChannelData(0);
+            const pcm = new Int16Array(samples.length);
+            for (let i = 0; i < samples.length; i++) {
+                const s = Math.max(-1, Math.min(1, samples[i]));
+                pcm[i] = s < 0 ? s * 0x8000 : s * 0x7fff;
+            }
+            socket.emit('audio_data', { meeting_id: meetingId, seq: seq, audio: pcm.buffer });
+        };
+        source.connect(audioProcessor);
+        audioProcessor.connect(audioContext.destination);
+    } catch (error) {
+        console.error('Error capturing audio:', error);
+        updateStatus('Microphone access is required to stream audio', 'error');
+    }
+}
+
+function stopAudioCapture() {
+    if (audioProcessor) {
+        audioProcessor.disconnect();
+        audioProcessor = null;
+    }
+    if (audioStream) {
+        audioStream.getTracks().forEach(track => track.stop());
+        audioStream = null;
+    }
+    if (audioContext) {
+        audioContext.close();
+        audioContext = null;
+    }
+}
+
+function fetchSummary(id) {
+    fetch(`/api/summary?meeting_id=${encodeURIComponent(id)}`)
     .then(response => response.json())
     .then(data => {
         if (data.status === 'success') {
-            isRecording = true;
-            updateStatus('Recording in progress...', 'recording');
-            startButton.disabled = true;
-            endButton.disabled = false;
+            if (data.summary) {
+                displaySummary(data.summary);
+            }
         } else {
             updateStatus(`Error: ${data.message}`, 'error');
         }
     })
     .catch(error => {
-        console.error('Error starting meeting:', error);
-        updateStatus('Error starting meeting', 'error');
+        console.error('Error fetching summary:', error);
+        updateStatus('Error fetching summary', 'error');
     });
 }
 
-function endMeeting() {
-    if (!isRecording) return;
-    
-    fetch('/end_meeting', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json'
-        }
-    })
+function fetchJob(id) {
+    fetch(`/jobs/${encodeURIComponent(id)}`)
     .then(response => response.json())
     .then(data => {
         if (data.status === 'success') {
-            isRecording = false;
-            updateStatus('Meeting ended', 'info');
-            startButton.disabled = false;
-            endButton.disabled = true;
-            
-            if (data.summary) {
-                displaySummary(data.summary);
-            }
-        } else {
-            updateStatus(`Error: ${data.message}`, 'error');
+            showJobProgress(data.job);
         }
     })
-    .catch(error => {
-        console.error('Error ending meeting:', error);
-        updateStatus('Error ending meeting', 'error');
+    .catch(error => console.error('Error fetching job:', error));
+}
+
+function showJobProgress(job) {
+    if (job.job_id !== summaryJobId) return;
+    if (job.status === 'completed' || job.status === 'failed') {
+        summaryJobId = null;
+    }
+    const summarize = job.results.summarize;
+    if (job.status === 'failed') {
+        updateStatus(`Error: ${job.error}`, 'error');
+    } else if (job.status === 'completed') {
+        updateStatus('Meeting summary ready', 'info');
+    }
+    if (summarize && summarize.summary) {
+        displaySummary(summarize.summary);
+    }
+}
+
+function requestResync() {
+    if (resyncPending) return;
+    resyncPending = true;
+    socket.emit('transcript_resync', { meeting_id: meetingId, since: lastSeq });
+}
+
+function addTranscriptEntries(entries) {
+    entries.forEach((entry) => {
+        // Skip entries already shown (batches can overlap a resync)
+        if (entry.seq <= lastSeq) return;
+        lastSeq = entry.seq;
+        lastFinalUtterance = Math.max(lastFinalUtterance, entry.utterance_id || 0);
+        addTranscriptEntry(entry);
     });
 }
 
 function addTranscriptEntry(data) {
+    // Finalize the utterance's pending line in place if there is one
+    const pending = transcriptContainer.querySelector(`.transcript-entry.pending[data-utterance="${data.utterance_id}"]`);
+    const entry = createTranscriptEntry(data);
+    if (pending) {
+        pending.replaceWith(entry);
+    } else {
+        transcriptContainer.appendChild(entry);
+    }
+    transcriptContainer.scrollTop = transcriptContainer.scrollHeight;
+}
+
+function createTranscriptEntry(data) {
     const entry = document.createElement('div');
     entry.className = 'transcript-entry';
     
     const timestamp = document.createElement('span');
     timestamp.className = 'timestamp';
-    timestamp.textContent = `[${data.timestamp}] `;
+    timestamp.textContent = data.timestamp ? `[${data.timestamp}] ` : '';
     
     const speaker = document.createElement('span');
     speaker.className = 'speaker';
@@ -107,9 +320,7 @@ function addTranscriptEntry(data) {
     entry.appendChild(timestamp);
     entry.appendChild(speaker);
     entry.appendChild(text);
-    
-    transcriptContainer.appendChild(entry);
-    transcriptContainer.scrollTop = transcriptContainer.scrollHeight;
+    return entry;
 }
 
 function updateStatus(message, type) {
@@ -117,11 +328,24 @@ function updateStatus(message, type) {
     statusIndicator.className = `status ${type}`;
 }
 
+function summaryContent() {
+    // Built once; the summary text only ever goes in through textContent
+    let content = summaryContainer.querySelector('.summary-content');
+    if (!content) {
+        const heading = document.createElement('h3');
+        heading.textContent = 'Meeting Summary';
+
+        content = document.createElement('div');
+        content.className = 'summary-content';
+
+        summaryContainer.appendChild(heading);
+        summaryContainer.appendChild(content);
+    }
+    return content;
+}
+
 function displaySummary(summary) {
-    summaryContainer.innerHTML = `
-        <h3>Meeting Summary</h3>
-        <div class="summary-content">${summary}</div>
-    `;
+    summaryContent().textContent = summary;
     summaryContainer.style.display = 'block';
 }
 
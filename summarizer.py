@@ -0,0 +1,311 @@
+import logging
+import math
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import (
+    ROLLING_SUMMARY_WINDOW,
+    ROLLING_SUMMARY_FAN_IN,
+    SUMMARY_CHUNK_TOKENS,
+    SUMMARY_MAX_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = """You are a helpful assistant that summarizes meeting transcripts.
+                    Your response should be structured in three parts:
+                    1. A concise summary of the main points discussed
+                    2. A list of action items, organized by speaker
+                    3. A general list of action items that aren't speaker-specific
+
+                    For speaker-specific action items, use the format:
+                    [Speaker Name]'s Action Items:
+                    - Item 1
+                    - Item 2
+
+                    For general action items, use the format:
+                    General Action Items:
+                    - Item 1
+                    - Item 2"""
+
+SUMMARY_INSTRUCTIONS = """Please structure your response as follows:
+1. First, provide a concise summary of the main points discussed
+2. Then, list all action items organized by speaker (if any speaker-specific items are identified)
+3. Finally, list any general action items that aren't specific to a particular speaker
+4. Format all action items as bulleted lists"""
+
+NOTES_SYSTEM_PROMPT = """You condense part of a meeting transcript into notes for a later summary.
+Keep every decision, open question and action item, and who it belongs to.
+Write terse bullet points; do not add anything that was not said."""
+
+# Bump whenever a prompt changes so cached responses to the old one are not reused
+PROMPT_VERSION = 1
+
+SUMMARY_MAX_TOKENS = 1000
+NOTES_MAX_TOKENS = 400
+CHARS_PER_TOKEN = 4  # rough average for English when tiktoken is not installed
+
+SPEAKER_PATTERN = re.compile(r'^\[[^\]]*\] ([^:]+):')
+
+_encoding = None
+
+
+def format_entry(entry):
+    """Format a transcript entry as ``[HH:MM:SS] Speaker N: text``."""
+    return f"[{entry['timestamp']}] {entry['speaker']}: {entry['text']}"
+
+
+def count_tokens(text):
+    """Number of tokens in ``text``; exact with tiktoken, estimated otherwise."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def speaker_turns(lines):
+    """Group consecutive transcript lines by the same speaker into turns."""
+    turns = []
+    current_speaker = None
+    for line in lines:
+        match = SPEAKER_PATTERN.match(line)
+        speaker = match.group(1) if match else current_speaker
+        if turns and speaker == current_speaker:
+            turns[-1].append(line)
+        else:
+            turns.append([line])
+        current_speaker = speaker
+    return turns
+
+
+def _split_words(line, max_tokens):
+    # Last resort for a single line that does not fit in a chunk
+    pieces, current = [], []
+    for word in line.split(' '):
+        if current and count_tokens(' '.join(current + [word])) > max_tokens:
+            pieces.append(' '.join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(' '.join(current))
+    return pieces
+
+
+def chunk_transcript(transcript, max_tokens=SUMMARY_CHUNK_TOKENS):
+    """Split a transcript into chunks of at most ``max_tokens`` tokens.
+
+    Chunks break between speaker turns; a turn too long for one chunk is split
+    between its lines, and a single oversized line between words.
+    """
+    lines = transcript.splitlines() if isinstance(transcript, str) else list(transcript)
+    chunks, current, current_tokens = [], [], 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n".join(current))
+        current, current_tokens = [], 0
+
+    for turn in speaker_turns(lines):
+        turn_tokens = count_tokens("\n".join(turn))
+        if current and current_tokens + turn_tokens > max_tokens:
+            flush()
+        if turn_tokens <= max_tokens:
+            current.extend(turn)
+            current_tokens += turn_tokens
+            continue
+        for line in turn:
+            line_tokens = count_tokens(line)
+            if current and current_tokens + line_tokens > max_tokens:
+                flush()
+            if line_tokens <= max_tokens:
+                current.append(line)
+                current_tokens += line_tokens
+            else:
+                flush()
+                chunks.extend(_split_words(line, max_tokens))
+    flush()
+    return chunks
+
+
+def summary_messages(transcript):
+    """Messages asking for the final summary of a full transcript."""
+    return [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": f"""Please provide a summary and action items for this meeting transcript:
+
+{transcript}
+
+{SUMMARY_INSTRUCTIONS}"""}
+    ]
+
+
+def notes_messages(text):
+    """Messages asking to condense a transcript window (or earlier notes)."""
+    return [
+        {"role": "system", "content": NOTES_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Condense this part of the meeting:\n\n{text}"}
+    ]
+
+
+def merge_messages(notes, tail=""):
+    """Messages asking for the final summary from partial notes plus the latest transcript."""
+    sections = "\n\n".join(f"Part {i + 1} notes:\n{part}" for i, part in enumerate(notes))
+    if tail:
+        sections += f"\n\nMost recent transcript:\n{tail}"
+    return [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": f"""Please provide a summary and action items for this meeting. Earlier parts of the meeting are given as notes, in order:
+
+{sections}
+
+{SUMMARY_INSTRUCTIONS}"""}
+    ]
+
+
+def complete_summary(backend, messages, max_tokens=SUMMARY_MAX_TOKENS, on_token=None):
+    """Request the final summary; with ``on_token``, stream it and pass on each piece as it arrives."""
+    if on_token is None or not hasattr(backend, 'stream'):
+        summary = backend.complete(messages, temperature=0.7, max_tokens=max_tokens)
+        if on_token is not None:
+            on_token(summary)
+        return summary
+    pieces = []
+    for piece in backend.stream(messages, temperature=0.7, max_tokens=max_tokens):
+        pieces.append(piece)
+        on_token(piece)
+    return ''.join(pieces)
+
+
+class RollingSummarizer:
+    """Condense a live transcript in the background, window by window.
+
+    Every ``window_size`` entries the window is condensed into notes on a
+    per-meeting worker thread. Once ``fan_in`` notes pile up at one level they
+    are condensed again into a single note one level up, so the material left
+    for ``finalize()`` stays small however long the meeting runs.
+    """
+
+    def __init__(self, backend, window_size=ROLLING_SUMMARY_WINDOW, fan_in=ROLLING_SUMMARY_FAN_IN):
+        self.backend = backend
+        self.window_size = window_size
+        self.fan_in = fan_in
+        self._pending = []  # formatted lines not yet condensed
+        self._levels = []  # _levels[0] holds window notes, higher levels notes of notes
+        self._futures = []
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def add_entry(self, entry):
+        """Record a transcript entry; returns quickly, condensing happens in the background."""
+        with self._lock:
+            self._pending.append(format_entry(entry))
+            if len(self._pending) < self.window_size:
+                return
+            window, self._pending = self._pending, []
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rolling-summary')
+            self._futures = [f for f in self._futures if not f.done()]
+            self._futures.append(self._executor.submit(self._condense_window, window))
+
+    def _condense_window(self, window):
+        self._add_notes(0, self._condense("\n".join(window)))
+
+    def _condense(self, text):
+        try:
+            return self.backend.complete(notes_messages(text), temperature=0.3, max_tokens=NOTES_MAX_TOKENS)
+        except Exception as e:
+            # Keep the raw material so the final summary still covers it
+            logger.error(f"Error condensing transcript window: {str(e)}")
+            return text
+
+    def _add_notes(self, level, notes):
+        # Only ever called from the single worker thread
+        while len(self._levels) <= level:
+            self._levels.append([])
+        self._levels[level].append(notes)
+        if len(self._levels[level]) >= self.fan_in:
+            group, self._levels[level] = self._levels[level], []
+            self._add_notes(level + 1, self._condense("\n\n".join(group)))
+
+    def has_notes(self):
+        """True once at least one window has been handed off for condensing."""
+        return bool(self._futures) or any(self._levels)
+
+    def notes(self):
+        """Wait for outstanding windows and return all notes, oldest first."""
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures)
+        # Higher levels cover older parts of the meeting
+        return [part for level in reversed(self._levels) for part in level]
+
+    def finalize(self, max_tokens=SUMMARY_MAX_TOKENS, on_token=None):
+        """Merge the partial notes and the not-yet-condensed tail into the final summary."""
+        notes = self.notes()
+        with self._lock:
+            tail = "\n".join(self._pending)
+        if not notes:
+            return complete_summary(self.backend, summary_messages(tail), max_tokens, on_token)
+        return complete_summary(self.backend, merge_messages(notes, tail), max_tokens, on_token)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+def _pack(texts, max_tokens):
+    # Greedily group whole texts so each group stays under max_tokens
+    groups, current, current_tokens = [], [], 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if current and current_tokens + tokens > max_tokens:
+            groups.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append("\n\n".join(current))
+    return groups
+
+
+def _condense_all(backend, texts, executor):
+    """Condense ``texts`` concurrently, keeping order; failed parts stay raw."""
+    def condense(text):
+        try:
+            return backend.complete(notes_messages(text), temperature=0.3, max_tokens=NOTES_MAX_TOKENS)
+        except Exception as e:
+            logger.error(f"Error condensing transcript chunk: {str(e)}")
+            return text
+    return list(executor.map(condense, texts))
+
+
+def summarize_transcript(backend, transcript, chunk_tokens=SUMMARY_CHUNK_TOKENS,
+                         max_workers=SUMMARY_MAX_WORKERS, max_tokens=SUMMARY_MAX_TOKENS, on_token=None):
+    """Summarize a transcript of any length with map-reduce.
+
+    A transcript that fits in ``chunk_tokens`` is summarized in one request.
+    Longer ones are split on speaker turns, the chunks are condensed into notes
+    by at most ``max_workers`` concurrent requests, and the notes are reduced
+    (again in parallel, if they are still too long) into the final summary.
+    Only that last request is streamed to ``on_token``.
+    """
+    if count_tokens(transcript) <= chunk_tokens:
+        return complete_summary(backend, summary_messages(transcript), max_tokens, on_token)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary-map') as executor:
+        notes = _condense_all(backend, chunk_transcript(transcript, chunk_tokens), executor)
+        while len(notes) > 1 and count_tokens("\n\n".join(notes)) > chunk_tokens:
+            groups = _pack(notes, chunk_tokens)
+            if len(groups) >= len(notes):
+                break  # notes are not getting any shorter
+            notes = _condense_all(backend, groups, executor)
+
+    logger.info(f"Reducing {len(notes)} partial summaries")
+    return complete_summary(backend, merge_messages(notes), max_tokens, on_token)
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from config import SUMMARY_CACHE_MAX_ENTRIES, SUMMARY_CACHE_PATH, SUMMARY_CACHE_MAX_BYTES
+from database import get_connection
+from summarizer import PROMPT_VERSION
+
+logger = logging.getLogger(__name__)
+
+CACHE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        response TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        last_used REAL NOT NULL
+    )
+'''
+CACHE_INDEX = "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)"
+SELECT_CACHE_SQL = "SELECT response FROM llm_cache WHERE key = ?"
+TOUCH_CACHE_SQL = "UPDATE llm_cache SET last_used = ? WHERE key = ?"
+UPSERT_CACHE_SQL = '''
+    INSERT INTO llm_cache (key, response, size, last_used) VALUES (?, ?, ?, ?)
+    ON CONFLICT (key) DO UPDATE SET response = excluded.response, size = excluded.size,
+                                    last_used = excluded.last_used
+'''
+CACHE_SIZE_SQL = "SELECT COALESCE(SUM(size), 0) FROM llm_cache"
+# Drop the least recently used rows needed to free at least ? bytes
+EVICT_CACHE_SQL = '''
+    DELETE FROM llm_cache WHERE key IN (
+        SELECT key FROM (
+            SELECT key, SUM(size) OVER (ORDER BY last_used, key) - size AS freed_before
+            FROM llm_cache
+        ) WHERE freed_before < ?
+    )
+'''
+
+
+def normalize_text(text):
+    """Collapse whitespace so cosmetic differences share a cache entry."""
+    return " ".join(text.split())
+
+
+def cache_key(messages, deployment, temperature, max_tokens, prompt_version=PROMPT_VERSION):
+    """SHA-256 over everything that determines the completion."""
+    payload = json.dumps({
+        'messages': [[m['role'], normalize_text(m['content'])] for m in messages],
+        'deployment': deployment,
+        'temperature': temperature,
+        'max_tokens': max_tokens,
+        'prompt_version': prompt_version,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SummaryCache:
+    """Two-tier cache of LLM responses: an in-memory LRU over a SQLite table.
+
+    The memory tier holds at most ``max_entries`` responses. The disk tier at
+    ``db_path`` (disabled when empty) survives restarts and is shared by every
+    worker; once it grows past ``max_bytes`` of response text the least
+    recently used rows are deleted.
+    """
+
+    def __init__(self, max_entries=SUMMARY_CACHE_MAX_ENTRIES, db_path=SUMMARY_CACHE_PATH,
+                 max_bytes=SUMMARY_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._disk_bytes = 0
+        if self.db_path:
+            conn = get_connection(self.db_path)
+            with conn:
+                conn.execute(CACHE_SCHEMA)
+                conn.execute(CACHE_INDEX)
+            self._disk_bytes = conn.execute(CACHE_SIZE_SQL).fetchone()[0]
+
+    def _count(self, metric):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def _remember(self, key, response):
+        with self._lock:
+            self._memory[key] = response
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached response for ``key`` or None."""
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                self.metrics['memory_hits'] += 1
+                return response
+
+        if self.db_path:
+            try:
+                conn = get_connection(self.db_path)
+                row = conn.execute(SELECT_CACHE_SQL, (key,)).fetchone()
+                if row is not None:
+                    with conn:
+                        conn.execute(TOUCH_CACHE_SQL, (time.time(), key))
+                    self._remember(key, row[0])
+                    self._count('disk_hits')
+                    return row[0]
+            except Exception as e:
+                logger.error(f"Error reading summary cache: {str(e)}")
+
+        self._count('misses')
+        return None
+
+    def put(self, key, response):
+        """Store ``response`` in both tiers, evicting from disk if it is full."""
+        self._remember(key, response)
+        self._count('stores')
+        if not self.db_path:
+            return
+        try:
+            size = len(response.encode('utf-8'))
+            conn = get_connection(self.db_path)
+            with conn:
+                conn.execute(UPSERT_CACHE_SQL, (key, response, size, time.time()))
+            with self._lock:
+                self._disk_bytes += size
+                full = self._disk_bytes > self.max_bytes
+            if full:
+                self._evict(conn)
+        except Exception as e:
+            logger.error(f"Error writing summary cache: {str(e)}")
+
+    def _evict(self, conn):
+        with conn:
+            # Recount: overwrites and other workers make the running total drift
+            over = conn.execute(CACHE_SIZE_SQL).fetchone()[0] - self.max_bytes
+            evicted = conn.execute(EVICT_CACHE_SQL, (over,)).rowcount if over > 0 else 0
+            total = conn.execute(CACHE_SIZE_SQL).fetchone()[0]
+        with self._lock:
+            self._disk_bytes = total
+            self.metrics['evictions'] += evicted
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._disk_bytes = 0
+        if self.db_path:
+            conn = get_connection(self.db_path)
+            with conn:
+                conn.execute("DELETE FROM llm_cache")
+
+    def stats(self):
+        """Hit/miss counters and tier sizes."""
+        with self._lock:
+            metrics = dict(self.metrics)
+            entries = len(self._memory)
+            disk_bytes = self._disk_bytes
+        lookups = metrics['memory_hits'] + metrics['disk_hits'] + metrics['misses']
+        return {
+            **metrics,
+            'hit_rate': round((lookups - metrics['misses']) / lookups, 3) if lookups else 0.0,
+            'memory_entries': entries,
+            'max_entries': self.max_entries,
+            'disk_bytes': disk_bytes,
+            'max_bytes': self.max_bytes if self.db_path else 0,
+        }
+
+
+class CachedChatBackend:
+    """Chat backend that answers repeated requests from a ``SummaryCache``."""
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+        self.deployment = getattr(backend, 'deployment', None)
+
+    def complete(self, messages, temperature=0.7, max_tokens=1000):
+        key = cache_key(messages, self.deployment, temperature, max_tokens)
+        response = self.cache.get(key)
+        if response is None:
+            response = self.backend.complete(messages, temperature=temperature, max_tokens=max_tokens)
+            self.cache.put(key, response)
+        return response
+
+    def stream(self, messages, temperature=0.7, max_tokens=1000):
+        """Yield a cached response whole, or stream a new one and cache it once it is complete."""
+        key = cache_key(messages, self.deployment, temperature, max_tokens)
+        response = self.cache.get(key)
+        if response is not None:
+            yield response
+            return
+        pieces = []
+        for piece in self.backend.stream(messages, temperature=temperature, max_tokens=max_tokens):
+            pieces.append(piece)
+            yield piece
+        self.cache.put(key, ''.join(pieces))
@@ -2,11 +2,21 @@ import os
 import unittest
 import tempfile
 import shutil
+
+# The app opens its database and summary cache when it is imported: keep them out of the working directory
+STATE_DIR = tempfile.mkdtemp()
+os.environ['DATABASE_PATH'] = os.path.join(STATE_DIR, 'meetings.db')
+os.environ['SUMMARY_CACHE_PATH'] = os.path.join(STATE_DIR, 'summary_cache.db')
+
 from flask import Flask
 from app import app, socketio
-from database import init_db, save_meeting
+from database import init_db, save_meeting, close_connections, MAX_PAGE_SIZE
 from unittest.mock import patch, MagicMock
 
+def tearDownModule():
+    close_connections()
+    shutil.rmtree(STATE_DIR, ignore_errors=True)
+
 class TestApp(unittest.TestCase):
     def setUp(self):
         # Create a temporary directory for the test database
@@ -44,7 +54,105 @@ class TestApp(unittest.TestCase):
         response = self.app.get('/meetings')
         self.assertEqual(response.status_code, 200)
         data = response.get_json()
-        self.assertEqual(len(data), 2)
+        self.assertEqual(len(data['meetings']), 2)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_list_meetings_pagination(self):
+        """Test cursor pagination and field projection on the list route."""
+        for i in range(5):
+            save_meeting(f"Test transcript {i}", f"Test summary {i}", self.test_db_path)
+
+        response = self.app.get('/meetings?limit=2')
+        data = response.get_json()
+        self.assertEqual([m['summary_snippet'] for m in data['meetings']], ['Test summary 4', 'Test summary 3'])
+        self.assertNotIn('transcript', data['meetings'][0])
+
+        seen = [m['id'] for m in data['meetings']]
+        while data['next_cursor']:
+            data = self.app.get(f"/meetings?limit=2&cursor={data['next_cursor']}").get_json()
+            seen.extend(m['id'] for m in data['meetings'])
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+        response = self.app.get('/meetings?fields=id,transcript')
+        self.assertEqual(set(response.get_json()['meetings'][0]), {'id', 'transcript'})
+
+        self.assertEqual(self.app.get('/meetings?fields=bogus').status_code, 400)
+        self.assertEqual(self.app.get('/meetings?cursor=bogus').status_code, 400)
+
+    def test_meeting_detail_route(self):
+        """Test the meeting detail route."""
+        meeting_id = save_meeting("Full transcript", "Full summary", self.test_db_path)
+
+        response = self.app.get(f'/meetings/{meeting_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['transcript'], "Full transcript")
+
+        response = self.app.get('/meetings/999999')
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_meetings_route(self):
+        """Test the streaming export route."""
+        save_meeting("Test transcript 1", "Test summary 1", self.test_db_path)
+        save_meeting("Test transcript 2", "Test summary 2", self.test_db_path)
+
+        response = self.app.get('/meetings/export?format=ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 2)
+
+        response = self.app.get('/meetings/export?format=xml')
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_meetings_route(self):
+        """Test the search route."""
+        save_meeting("Talked about the launch date", "Launch", self.test_db_path)
+
+        response = self.app.get('/meetings/search?q=launch')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['results']), 1)
+        self.assertFalse(response.get_json()['truncated'])
+
+        response = self.app.get('/meetings/search?q=')
+        self.assertEqual(response.status_code, 400)
+
+    def test_meetings_by_participant_route(self):
+        """Test looking meetings up by participant address."""
+        from database import update_meeting_participants
+        meeting_id = save_meeting("[10:00:01] Speaker 1: Hi", "Summary", self.test_db_path)
+        update_meeting_participants(["alice@example.com"], self.test_db_path)
+
+        response = self.app.get('/meetings/by-participant?email=alice@')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['id'] for m in response.get_json()['meetings']], [meeting_id])
+
+        response = self.app.get('/meetings/by-participant?email=')
+        self.assertEqual(response.status_code, 400)
+
+    def test_speaker_segments_route(self):
+        """Test the per-speaker segments route."""
+        save_meeting("[10:00:01] Speaker 1: Hi\n[10:00:04] Speaker 2: Hello", "Summary", self.test_db_path)
+
+        response = self.app.get('/segments?speaker_id=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([s['text'] for s in response.get_json()['segments']], ["Hello"])
+
+        response = self.app.get('/segments')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['message'], 'speaker_id is required')
+        response = self.app.get('/segments?speaker_id=x')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('must be integers', response.get_json()['message'])
+
+    def test_speaker_segments_limit_is_capped(self):
+        """The per-speaker route returns at most MAX_PAGE_SIZE segments."""
+        lines = [f"[10:00:{i % 60:02d}] Speaker 1: Line {i}" for i in range(MAX_PAGE_SIZE + 20)]
+        save_meeting("\n".join(lines), "Summary", self.test_db_path)
+
+        for query in ('/segments?speaker_id=1', f'/segments?speaker_id=1&limit={MAX_PAGE_SIZE * 10}'):
+            response = self.app.get(query)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.get_json()['segments']), MAX_PAGE_SIZE)
 
     @patch('app.MeetingTranscriber')
     def test_start_meeting_success(self, mock_transcriber):
@@ -92,11 +200,11 @@ class TestApp(unittest.TestCase):
         self.assertEqual(response.status_code, 500)
         self.assertEqual(response.json['status'], 'error')
 
-    @patch('app.send_meeting_summary')
-    def test_send_email_success(self, mock_send_email):
-        """Test successful email sending."""
+    @patch('app.email_outbox')
+    def test_send_email_success(self, mock_outbox):
+        """Test that sending email queues a job and returns its ID."""
         # Configure mock
-        mock_send_email.return_value = (True, "Email sent successfully")
+        mock_outbox.enqueue.return_value = 'job-1'
         
         # Test data
         test_data = {
@@ -105,15 +213,67 @@ class TestApp(unittest.TestCase):
         }
         
         response = self.app.post('/send_email', json=test_data)
-        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.status_code, 202)
         self.assertEqual(response.json['status'], 'success')
-        mock_send_email.assert_called_once_with(['test@example.com'], 'Test summary')
+        self.assertEqual(response.json['job_id'], 'job-1')
+        mock_outbox.enqueue.assert_called_once_with(['test@example.com'], 'Test summary')
+
+    @patch('app.email_outbox')
+    def test_email_job_status(self, mock_outbox):
+        """Test the email job status route."""
+        mock_outbox.job.side_effect = lambda job_id: {'job_id': job_id, 'status': 'completed'} if job_id == 'job-1' else None
+        
+        response = self.app.get('/email/jobs/job-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['job']['status'], 'completed')
+        
+        response = self.app.get('/email/jobs/missing')
+        self.assertEqual(response.status_code, 404)
+
+    @patch('app.job_queue')
+    def test_job_status(self, mock_queue):
+        """Test the background job status route."""
+        mock_queue.job.side_effect = lambda job_id: {'job_id': job_id, 'status': 'running'} if job_id == 'job-1' else None
+
+        response = self.app.get('/jobs/job-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['job']['status'], 'running')
+
+        response = self.app.get('/jobs/missing')
+        self.assertEqual(response.status_code, 404)
+
+    @patch('app.segment_writer')
+    @patch('app.sessions')
+    def test_summary_does_not_save_the_meeting(self, mock_sessions, mock_writer):
+        """Test that the summary route only reports the summary."""
+        transcriber = MagicMock(is_recording=False)
+        transcriber.generate_summary.return_value = "Test summary"
+        mock_sessions.get.side_effect = lambda meeting_id: transcriber if meeting_id == 'room-1' else None
+
+        response = self.app.get('/api/summary?meeting_id=room-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['summary'], 'Test summary')
+        mock_writer.finish.assert_not_called()
+
+        response = self.app.get('/api/summary?meeting_id=missing')
+        self.assertEqual(response.status_code, 404)
 
-    @patch('app.send_meeting_summary')
-    def test_send_email_error(self, mock_send_email):
+    def test_metrics(self):
+        """Test the Prometheus metrics route."""
+        self.app.get('/meetings')
+
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        body = response.get_data(as_text=True)
+        self.assertIn('meeting_db_query_seconds_count{function="get_meetings_page"}', body)
+        self.assertIn('# TYPE meeting_active_sessions gauge', body)
+
+    @patch('app.email_outbox')
+    def test_send_email_error(self, mock_outbox):
         """Test email sending with error."""
         # Configure mock to raise exception
-        mock_send_email.side_effect = Exception("Test error")
+        mock_outbox.enqueue.side_effect = Exception("Test error")
         
         test_data = {
             'summary': 'Test summary',
@@ -124,5 +284,16 @@ class TestApp(unittest.TestCase):
         self.assertEqual(response.status_code, 500)
         self.assertEqual(response.json['status'], 'error')
 
+    def test_batch_job_rejects_bad_files(self):
+        """Batch jobs only accept recordings inside the batch input directory."""
+        response = self.app.post('/batch/jobs', json={'files': []})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.app.post('/batch/jobs', json={'files': ['../meetings.db']})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.app.get('/batch/jobs/missing')
+        self.assertEqual(response.status_code, 404)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,155 @@
+import math
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import unittest
+import wave
+from unittest.mock import patch, MagicMock
+from audio_ingest import AudioRingBuffer, AudioIngestSession, BufferSink
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_BYTES = SAMPLE_RATE * 2 * FRAME_MS // 1000
+
+def write_test_wav(path, seconds=2):
+    """Write a 16 kHz mono 16-bit WAV containing a 440 Hz tone."""
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(b''.join(
+            struct.pack('<h', int(8000 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)))
+            for i in range(SAMPLE_RATE * seconds)
+        ))
+
+class SlowSink(BufferSink):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def write(self, view):
+        time.sleep(self.delay)
+        super().write(view)
+
+class TestAudioRingBuffer(unittest.TestCase):
+    def test_write_and_read_wrap_around(self):
+        ring = AudioRingBuffer(10)
+        self.assertTrue(ring.write(b'abcdef'))
+        ring.consume(len(ring.peek()))
+        self.assertTrue(ring.write(b'ghijklm'))
+
+        # The data wraps past the end of the ring, so it comes out in two runs
+        first = ring.peek()
+        self.assertEqual(bytes(first), b'ghij')
+        ring.consume(len(first))
+        self.assertEqual(bytes(ring.peek()), b'klm')
+
+    def test_frame_that_does_not_fit_is_rejected_whole(self):
+        ring = AudioRingBuffer(8)
+        self.assertTrue(ring.write(b'abcdef'))
+        self.assertFalse(ring.write(b'ghi'))
+        self.assertEqual(len(ring), 6)
+
+    def test_peek_returns_view_into_ring(self):
+        ring = AudioRingBuffer(16)
+        ring.write(memoryview(bytearray(b'audio')))
+        view = ring.peek()
+        self.assertIsInstance(view, memoryview)
+        self.assertIs(view.obj, ring._buffer)
+
+    def test_peek_times_out_and_close_wakes_reader(self):
+        ring = AudioRingBuffer(16)
+        self.assertIsNone(ring.peek(timeout=0.01))
+        threading.Timer(0.05, ring.close).start()
+        start = time.perf_counter()
+        self.assertIsNone(ring.peek(timeout=5))
+        self.assertLess(time.perf_counter() - start, 1)
+
+class TestAudioIngestSession(unittest.TestCase):
+    def test_audio_reaches_sink_in_order(self):
+        sink = BufferSink()
+        session = AudioIngestSession(sink, capacity=8192)
+        frames = [bytes([i]) * 100 for i in range(50)]
+        for seq, frame in enumerate(frames):
+            self.assertTrue(session.feed(frame, seq))
+        session.close()
+
+        self.assertEqual(bytes(sink.data), b''.join(frames))
+        self.assertTrue(sink.closed)
+        stats = session.stats()
+        self.assertEqual(stats['bytes_written'], 5000)
+        self.assertEqual(stats['frames_dropped'], 0)
+
+    def test_full_buffer_drops_frames_and_signals_backpressure(self):
+        signals = []
+        session = AudioIngestSession(SlowSink(0.05), capacity=1000, on_backpressure=signals.append)
+        results = [session.feed(b'x' * 200, seq) for seq in range(20)]
+        session.close()
+
+        stats = session.stats()
+        self.assertIn(False, results)
+        self.assertEqual(stats['frames_dropped'], results.count(False))
+        self.assertEqual(stats['bytes_written'] + stats['bytes_dropped'], 4000)
+        self.assertEqual(signals[0], True)
+        self.assertEqual(signals[-1], False)
+
+    def test_sequence_gaps_are_counted(self):
+        session = AudioIngestSession(BufferSink())
+        for seq in (0, 1, 4, 5, 9):
+            session.feed(b'x', seq)
+        session.close()
+        self.assertEqual(session.stats()['frames_missing'], 5)
+
+class TestAudioReplay(unittest.TestCase):
+    """Replay a WAV file through the audio_data Socket.IO event at 10x real time."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.wav_path = os.path.join(self.test_dir, 'meeting.wav')
+        write_test_wav(self.wav_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    @patch('azure.cognitiveservices.speech.transcription.ConversationTranscriber')
+    def test_replay_wav_through_socket(self, mock_conversation_transcriber):
+        mock_conversation_transcriber.return_value = MagicMock()
+        import app as app_module
+        from transcriber import MeetingTranscriber
+
+        sink = BufferSink()
+        factory = lambda meeting_id: MeetingTranscriber(
+            app_module.socketio, meeting_id=meeting_id, audio_input='push',
+            audio_sink_factory=lambda: sink)
+        client = app_module.socketio.test_client(app_module.app)
+        with patch.object(app_module.sessions, 'factory', factory):
+            client.emit('start_meeting', {'meeting_id': 'replay'})
+            started = [m for m in client.get_received() if m['name'] == 'meeting_started']
+            self.assertEqual(started[0]['args'][0]['audio_input'], 'push')
+
+            with wave.open(self.wav_path, 'rb') as wav:
+                audio = wav.readframes(wav.getnframes())
+            start = time.perf_counter()
+            for seq, offset in enumerate(range(0, len(audio), FRAME_BYTES)):
+                client.emit('audio_data', {'meeting_id': 'replay', 'seq': seq,
+                                           'audio': audio[offset:offset + FRAME_BYTES]})
+                # 10x real time: a 20 ms frame every 2 ms
+                time.sleep(max(0, start + (seq + 1) * FRAME_MS / 10000 - time.perf_counter()))
+
+            transcriber = app_module.sessions.get('replay')
+            client.emit('stop_meeting', {'meeting_id': 'replay'})
+            stats = transcriber.audio_ingest.stats()
+            app_module.sessions.remove('replay')
+        client.disconnect()
+
+        self.assertEqual(bytes(sink.data), audio)
+        self.assertTrue(sink.closed)
+        self.assertEqual(stats['frames_received'], math.ceil(len(audio) / FRAME_BYTES))
+        self.assertEqual(stats['frames_dropped'], 0)
+        self.assertEqual(stats['frames_missing'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
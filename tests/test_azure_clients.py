@@ -0,0 +1,67 @@
+import os
+import sys
+import unittest
+import threading
+from unittest.mock import patch, MagicMock
+from azure_clients import ClientRegistry, clients
+
+class TestClientRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ClientRegistry()
+        self.factory = MagicMock(side_effect=lambda cls, endpoint, key: cls([(endpoint, key)]))
+        self.registry.register('fake', 'collections', 'OrderedDict',
+                               ['FAKE_ENDPOINT', 'FAKE_KEY'], factory=self.factory)
+
+    def test_register_does_not_build(self):
+        """Registering a client must not import or construct anything."""
+        self.assertEqual(self.registry.loaded(), [])
+        self.factory.assert_not_called()
+
+    def test_get_builds_once_and_caches(self):
+        """The first get() builds the client and later calls reuse it."""
+        with patch.dict(os.environ, {'FAKE_ENDPOINT': 'https://fake', 'FAKE_KEY': 'secret'}):
+            first = self.registry.get('fake')
+            second = self.registry.get('fake')
+
+        self.assertIs(first, second)
+        self.assertEqual(first['https://fake'], 'secret')
+        self.factory.assert_called_once()
+        self.assertIn('fake', self.registry.init_times())
+        self.assertTrue(self.registry.stats()['fake']['available'])
+
+    def test_missing_settings_return_none(self):
+        """A client with missing settings is reported as unavailable."""
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertFalse(self.registry.is_configured('fake'))
+            self.assertIsNone(self.registry.get('fake'))
+        self.factory.assert_not_called()
+
+    def test_factory_error_returns_none(self):
+        """Construction errors are logged and cached as None."""
+        self.factory.side_effect = Exception("boom")
+        with patch.dict(os.environ, {'FAKE_ENDPOINT': 'https://fake', 'FAKE_KEY': 'secret'}):
+            self.assertIsNone(self.registry.get('fake'))
+            self.assertIsNone(self.registry.get('fake'))
+        self.factory.assert_called_once()
+
+    def test_concurrent_get_builds_once(self):
+        """Concurrent first calls only construct the client once."""
+        results = []
+        with patch.dict(os.environ, {'FAKE_ENDPOINT': 'https://fake', 'FAKE_KEY': 'secret'}):
+            threads = [threading.Thread(target=lambda: results.append(self.registry.get('fake')))
+                       for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.factory.assert_called_once()
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_default_registry_is_lazy(self):
+        """Importing the default registry does not import any SDK client module."""
+        self.assertIn('form_recognizer', clients.names())
+        self.assertNotIn('azure.ai.formrecognizer', sys.modules)
+
+if __name__ == '__main__':
+    unittest.main()
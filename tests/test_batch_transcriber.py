@@ -0,0 +1,199 @@
+import math
+import os
+import random
+import shutil
+import struct
+import tempfile
+import time
+import unittest
+import wave
+from batch_transcriber import (
+    BatchTranscriber,
+    BatchJobManager,
+    StubRecognizer,
+    load_audio,
+    main,
+    resolve_input_path,
+    split_on_silence
+)
+from database import init_db, get_meeting, get_all_meetings, close_connections
+
+SAMPLE_RATE = 16000
+
+def tone(seconds, amplitude=8000):
+    return b''.join(
+        struct.pack('<h', int(amplitude * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)))
+        for i in range(int(SAMPLE_RATE * seconds))
+    )
+
+def silence(seconds):
+    return b'\x00\x00' * int(SAMPLE_RATE * seconds)
+
+def write_wav(path, pcm, channels=1, width=2, rate=SAMPLE_RATE):
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(width)
+        wav.setframerate(rate)
+        wav.writeframes(pcm)
+
+class ShuffledRecognizer(StubRecognizer):
+    """Finishes segments in random order."""
+
+    def transcribe(self, pcm, sample_rate):
+        time.sleep(random.uniform(0, 0.02))
+        return super().transcribe(pcm, sample_rate)
+
+class FailingRecognizer(StubRecognizer):
+    """Fails on segments longer than ``max_seconds``."""
+
+    def __init__(self, max_seconds):
+        super().__init__()
+        self.max_seconds = max_seconds
+
+    def transcribe(self, pcm, sample_rate):
+        if len(pcm) / (sample_rate * 2) > self.max_seconds:
+            raise RuntimeError("Recognition canceled")
+        return super().transcribe(pcm, sample_rate)
+
+class TestSplitOnSilence(unittest.TestCase):
+    def test_splits_in_pauses(self):
+        pcm = tone(6) + silence(1) + tone(6) + silence(1) + tone(3)
+        segments = split_on_silence(pcm, SAMPLE_RATE)
+        self.assertEqual(len(segments), 3)
+        # Cuts fall in the middle of each one-second pause
+        self.assertAlmostEqual(segments[1].start, 6.5, delta=0.1)
+        self.assertAlmostEqual(segments[2].start, 13.5, delta=0.1)
+        self.assertEqual(b''.join(s.pcm for s in segments), pcm[:len(b''.join(s.pcm for s in segments))])
+
+    def test_short_pause_does_not_split(self):
+        pcm = tone(6) + silence(0.2) + tone(6)
+        self.assertEqual(len(split_on_silence(pcm, SAMPLE_RATE)), 1)
+
+    def test_long_speech_is_cut_at_max_segment(self):
+        segments = split_on_silence(tone(25), SAMPLE_RATE, max_segment=10)
+        self.assertEqual(len(segments), 3)
+        self.assertAlmostEqual(segments[1].start, 10, delta=0.1)
+
+    def test_silent_segments_are_skipped(self):
+        pcm = tone(6) + silence(30) + tone(6)
+        segments = split_on_silence(pcm, SAMPLE_RATE, max_segment=10)
+        self.assertTrue(all(any(s.pcm) for s in segments))
+        self.assertEqual(len(segments), 2)
+
+class TestBatchTranscriber(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, 'meetings.db')
+        init_db(self.db_path)
+
+    def tearDown(self):
+        close_connections()
+        shutil.rmtree(self.test_dir)
+
+    def make_recording(self, name, speech_seconds=(6, 6, 6)):
+        pcm = b''.join(tone(seconds) + silence(1) for seconds in speech_seconds)
+        path = os.path.join(self.test_dir, name)
+        write_wav(path, pcm)
+        return path
+
+    def test_load_audio_converts_to_16_bit_mono(self):
+        path = os.path.join(self.test_dir, 'stereo.wav')
+        write_wav(path, b'\x80\x80' * SAMPLE_RATE, channels=2, width=1)
+        pcm, rate = load_audio(path)
+        self.assertEqual(rate, SAMPLE_RATE)
+        self.assertEqual(len(pcm), SAMPLE_RATE * 2)
+
+    def test_transcripts_are_reassembled_in_order_and_saved(self):
+        paths = [self.make_recording(f"meeting{i}.wav") for i in range(3)]
+        batch = BatchTranscriber(ShuffledRecognizer(), max_workers=4, db_path=self.db_path)
+        report = batch.transcribe_files(paths)
+
+        self.assertEqual(report['errors'], [])
+        self.assertEqual([r['path'] for r in report['files']], paths)
+        meeting = get_meeting(report['files'][0]['meeting_id'], db_path=self.db_path)
+        offsets = [line.split(']')[0] for line in meeting['transcript'].splitlines()]
+        self.assertEqual(offsets, ['[00:00:00', '[00:00:06', '[00:00:13'])
+        self.assertAlmostEqual(report['audio_seconds'], 3 * 21, delta=1)
+        self.assertGreater(report['throughput'], 0)
+
+    def test_workers_run_segments_concurrently(self):
+        paths = [self.make_recording(f"meeting{i}.wav") for i in range(2)]
+        timings = []
+        for workers in (1, 6):
+            batch = BatchTranscriber(StubRecognizer(realtime_factor=0.005), max_workers=workers,
+                                     db_path=self.db_path)
+            start = time.perf_counter()
+            batch.transcribe_files(paths)
+            timings.append(time.perf_counter() - start)
+        self.assertLess(timings[1], timings[0] / 2)
+
+    def test_unreadable_file_is_reported(self):
+        good = self.make_recording("good.wav")
+        bad = os.path.join(self.test_dir, "bad.wav")
+        with open(bad, 'wb') as f:
+            f.write(b'not audio')
+        report = BatchTranscriber(StubRecognizer(), db_path=self.db_path).transcribe_files([bad, good])
+        self.assertEqual([e['path'] for e in report['errors']], [bad])
+        self.assertEqual(len(report['files']), 1)
+
+    def test_file_with_failed_segments_is_not_saved(self):
+        good = self.make_recording("good.wav")
+        partial = self.make_recording("partial.wav", speech_seconds=(6, 12, 6))
+        report = BatchTranscriber(FailingRecognizer(max_seconds=10), db_path=self.db_path).transcribe_files(
+            [partial, good])
+
+        self.assertEqual([r['path'] for r in report['files']], [good])
+        self.assertEqual(report['files'][0]['failed_segments'], 0)
+        error, = report['errors']
+        self.assertEqual((error['path'], error['segments'], error['failed_segments']), (partial, 3, 1))
+        self.assertEqual(error['segment_errors'], [{'start': '00:00:06', 'error': "Recognition canceled"}])
+        self.assertEqual(report['failed_segments'], 1)
+        self.assertEqual(len(get_all_meetings(self.db_path)), 1)
+
+    def test_summaries_are_saved(self):
+        path = self.make_recording("meeting.wav")
+        batch = BatchTranscriber(StubRecognizer(), db_path=self.db_path,
+                                 summarize=lambda transcript: f"{len(transcript.splitlines())} lines")
+        report = batch.transcribe_files([path])
+        self.assertEqual(get_meeting(report['files'][0]['meeting_id'], db_path=self.db_path)['summary'], "3 lines")
+
+    def test_job_manager_reports_progress(self):
+        paths = [self.make_recording(f"meeting{i}.wav") for i in range(2)]
+        jobs = BatchJobManager(lambda: BatchTranscriber(StubRecognizer(), db_path=self.db_path))
+        job_id = jobs.submit(paths)
+        deadline = time.time() + 10
+        while jobs.get(job_id)['status'] not in ('completed', 'failed') and time.time() < deadline:
+            time.sleep(0.01)
+
+        job = jobs.get(job_id)
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['files_done'], 2)
+        self.assertEqual(len(job['meeting_ids']), 2)
+        self.assertIn('throughput', job)
+        self.assertIsNone(jobs.get('missing'))
+
+    def test_job_reports_failed_segments(self):
+        path = self.make_recording("meeting.wav")
+        jobs = BatchJobManager(lambda: BatchTranscriber(FailingRecognizer(max_seconds=0), db_path=self.db_path))
+        job_id = jobs.submit([path])
+        deadline = time.time() + 10
+        while jobs.get(job_id)['status'] not in ('completed', 'failed') and time.time() < deadline:
+            time.sleep(0.01)
+
+        job = jobs.get(job_id)
+        self.assertEqual((job['files_done'], job['failed_segments']), (0, 3))
+        self.assertEqual([e['path'] for e in job['errors']], [path])
+
+    def test_cli(self):
+        path = self.make_recording("meeting.wav")
+        self.assertEqual(main([path, '--backend', 'stub', '--db', self.db_path]), 0)
+
+    def test_resolve_input_path(self):
+        path = self.make_recording("meeting.wav")
+        self.assertEqual(resolve_input_path("meeting.wav", self.test_dir), os.path.realpath(path))
+        for name in ("../meeting.wav", "/etc/passwd", "missing.wav", "meetings.db"):
+            with self.assertRaises(ValueError):
+                resolve_input_path(name, self.test_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,9 @@ import unittest
 import sqlite3
 import tempfile
 import shutil
-from database import init_db, save_meeting, update_meeting_participants, get_all_meetings
+import threading
+from unittest.mock import patch
+from database import init_db, save_meeting, update_meeting_participants, get_all_meetings, get_connection, get_meetings_page, get_meeting, search_meetings, rebuild_search_index
 
 class TestDatabase(unittest.TestCase):
     def setUp(self):
@@ -92,5 +94,145 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(meetings[0]['transcript'], "Transcript 2")  # Most recent first
         self.assertEqual(meetings[1]['transcript'], "Transcript 1")
 
+    def test_connection_reused_per_thread(self):
+        """Each thread reuses one tuned connection per database."""
+        conn = get_connection(self.test_db_path)
+        self.assertIs(conn, get_connection(self.test_db_path))
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(get_connection(self.test_db_path)))
+        thread.start()
+        thread.join()
+        self.assertIsNot(conn, other[0])
+
+    def test_concurrent_writers(self):
+        """Concurrent writers on pooled connections all commit."""
+        def write(n):
+            for i in range(25):
+                save_meeting(f"Transcript {n}-{i}", "Summary", self.test_db_path)
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(get_all_meetings(self.test_db_path)), 100)
+
+    def test_get_meetings_page(self):
+        """Test keyset pagination over (timestamp, id)."""
+        for i in range(5):
+            save_meeting(f"Transcript {i}", f"Summary {i}", self.test_db_path)
+
+        page, cursor = get_meetings_page(limit=3, db_path=self.test_db_path)
+        self.assertEqual([m['summary_snippet'] for m in page], ["Summary 4", "Summary 3", "Summary 2"])
+        self.assertIsNotNone(cursor)
+
+        page, cursor = get_meetings_page(limit=3, cursor=cursor, db_path=self.test_db_path)
+        self.assertEqual([m['summary_snippet'] for m in page], ["Summary 1", "Summary 0"])
+        self.assertIsNone(cursor)
+
+    def test_timestamp_index_used(self):
+        """The listing query is served by the timestamp index."""
+        conn = get_connection(self.test_db_path)
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM meetings WHERE (timestamp, id) < (?, ?) "
+            "ORDER BY timestamp DESC, id DESC LIMIT 10", ("2030-01-01", 1)
+        ).fetchall()
+        self.assertIn('idx_meetings_timestamp', ' '.join(str(row) for row in plan))
+
+    def test_get_meeting(self):
+        """Test fetching a single meeting."""
+        meeting_id = save_meeting("Transcript", "Summary", self.test_db_path)
+        self.assertEqual(get_meeting(meeting_id, self.test_db_path)['summary'], "Summary")
+        self.assertIsNone(get_meeting(meeting_id + 1, self.test_db_path))
+
+    def test_search_meetings(self):
+        """Test full-text search with ranking and highlighted snippets."""
+        save_meeting("We discussed the quarterly budget", "Budget review", self.test_db_path)
+        save_meeting("Hiring plan for the new team", "Hiring", self.test_db_path)
+
+        results, truncated = search_meetings("budget", db_path=self.test_db_path)
+        self.assertEqual(len(results), 1)
+        self.assertFalse(truncated)
+        self.assertIn("<mark>budget</mark>", results[0]['transcript_snippet'])
+        self.assertIn("<mark>Budget</mark>", results[0]['summary_snippet'])
+
+        self.assertEqual(search_meetings("hir*", db_path=self.test_db_path)[0][0]['summary_snippet'], "<mark>Hiring</mark>")
+        self.assertEqual(search_meetings("budget hiring", db_path=self.test_db_path)[0], [])
+        with self.assertRaises(ValueError):
+            search_meetings("  ", db_path=self.test_db_path)
+
+    def test_search_filters(self):
+        """Test participant and date range filters."""
+        save_meeting("Budget for marketing", "Summary", self.test_db_path)
+        update_meeting_participants(["alice@example.com"], self.test_db_path)
+        save_meeting("Budget for engineering", "Summary", self.test_db_path)
+        update_meeting_participants(["bob@example.com"], self.test_db_path)
+
+        results, _ = search_meetings("budget", participant="alice@example.com", db_path=self.test_db_path)
+        self.assertEqual([r['participants'] for r in results], [["alice@example.com"]])
+
+        self.assertEqual(len(search_meetings("budget", start="2000-01-01", end="2999-12-31", db_path=self.test_db_path)[0]), 2)
+        self.assertEqual(search_meetings("budget", end="2000-01-01", db_path=self.test_db_path)[0], [])
+
+    def test_search_reports_matches_beyond_the_rank_window(self):
+        """Test that only the newest matches are ranked without a date range."""
+        ids = [save_meeting(f"Budget meeting {i}", "Summary", self.test_db_path) for i in range(3)]
+        with patch('database.SEARCH_RANK_WINDOW', 2):
+            results, truncated = search_meetings("budget", db_path=self.test_db_path)
+            self.assertEqual(sorted(r['id'] for r in results), ids[1:])
+            self.assertTrue(truncated)
+
+            results, truncated = search_meetings("budget", start="2000-01-01", db_path=self.test_db_path)
+            self.assertEqual(len(results), 3)
+            self.assertFalse(truncated)
+
+        with patch('database.SEARCH_RANK_WINDOW', 3):
+            self.assertFalse(search_meetings("budget", db_path=self.test_db_path)[1])
+
+    def test_search_index_follows_updates_and_deletes(self):
+        """Triggers keep the index in sync with the meetings table."""
+        meeting_id = save_meeting("Original words", "Summary", self.test_db_path)
+        conn = get_connection(self.test_db_path)
+        with conn:
+            conn.execute("UPDATE meetings SET transcript = 'Replacement words' WHERE id = ?", (meeting_id,))
+        self.assertEqual(search_meetings("original", db_path=self.test_db_path)[0], [])
+        self.assertEqual(len(search_meetings("replacement", db_path=self.test_db_path)[0]), 1)
+
+        with conn:
+            conn.execute("DELETE FROM meetings WHERE id = ?", (meeting_id,))
+        self.assertEqual(search_meetings("replacement", db_path=self.test_db_path)[0], [])
+
+    def test_rebuild_search_index_backfills_existing_database(self):
+        """Meetings saved before the index existed are indexed incrementally."""
+        legacy_path = os.path.join(self.test_dir, 'legacy.db')
+        conn = sqlite3.connect(legacy_path)
+        conn.execute("""
+            CREATE TABLE meetings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME NOT NULL,
+                transcript TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                participants TEXT
+            )
+        """)
+        conn.executemany(
+            "INSERT INTO meetings (timestamp, transcript, summary) VALUES (?, ?, ?)",
+            [("2025-01-01 10:00:00", f"Legacy roadmap meeting {i}", "Summary") for i in range(7)]
+        )
+        conn.commit()
+        conn.close()
+
+        init_db(legacy_path)
+        save_meeting("New roadmap meeting", "Summary", legacy_path)
+        self.assertEqual(len(search_meetings("roadmap", db_path=legacy_path)[0]), 1)
+
+        self.assertEqual(rebuild_search_index(legacy_path, batch_size=3), 7)
+        self.assertEqual(len(search_meetings("roadmap", db_path=legacy_path)[0]), 8)
+        self.assertEqual(rebuild_search_index(legacy_path), 0)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,120 @@
+import random
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from llm import FakeChatBackend
+from transcriber import MeetingTranscriber
+from diarization import (
+    SpeakerLabels, LocalDiarizer, ConversationRecognizer, diarize,
+    diarization_error_rate, extract_embedding, restrict_turns, speech_regions, PITCH_BINS, LPC_ORDER
+)
+from tests.synthetic_voices import SYNTHETIC_VOICES, synthesize_voice, synthetic_conversation
+
+SAMPLE_RATE = 16000
+
+class TestDiarizationErrorRate(unittest.TestCase):
+    reference = [(0.0, 2.0, 'alice'), (2.0, 4.0, 'bob')]
+
+    def test_labels_only_need_to_match_up_to_renaming(self):
+        hypothesis = [(0.0, 2.0, 7), (2.0, 4.0, 3)]
+        self.assertAlmostEqual(diarization_error_rate(self.reference, hypothesis)['der'], 0.0)
+
+    def test_missed_false_alarm_and_confusion(self):
+        hypothesis = [(0.0, 1.0, 'x'), (2.0, 3.0, 'x'), (3.0, 5.0, 'y')]
+        result = diarization_error_rate(self.reference, hypothesis)
+        self.assertAlmostEqual(result['missed'], 1.0)
+        self.assertAlmostEqual(result['false_alarm'], 1.0)
+        self.assertAlmostEqual(result['confusion'], 1.0)
+        self.assertAlmostEqual(result['der'], 0.75)
+
+class TestSpeakerLabels(unittest.TestCase):
+    def test_speakers_are_numbered_in_order_of_appearance(self):
+        labels = SpeakerLabels()
+        self.assertEqual([labels.number(key) for key in ('Guest-2', 'Guest-1', 'Guest-2')], [1, 2, 1])
+        self.assertIsNone(labels.number('Unknown'))
+        self.assertIsNone(labels.number(None))
+
+class TestLocalDiarization(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pcm, cls.reference = synthetic_conversation(turns=8, speakers=3, seed=4)
+
+    def test_silence_has_no_embedding(self):
+        self.assertIsNone(extract_embedding(b'\0\0' * SAMPLE_RATE, SAMPLE_RATE))
+        voice = synthesize_voice(SYNTHETIC_VOICES[0], 1.0, SAMPLE_RATE, random.Random(1))
+        self.assertEqual(len(extract_embedding(voice, SAMPLE_RATE)), PITCH_BINS + LPC_ORDER)
+
+    def test_offline_diarization_finds_the_speakers(self):
+        hypothesis = diarize(self.pcm, SAMPLE_RATE)
+        self.assertLess(diarization_error_rate(self.reference, hypothesis)['der'], 0.15)
+        self.assertEqual(len({speaker for _, _, speaker in hypothesis}), 3)
+
+    def test_streaming_diarization_does_not_block_the_feeder(self):
+        diarizer = LocalDiarizer(SAMPLE_RATE)
+        start = time.perf_counter()
+        for offset in range(0, len(self.pcm), 640):
+            diarizer.feed(self.pcm[offset:offset + 640])
+        feed_time = time.perf_counter() - start
+        self.assertTrue(diarizer.wait(timeout=30))
+        diarizer.close()
+
+        self.assertLess(feed_time, 0.5)
+        hypothesis = restrict_turns(diarizer.turns(), speech_regions(self.pcm, SAMPLE_RATE))
+        self.assertLess(diarization_error_rate(self.reference, hypothesis)['der'], 0.2)
+        # Lookups by utterance time agree with the reference turns
+        first, second = self.reference[2], self.reference[3]
+        self.assertNotEqual(diarizer.speaker_at(first[0], first[1]), diarizer.speaker_at(second[0], second[1]))
+        self.assertIsNone(diarizer.speaker_at(10_000, 10_001))
+
+class TestTranscriberSpeakers(unittest.TestCase):
+    def make_transcriber(self, **kwargs):
+        return MeetingTranscriber(MagicMock(), llm=FakeChatBackend(), summarizer=False,
+                                  interim_results=False, **kwargs)
+
+    def result(self, text, speaker_id=None, offset=0, duration=10_000_000):
+        return MagicMock(result=MagicMock(text=text, speaker_id=speaker_id, offset=offset, duration=duration))
+
+    def test_conversation_transcriber_speakers(self):
+        transcriber = self.make_transcriber()
+        for text, speaker_id in (("Hi", 'Unknown'), ("Hello", 'Guest-1'), ("Hey", 'Guest-2'),
+                                 ("Again", 'Guest-1'), ("Still me", 'Unknown')):
+            transcriber.handle_result(self.result(text, speaker_id))
+        self.assertEqual([e['speaker'] for e in transcriber.speaker_transcript],
+                         ["Speaker 1", "Speaker 1", "Speaker 2", "Speaker 1", "Speaker 1"])
+        self.assertEqual([e['speaker_id'] for e in transcriber.speaker_transcript], [1, 1, 2, 1, 1])
+
+    def test_long_pause_does_not_change_the_speaker(self):
+        transcriber = self.make_transcriber(diarization='none')
+        transcriber.add_entry("Before the pause")
+        with patch('time.time', return_value=time.time() + 60):
+            transcriber.add_entry("After the pause")
+        self.assertEqual({e['speaker'] for e in transcriber.speaker_transcript}, {"Speaker 1"})
+
+    def test_local_diarizer_labels_results_by_offset(self):
+        diarizer = MagicMock()
+        diarizer.speaker_at.side_effect = lambda start, end: 0 if start < 5 else 1
+        transcriber = self.make_transcriber(diarization='local', audio_input='push',
+                                            audio_sink_factory=MagicMock, diarizer_factory=lambda rate: diarizer)
+        transcriber._open_audio_stream()
+        transcriber.handle_result(self.result("First", offset=10_000_000))
+        transcriber.handle_result(self.result("Second", offset=60_000_000))
+        self.assertEqual([e['speaker'] for e in transcriber.speaker_transcript], ["Speaker 1", "Speaker 2"])
+        diarizer.speaker_at.assert_called_with(6.0, 7.0)
+
+        # Audio pushed to the recognizer reaches the diarizer too
+        transcriber.audio_ingest.sink.write(b'\1\0' * 8)
+        transcriber.close()
+        diarizer.feed.assert_called_with(b'\1\0' * 8)
+        diarizer.close.assert_called()
+
+    @patch('azure.cognitiveservices.speech.transcription.ConversationTranscriber')
+    def test_conversation_recognizer_wraps_the_transcriber(self, mock_conversation_transcriber):
+        recognizer = ConversationRecognizer(MagicMock(), MagicMock())
+        transcriber = mock_conversation_transcriber.return_value
+        self.assertIs(recognizer.recognized, transcriber.transcribed)
+        self.assertIs(recognizer.recognizing, transcriber.transcribing)
+        recognizer.start_continuous_recognition()
+        transcriber.start_transcribing_async.return_value.get.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
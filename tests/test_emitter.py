@@ -0,0 +1,180 @@
+import threading
+import time
+import unittest
+from emitter import TranscriptEmitter, InterimThrottle, SummaryStreamer
+
+class RecordingSocketIO:
+    def __init__(self):
+        self.emitted = []
+        self.lock = threading.Lock()
+
+    def emit(self, event, payload, to=None):
+        with self.lock:
+            self.emitted.append((event, payload, to))
+
+def entry(text):
+    return {'text': text, 'speaker': 'Speaker 1', 'timestamp': '10:00:00', 'speaker_id': 1}
+
+class TestTranscriptEmitter(unittest.TestCase):
+    def setUp(self):
+        self.socketio = RecordingSocketIO()
+        self.emitter = TranscriptEmitter(self.socketio, window=0.05)
+
+    def tearDown(self):
+        self.emitter.close()
+
+    def wait_for(self, count, timeout=2):
+        deadline = time.time() + timeout
+        while len(self.socketio.emitted) < count and time.time() < deadline:
+            time.sleep(0.005)
+
+    def test_entries_within_window_are_coalesced(self):
+        for i in range(5):
+            self.emitter.publish('meeting-1', entry(f"line {i}"))
+        self.wait_for(1)
+        time.sleep(0.1)
+
+        self.assertEqual(len(self.socketio.emitted), 1)
+        event, payload, room = self.socketio.emitted[0]
+        self.assertEqual((event, room), ('transcript_batch', 'meeting-1'))
+        self.assertEqual((payload['from_seq'], payload['to_seq']), (1, 5))
+        self.assertEqual([e['text'] for e in payload['entries']], [f"line {i}" for i in range(5)])
+
+    def test_rooms_have_their_own_sequences(self):
+        self.emitter.publish('a', entry("a1"))
+        self.emitter.publish('b', entry("b1"))
+        self.emitter.publish('a', entry("a2"))
+        self.emitter.flush()
+
+        batches = {room: payload for _, payload, room in self.socketio.emitted}
+        self.assertEqual(set(batches), {'a', 'b'})
+        self.assertEqual([e['seq'] for e in batches['a']['entries']], [1, 2])
+        self.assertEqual([e['seq'] for e in batches['b']['entries']], [1])
+
+    def test_later_batches_continue_the_sequence(self):
+        self.emitter.publish('a', entry("one"))
+        self.wait_for(1)
+        self.emitter.publish('a', entry("two"))
+        self.wait_for(2)
+        self.assertEqual([p['from_seq'] for _, p, _ in self.socketio.emitted], [1, 2])
+
+    def test_zero_window_sends_immediately(self):
+        emitter = TranscriptEmitter(self.socketio, window=0)
+        emitter.publish('a', entry("now"))
+        self.assertEqual(len(self.socketio.emitted), 1)
+
+    def test_since_returns_missing_entries(self):
+        for i in range(5):
+            self.emitter.publish('a', entry(f"line {i}"))
+        self.assertEqual([e['seq'] for e in self.emitter.since('a', 3)], [4, 5])
+        self.assertEqual(self.emitter.since('a', 5), [])
+        self.assertEqual(self.emitter.since('unknown', 0), [])
+
+    def test_since_beyond_history_needs_full_resync(self):
+        emitter = TranscriptEmitter(self.socketio, window=0, history_size=3)
+        for i in range(10):
+            emitter.publish('a', entry(f"line {i}"))
+        self.assertIsNone(emitter.since('a', 2))
+        self.assertEqual([e['seq'] for e in emitter.since('a', 7)], [8, 9, 10])
+
+    def test_discard_flushes_pending(self):
+        self.emitter.publish('a', entry("last words"))
+        self.emitter.discard('a')
+        self.assertEqual(len(self.socketio.emitted), 1)
+        self.assertEqual(self.emitter.last_seq('a'), 0)
+
+class TestInterimThrottle(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+        self.throttle = InterimThrottle(lambda utterance_id, text: self.sent.append((utterance_id, text)),
+                                        interval=0.05)
+
+    def test_first_hypothesis_is_sent_immediately(self):
+        self.throttle.offer(1, "hello")
+        self.assertEqual(self.sent, [(1, "hello")])
+
+    def test_burst_is_throttled_to_latest(self):
+        for text in ("the", "the quick", "the quick brown", "the quick brown fox"):
+            self.throttle.offer(1, text)
+        self.assertEqual(len(self.sent), 1)
+        time.sleep(0.1)
+        self.assertEqual(self.sent, [(1, "the"), (1, "the quick brown fox")])
+        self.assertEqual((self.throttle.offered, self.throttle.sent), (4, 2))
+
+    def test_finalize_drops_held_hypothesis(self):
+        self.throttle.offer(1, "the")
+        self.throttle.offer(1, "the quick")
+        self.throttle.finalize()
+        time.sleep(0.1)
+        self.assertEqual(self.sent, [(1, "the")])
+
+        # The next utterance is not held back by the previous one
+        self.throttle.offer(2, "next")
+        self.assertEqual(self.sent[-1], (2, "next"))
+
+class TestSummaryStreamer(unittest.TestCase):
+    def setUp(self):
+        self.socketio = RecordingSocketIO()
+        self.streamer = SummaryStreamer(self.socketio, window=0.05)
+
+    def test_tokens_are_coalesced_after_the_first(self):
+        stream = self.streamer.open('room-1')
+        for token in ("The", " team", " agreed", " to", " ship"):
+            stream.write(token)
+        self.assertEqual([payload['text'] for _, payload, _ in self.socketio.emitted], ["The"])
+
+        time.sleep(0.06)
+        stream.write(".")
+        stream.finish("The team agreed to ship.")
+        events = [(event, payload) for event, payload, to in self.socketio.emitted if to == 'room-1']
+        self.assertEqual([payload['text'] for event, payload in events if event == 'summary_chunk'],
+                         ["The", " team agreed to ship."])
+        self.assertEqual([payload['index'] for event, payload in events if event == 'summary_chunk'], [0, 1])
+        done = events[-1][1]
+        self.assertEqual((events[-1][0], done['summary']), ('summary_done', "The team agreed to ship."))
+        self.assertEqual(done['stream_id'], events[0][1]['stream_id'])
+
+    def test_time_to_first_token_is_reported(self):
+        stream = self.streamer.open('room-1')
+        time.sleep(0.03)
+        stream.write("Summary")
+        time.sleep(0.03)
+        stream.finish("Summary")
+
+        self.assertGreaterEqual(stream.time_to_first_token(), 0.03)
+        done = self.socketio.emitted[-1][1]
+        self.assertGreaterEqual(done['time_to_first_token_ms'], 30)
+        self.assertGreater(done['total_ms'], done['time_to_first_token_ms'])
+        stats = self.streamer.stats()
+        self.assertEqual((stats['streams'], stats['chunks_sent']), (1, 1))
+        self.assertGreaterEqual(stats['time_to_first_token_ms']['p50'], 30)
+
+    def test_each_stream_has_its_own_id(self):
+        first, second = self.streamer.open('room-1'), self.streamer.open('room-1')
+        self.assertNotEqual(first.stream_id, second.stream_id)
+
+class TestResyncOverSocket(unittest.TestCase):
+    def test_client_catches_up_after_gap(self):
+        import app as app_module
+
+        client = app_module.socketio.test_client(app_module.app)
+        client.emit('join_meeting', {'meeting_id': 'resync-room'})
+        client.get_received()
+        for i in range(4):
+            app_module.transcript_emitter.publish('resync-room', entry(f"line {i}"))
+        app_module.transcript_emitter.flush('resync-room')
+
+        batches = [m['args'][0] for m in client.get_received() if m['name'] == 'transcript_batch']
+        self.assertEqual(sum(len(b['entries']) for b in batches), 4)
+
+        # Pretend only the first two arrived
+        client.emit('transcript_resync', {'meeting_id': 'resync-room', 'since': 2})
+        reply = [m['args'][0] for m in client.get_received() if m['name'] == 'transcript_resync'][0]
+        self.assertEqual([e['seq'] for e in reply['entries']], [3, 4])
+        self.assertEqual(reply['last_seq'], 4)
+
+        app_module.transcript_emitter.discard('resync-room')
+        client.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import csv
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import unittest
+import tracemalloc
+from database import init_db, save_meeting, update_meeting_participants, get_connection
+from export import export_meetings, iter_meeting_batches, main
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.test_db_path = os.path.join(self.test_dir, 'test_meetings.db')
+        init_db(self.test_db_path)
+        save_meeting("Transcript 1", "Summary 1", self.test_db_path)
+        save_meeting("Transcript 2, with a comma\nand a newline", "Summary 2", self.test_db_path)
+        update_meeting_participants(["a@example.com", "b@example.com"], self.test_db_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_ndjson_export(self):
+        """Each meeting becomes one JSON line."""
+        data = b''.join(export_meetings('ndjson', db_path=self.test_db_path))
+        rows = [json.loads(line) for line in data.decode('utf-8').splitlines()]
+        self.assertEqual([row['summary'] for row in rows], ["Summary 1", "Summary 2"])
+        self.assertEqual(rows[1]['participants'], ["a@example.com", "b@example.com"])
+
+    def test_csv_export(self):
+        """CSV output has a header and quotes embedded separators."""
+        data = b''.join(export_meetings('csv', db_path=self.test_db_path))
+        rows = list(csv.DictReader(io.StringIO(data.decode('utf-8'))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1]['transcript'], "Transcript 2, with a comma\nand a newline")
+        self.assertEqual(rows[1]['participants'], "a@example.com;b@example.com")
+
+    def test_gzip_export(self):
+        """Compressed output decompresses to the plain export."""
+        plain = b''.join(export_meetings('ndjson', db_path=self.test_db_path))
+        compressed = b''.join(export_meetings('ndjson', compress=True, db_path=self.test_db_path))
+        self.assertEqual(gzip.decompress(compressed), plain)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            export_meetings('xml', db_path=self.test_db_path)
+
+    def test_batches_use_fetchmany_chunks(self):
+        """Rows are produced in batches of chunk_size."""
+        for i in range(5):
+            save_meeting(f"Transcript {i}", "Summary", self.test_db_path)
+        sizes = [len(batch) for batch in iter_meeting_batches(self.test_db_path, chunk_size=3)]
+        self.assertEqual(sizes, [3, 3, 1])
+
+    def test_memory_does_not_grow_with_rows(self):
+        """Peak memory while exporting stays far below the size of the data."""
+        conn = get_connection(self.test_db_path)
+        transcript = "x" * 10000
+        with conn:
+            conn.executemany(
+                "INSERT INTO meetings (timestamp, transcript, summary) VALUES (?, ?, ?)",
+                [("2025-01-01 00:00:00", transcript, "Summary")] * 4000
+            )
+
+        tracemalloc.start()
+        total = 0
+        for chunk in export_meetings('ndjson', db_path=self.test_db_path, chunk_size=50):
+            total += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertGreater(total, 40_000_000)
+        self.assertLess(peak, 5_000_000)
+
+    def test_cli_writes_file(self):
+        """The CLI writes a gzip export to the output path."""
+        output = os.path.join(self.test_dir, 'export.csv.gz')
+        main(['--format', 'csv', '--gzip', '--db', self.test_db_path, '--output', output])
+        with gzip.open(output, 'rt') as f:
+            self.assertEqual(len(list(csv.DictReader(f))), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,246 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock
+from database import init_db, close_connections
+from jobs import JobQueue, Pipeline, Stage, post_meeting_pipeline, POST_MEETING
+from llm import FakeChatBackend
+from session_manager import SessionManager
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, 'meetings.db')
+        init_db(self.db_path)
+        self.queue = self.make_queue()
+
+    def tearDown(self):
+        self.queue.close()
+        close_connections()
+        shutil.rmtree(self.test_dir)
+
+    def make_queue(self, **kwargs):
+        options = {'workers': 2, 'retry_base': 0.01, 'retry_max': 0.02, 'max_attempts': 3, 'poll_interval': 0.05}
+        options.update(kwargs)
+        return JobQueue(db_path=self.db_path, **options)
+
+    def test_stages_run_after_their_dependencies_and_see_their_results(self):
+        order = []
+        def stage(name, value, depends=()):
+            def run(context):
+                order.append(name)
+                return {'value': value + sum(context.results[d]['value'] for d in depends)}
+            return Stage(name, run, depends)
+        self.queue.register(Pipeline('sum', [
+            stage('a', 1),
+            stage('b', 10, ('a',)),
+            stage('c', 100, ('a',)),
+            stage('d', 1000, ('b', 'c')),
+        ]))
+        job_id = self.queue.submit('sum')
+        self.assertEqual(self.queue.job(job_id)['status'], 'queued')
+
+        self.assertEqual(self.queue.run_pending(), 4)
+        job = self.queue.job(job_id)
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(order[0], 'a')
+        self.assertEqual(order[-1], 'd')
+        self.assertEqual(job['results']['d']['value'], 1000 + 11 + 101)
+
+    def test_stages_must_depend_on_earlier_stages(self):
+        with self.assertRaises(ValueError):
+            Pipeline('bad', [Stage('a', lambda context: None, ('b',)), Stage('b', lambda context: None)])
+        with self.assertRaises(ValueError):
+            self.queue.submit('unregistered')
+
+    def test_failed_stage_is_retried_with_backoff(self):
+        calls = []
+        def flaky(context):
+            calls.append(context.attempt)
+            if context.attempt < 3:
+                raise RuntimeError("busy")
+            return 'ok'
+        self.queue.register(Pipeline('flaky', [Stage('first', flaky)]))
+        self.queue.start()
+        job = self.queue.wait(self.queue.submit('flaky'), timeout=5)
+
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(calls, [1, 2, 3])
+        self.assertEqual(job['stages'][0]['attempts'], 3)
+        self.assertEqual(self.queue.stats()['stages_retried'], 2)
+
+    def test_exhausted_stage_fails_the_job_and_cancels_the_rest(self):
+        done = []
+        def fail(context):
+            raise RuntimeError("model unavailable")
+        self.queue.register(Pipeline('doomed', [
+            Stage('first', lambda context: done.append('first')),
+            Stage('second', fail, ('first',), max_attempts=2),
+            Stage('third', lambda context: done.append('third'), ('second',)),
+        ]))
+        self.queue.start()
+        job = self.queue.wait(self.queue.submit('doomed'), timeout=5)
+
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['error'], "second: model unavailable")
+        self.assertEqual([s['status'] for s in job['stages']], ['completed', 'failed', 'cancelled'])
+        self.assertEqual(job['stages'][1]['attempts'], 2)
+        self.assertEqual(done, ['first'])
+
+    def test_idempotency_key_returns_the_first_job(self):
+        self.queue.register(Pipeline('once', [Stage('only', lambda context: None)]))
+        first = self.queue.submit('once', idempotency_key='meeting-1')
+        self.assertEqual(self.queue.submit('once', idempotency_key='meeting-1'), first)
+        self.assertNotEqual(self.queue.submit('once', idempotency_key='meeting-2'), first)
+        self.assertEqual(self.queue.stats()['jobs'], {'queued': 2})
+
+    def test_stage_of_a_dead_worker_is_reclaimed_after_its_lease(self):
+        ran = []
+        self.queue.close()
+        self.queue = self.make_queue(lease_seconds=0.05)
+        self.queue.register(Pipeline('leased', [Stage('only', lambda context: ran.append(context.attempt))]))
+        job_id = self.queue.submit('leased')
+        # A worker claims the stage and dies before running it
+        self.assertEqual(len(self.queue._claim()), 1)
+        self.assertEqual(self.queue.run_pending(), 0)
+
+        time.sleep(0.1)
+        self.assertEqual(self.queue.run_pending(), 1)
+        self.assertEqual(ran, [2])
+        self.assertEqual(self.queue.job(job_id)['status'], 'completed')
+
+    def test_jobs_pinned_to_a_worker_only_run_there(self):
+        self.queue.close()
+        self.queue = self.make_queue(worker_id=1)
+        other = self.make_queue(worker_id=2)
+        for queue in (self.queue, other):
+            queue.register(Pipeline('pinned', [Stage('only', lambda context: None)]))
+        job_id = self.queue.submit('pinned', worker=1)
+
+        self.assertEqual(other.run_pending(), 0)
+        self.assertEqual(self.queue.run_pending(), 1)
+        self.assertEqual(self.queue.job(job_id)['status'], 'completed')
+
+    def test_jobs_survive_a_restart(self):
+        self.queue.register(Pipeline('durable', [Stage('only', lambda context: context.payload['n'] * 2)]))
+        job_id = self.queue.submit('durable', {'n': 21})
+        self.queue.close()
+
+        self.queue = self.make_queue()
+        self.queue.register(Pipeline('durable', [Stage('only', lambda context: context.payload['n'] * 2)]))
+        self.queue.start()
+        self.assertEqual(self.queue.wait(job_id, timeout=5)['results'], {'only': 42})
+
+    def test_progress_is_reported_for_each_transition(self):
+        progress = []
+        self.queue.on_progress = lambda job, payload: progress.append((payload['room'], job['status']))
+        self.queue.register(Pipeline('steps', [Stage('a', lambda context: 1), Stage('b', lambda context: 2, ('a',))]))
+        self.queue.submit('steps', {'room': 'room-1'})
+        self.queue.run_pending()
+
+        self.assertEqual(progress[0], ('room-1', 'running'))
+        self.assertEqual(progress[-1], ('room-1', 'completed'))
+        self.assertEqual(sum(1 for _, status in progress if status == 'completed'), 1)
+
+class TestPostMeetingPipeline(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, 'meetings.db')
+        init_db(self.db_path)
+        self.transcribers = {}
+        self.sessions = SessionManager(lambda meeting_id: self.transcribers[meeting_id])
+        self.segment_writer = MagicMock()
+        self.segment_writer.finish.return_value = 7
+        self.outbox = MagicMock()
+        self.outbox.enqueue.side_effect = lambda participants, summary, job_id=None: job_id
+        self.queue = JobQueue(db_path=self.db_path, workers=1, retry_base=0.01, retry_max=0.02, max_attempts=2)
+        self.queue.register(post_meeting_pipeline(self.sessions, self.segment_writer, self.outbox, FakeChatBackend()))
+
+    def tearDown(self):
+        self.queue.close()
+        close_connections()
+        shutil.rmtree(self.test_dir)
+
+    def add_session(self, transcriber, meeting_id='room-1'):
+        transcriber.session_id = f"{meeting_id}-session"
+        transcriber.stop_recording.side_effect = lambda: setattr(transcriber, 'is_recording', False)
+        self.transcribers[meeting_id] = transcriber
+        return self.sessions.get_or_create(meeting_id)
+
+    def test_meeting_is_stopped_summarized_saved_and_emailed(self):
+        transcriber = MagicMock(is_recording=True)
+        transcriber.generate_summary.return_value = "Decisions: ship it."
+        self.add_session(transcriber)
+        job_id = self.queue.submit(POST_MEETING, {'meeting_id': 'room-1', 'participants': ['a@example.com']})
+        self.queue.run_pending()
+
+        job = self.queue.job(job_id)
+        self.assertEqual(job['status'], 'completed')
+        transcriber.stop_recording.assert_called_once()
+        self.segment_writer.finish.assert_called_once_with('room-1', "Decisions: ship it.")
+        self.outbox.enqueue.assert_called_once_with(['a@example.com'], "Decisions: ship it.",
+                                                    job_id=f"{job_id}-email")
+        self.assertEqual(job['results']['summarize']['summary'], "Decisions: ship it.")
+        self.assertEqual(job['results']['save']['saved_meeting_id'], 7)
+        # The saved meeting's session is released
+        self.assertNotIn('room-1', self.sessions)
+        transcriber.close.assert_called_once()
+
+    def test_new_session_in_the_room_is_kept(self):
+        transcriber = MagicMock(is_recording=True)
+        transcriber.generate_summary.return_value = "Summary"
+        self.add_session(transcriber)
+        job_id = self.queue.submit(POST_MEETING, {'meeting_id': 'room-1', 'session_id': 'an-earlier-session'})
+        self.queue.run_pending()
+
+        self.assertEqual(self.queue.job(job_id)['status'], 'completed')
+        self.assertIs(self.sessions.get('room-1'), transcriber)
+
+    def test_summary_is_streamed_to_the_meeting_room(self):
+        streamer = MagicMock()
+        stream = streamer.open.return_value
+        stream.time_to_first_token.return_value = 0.25
+        self.queue.register(post_meeting_pipeline(self.sessions, self.segment_writer, self.outbox,
+                                                  FakeChatBackend(), summary_streamer=streamer))
+        transcriber = MagicMock(is_recording=False)
+        transcriber.generate_summary.return_value = "Streamed summary"
+        self.add_session(transcriber)
+        job_id = self.queue.submit(POST_MEETING, {'meeting_id': 'room-1'})
+        self.queue.run_pending()
+
+        streamer.open.assert_called_once_with('room-1')
+        transcriber.generate_summary.assert_called_once_with(on_token=stream.write, raise_errors=True)
+        stream.finish.assert_called_once_with("Streamed summary")
+        self.assertEqual(self.queue.job(job_id)['results']['summarize']['time_to_first_token_ms'], 250)
+        # Saved once, with the assembled text
+        self.segment_writer.finish.assert_called_once_with('room-1', "Streamed summary")
+
+    def test_summary_error_is_retried_without_stopping_again(self):
+        transcriber = MagicMock(is_recording=True)
+        transcriber.generate_summary.side_effect = [TimeoutError("timeout"), "Summary"]
+        self.add_session(transcriber)
+        job_id = self.queue.submit(POST_MEETING, {'meeting_id': 'room-1'})
+        self.queue.start()
+        job = self.queue.wait(job_id, timeout=5)
+
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['stages'][1]['attempts'], 2)
+        transcriber.stop_recording.assert_called_once()
+        self.outbox.enqueue.assert_not_called()
+
+    def test_lost_session_is_summarized_from_persisted_segments(self):
+        self.segment_writer.recover.return_value = [
+            {'speaker': "Speaker 1", 'text': "We ship on Friday.", 'timestamp': "10:00:00"}
+        ]
+        job_id = self.queue.submit(POST_MEETING, {'meeting_id': 'room-1'})
+        self.queue.run_pending()
+
+        job = self.queue.job(job_id)
+        self.assertEqual(job['status'], 'completed')
+        self.assertTrue(job['results']['summarize']['summary'])
+        self.segment_writer.recover.assert_called_once_with('room-1')
+
+if __name__ == '__main__':
+    unittest.main()
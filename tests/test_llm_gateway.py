@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import openai
+from llm import OpenAIChatBackend
+from metrics import LLM_TOKENS
+from llm_gateway import LLMGateway, CircuitBreaker, CircuitOpenError, LLMUnavailableError, retry_after
+
+MESSAGES = [{'role': 'user', 'content': 'Summarize the meeting'}]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    """Chat completions endpoint that plays back ``server.script``: (status, headers, delay) per request."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        server = self.server
+        with server.lock:
+            status, headers, delay = server.script.pop(0) if server.script else (200, {}, server.delay)
+            server.requests += 1
+            server.peers.add(self.client_address)
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        time.sleep(delay)
+        with server.lock:
+            server.active -= 1
+        if status == 200:
+            body = {'id': 'fake', 'object': 'chat.completion', 'created': 0, 'model': 'fake',
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': f"answer after {delay}"}}]}
+        else:
+            body = {'error': {'code': str(status), 'message': f"status {status}"}}
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_consecutive_failures_and_recovers(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+        for _ in range(2):
+            breaker.record_failure()
+        breaker.record_success()
+        for _ in range(3):
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+
+        # One trial call once the timeout has passed; its failure opens the circuit again
+        clock.now = 10
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+
+        clock.now = 20
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+        self.assertEqual(breaker.opened, 2)
+
+    def test_retry_after_headers(self):
+        self.assertEqual(retry_after(openai.error.RateLimitError("slow down", headers={'Retry-After': '2'})), 2.0)
+        self.assertEqual(retry_after(openai.error.RateLimitError("slow down", headers={'retry-after-ms': '250'})),
+                         0.25)
+        self.assertIsNone(retry_after(openai.error.APIError("boom")))
+
+class TestLLMGateway(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), CompletionHandler)
+        self.server.script = []
+        self.server.delay = 0
+        self.server.requests = 0
+        self.server.peers = set()
+        self.server.active = 0
+        self.server.peak = 0
+        self.server.lock = threading.Lock()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.gateway = self.make_gateway()
+
+    def tearDown(self):
+        self.gateway.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def make_gateway(self, **kwargs):
+        options = {'requests_per_minute': 0, 'tokens_per_minute': 0, 'retry_base': 0.01, 'retry_max': 0.02,
+                   'queue_timeout': 5, 'hedge': False}
+        options.update(kwargs)
+        return LLMGateway(api_key='test', api_base=f"http://127.0.0.1:{self.server.server_port}",
+                          api_version='2023-05-15', **options)
+
+    def complete(self, gateway=None):
+        return OpenAIChatBackend('fake', gateway or self.gateway).complete(MESSAGES)
+
+    def test_connections_are_kept_alive(self):
+        for _ in range(5):
+            self.complete()
+        self.assertEqual(self.server.requests, 5)
+        self.assertEqual(len(self.server.peers), 1)
+
+    def test_token_usage_is_counted(self):
+        prompt, completion = LLM_TOKENS.labels('prompt'), LLM_TOKENS.labels('completion')
+        before = prompt.values()[0], completion.values()[0]
+        self.complete()
+        # The fake service reports no usage, so both are estimated
+        self.assertGreater(prompt.values()[0], before[0])
+        self.assertGreater(completion.values()[0], before[1])
+
+    def test_throttled_request_waits_for_retry_after(self):
+        self.server.script = [(429, {'Retry-After': '0.3'}, 0)]
+        start = time.monotonic()
+        self.assertEqual(self.complete(), "answer after 0")
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+        stats = self.gateway.stats()
+        self.assertEqual((stats['throttled'], stats['retried'], stats['circuit']), (1, 1, 'closed'))
+
+    def test_server_errors_are_retried_then_open_the_circuit(self):
+        self.gateway = self.make_gateway(max_retries=1, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+        self.server.script = [(500, {}, 0), (200, {}, 0)]
+        self.assertEqual(self.complete(), "answer after 0")
+
+        self.server.script = [(500, {}, 0)] * 2
+        with self.assertRaises(openai.error.APIError):
+            self.complete()
+        requests = self.server.requests
+        with self.assertRaises(CircuitOpenError):
+            self.complete()
+        self.assertEqual(self.server.requests, requests)
+        self.assertEqual(self.gateway.stats()['circuit'], 'open')
+
+    def test_client_errors_are_not_retried(self):
+        self.server.script = [(400, {}, 0)]
+        with self.assertRaises(openai.error.InvalidRequestError):
+            self.complete()
+        self.assertEqual(self.server.requests, 1)
+
+    def test_concurrency_is_capped(self):
+        self.gateway = self.make_gateway(max_concurrency=2)
+        self.server.delay = 0.05
+        threads = [threading.Thread(target=self.complete) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.server.requests, 6)
+        self.assertEqual(self.server.peak, 2)
+
+    def test_requests_per_minute_spaces_out_calls(self):
+        # 600 a minute is 10 a second, with a burst of 100 over ten seconds
+        self.gateway = self.make_gateway(requests_per_minute=600)
+        self.gateway.request_bucket.try_acquire(self.gateway.request_bucket.available())
+        start = time.monotonic()
+        for _ in range(3):
+            self.complete()
+        self.assertGreaterEqual(time.monotonic() - start, 0.25)
+
+    def test_tokens_per_minute_refuses_what_cannot_fit_in_time(self):
+        self.gateway = self.make_gateway(tokens_per_minute=6000, queue_timeout=0.05)
+        self.complete()
+        # The prompt plus max_tokens of the first call used up the burst
+        with self.assertRaises(LLMUnavailableError):
+            self.complete()
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.gateway.stats()['circuit'], 'closed')
+
+    def test_slow_request_is_hedged(self):
+        self.gateway = self.make_gateway(hedge=True, hedge_min=0.05)
+        for _ in range(20):
+            self.complete()
+        self.server.script = [(200, {}, 1.0)]
+        start = time.monotonic()
+        self.assertEqual(self.complete(), "answer after 0")
+        self.assertLess(time.monotonic() - start, 0.5)
+        stats = self.gateway.stats()
+        self.assertEqual((stats['hedged'], stats['hedge_wins']), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
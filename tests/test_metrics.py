@@ -0,0 +1,127 @@
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import weakref
+from metrics import Registry, Exporter, merge, render, timed
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_adds_up_every_thread(self):
+        counter = self.registry.counter('calls_total', "Calls", ('kind',))
+        def work():
+            for _ in range(1000):
+                counter.labels('a').inc()
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.labels('b').inc(5)
+
+        samples = dict((tuple(labels), values) for labels, values in self.registry.snapshot()['calls_total']['samples'])
+        self.assertEqual(samples, {('a',): [8000], ('b',): [5]})
+
+    def test_cells_of_finished_threads_are_folded(self):
+        counter = self.registry.counter('calls_total', "Calls")
+        for _ in range(3):
+            thread = threading.Thread(target=counter.inc)
+            thread.start()
+            thread.join()
+        child = counter.labels()
+        # Folded as each thread exits, before anything reads the counter
+        self.assertEqual(len(child._cells._cells), 0)
+        self.assertEqual(child.values(), [3])
+        counter.inc()
+        self.assertEqual(child.values(), [4])
+
+    def test_cells_do_not_keep_finished_threads_alive(self):
+        histogram = self.registry.histogram('latency_seconds', "Latency")
+        thread = threading.Thread(target=histogram.observe, args=(0.5,))
+        thread.start()
+        thread.join()
+        reference = weakref.ref(thread)
+        del thread
+        self.assertIsNone(reference())
+        self.assertEqual(histogram.labels().values()[-1], 0.5)
+
+    def test_histogram_exposition(self):
+        histogram = self.registry.histogram('latency_seconds', "Latency", ('route',), buckets=(0.5, 1))
+        for value in (0.25, 0.5, 0.75, 4):
+            histogram.labels('/a"b').observe(value)
+
+        text = render(merge([(1, self.registry.snapshot(), True)]))
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        self.assertIn('latency_seconds_bucket{route="/a\\"b",le="0.5"} 2', text)
+        self.assertIn('latency_seconds_bucket{route="/a\\"b",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{route="/a\\"b"} 4', text)
+        self.assertIn('latency_seconds_sum{route="/a\\"b"} 5.5', text)
+
+    def test_timed_labels_calls_with_the_function_name(self):
+        histogram = self.registry.histogram('query_seconds', "Queries", ('function',))
+        @timed(histogram)
+        def load_things():
+            """Load the things."""
+            return 42
+        self.assertEqual(load_things(), 42)
+        self.assertEqual(load_things.__doc__, "Load the things.")
+        self.assertEqual(sum(histogram.labels('load_things').values()[:-1]), 1)
+
+    def test_wrong_labels_are_refused(self):
+        counter = self.registry.counter('calls_total', "Calls", ('kind',))
+        with self.assertRaises(ValueError):
+            counter.labels('a', 'b')
+        with self.assertRaises(ValueError):
+            self.registry.counter('calls_total', "Calls again")
+
+class TestExporter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_worker(self, worker_id):
+        registry = Registry()
+        counter = registry.counter('requests_total', "Requests")
+        gauge = registry.gauge('sessions', "Sessions")
+        return Exporter(registry, self.directory, worker_id, interval=60), counter, gauge
+
+    def test_workers_report_each_other(self):
+        first, first_requests, first_sessions = self.make_worker(1)
+        second, second_requests, second_sessions = self.make_worker(2)
+        first_requests.inc(3)
+        first_sessions.set(2)
+        second_requests.inc(4)
+        second_sessions.set_function(lambda: 5)
+        second.write()
+
+        text = first.render()
+        self.assertIn('requests_total 7', text)
+        self.assertIn('sessions{worker="1"} 2', text)
+        self.assertIn('sessions{worker="2"} 5', text)
+
+    def test_stale_gauges_are_left_out(self):
+        first, _, _ = self.make_worker(1)
+        second, second_requests, second_sessions = self.make_worker(2)
+        second_requests.inc(4)
+        second_sessions.set(5)
+        second.write()
+        with open(second.path) as f:
+            data = json.load(f)
+        data['time'] = time.time() - 3600
+        with open(second.path, 'w') as f:
+            json.dump(data, f)
+
+        text = first.render()
+        # What a stopped worker counted still adds up, but its gauges no longer apply
+        self.assertIn('requests_total 4', text)
+        self.assertNotIn('worker="2"', text)
+
+if __name__ == '__main__':
+    unittest.main()
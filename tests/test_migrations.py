@@ -0,0 +1,140 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from database import (
+    init_db,
+    save_meeting,
+    update_meeting_participants,
+    get_connection,
+    close_connections,
+    backfill_normalized_tables,
+    backfill_status,
+    find_meetings_by_participant,
+    get_speaker_segments
+)
+from migrations import LATEST_VERSION, migrate, parse_transcript, participant_emails, schema_version
+
+LIVE_TRANSCRIPT = "\n".join([
+    "[10:00:01] Speaker 1: Welcome everyone.",
+    "[10:00:05] Speaker 2: Thanks, I have the numbers.",
+    "[10:00:09] Speaker 1: Great, go ahead.",
+    "[10:00:15] Speaker 2: Revenue is up.",
+])
+
+def create_legacy_database(path, meetings):
+    """A database as it looked before migrations: meetings with comma-joined participants."""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE meetings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME NOT NULL,
+            transcript TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            participants TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO meetings (timestamp, transcript, summary, participants) VALUES (?, ?, ?, ?)",
+        meetings
+    )
+    conn.commit()
+    conn.close()
+
+class TestParsing(unittest.TestCase):
+    def test_live_and_batch_lines(self):
+        transcript = "[10:00:01] Speaker 3: Hello there\n\n[00:01:05] Offline segment\nloose line"
+        self.assertEqual(parse_transcript(transcript), [
+            (1, 3, '10:00:01', 'Hello there'),
+            (2, None, '00:01:05', 'Offline segment'),
+            (3, None, None, 'loose line'),
+        ])
+
+    def test_participant_emails_are_normalized(self):
+        self.assertEqual(participant_emails("Alice@Example.com, bob@example.com,,alice@example.com"),
+                         ['alice@example.com', 'bob@example.com'])
+        self.assertEqual(participant_emails(["Carol <carol@example.com>"]), ['carol@example.com'])
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, 'meetings.db')
+
+    def tearDown(self):
+        close_connections()
+        shutil.rmtree(self.test_dir)
+
+    def test_new_database_is_at_latest_version(self):
+        init_db(self.db_path)
+        conn = get_connection(self.db_path)
+        self.assertEqual(schema_version(conn), LATEST_VERSION)
+        self.assertEqual(migrate(conn), [])
+        self.assertEqual(backfill_status(self.db_path), {})
+
+    def test_new_meetings_are_normalized_on_write(self):
+        init_db(self.db_path)
+        meeting_id = save_meeting(LIVE_TRANSCRIPT, "Summary", self.db_path)
+        update_meeting_participants(["alice@example.com", "Bob@Example.com"], self.db_path)
+
+        said = get_speaker_segments(2, db_path=self.db_path)
+        self.assertEqual([s['text'] for s in said], ["Thanks, I have the numbers.", "Revenue is up."])
+        self.assertEqual([m['id'] for m in find_meetings_by_participant("bob@example.com", db_path=self.db_path)],
+                         [meeting_id])
+
+        # Changing the participants replaces the rows
+        update_meeting_participants(["carol@example.com"], self.db_path)
+        self.assertEqual(find_meetings_by_participant("bob@example.com", db_path=self.db_path), [])
+
+    def test_legacy_rows_are_backfilled_in_batches(self):
+        create_legacy_database(self.db_path, [
+            ("2025-01-0%d 10:00:00" % (i + 1), LIVE_TRANSCRIPT, "Summary",
+             "alice@example.com,bob@example.com" if i % 2 else "alice@other.org")
+            for i in range(7)
+        ])
+        init_db(self.db_path)
+        self.assertEqual(backfill_status(self.db_path), {1: 7})
+        self.assertEqual(get_speaker_segments(1, db_path=self.db_path), [])
+
+        self.assertEqual(backfill_normalized_tables(self.db_path, batch_size=3), 7)
+        self.assertEqual(backfill_status(self.db_path), {})
+        self.assertEqual(len(get_speaker_segments(1, db_path=self.db_path)), 14)
+        self.assertEqual(len(find_meetings_by_participant("bob@example.com", db_path=self.db_path)), 3)
+        # A bare mailbox matches it at any domain
+        self.assertEqual(len(find_meetings_by_participant("alice@", db_path=self.db_path)), 7)
+        self.assertEqual(len(find_meetings_by_participant("alice", db_path=self.db_path)), 7)
+        self.assertEqual(backfill_normalized_tables(self.db_path), 0)
+
+    def test_interrupted_backfill_resumes(self):
+        create_legacy_database(self.db_path, [("2025-01-01 10:00:00", LIVE_TRANSCRIPT, "S", None)] * 5)
+        init_db(self.db_path)
+        conn = get_connection(self.db_path)
+        with conn:
+            conn.execute("UPDATE migration_backfill SET done = 3")
+        self.assertEqual(backfill_normalized_tables(self.db_path, batch_size=2), 2)
+        self.assertEqual(conn.execute("SELECT COUNT(DISTINCT meeting_id) FROM segments").fetchone()[0], 2)
+
+    def test_queries_use_indexes(self):
+        init_db(self.db_path)
+        conn = get_connection(self.db_path)
+        plans = {
+            'participant': "SELECT meeting_id FROM participants WHERE email >= 'alice@' AND email < 'aliceA'",
+            'speaker': "SELECT meeting_id, seq, text FROM segments WHERE speaker_id = 2 ORDER BY meeting_id, seq",
+        }
+        for name, sql in plans.items():
+            plan = " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall())
+            self.assertIn("USING", plan, name)
+            self.assertNotIn("TEMP B-TREE", plan, name)
+
+    def test_deleting_a_meeting_removes_its_rows(self):
+        init_db(self.db_path)
+        meeting_id = save_meeting(LIVE_TRANSCRIPT, "Summary", self.db_path)
+        update_meeting_participants(["alice@example.com"], self.db_path)
+        conn = get_connection(self.db_path)
+        with conn:
+            conn.execute("DELETE FROM meetings WHERE id = ?", (meeting_id,))
+        self.assertEqual(get_speaker_segments(1, db_path=self.db_path), [])
+        self.assertEqual(find_meetings_by_participant("alice@example.com", db_path=self.db_path), [])
+
+if __name__ == '__main__':
+    unittest.main()
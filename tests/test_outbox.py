@@ -0,0 +1,287 @@
+import os
+import shutil
+import smtplib
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from email_service import personalize_summary, recipient_name
+from database import close_connections
+from outbox import EmailOutbox, SMTPConnectionPool, backoff_delay, is_permanent
+from ratelimit import TokenBucket
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+class FakeSMTPServer:
+    """Records what pooled connections do; ``failures`` are raised by the next sends."""
+
+    def __init__(self):
+        self.connections = 0
+        self.logins = 0
+        self.messages = []
+        self.failures = []
+        self.lock = threading.Lock()
+
+    def factory(self, host, port, timeout=None):
+        with self.lock:
+            self.connections += 1
+        return FakeSMTP(self)
+
+class FakeSMTP:
+    def __init__(self, server):
+        self.server = server
+        self.open = True
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        self.server.logins += 1
+
+    def send_message(self, msg):
+        if not self.open:
+            raise smtplib.SMTPServerDisconnected("closed")
+        with self.server.lock:
+            failure = self.server.failures.pop(0) if self.server.failures else None
+            if failure is None:
+                self.server.messages.append(msg)
+        if failure is not None:
+            if isinstance(failure, smtplib.SMTPServerDisconnected):
+                self.open = False
+            raise failure
+
+    def noop(self):
+        return (250, b'OK') if self.open else (421, b'closed')
+
+    def rset(self):
+        pass
+
+    def quit(self):
+        self.open = False
+
+    def close(self):
+        self.open = False
+
+class TestPersonalization(unittest.TestCase):
+    def test_names_come_from_display_name_or_address(self):
+        self.assertEqual(recipient_name("Ada Lovelace <ada@example.com>"), "Ada Lovelace")
+        self.assertEqual(recipient_name("grace.hopper@example.com"), "Grace Hopper")
+
+    def test_summary_is_addressed_to_the_recipient(self):
+        body = personalize_summary("bob@example.com", "Decisions: ship it.")
+        self.assertTrue(body.startswith("Hi Bob,"))
+        self.assertIn("Decisions: ship it.", body)
+
+class TestBackoff(unittest.TestCase):
+    def test_delay_doubles_and_is_capped(self):
+        for attempt, ceiling in ((1, 10), (2, 20), (3, 40), (10, 100)):
+            delay = backoff_delay(attempt, base=10, maximum=100)
+            self.assertGreaterEqual(delay, ceiling / 2)
+            self.assertLessEqual(delay, ceiling)
+
+    def test_permanent_errors(self):
+        self.assertTrue(is_permanent(smtplib.SMTPRecipientsRefused({'x@example.com': (550, b'no')})))
+        self.assertTrue(is_permanent(smtplib.SMTPDataError(554, b'rejected')))
+        self.assertFalse(is_permanent(smtplib.SMTPDataError(451, b'try later')))
+        self.assertFalse(is_permanent(smtplib.SMTPAuthenticationError(535, b'bad credentials')))
+        self.assertFalse(is_permanent(smtplib.SMTPServerDisconnected("gone")))
+
+class TestSMTPConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeSMTPServer()
+        self.pool = SMTPConnectionPool('smtp.example.com', 587, 'user', 'secret', size=2,
+                                       factory=self.server.factory)
+
+    def test_connections_are_reused(self):
+        for _ in range(5):
+            with self.pool.connection() as smtp:
+                smtp.send_message("message")
+        self.assertEqual((self.server.connections, self.server.logins), (1, 1))
+        self.assertEqual(self.pool.stats()['reused'], 4)
+
+    def test_dropped_connection_is_replaced(self):
+        self.server.failures.append(smtplib.SMTPServerDisconnected("dropped"))
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            with self.pool.connection() as smtp:
+                smtp.send_message("message")
+        with self.pool.connection() as smtp:
+            smtp.send_message("message")
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(self.pool.stats()['discarded'], 1)
+
+    def test_stale_idle_connection_is_probed(self):
+        self.pool.idle_check = 0
+        with self.pool.connection() as smtp:
+            smtp.open = False  # the server timed the idle session out
+        with self.pool.connection() as smtp:
+            self.assertTrue(smtp.open)
+        self.assertEqual(self.server.connections, 2)
+
+class TestEmailOutbox(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, 'meetings.db')
+        self.server = FakeSMTPServer()
+        self.outbox = self.make_outbox()
+
+    def tearDown(self):
+        self.outbox.close()
+        close_connections()
+        shutil.rmtree(self.test_dir)
+
+    def make_outbox(self, **kwargs):
+        pool = SMTPConnectionPool('smtp.example.com', 587, 'user', 'secret', size=2, factory=self.server.factory)
+        options = {'workers': 2, 'retry_base': 0.05, 'retry_max': 0.2, 'max_attempts': 3,
+                   'rate_limiter': TokenBucket(1000, capacity=100)}
+        options.update(kwargs)
+        return EmailOutbox(pool, db_path=self.db_path, sender='assistant@example.com', **options)
+
+    def test_enqueue_returns_before_sending(self):
+        job_id = self.outbox.enqueue(["a@example.com", "b@example.com"], "Summary")
+        self.assertEqual(self.outbox.job(job_id)['status'], 'queued')
+        self.assertEqual(self.server.messages, [])
+
+    def test_enqueue_with_a_job_id_is_idempotent(self):
+        self.assertEqual(self.outbox.enqueue(["a@example.com"], "Summary", job_id='meeting-1-email'), 'meeting-1-email')
+        self.outbox.enqueue(["a@example.com"], "Summary", job_id='meeting-1-email')
+        self.assertEqual(self.outbox.job('meeting-1-email')['total'], 1)
+
+    def test_each_participant_gets_a_personal_message(self):
+        self.outbox.start()
+        job_id = self.outbox.enqueue(["Ann <ann@example.com>", "bo@example.com"], "Summary text")
+        job = self.outbox.wait(job_id, timeout=5)
+
+        self.assertEqual((job['status'], job['sent']), ('completed', 2))
+        by_recipient = {msg['To']: msg for msg in self.server.messages}
+        self.assertEqual(set(by_recipient), {"Ann <ann@example.com>", "bo@example.com"})
+        self.assertIn("Hi Ann,", by_recipient["Ann <ann@example.com>"].get_payload()[0].get_payload())
+        # Both messages went over at most two pooled connections
+        self.assertLessEqual(self.server.connections, 2)
+
+    def test_transient_failures_are_retried(self):
+        self.server.failures = [smtplib.SMTPDataError(451, b'try later'), smtplib.SMTPServerDisconnected("gone")]
+        self.outbox.start()
+        job = self.outbox.wait(self.outbox.enqueue(["a@example.com"], "Summary"), timeout=5)
+
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['messages'][0]['attempts'], 3)
+        self.assertEqual(self.outbox.stats()['retried'], 2)
+
+    def test_gives_up_after_max_attempts(self):
+        self.server.failures = [smtplib.SMTPDataError(451, b'try later')] * 3
+        self.outbox.start()
+        job = self.outbox.wait(self.outbox.enqueue(["a@example.com"], "Summary"), timeout=5)
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['messages'][0]['attempts'], 3)
+        self.assertIn('try later', job['messages'][0]['error'])
+
+    def test_permanent_failure_is_not_retried(self):
+        self.server.failures = [smtplib.SMTPRecipientsRefused({'a@example.com': (550, b'no such user')})]
+        self.outbox.start()
+        job = self.outbox.wait(self.outbox.enqueue(["a@example.com", "b@example.com"], "Summary"), timeout=5)
+        self.assertEqual(job['status'], 'partial')
+        self.assertEqual(sorted(m['attempts'] for m in job['messages']), [1, 1])
+
+    def test_queued_messages_survive_a_restart(self):
+        job_id = self.outbox.enqueue(["a@example.com"], "Summary")
+        self.outbox.close()
+
+        self.outbox = self.make_outbox()
+        self.outbox.start()
+        self.assertEqual(self.outbox.wait(job_id, timeout=5)['status'], 'completed')
+
+    def test_rate_limit_spaces_out_sends(self):
+        self.outbox.close()
+        self.outbox = self.make_outbox(workers=2, rate_limiter=TokenBucket(20, capacity=1))
+        self.outbox.start()
+        start = time.monotonic()
+        self.outbox.wait(self.outbox.enqueue([f"p{i}@example.com" for i in range(5)], "Summary"), timeout=5)
+        # One token up front, then one every 50 ms
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+    def test_database_error_while_sending_is_retried_after_the_lease(self):
+        self.outbox.close()
+        self.outbox = self.make_outbox(workers=1)
+        send = self.outbox._send
+        calls = []
+        def flaky_send(message):
+            calls.append(message.id)
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            send(message)
+        self.outbox._send = flaky_send
+        with patch('outbox.LEASE_SECONDS', 0.1):
+            self.outbox.start()
+            job = self.outbox.wait(self.outbox.enqueue(["a@example.com"], "Summary"), timeout=5)
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(len(calls), 2)
+
+    def test_sender_that_lost_its_lease_cannot_overwrite_the_outcome(self):
+        job_id = self.outbox.enqueue(["a@example.com"], "Summary")
+        with patch('outbox.LEASE_SECONDS', 0):
+            stale, = self.outbox._claim()
+        current, = self.outbox._claim()
+        self.assertEqual((stale.attempt, current.attempt), (1, 2))
+
+        # The stale sender's failure lands after the current attempt has started
+        self.outbox._record_failure(stale, smtplib.SMTPDataError(550, b"Mailbox unavailable"))
+        self.assertEqual(self.outbox.job(job_id)['messages'][0]['status'], 'sending')
+        self.outbox._send(current)
+        job = self.outbox.job(job_id)
+        self.assertEqual((job['status'], job['messages'][0]['attempts']), ('completed', 2))
+
+    def test_unknown_job(self):
+        self.assertIsNone(self.outbox.job('missing'))
+
+    def test_enqueue_validates_input(self):
+        with self.assertRaises(ValueError):
+            self.outbox.enqueue([], "Summary")
+        with self.assertRaises(ValueError):
+            self.outbox.enqueue(["a@example.com"], "")
+
+@unittest.skipIf(Controller is None, "aiosmtpd is not installed")
+class TestOutboxAgainstLocalSMTP(unittest.TestCase):
+    def setUp(self):
+        self.received = []
+
+        received = self.received
+
+        class Handler:
+            async def handle_DATA(self, server, session, envelope):
+                received.append(envelope)
+                return '250 Message accepted for delivery'
+
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        self.controller = Controller(Handler(), hostname='127.0.0.1', port=port)
+        self.controller.start()
+        self.test_dir = tempfile.mkdtemp()
+        pool = SMTPConnectionPool('127.0.0.1', port, username=None, starttls=False, size=1)
+        self.outbox = EmailOutbox(pool, db_path=os.path.join(self.test_dir, 'meetings.db'),
+                                  sender='assistant@example.com', workers=1,
+                                  rate_limiter=TokenBucket(1000, capacity=100))
+
+    def tearDown(self):
+        self.outbox.close()
+        self.controller.stop()
+        close_connections()
+        shutil.rmtree(self.test_dir)
+
+    def test_messages_are_delivered_over_one_connection(self):
+        self.outbox.start()
+        recipients = [f"p{i}@example.com" for i in range(3)]
+        job = self.outbox.wait(self.outbox.enqueue(recipients, "Summary"), timeout=10)
+
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(sorted(e.rcpt_tos[0] for e in self.received), recipients)
+        self.assertEqual(self.outbox.pool.stats()['opened'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
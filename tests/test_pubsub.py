@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+import unittest
+import socketio
+from flask import Flask
+from flask_socketio import SocketIO, join_room
+from werkzeug.serving import make_server
+from pubsub import InProcessBroker, InProcessManager, make_client_manager
+
+class Worker:
+    """A Flask-SocketIO server on a local port, relaying through ``broker``.
+
+    The Socket.IO test client refuses message queues, so these tests use
+    real servers and clients over HTTP long-polling.
+    """
+
+    def __init__(self, broker):
+        self.app = Flask(__name__)
+        self.socketio = SocketIO(self.app, async_mode='threading',
+                                 client_manager=InProcessManager(broker, channel='test'))
+
+        @self.socketio.on('join_meeting')
+        def on_join(data):
+            join_room(data['meeting_id'])
+            return True
+
+        self.server = make_server('127.0.0.1', 0, self.app, threaded=True)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.socketio.server.manager.close()
+
+class Listener:
+    def __init__(self, worker, meeting_id):
+        self.received = []
+        self.client = socketio.Client()
+        self.client.on('transcript_batch', self.received.append)
+        self.client.connect(worker.url, transports=['polling'])
+        self.client.call('join_meeting', {'meeting_id': meeting_id}, timeout=5)
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.time() + timeout
+        while len(self.received) < count and time.time() < deadline:
+            time.sleep(0.01)
+        return self.received
+
+class TestInProcessManager(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.INFO)
+        self.broker = InProcessBroker()
+        self.workers = [Worker(self.broker) for _ in range(2)]
+        self.listeners = []
+
+    def tearDown(self):
+        for listener in self.listeners:
+            listener.client.disconnect()
+        for worker in self.workers:
+            worker.close()
+        logging.disable(logging.NOTSET)
+
+    def listen(self, worker, meeting_id):
+        listener = Listener(self.workers[worker], meeting_id)
+        self.listeners.append(listener)
+        return listener
+
+    def test_room_event_reaches_clients_on_other_workers(self):
+        local = self.listen(0, 'abc.1')
+        remote = self.listen(1, 'abc.1')
+
+        self.workers[0].socketio.emit('transcript_batch', {'entries': ['hello']}, to='abc.1')
+
+        for listener in (local, remote):
+            self.assertEqual(listener.wait_for(1), [{'entries': ['hello']}])
+
+    def test_other_rooms_are_not_reached(self):
+        other = self.listen(1, 'xyz.1')
+        self.workers[0].socketio.emit('transcript_batch', {'entries': []}, to='abc.1')
+        self.assertEqual(other.wait_for(1, timeout=0.3), [])
+
+    def test_closed_subscription_stops_receiving(self):
+        local = self.listen(0, 'abc.1')
+        remote = self.listen(1, 'abc.1')
+        self.workers[1].socketio.server.manager.close()
+
+        self.workers[0].socketio.emit('transcript_batch', {'entries': []}, to='abc.1')
+        self.assertEqual(len(local.wait_for(1)), 1)
+        self.assertEqual(remote.wait_for(1, timeout=0.3), [])
+
+class TestClientManagerFactory(unittest.TestCase):
+    def test_no_url_keeps_events_local(self):
+        self.assertIsNone(make_client_manager(None))
+        self.assertIsNone(make_client_manager(''))
+
+    def test_memory_url_uses_in_process_broker(self):
+        manager = make_client_manager('memory://', channel='meetings')
+        self.assertIsInstance(manager, InProcessManager)
+        self.assertEqual(manager.channel, 'meetings')
+
+    def test_unsupported_url_is_rejected(self):
+        for url in ('amqp://guest@localhost//', 'localhost:6379'):
+            with self.assertRaises(ValueError):
+                make_client_manager(url)
@@ -0,0 +1,71 @@
+import threading
+import time
+import unittest
+from ratelimit import TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestTokenBucket(unittest.TestCase):
+    def test_bucket_starts_full_and_refills(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=3, clock=clock)
+        self.assertEqual([bucket.try_acquire() for _ in range(4)], [True, True, True, False])
+        clock.now = 0.5
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+
+    def test_refill_is_capped_at_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=5, clock=clock)
+        bucket.try_acquire(5)
+        clock.now = 100
+        self.assertEqual(bucket.available(), 5)
+
+    def test_delay_reports_wait(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=4, capacity=4, clock=clock)
+        bucket.try_acquire(4)
+        self.assertAlmostEqual(bucket.delay(2), 0.5)
+
+    def test_acquire_blocks_until_tokens_arrive(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_acquire_times_out(self):
+        bucket = TokenBucket(rate=1, capacity=1)
+        bucket.acquire()
+        self.assertFalse(bucket.acquire(timeout=0.05))
+
+    def test_rate_holds_across_threads(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        acquired = []
+
+        def worker():
+            for _ in range(5):
+                bucket.acquire()
+                acquired.append(time.monotonic())
+
+        start = time.monotonic()
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 20 tokens at 100/s with one up front take at least 0.19 s
+        self.assertEqual(len(acquired), 20)
+        self.assertGreaterEqual(max(acquired) - start, 0.17)
+
+    def test_oversized_request_is_rejected(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=1, capacity=2).acquire(3)
+
+if __name__ == '__main__':
+    unittest.main()
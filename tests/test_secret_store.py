@@ -0,0 +1,138 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from secret_store import SecretStore, LocalSecretBackend, KeyVaultSecretBackend, OPENAI_SECRET_NAMES
+
+TEST_SECRETS = {
+    'openai-api-key': 'test_key',
+    'openai-api-base': 'https://test.openai.azure.com',
+    'openai-api-version': '2023-05-15',
+    'openai-api-type': 'azure',
+}
+
+class TestSecretStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.test_dir, 'secrets.cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_load_fetches_all_secrets_in_parallel(self):
+        """Four secrets with a 0.2 s round trip each load in about one round trip."""
+        backend = LocalSecretBackend(TEST_SECRETS, delay=0.2)
+        store = SecretStore(backend, OPENAI_SECRET_NAMES)
+
+        start = time.perf_counter()
+        store.load()
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(backend.calls, 4)
+        self.assertEqual(store.get('openai-api-key'), 'test_key')
+        self.assertEqual(store.get('openai-api-type'), 'azure')
+
+    def test_missing_secret_raises(self):
+        """A secret the backend does not have fails the initial load."""
+        backend = LocalSecretBackend({'openai-api-key': 'test_key'})
+        store = SecretStore(backend, OPENAI_SECRET_NAMES)
+        with self.assertRaises(KeyError):
+            store.load()
+
+    def test_key_vault_backend(self):
+        """The Key Vault backend returns the secret's value."""
+        secret_client = MagicMock()
+        secret_client.get_secret.return_value.value = 'vault_value'
+        backend = KeyVaultSecretBackend(secret_client)
+        self.assertEqual(backend.get_secret('openai-api-key'), 'vault_value')
+        secret_client.get_secret.assert_called_once_with('openai-api-key')
+
+    def test_background_refresh_before_expiry(self):
+        """The refresh thread picks up new values before the TTL runs out."""
+        backend = LocalSecretBackend(TEST_SECRETS)
+        refreshed = []
+        store = SecretStore(backend, OPENAI_SECRET_NAMES, ttl=0.4, refresh_margin=0.2,
+                            on_refresh=lambda s: refreshed.append(s.get('openai-api-key')))
+        store.load()
+        backend.values['openai-api-key'] = 'rotated_key'
+        store.start_refresh()
+        try:
+            deadline = time.time() + 2
+            while store.get('openai-api-key') != 'rotated_key' and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            store.stop_refresh()
+
+        self.assertEqual(store.get('openai-api-key'), 'rotated_key')
+        self.assertEqual(refreshed[0], 'test_key')
+        self.assertIn('rotated_key', refreshed)
+
+    def test_failed_refresh_keeps_cached_values(self):
+        """Requests keep getting the last known values while the vault is down."""
+        backend = LocalSecretBackend(TEST_SECRETS)
+        store = SecretStore(backend, OPENAI_SECRET_NAMES, ttl=0.2, refresh_margin=0.1)
+        store.load()
+        backend.values = {}
+        store.start_refresh()
+        try:
+            time.sleep(0.4)
+            self.assertEqual(store.get('openai-api-key'), 'test_key')
+        finally:
+            store.stop_refresh()
+
+    def test_refresh_loop_recovers_from_a_failed_load(self):
+        """Secrets arrive in the background once the vault comes back after a failed first load."""
+        backend = LocalSecretBackend({})
+        store = SecretStore(backend, OPENAI_SECRET_NAMES, ttl=60, refresh_margin=10)
+        with self.assertRaises(KeyError):
+            store.load()
+        store.start_refresh()
+        try:
+            backend.values = dict(TEST_SECRETS)
+            deadline = time.time() + 3
+            while store.get('openai-api-key') is None and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            store.stop_refresh()
+
+        self.assertEqual(store.get('openai-api-key'), 'test_key')
+
+    def test_encrypted_file_cache_skips_backend(self):
+        """A warm restart reads the encrypted cache file instead of the vault."""
+        try:
+            from cryptography.fernet import Fernet
+        except ImportError:
+            self.skipTest("cryptography is not installed")
+        key = Fernet.generate_key()
+
+        first = SecretStore(LocalSecretBackend(TEST_SECRETS), OPENAI_SECRET_NAMES,
+                            cache_path=self.cache_path, cache_key=key)
+        first.load()
+        with open(self.cache_path, 'rb') as f:
+            self.assertNotIn(b'test_key', f.read())
+
+        backend = LocalSecretBackend(TEST_SECRETS)
+        second = SecretStore(backend, OPENAI_SECRET_NAMES, cache_path=self.cache_path, cache_key=key)
+        second.load()
+        self.assertEqual(backend.calls, 0)
+        self.assertEqual(second.get('openai-api-base'), 'https://test.openai.azure.com')
+
+    def test_file_cache_with_wrong_key_falls_back_to_backend(self):
+        """A cache written with another key is ignored."""
+        try:
+            from cryptography.fernet import Fernet
+        except ImportError:
+            self.skipTest("cryptography is not installed")
+        SecretStore(LocalSecretBackend(TEST_SECRETS), OPENAI_SECRET_NAMES,
+                    cache_path=self.cache_path, cache_key=Fernet.generate_key()).load()
+
+        backend = LocalSecretBackend(TEST_SECRETS)
+        SecretStore(backend, OPENAI_SECRET_NAMES, cache_path=self.cache_path,
+                    cache_key=Fernet.generate_key()).load()
+        self.assertEqual(backend.calls, 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import MagicMock
+from llm import FakeChatBackend
+from segment_store import Segment, SegmentStore
+from transcriber import MeetingTranscriber
+
+def fill(store, count, start=1):
+    for seq in range(start, start + count):
+        store.append(seq, seq % 3 + 1, f"Speaker {seq % 3 + 1}", "10:00:00", f"Line number {seq}")
+
+class TestSegment(unittest.TestCase):
+    def test_fields_are_slices_of_the_formatted_line(self):
+        segment = Segment(7, 2, "Speaker 2", "10:02:11", "Let's ship it")
+        self.assertEqual(segment.line, "[10:02:11] Speaker 2: Let's ship it")
+        self.assertEqual((segment.text, segment.timestamp), ("Let's ship it", "10:02:11"))
+        self.assertEqual(segment.as_entry()['seq'], 7)
+        self.assertFalse(hasattr(segment, '__dict__'))
+
+    def test_speaker_labels_are_interned(self):
+        first = Segment(1, 1, "".join(["Speaker ", "1"]), "10:00:00", "a")
+        second = Segment(2, 1, "".join(["Speaker ", "1"]), "10:00:01", "b")
+        self.assertIs(first.speaker, second.speaker)
+
+class TestSegmentStore(unittest.TestCase):
+    def test_small_transcript_stays_in_memory(self):
+        store = SegmentStore(memory_budget=1024 * 1024, max_segments=None)
+        fill(store, 3)
+        self.assertEqual(store.stats()['spilled'], 0)
+        self.assertEqual(store.formatted().splitlines()[0], "[10:00:00] Speaker 2: Line number 1")
+        store.close()
+
+    def test_old_segments_spill_past_the_budget(self):
+        store = SegmentStore(memory_budget=4096, max_segments=None)
+        fill(store, 200)
+        stats = store.stats()
+        self.assertGreater(stats['spilled'], 0)
+        self.assertLessEqual(stats['memory_bytes'], 4096)
+        self.assertEqual(len(store), 200)
+
+        # Nothing is lost: the transcript is rebuilt from disk plus memory
+        lines = store.formatted().split("\n")
+        self.assertEqual(len(lines), 200)
+        self.assertTrue(lines[0].endswith("Line number 1"))
+        self.assertTrue(lines[-1].endswith("Line number 200"))
+        store.close()
+
+    def test_entry_cap_also_spills(self):
+        store = SegmentStore(memory_budget=None, max_segments=10)
+        fill(store, 25)
+        self.assertLessEqual(store.stats()['in_memory'], 10)
+        self.assertEqual([e['seq'] for e in store.since(23)], [24, 25])
+        self.assertEqual(len(store.formatted().split("\n")), 25)
+        store.close()
+
+    def test_appending_after_reading_continues_the_transcript(self):
+        store = SegmentStore(memory_budget=None, max_segments=5)
+        fill(store, 8)
+        store.formatted()
+        fill(store, 8, start=9)
+        lines = store.formatted().split("\n")
+        self.assertEqual([line.rsplit(" ", 1)[1] for line in lines], [str(i) for i in range(1, 17)])
+        store.close()
+
+    def test_newlines_cannot_split_an_entry(self):
+        store = SegmentStore()
+        store.append(1, 1, "Speaker 1", "10:00:00", "two\nlines")
+        self.assertEqual(store.formatted(), "[10:00:00] Speaker 1: two lines")
+
+class TestTranscriberStorage(unittest.TestCase):
+    def test_long_meeting_keeps_full_transcript_within_budget(self):
+        transcriber = MeetingTranscriber(MagicMock(), llm=FakeChatBackend(), summarizer=False,
+                                         interim_results=False, memory_budget=8192)
+        for i in range(500):
+            transcriber.add_entry(f"Utterance {i}")
+        stats = transcriber.segments.stats()
+        self.assertLessEqual(stats['memory_bytes'], 8192)
+        self.assertEqual(stats['segments'], 500)
+        self.assertEqual(len(transcriber.segments.formatted().split("\n")), 500)
+        self.assertEqual(transcriber.transcript[-1], "Utterance 499")
+        transcriber.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock
+from database import init_db, get_connection, get_meeting, close_connections, get_speaker_segments
+from emitter import TranscriptEmitter
+from llm import FakeChatBackend
+from segment_writer import SegmentWriter
+from transcriber import MeetingTranscriber
+
+def entry(seq, text, speaker_id=1):
+    return {'text': text, 'speaker': f"Speaker {speaker_id}", 'timestamp': f"10:00:{seq:02d}",
+            'speaker_id': speaker_id, 'utterance_id': seq}
+
+class TestSegmentWriter(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, 'meetings.db')
+        init_db(self.db_path)
+        self.writer = SegmentWriter(self.db_path, batch_size=5, interval=0.05)
+
+    def tearDown(self):
+        self.writer.close()
+        close_connections()
+        shutil.rmtree(self.test_dir)
+
+    def live_count(self, room='room-1'):
+        return get_connection(self.db_path).execute(
+            "SELECT COUNT(*) FROM live_segments WHERE room = ?", (room,)).fetchone()[0]
+
+    def wait_for(self, count, timeout=2):
+        deadline = time.time() + timeout
+        while self.live_count() < count and time.time() < deadline:
+            time.sleep(0.005)
+        return self.live_count()
+
+    def test_append_only_queues(self):
+        self.writer.append('room-1', entry(1, "hello"))
+        self.assertEqual(self.live_count(), 0)
+        self.assertTrue(self.writer.flush())
+        self.assertEqual(self.live_count(), 1)
+
+    def test_full_batches_are_written_together(self):
+        self.writer.interval = 10
+        self.writer.start()
+        for seq in range(1, 11):
+            self.writer.append('room-1', entry(seq, f"line {seq}"))
+        self.assertEqual(self.wait_for(10), 10)
+        self.assertEqual(self.writer.stats()['batches_written'], 2)
+
+    def test_partial_batch_is_written_after_interval(self):
+        self.writer.start()
+        self.writer.append('room-1', entry(1, "only line"))
+        self.assertEqual(self.wait_for(1), 1)
+
+    def test_recover_returns_entries_in_order(self):
+        self.writer.start()
+        for seq in (1, 2, 3):
+            self.writer.append('room-1', entry(seq, f"line {seq}", speaker_id=seq))
+        self.writer.append('room-2', entry(1, "elsewhere"))
+
+        recovered = self.writer.recover('room-1')
+        self.assertEqual([e['text'] for e in recovered], ["line 1", "line 2", "line 3"])
+        self.assertEqual(recovered[-1]['speaker'], "Speaker 3")
+        self.assertEqual(recovered[-1]['seq'], 3)
+        self.assertEqual({m['meeting_id']: m['last_seq'] for m in self.writer.unfinished()},
+                         {'room-1': 3, 'room-2': 1})
+
+    def test_finish_saves_the_meeting(self):
+        self.writer.start()
+        self.writer.append('room-1', entry(1, "Welcome", speaker_id=1))
+        self.writer.append('room-1', entry(2, "Thanks", speaker_id=2))
+
+        meeting_id = self.writer.finish('room-1', "Short meeting")
+        meeting = get_meeting(meeting_id, self.db_path)
+        self.assertEqual(meeting['transcript'], "[10:00:01] Speaker 1: Welcome\n[10:00:02] Speaker 2: Thanks")
+        self.assertEqual(meeting['summary'], "Short meeting")
+        self.assertEqual([s['text'] for s in get_speaker_segments(2, db_path=self.db_path)], ["Thanks"])
+        self.assertEqual(self.live_count(), 0)
+        self.assertIsNone(self.writer.finish('room-1', "Again"))
+
+    def test_failed_write_is_retried(self):
+        conn = get_connection(self.db_path)
+        with conn:
+            conn.execute("ALTER TABLE live_segments RENAME TO live_segments_moved")
+        self.writer.append('room-1', entry(1, "kept"))
+        self.assertFalse(self.writer.flush())
+        self.assertEqual(self.writer.stats()['pending_retry'], 1)
+
+        with conn:
+            conn.execute("ALTER TABLE live_segments_moved RENAME TO live_segments")
+        self.assertTrue(self.writer.flush())
+        self.assertEqual(self.live_count(), 1)
+
+class TestMeetingRecovery(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, 'meetings.db')
+        init_db(self.db_path)
+
+    def tearDown(self):
+        close_connections()
+        shutil.rmtree(self.test_dir)
+
+    def make_transcriber(self, writer, emitter=None):
+        return MeetingTranscriber(MagicMock(), meeting_id='room-1', llm=FakeChatBackend(), summarizer=False,
+                                  interim_results=False, emitter=emitter, segment_writer=writer)
+
+    def test_restarted_worker_resumes_the_meeting(self):
+        writer = SegmentWriter(self.db_path, batch_size=2, interval=0.05)
+        writer.start()
+        transcriber = self.make_transcriber(writer)
+        for text in ("First point", "Second point", "Third point"):
+            transcriber.add_entry(text)
+        # The worker dies: nothing is finished, only what the writer committed survives
+        writer.close()
+
+        emitter = TranscriptEmitter(MagicMock(), window=0)
+        resumed = self.make_transcriber(SegmentWriter(self.db_path), emitter=emitter)
+        self.assertEqual(resumed.recovered_entries, 3)
+        self.assertEqual(resumed.transcript, ["First point", "Second point", "Third point"])
+        self.assertEqual(emitter.last_seq('room-1'), 3)
+
+        # New entries continue the numbering
+        self.assertEqual(resumed.add_entry("Fourth point")['utterance_id'], 4)
+        self.assertEqual(emitter.last_seq('room-1'), 4)
+
+if __name__ == '__main__':
+    unittest.main()
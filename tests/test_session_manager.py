@@ -0,0 +1,78 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+from session_manager import SessionManager, SessionLimitError
+
+def make_session(meeting_id):
+    session = MagicMock()
+    session.meeting_id = meeting_id
+    session.is_recording = False
+    session.last_activity = time.time()
+    session.segments = []
+    return session
+
+class TestSessionManager(unittest.TestCase):
+    def setUp(self):
+        self.factory = MagicMock(side_effect=make_session)
+        self.manager = SessionManager(self.factory, max_sessions=3, idle_timeout=60)
+
+    def test_get_or_create_reuses_session(self):
+        """The same meeting ID always maps to the same session."""
+        first = self.manager.get_or_create('meeting-1')
+        second = self.manager.get_or_create('meeting-1')
+        self.assertIs(first, second)
+        self.factory.assert_called_once_with('meeting-1')
+
+    def test_sessions_are_isolated(self):
+        """Different meetings get independent sessions."""
+        first = self.manager.get_or_create('meeting-1')
+        second = self.manager.get_or_create('meeting-2')
+        self.assertIsNot(first, second)
+        self.assertEqual(len(self.manager), 2)
+        self.assertIsNone(self.manager.get('meeting-3'))
+
+    def test_session_cap(self):
+        """Creating more sessions than the cap raises SessionLimitError."""
+        for i in range(3):
+            self.manager.get_or_create(f'meeting-{i}')
+        with self.assertRaises(SessionLimitError):
+            self.manager.get_or_create('meeting-overflow')
+
+    def test_cap_evicts_idle_sessions_first(self):
+        """An idle session makes room for a new meeting at the cap."""
+        for i in range(3):
+            self.manager.get_or_create(f'meeting-{i}')
+        self.manager.get('meeting-0').last_activity = time.time() - 120
+
+        self.manager.get_or_create('meeting-new')
+        self.assertNotIn('meeting-0', self.manager)
+        self.assertIn('meeting-new', self.manager)
+
+    def test_evict_idle_stops_recording(self):
+        """Evicting an idle recording session stops its recognizer."""
+        session = self.manager.get_or_create('meeting-1')
+        session.is_recording = True
+        self.manager.get_or_create('meeting-2')
+
+        evicted = self.manager.evict_idle(now=time.time() + 120)
+        self.assertEqual(sorted(evicted), ['meeting-1', 'meeting-2'])
+        session.stop_recording.assert_called_once()
+        self.assertEqual(len(self.manager), 0)
+
+    def test_remove(self):
+        """Removing a session forgets it."""
+        session = self.manager.get_or_create('meeting-1')
+        self.assertIs(self.manager.remove('meeting-1'), session)
+        self.assertIsNone(self.manager.remove('meeting-1'))
+        self.assertNotIn('meeting-1', self.manager)
+
+    def test_stats(self):
+        """Stats report each active session."""
+        self.manager.get_or_create('meeting-1')
+        stats = self.manager.stats()
+        self.assertEqual(stats['active'], 1)
+        self.assertEqual(stats['max_sessions'], 3)
+        self.assertIn('meeting-1', stats['sessions'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,268 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from llm import FakeChatBackend, OpenAIChatBackend
+from llm_gateway import LLMGateway
+from summarizer import (
+    RollingSummarizer,
+    NOTES_SYSTEM_PROMPT,
+    SUMMARY_SYSTEM_PROMPT,
+    chunk_transcript,
+    count_tokens,
+    summarize_transcript
+)
+
+def make_entry(i, speaker="Speaker 1"):
+    return {'text': f"Sentence number {i}", 'speaker': speaker, 'timestamp': '10:00:00', 'speaker_id': 1}
+
+def is_notes_call(messages):
+    return messages[0]['content'] == NOTES_SYSTEM_PROMPT
+
+class TestRollingSummarizer(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeChatBackend()
+        self.summarizer = RollingSummarizer(self.backend, window_size=5, fan_in=3)
+
+    def tearDown(self):
+        self.summarizer.close()
+
+    def test_windows_are_condensed_in_background(self):
+        """Each full window produces one notes request."""
+        for i in range(12):
+            self.summarizer.add_entry(make_entry(i))
+        notes = self.summarizer.notes()
+
+        self.assertEqual(len(notes), 2)
+        self.assertEqual(sum(is_notes_call(call) for call in self.backend.calls), 2)
+        self.assertIn("Sentence number 0", self.backend.calls[0][1]['content'])
+
+    def test_add_entry_does_not_wait_for_backend(self):
+        """A slow backend never blocks the recognition callback."""
+        self.backend.delay = 0.2
+        start = time.perf_counter()
+        for i in range(10):
+            self.summarizer.add_entry(make_entry(i))
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertEqual(len(self.summarizer.notes()), 2)
+
+    def test_notes_are_merged_hierarchically(self):
+        """fan_in notes at one level are condensed into one note a level up."""
+        for i in range(5 * 7):
+            self.summarizer.add_entry(make_entry(i))
+        notes = self.summarizer.notes()
+
+        # 7 windows -> 2 level-1 notes (from 6 windows) + 1 level-0 note
+        self.assertEqual(len(notes), 3)
+        self.assertEqual(sum(is_notes_call(call) for call in self.backend.calls), 9)
+
+    def test_finalize_merges_notes_and_tail(self):
+        """The final request contains the notes and the uncondensed tail only."""
+        for i in range(13):
+            self.summarizer.add_entry(make_entry(i))
+        summary = self.summarizer.finalize()
+
+        final = self.backend.calls[-1]
+        self.assertEqual(final[0]['content'], SUMMARY_SYSTEM_PROMPT)
+        self.assertIn("Part 2 notes", final[1]['content'])
+        self.assertIn("Sentence number 12", final[1]['content'])
+        self.assertNotIn("Sentence number 3", final[1]['content'])
+        self.assertTrue(summary.startswith("Summary of"))
+
+    def test_final_request_size_is_bounded(self):
+        """The final request stays small however long the meeting is."""
+        sizes = []
+        for length in (50, 500):
+            backend = FakeChatBackend()
+            summarizer = RollingSummarizer(backend, window_size=5, fan_in=3)
+            for i in range(length):
+                summarizer.add_entry(make_entry(i))
+            summarizer.finalize()
+            summarizer.close()
+            sizes.append(len(backend.calls[-1][1]['content']))
+        self.assertLess(sizes[1], sizes[0] * 2)
+
+    def test_failed_window_keeps_raw_text(self):
+        """If condensing fails the raw window text is kept as its notes."""
+        def responder(messages):
+            if is_notes_call(messages):
+                raise Exception("LLM unavailable")
+            return "Final summary"
+        self.backend.responder = responder
+
+        for i in range(5):
+            self.summarizer.add_entry(make_entry(i))
+        notes = self.summarizer.notes()
+        self.assertIn("Sentence number 4", notes[0])
+        self.assertEqual(self.summarizer.finalize(), "Final summary")
+
+    def test_finalize_without_full_window(self):
+        """A short meeting is summarized from its transcript directly."""
+        self.summarizer.add_entry(make_entry(0))
+        self.assertFalse(self.summarizer.has_notes())
+        self.summarizer.finalize()
+        self.assertIn("Sentence number 0", self.backend.calls[-1][1]['content'])
+
+def make_transcript(lines, turn_length=3):
+    return "\n".join(
+        f"[10:00:00] Speaker {(i // turn_length) % 3 + 1}: Sentence number {i} about the roadmap"
+        for i in range(lines)
+    )
+
+class TestChunking(unittest.TestCase):
+    def test_chunks_respect_token_limit(self):
+        chunks = chunk_transcript(make_transcript(300), max_tokens=200)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(chunk), 200)
+
+    def test_chunks_keep_every_line_in_order(self):
+        transcript = make_transcript(300)
+        chunks = chunk_transcript(transcript, max_tokens=200)
+        self.assertEqual("\n".join(chunks), transcript)
+
+    def test_chunks_break_between_speaker_turns(self):
+        for chunk in chunk_transcript(make_transcript(300), max_tokens=200)[:-1]:
+            # Turns are three lines long, so no chunk ends mid-turn
+            self.assertEqual(len(chunk.splitlines()) % 3, 0)
+
+    def test_long_turn_is_split_between_lines(self):
+        chunks = chunk_transcript(make_transcript(60, turn_length=60), max_tokens=100)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(chunk), 100)
+
+    def test_oversized_line_is_split_between_words(self):
+        line = "[10:00:00] Speaker 1: " + "word " * 500
+        chunks = chunk_transcript(line, max_tokens=50)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(chunk), 50)
+
+class TestMapReduce(unittest.TestCase):
+    def test_short_transcript_is_one_request(self):
+        backend = FakeChatBackend()
+        summarize_transcript(backend, make_transcript(10), chunk_tokens=1000)
+        self.assertEqual(len(backend.calls), 1)
+        self.assertEqual(backend.calls[0][0]['content'], SUMMARY_SYSTEM_PROMPT)
+
+    def test_chunks_are_mapped_then_reduced_in_order(self):
+        backend = FakeChatBackend(responder=lambda messages: messages[-1]['content'].split(":")[-1][:20])
+        transcript = make_transcript(300)
+        chunks = chunk_transcript(transcript, max_tokens=200)
+        summarize_transcript(backend, transcript, chunk_tokens=200, max_workers=4)
+
+        notes_calls = [call for call in backend.calls if call[0]['content'] == NOTES_SYSTEM_PROMPT]
+        self.assertEqual(len(notes_calls), len(chunks))
+        final = backend.calls[-1]
+        self.assertEqual(final[0]['content'], SUMMARY_SYSTEM_PROMPT)
+        self.assertLess(final[1]['content'].index("Part 1 notes"), final[1]['content'].index("Part 2 notes"))
+
+    def test_concurrency_is_bounded(self):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def responder(messages):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return "notes"
+
+        backend = FakeChatBackend(responder=responder)
+        summarize_transcript(backend, make_transcript(300), chunk_tokens=200, max_workers=3)
+        self.assertEqual(peak[0], 3)
+
+    def test_parallel_map_is_faster_than_serial(self):
+        transcript = make_transcript(300)
+        timings = []
+        for workers in (1, 8):
+            start = time.perf_counter()
+            summarize_transcript(FakeChatBackend(delay=0.02), transcript, chunk_tokens=200, max_workers=workers)
+            timings.append(time.perf_counter() - start)
+        self.assertLess(timings[1], timings[0] / 2)
+
+    def test_failed_chunk_falls_back_to_raw_text(self):
+        def responder(messages):
+            if messages[0]['content'] == NOTES_SYSTEM_PROMPT and "Sentence number 0 " in messages[1]['content']:
+                raise Exception("LLM unavailable")
+            return "notes"
+        backend = FakeChatBackend(responder=responder)
+        summarize_transcript(backend, make_transcript(300), chunk_tokens=200)
+        self.assertIn("Sentence number 0 ", backend.calls[-1][1]['content'])
+
+class StreamingCompletionHandler(BaseHTTPRequestHandler):
+    """Local stand-in for a streaming chat completions endpoint: one SSE event per token."""
+    tokens = ["Decisions", ":", " ship", " on", " Friday", "."]
+    token_delay = 0.05
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(body)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        # Azure opens with a chunk that only carries content filter results
+        self.send_event({'id': '', 'object': '', 'created': 0, 'model': '', 'choices': []})
+        for i, token in enumerate(self.tokens):
+            if i:
+                time.sleep(self.token_delay)
+            self.send_event({'id': 'fake', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'fake',
+                             'choices': [{'index': 0, 'finish_reason': None, 'delta': {'content': token}}]})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def send_event(self, payload):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+class TestStreamingSummary(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StreamingCompletionHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.gateway = LLMGateway(api_key='test', api_base=f"http://127.0.0.1:{self.server.server_port}",
+                                  api_version='2023-05-15', requests_per_minute=0, tokens_per_minute=0)
+
+    def tearDown(self):
+        self.gateway.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_tokens_arrive_before_the_completion_finishes(self):
+        arrivals = []
+        start = time.perf_counter()
+        summary = summarize_transcript(OpenAIChatBackend('fake', self.gateway), make_transcript(10),
+                                       on_token=lambda token: arrivals.append((time.perf_counter() - start, token)))
+
+        self.assertEqual(summary, "Decisions: ship on Friday.")
+        self.assertEqual("".join(token for _, token in arrivals), summary)
+        self.assertTrue(self.server.requests[0]['stream'])
+        # The first token is not held back until the last one has been generated
+        time_to_first_token, total = arrivals[0][0], arrivals[-1][0]
+        self.assertLess(time_to_first_token, total - 0.15)
+
+    def test_only_the_reduce_request_is_streamed(self):
+        backend = FakeChatBackend(responder=lambda messages: "notes" if is_notes_call(messages) else "final summary")
+        tokens = []
+        summary = summarize_transcript(backend, make_transcript(300), chunk_tokens=200, on_token=tokens.append)
+        self.assertEqual(summary, "final summary")
+        self.assertEqual(tokens, ["final", " summary"])
+
+    def test_rolling_summary_streams_the_merge(self):
+        summarizer = RollingSummarizer(FakeChatBackend(responder=lambda messages: "merged notes"), window_size=5)
+        for i in range(7):
+            summarizer.add_entry(make_entry(i))
+        tokens = []
+        self.assertEqual(summarizer.finalize(on_token=tokens.append), "merged notes")
+        self.assertEqual("".join(tokens), "merged notes")
+        summarizer.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from database import close_connections
+from llm import FakeChatBackend
+from summary_cache import SummaryCache, CachedChatBackend, cache_key
+
+MESSAGES = [
+    {"role": "system", "content": "Summarize."},
+    {"role": "user", "content": "[10:00:00] Speaker 1: Ship the release on Friday."},
+]
+
+class TestCacheKey(unittest.TestCase):
+    def test_whitespace_is_normalized(self):
+        spaced = [MESSAGES[0], {"role": "user", "content": "  [10:00:00]  Speaker 1:\nShip the release on Friday. "}]
+        self.assertEqual(cache_key(MESSAGES, 'gpt', 0.7, 1000), cache_key(spaced, 'gpt', 0.7, 1000))
+
+    def test_parameters_change_the_key(self):
+        base = cache_key(MESSAGES, 'gpt', 0.7, 1000)
+        self.assertNotEqual(base, cache_key(MESSAGES, 'other', 0.7, 1000))
+        self.assertNotEqual(base, cache_key(MESSAGES, 'gpt', 0.3, 1000))
+        self.assertNotEqual(base, cache_key(MESSAGES, 'gpt', 0.7, 500))
+        self.assertNotEqual(base, cache_key(MESSAGES, 'gpt', 0.7, 1000, prompt_version=99))
+
+class TestSummaryCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, 'cache.db')
+
+    def tearDown(self):
+        close_connections()
+        shutil.rmtree(self.test_dir)
+
+    def test_miss_then_memory_hit(self):
+        cache = SummaryCache(db_path=self.db_path)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', 'summary')
+        self.assertEqual(cache.get('a'), 'summary')
+        stats = cache.stats()
+        self.assertEqual((stats['misses'], stats['memory_hits'], stats['stores']), (1, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_memory_tier_is_lru(self):
+        cache = SummaryCache(max_entries=2, db_path='')
+        cache.put('a', '1')
+        cache.put('b', '2')
+        cache.get('a')
+        cache.put('c', '3')
+        self.assertEqual(cache.get('a'), '1')
+        self.assertIsNone(cache.get('b'))
+
+    def test_disk_tier_survives_restart(self):
+        SummaryCache(db_path=self.db_path).put('a', 'summary')
+        cache = SummaryCache(db_path=self.db_path)
+        self.assertEqual(cache.get('a'), 'summary')
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+        # Promoted into memory
+        cache.get('a')
+        self.assertEqual(cache.stats()['memory_hits'], 1)
+
+    def test_disk_tier_evicts_least_recently_used(self):
+        cache = SummaryCache(max_entries=1, db_path=self.db_path, max_bytes=350)
+        for key in 'abc':
+            cache.put(key, 'x' * 100)
+            time.sleep(0.01)
+        cache.get('a')  # a is now more recent than b
+        time.sleep(0.01)
+        cache.put('d', 'x' * 100)
+
+        stats = cache.stats()
+        self.assertEqual(stats['disk_bytes'], 300)
+        self.assertEqual(stats['evictions'], 1)
+        fresh = SummaryCache(db_path=self.db_path, max_bytes=350)
+        self.assertIsNone(fresh.get('b'))
+        self.assertEqual(fresh.get('a'), 'x' * 100)
+        self.assertEqual(fresh.get('d'), 'x' * 100)
+
+class TestCachedChatBackend(unittest.TestCase):
+    def test_identical_request_skips_backend(self):
+        backend = FakeChatBackend(delay=0.05)
+        cached = CachedChatBackend(backend, SummaryCache(db_path=''))
+        first = cached.complete(MESSAGES, temperature=0.7, max_tokens=1000)
+
+        start = time.perf_counter()
+        second = cached.complete(MESSAGES, temperature=0.7, max_tokens=1000)
+        self.assertLess(time.perf_counter() - start, 0.01)
+        self.assertEqual(first, second)
+        self.assertEqual(len(backend.calls), 1)
+
+    def test_different_parameters_call_backend(self):
+        backend = FakeChatBackend()
+        cached = CachedChatBackend(backend, SummaryCache(db_path=''))
+        cached.complete(MESSAGES, temperature=0.7, max_tokens=1000)
+        cached.complete(MESSAGES, temperature=0.7, max_tokens=500)
+        self.assertEqual(len(backend.calls), 2)
+
+    def test_errors_are_not_cached(self):
+        calls = []
+        def responder(messages):
+            calls.append(messages)
+            if len(calls) == 1:
+                raise Exception("LLM unavailable")
+            return "summary"
+        cached = CachedChatBackend(FakeChatBackend(responder=responder), SummaryCache(db_path=''))
+        with self.assertRaises(Exception):
+            cached.complete(MESSAGES)
+        self.assertEqual(cached.complete(MESSAGES), "summary")
+
+    def test_streamed_response_is_cached_once_complete(self):
+        backend = FakeChatBackend(responder=lambda messages: "a streamed summary")
+        cached = CachedChatBackend(backend, SummaryCache(db_path=''))
+        self.assertEqual(list(cached.stream(MESSAGES)), ["a", " streamed", " summary"])
+        self.assertEqual(list(cached.stream(MESSAGES)), ["a streamed summary"])
+        self.assertEqual(cached.complete(MESSAGES), "a streamed summary")
+        self.assertEqual(len(backend.calls), 1)
+
+if __name__ == '__main__':
+    unittest.main()
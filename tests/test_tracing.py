@@ -0,0 +1,223 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from database import init_db, close_connections
+from emitter import TranscriptEmitter
+from outbox import EmailOutbox, SMTPConnectionPool
+from ratelimit import TokenBucket
+from segment_writer import SegmentWriter
+from tracing import Tracer, JsonLinesExporter, OTLPExporter, NOOP_SPAN, current_span, parse_context
+from tests.test_emitter import RecordingSocketIO, entry
+from tests.test_outbox import FakeSMTPServer
+
+class RecordingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+    def close(self):
+        pass
+
+    def named(self, name):
+        return [span for span in self.spans if span['name'] == name]
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.exporter = RecordingExporter()
+        self.tracer = Tracer(self.exporter, enabled=True, sample_rate=1.0, interval=0.05)
+
+    def tearDown(self):
+        self.tracer.close()
+
+    def test_disabled_tracer_hands_out_a_noop_span(self):
+        tracer = Tracer(enabled=False)
+        with tracer.span('utterance', baggage={'meeting_id': 'room-1'}) as span:
+            self.assertIs(span, NOOP_SPAN)
+            self.assertIsNone(current_span())
+            span.record('transcript.emit', 0, 1)
+        self.assertIsNone(tracer.exporter)
+
+    def test_nested_spans_share_the_trace_and_baggage(self):
+        with self.tracer.span('utterance', baggage={'meeting_id': 'room-1'}, utterance_id=3) as root:
+            with self.tracer.span('handle') as child:
+                self.assertIs(current_span(), child)
+            self.assertIs(current_span(), root)
+            root.record('transcript.emit', root.start_ns, root.start_ns + 1000, batch_entries=2)
+        self.assertIsNone(current_span())
+        self.assertTrue(self.tracer.flush())
+
+        spans = {span['name']: span for span in self.exporter.spans}
+        self.assertEqual(set(spans), {'utterance', 'handle', 'transcript.emit'})
+        self.assertIsNone(spans['utterance']['parent_id'])
+        for name in ('handle', 'transcript.emit'):
+            self.assertEqual(spans[name]['trace_id'], spans['utterance']['trace_id'])
+            self.assertEqual(spans[name]['parent_id'], spans['utterance']['span_id'])
+            self.assertEqual(spans[name]['attributes']['meeting_id'], 'room-1')
+        self.assertEqual(spans['utterance']['attributes'], {'meeting_id': 'room-1', 'utterance_id': 3})
+        self.assertEqual(spans['transcript.emit']['duration_ms'], 0.001)
+
+    def test_errors_are_recorded(self):
+        with self.assertRaises(RuntimeError):
+            with self.tracer.span('job.summarize'):
+                raise RuntimeError("model unavailable")
+        self.tracer.flush()
+        self.assertEqual(self.exporter.spans[0]['status'], 'error')
+        self.assertEqual(self.exporter.spans[0]['error'], "RuntimeError: model unavailable")
+
+    def test_sampling_is_decided_per_trace(self):
+        tracer = Tracer(self.exporter, enabled=True, sample_rate=0.5, interval=0.05)
+        kept = 0
+        for i in range(200):
+            with tracer.span('utterance') as root:
+                with tracer.span('handle') as child:
+                    self.assertEqual(child.sampled, root.sampled)
+            kept += root.sampled
+        tracer.flush()
+        self.assertEqual(len(self.exporter.spans), kept * 2)
+        self.assertTrue(50 < kept < 150)
+        tracer.close()
+
+        # Stages of one job land in the same trace with the same decision
+        first, second = tracer.span('job.stop', trace_key='job-1'), tracer.span('job.save', trace_key='job-1')
+        self.assertEqual((first.trace_id, first.sampled), (second.trace_id, second.sampled))
+        self.assertNotEqual(first.trace_id, tracer.span('job.stop', trace_key='job-2').trace_id)
+
+    def test_context_continues_the_trace_elsewhere(self):
+        with self.tracer.span('job.email', baggage={'meeting_id': 'room-1'}) as span:
+            context = json.loads(json.dumps(span.context()))
+        remote = parse_context(context)
+        self.assertEqual((remote.trace_id, remote.span_id, remote.sampled), (span.trace_id, span.span_id, True))
+
+        child = self.tracer.span('email.send', parent=context)
+        self.assertEqual((child.trace_id, child.parent_id), (span.trace_id, span.span_id))
+        self.assertEqual(child.baggage, {'meeting_id': 'room-1'})
+        self.assertIsNone(parse_context({'traceparent': 'garbage'}))
+
+    def test_full_queue_drops_spans(self):
+        tracer = Tracer(self.exporter, enabled=True, queue_size=2)
+        tracer._start = lambda: None
+        for _ in range(5):
+            tracer.span('utterance').end()
+        self.assertEqual(tracer.stats()['dropped'], 3)
+
+class TestExporters(unittest.TestCase):
+    def test_json_lines_file(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(test_dir, 'traces.jsonl')
+            tracer = Tracer(JsonLinesExporter(path, service_name='test'), enabled=True, interval=0.05)
+            for i in range(3):
+                with tracer.span('utterance', baggage={'meeting_id': 'room-1'}, utterance_id=i):
+                    pass
+            tracer.close()
+
+            with open(path) as f:
+                spans = [json.loads(line) for line in f]
+            self.assertEqual([span['attributes']['utterance_id'] for span in spans], [0, 1, 2])
+            self.assertEqual(spans[0]['service'], 'test')
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_otlp_http_json(self):
+        received = []
+        class CollectorHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append((self.path, json.loads(self.rfile.read(int(self.headers['Content-Length'])))))
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+        server = ThreadingHTTPServer(('127.0.0.1', 0), CollectorHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            tracer = Tracer(OTLPExporter(f"http://127.0.0.1:{server.server_port}", service_name='test'),
+                            enabled=True, interval=0.05)
+            with tracer.span('job.summarize', trace_key='job-1', baggage={'meeting_id': 'room-1'}, attempt=2):
+                with tracer.span('summary'):
+                    pass
+            tracer.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual({path for path, _ in received}, {'/v1/traces'})
+        resource = received[0][1]['resourceSpans'][0]
+        self.assertEqual(resource['resource']['attributes'],
+                         [{'key': 'service.name', 'value': {'stringValue': 'test'}}])
+        # The child ended first
+        child, parent = [span for _, payload in received
+                         for span in payload['resourceSpans'][0]['scopeSpans'][0]['spans']]
+        self.assertEqual(child['parentSpanId'], parent['spanId'])
+        self.assertNotIn('parentSpanId', parent)
+        self.assertIn({'key': 'attempt', 'value': {'intValue': '2'}}, parent['attributes'])
+        self.assertIn({'key': 'meeting_id', 'value': {'stringValue': 'room-1'}}, child['attributes'])
+
+class TestPropagation(unittest.TestCase):
+    """Work queued inside a span is traced as its child when it is done on another thread."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, 'meetings.db')
+        init_db(self.db_path)
+        self.exporter = RecordingExporter()
+        self.tracer = Tracer(self.exporter, enabled=True, interval=0.05)
+
+    def tearDown(self):
+        self.tracer.close()
+        close_connections()
+        shutil.rmtree(self.test_dir)
+
+    def test_utterance_emit_and_persistence(self):
+        emitter = TranscriptEmitter(RecordingSocketIO(), window=0.01)
+        writer = SegmentWriter(db_path=self.db_path, interval=0.01)
+        writer.start()
+        try:
+            for i in range(3):
+                with self.tracer.span('utterance', baggage={'meeting_id': 'room-1'}):
+                    line = {**entry(f"line {i}"), 'utterance_id': i + 1}
+                    emitter.publish('room-1', line)
+                    writer.append('room-1', line)
+            # Published outside any span: not traced
+            emitter.publish('room-1', entry("untraced"))
+            emitter.flush()
+            writer.flush(timeout=5)
+        finally:
+            emitter.close()
+            writer.close()
+        self.tracer.flush()
+
+        utterances = {span['span_id']: span for span in self.exporter.named('utterance')}
+        self.assertEqual(len(utterances), 3)
+        for name in ('transcript.emit', 'segment.persist'):
+            children = self.exporter.named(name)
+            self.assertEqual(sorted(span['parent_id'] for span in children), sorted(utterances))
+            self.assertTrue(all(span['attributes']['meeting_id'] == 'room-1' for span in children))
+
+    def test_email_is_sent_in_the_trace_that_queued_it(self):
+        pool = SMTPConnectionPool('smtp.example.com', 587, 'user', 'secret', size=1, factory=FakeSMTPServer().factory)
+        outbox = EmailOutbox(pool, db_path=self.db_path, sender='assistant@example.com', workers=1,
+                             rate_limiter=TokenBucket(1000, capacity=100))
+        with patch('outbox.tracer', self.tracer):
+            with self.tracer.span('job.email', trace_key='job-1', baggage={'meeting_id': 'room-1'}) as stage:
+                job_id = outbox.enqueue(["a@example.com"], "Summary")
+            outbox.start()
+            self.assertEqual(outbox.wait(job_id, timeout=5)['status'], 'completed')
+            outbox.close()
+        self.tracer.flush()
+
+        send, = self.exporter.named('email.send')
+        self.assertEqual((send['trace_id'], send['parent_id']), (stage.trace_id, stage.span_id))
+        self.assertEqual(send['attributes']['meeting_id'], 'room-1')
+        self.assertEqual(send['attributes']['email_job_id'], job_id)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 import unittest
 from unittest.mock import patch, MagicMock
 from transcriber import MeetingTranscriber
+from llm import FakeChatBackend
+from summarizer import RollingSummarizer
+from tracing import Tracer
 import azure.cognitiveservices.speech as speechsdk
 
 class TestTranscriber(unittest.TestCase):
@@ -9,11 +12,11 @@ class TestTranscriber(unittest.TestCase):
         self.mock_socketio = MagicMock()
         self.transcriber = MeetingTranscriber(self.mock_socketio)
 
-    @patch('azure.cognitiveservices.speech.SpeechRecognizer')
-    def test_start_recording(self, mock_speech_recognizer):
+    @patch('azure.cognitiveservices.speech.transcription.ConversationTranscriber')
+    def test_start_recording(self, mock_conversation_transcriber):
         # Configure mock
         mock_recognizer = MagicMock()
-        mock_speech_recognizer.return_value = mock_recognizer
+        mock_conversation_transcriber.return_value = mock_recognizer
         
         # Start recording
         self.transcriber.start_recording()
@@ -21,13 +24,13 @@ class TestTranscriber(unittest.TestCase):
         # Verify results
         self.assertTrue(self.transcriber.is_recording)
         self.assertEqual(self.transcriber.transcript, [])
-        mock_recognizer.start_continuous_recognition.assert_called_once()
+        mock_recognizer.start_transcribing_async.assert_called_once()
 
-    @patch('azure.cognitiveservices.speech.SpeechRecognizer')
-    def test_stop_recording(self, mock_speech_recognizer):
+    @patch('azure.cognitiveservices.speech.transcription.ConversationTranscriber')
+    def test_stop_recording(self, mock_conversation_transcriber):
         # Configure mock
         mock_recognizer = MagicMock()
-        mock_speech_recognizer.return_value = mock_recognizer
+        mock_conversation_transcriber.return_value = mock_recognizer
         
         # Start recording first
         self.transcriber.start_recording()
@@ -37,48 +40,58 @@ class TestTranscriber(unittest.TestCase):
         
         # Verify results
         self.assertFalse(self.transcriber.is_recording)
+        mock_recognizer.stop_transcribing_async.assert_called_once()
+
+    @patch('azure.cognitiveservices.speech.SpeechRecognizer')
+    def test_recording_without_diarization(self, mock_speech_recognizer):
+        mock_recognizer = MagicMock()
+        mock_speech_recognizer.return_value = mock_recognizer
+        transcriber = MeetingTranscriber(self.mock_socketio, diarization='none')
+
+        transcriber.start_recording()
+        transcriber.stop_recording()
+
+        mock_recognizer.start_continuous_recognition.assert_called_once()
         mock_recognizer.stop_continuous_recognition.assert_called_once()
 
-    @patch('requests.post')
-    def test_generate_summary_success(self, mock_post):
-        # Configure mock response
-        mock_response = MagicMock()
-        mock_response.json.return_value = {
-            'choices': [{'message': {'content': 'Test summary'}}]
-        }
-        mock_post.return_value = mock_response
-        
-        # Set test transcript
-        self.transcriber.transcript = ["Test transcript"]
-        
+    def test_generate_summary_success(self):
+        backend = FakeChatBackend(responder=lambda messages: 'Test summary')
+        transcriber = MeetingTranscriber(self.mock_socketio, llm=backend, summarizer=None)
+
+        # Seed the transcript the way recognition does
+        transcriber.add_entry("Test transcript")
+
         # Generate summary
-        summary = self.transcriber.generate_summary()
-        
+        summary = transcriber.generate_summary()
+
         # Verify results
         self.assertEqual(summary, 'Test summary')
-        mock_post.assert_called_once()
+        self.assertEqual(len(backend.calls), 1)
+        self.assertIn("Test transcript", backend.calls[0][-1]['content'])
+        transcriber.close()
+
+    def test_generate_summary_error(self):
+        def fail(messages):
+            raise Exception("API Error")
+        transcriber = MeetingTranscriber(self.mock_socketio, llm=FakeChatBackend(responder=fail), summarizer=None)
+
+        # Seed the transcript the way recognition does
+        transcriber.add_entry("Test transcript")
 
-    @patch('requests.post')
-    def test_generate_summary_error(self, mock_post):
-        # Configure mock to raise exception
-        mock_post.side_effect = Exception("API Error")
-        
-        # Set test transcript
-        self.transcriber.transcript = ["Test transcript"]
-        
         # Generate summary
-        summary = self.transcriber.generate_summary()
-        
+        summary = transcriber.generate_summary()
+
         # Verify results
         self.assertIn("Error generating summary", summary)
         self.assertIn("API Error", summary)
+        transcriber.close()
 
     def test_generate_summary_empty_transcript(self):
         # Test with empty transcript
         summary = self.transcriber.generate_summary()
-        
+
         # Verify results
-        self.assertEqual(summary, "No transcript available to generate summary.")
+        self.assertEqual(summary, "No transcript available to summarize.")
 
     def test_handle_result(self):
         # Create a mock event
@@ -88,12 +101,83 @@ class TestTranscriber(unittest.TestCase):
         # Call handle_result
         self.transcriber.handle_result(mock_event)
         
-        # Verify results
+        self.transcriber.emitter.flush()
+        
+        # Verify results: the entry goes out numbered, in a batch
         self.assertEqual(self.transcriber.transcript, ["Test recognition"])
-        self.mock_socketio.emit.assert_called_once_with(
-            'transcript_update',
-            {'text': "Test recognition"}
-        )
+        self.mock_socketio.emit.assert_called_once()
+        event, payload = self.mock_socketio.emit.call_args[0]
+        self.assertEqual(event, 'transcript_batch')
+        self.assertEqual(payload['entries'][0]['text'], "Test recognition")
+        self.assertEqual(payload['entries'][0]['seq'], 1)
+
+    def test_handle_result_is_traced(self):
+        exporter = MagicMock()
+        tracer = Tracer(exporter, enabled=True, interval=0.05)
+        event = MagicMock()
+        event.result.text = "Test recognition"
+        event.result.offset, event.result.duration = 50_000_000, 20_000_000
+        event.result.properties = {speechsdk.PropertyId.SpeechServiceResponse_RecognitionLatencyMs: '300'}
+        transcriber = MeetingTranscriber(self.mock_socketio, meeting_id='room-1')
+        with patch('transcriber.tracer', tracer):
+            transcriber.handle_result(event)
+        transcriber.emitter.flush()
+        tracer.close()
+
+        spans = {span['name']: span for call in exporter.export.call_args_list for span in call[0][0]}
+        utterance = spans['utterance']
+        self.assertEqual(utterance['attributes'], {'meeting_id': 'room-1', 'audio_offset_ms': 5000,
+                                                   'audio_duration_ms': 2000, 'utterance_id': 1})
+        self.assertEqual(spans['speech.recognize']['end_time_unix_nano'], utterance['start_time_unix_nano'])
+        self.assertEqual(spans['speech.recognize']['duration_ms'], 300)
+        self.assertEqual(spans['transcript.emit']['parent_id'], utterance['span_id'])
+        transcriber.close()
+
+    def test_interim_results_are_replaced_by_final(self):
+        event = MagicMock()
+        event.result.text = "Test"
+        self.transcriber.handle_partial(event)
+        self.mock_socketio.emit.assert_called_once()
+        event_name, payload = self.mock_socketio.emit.call_args[0]
+        self.assertEqual(event_name, 'transcript_interim')
+        self.assertEqual((payload['utterance_id'], payload['text']), (1, "Test"))
+
+        event.result.text = "Test recognition"
+        entry = self.transcriber.add_entry(event.result.text)
+        # The final entry carries the same utterance ID; the next utterance gets a new one
+        self.assertEqual(entry['utterance_id'], 1)
+        self.assertEqual(self.transcriber.utterance_id, 2)
+
+    def test_generate_summary_uses_rolling_notes(self):
+        # Use a local fake LLM for both the rolling notes and the final merge
+        backend = FakeChatBackend(responder=lambda messages: "Rolling summary")
+        transcriber = MeetingTranscriber(self.mock_socketio, llm=backend,
+                                         summarizer=RollingSummarizer(backend, window_size=2))
+        for text in ["First point", "Second point", "Third point"]:
+            event = MagicMock()
+            event.result.text = text
+            transcriber.handle_result(event)
+
+        summary = transcriber.generate_summary()
+
+        # One notes request for the full window, one merge request
+        self.assertEqual(summary, "Rolling summary")
+        self.assertEqual(len(backend.calls), 2)
+        self.assertIn("Third point", backend.calls[-1][1]['content'])
+        transcriber.close()
+
+    def test_generate_summary_failure_can_be_raised(self):
+        def fail(messages):
+            raise TimeoutError("model timed out")
+        transcriber = MeetingTranscriber(self.mock_socketio, llm=FakeChatBackend(responder=fail), summarizer=None)
+        event = MagicMock()
+        event.result.text = "First point"
+        transcriber.handle_result(event)
+
+        self.assertIn("model timed out", transcriber.generate_summary())
+        with self.assertRaises(TimeoutError):
+            transcriber.generate_summary(raise_errors=True)
+        transcriber.close()
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
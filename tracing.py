@@ -0,0 +1,416 @@
+import atexit
+import hashlib
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import namedtuple
+import requests
+from config import (
+    TRACING_ENABLED,
+    TRACING_EXPORTER,
+    TRACING_FILE,
+    TRACING_OTLP_ENDPOINT,
+    TRACING_SAMPLE_RATE,
+    TRACING_SERVICE_NAME,
+    TRACING_QUEUE_SIZE,
+    TRACING_EXPORT_INTERVAL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = 512
+
+# A span received from elsewhere (another thread or a queued job), to continue its trace
+SpanContext = namedtuple('SpanContext', 'trace_id span_id sampled baggage')
+
+_local = threading.local()
+_STOP = object()
+
+
+def current_span():
+    """The span entered last on this thread, or None."""
+    return getattr(_local, 'span', None)
+
+
+def parse_context(context):
+    """The SpanContext of what ``Span.context()`` returned, or None if it is missing or malformed."""
+    if not context:
+        return None
+    try:
+        _, trace_id, span_id, flags = context['traceparent'].split('-')
+    except (KeyError, ValueError, AttributeError):
+        return None
+    return SpanContext(trace_id, span_id, flags == '01', context.get('baggage') or {})
+
+
+def _new_id(bits):
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    """One timed operation of a trace.
+
+    Entering a span makes it the current span of the thread, so spans
+    started inside it become its children. ``baggage`` (e.g. the meeting ID)
+    is passed down to every descendant and exported with each of them.
+    A span continuing a trace that was not sampled is tracked but never exported.
+    """
+
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'sampled', 'baggage', 'attributes',
+                 'events', 'start_ns', 'end_ns', 'error', '_previous')
+
+    def __init__(self, tracer, name, trace_id, parent_id, sampled, baggage, attributes, start_ns=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.baggage = baggage
+        self.attributes = attributes
+        self.events = []
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def add_event(self, name, **attributes):
+        if self.sampled:
+            self.events.append((name, time.time_ns(), attributes))
+
+    def record_error(self, error):
+        self.error = f"{type(error).__name__}: {str(error)}"
+
+    def child(self, name, start_ns=None, **attributes):
+        """A new span under this one; it is not entered, so it can be ended on any thread."""
+        return Span(self.tracer, name, self.trace_id, self.span_id, self.sampled, self.baggage,
+                    attributes, start_ns)
+
+    def record(self, name, start_ns, end_ns, **attributes):
+        """Add a finished child span that ran from ``start_ns`` to ``end_ns``."""
+        if self.sampled:
+            self.child(name, start_ns, **attributes).end(end_ns)
+
+    def context(self):
+        """What a span in another process needs to continue this trace; JSON-serializable."""
+        flags = '01' if self.sampled else '00'
+        return {'traceparent': f"00-{self.trace_id}-{self.span_id}-{flags}", 'baggage': self.baggage}
+
+    def end(self, end_ns=None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns or time.time_ns()
+        if self.sampled:
+            self.tracer._export(self)
+
+    def __enter__(self):
+        self._previous = getattr(_local, 'span', None)
+        _local.span = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.span = self._previous
+        if exc is not None:
+            self.record_error(exc)
+        self.end()
+        return False
+
+    def to_dict(self):
+        span = {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_time_unix_nano': self.start_ns,
+            'end_time_unix_nano': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': {**self.baggage, **self.attributes},
+            'events': [{'name': name, 'time_unix_nano': at, 'attributes': attributes}
+                       for name, at, attributes in self.events],
+            'status': 'error' if self.error else 'ok',
+        }
+        if self.error:
+            span['error'] = self.error
+        return span
+
+
+class _NoopSpan:
+    """What every span is while tracing is disabled: does nothing, as cheaply as possible."""
+
+    __slots__ = ()
+    sampled = False
+    trace_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add_event(self, name, **attributes):
+        pass
+
+    def record_error(self, error):
+        pass
+
+    def child(self, name, start_ns=None, **attributes):
+        return self
+
+    def record(self, name, start_ns, end_ns, **attributes):
+        pass
+
+    def context(self):
+        return None
+
+    def end(self, end_ns=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _UnsampledSpan(_NoopSpan):
+    """A root span whose trace was not sampled: spans started inside it are not sampled either."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        _local.unsampled = getattr(_local, 'unsampled', 0) + 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.unsampled -= 1
+        return False
+
+
+UNSAMPLED_SPAN = _UnsampledSpan()
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_attributes(attributes):
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+class JsonLinesExporter:
+    """Append each span to a local file as one JSON object per line."""
+
+    def __init__(self, path=TRACING_FILE, service_name=TRACING_SERVICE_NAME):
+        self.path = path
+        self.service_name = service_name
+        self._file = None
+
+    def export(self, spans):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        for span in spans:
+            self._file.write(json.dumps({'service': self.service_name, **span}, default=str) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class OTLPExporter:
+    """Send spans to an OpenTelemetry collector over OTLP/HTTP with JSON encoding."""
+
+    def __init__(self, endpoint=TRACING_OTLP_ENDPOINT, service_name=TRACING_SERVICE_NAME, timeout=10):
+        self.url = f"{endpoint.rstrip('/')}/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _span(self, span):
+        otlp = {
+            'traceId': span['trace_id'],
+            'spanId': span['span_id'],
+            'name': span['name'],
+            'kind': 1,
+            'startTimeUnixNano': str(span['start_time_unix_nano']),
+            'endTimeUnixNano': str(span['end_time_unix_nano']),
+            'attributes': _otlp_attributes(span['attributes']),
+            'events': [{'name': event['name'], 'timeUnixNano': str(event['time_unix_nano']),
+                        'attributes': _otlp_attributes(event['attributes'])} for event in span['events']],
+            'status': {'code': 2, 'message': span['error']} if span.get('error') else {'code': 0},
+        }
+        if span['parent_id']:
+            otlp['parentSpanId'] = span['parent_id']
+        return otlp
+
+    def export(self, spans):
+        payload = {'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({'service.name': self.service_name})},
+            'scopeSpans': [{'scope': {'name': 'meeting-assistant.tracing'},
+                            'spans': [self._span(span) for span in spans]}],
+        }]}
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+
+EXPORTERS = {'jsonl': JsonLinesExporter, 'otlp': OTLPExporter}
+
+
+def make_exporter(kind=TRACING_EXPORTER):
+    if kind not in EXPORTERS:
+        raise ValueError(f"Unknown tracing exporter {kind!r}, expected one of {sorted(EXPORTERS)}")
+    return EXPORTERS[kind]()
+
+
+class Tracer:
+    """Starts spans and exports the sampled ones from a background thread.
+
+    Whether a trace is sampled is decided once, at its root, and every span
+    under it follows; spans of a job that runs stage by stage share the
+    trace and decision derived from their ``trace_key``. Finished spans wait
+    in a bounded queue; when the exporter cannot keep up they are dropped
+    rather than slowing down the thread that ended them.
+    """
+
+    def __init__(self, exporter=None, enabled=TRACING_ENABLED, sample_rate=TRACING_SAMPLE_RATE,
+                 queue_size=TRACING_QUEUE_SIZE, interval=TRACING_EXPORT_INTERVAL_SECONDS):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.exporter = exporter if exporter is not None or not enabled else make_exporter()
+        self.interval = interval
+        self.metrics = {'exported': 0, 'dropped': 0, 'export_errors': 0}
+        self._threshold = int(sample_rate * 2 ** 64)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def span(self, name, parent=None, trace_key=None, baggage=None, start_ns=None, **attributes):
+        """Start a span; enter it with ``with`` or call ``end()``.
+
+        The parent is the thread's current span unless ``parent`` (a Span or
+        what ``Span.context()`` returned) is given. A ``trace_key`` starts
+        a root span of the trace derived from the key instead.
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        if trace_key is not None:
+            # The same key always gets the same trace and the same sampling decision
+            trace_id = hashlib.md5(str(trace_key).encode()).hexdigest()
+            sampled = int(trace_id[:16], 16) < self._threshold
+            return Span(self, name, trace_id, None, sampled, baggage or {}, attributes, start_ns)
+        if parent is None:
+            parent = current_span()
+            if parent is None and getattr(_local, 'unsampled', 0):
+                return NOOP_SPAN
+        elif isinstance(parent, dict):
+            parent = parse_context(parent)
+        if parent is None:
+            if random.random() >= self.sample_rate:
+                # Cheap enough for the recognition callback when little is sampled
+                return UNSAMPLED_SPAN
+            return Span(self, name, _new_id(128), None, True, baggage or {}, attributes, start_ns)
+        merged = {**parent.baggage, **baggage} if baggage else parent.baggage
+        return Span(self, name, parent.trace_id, parent.span_id, parent.sampled, merged, attributes, start_ns)
+
+    def _export(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            with self._lock:
+                self.metrics['dropped'] += 1
+            return
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.interval)
+            except queue.Empty:
+                continue
+            batch, barriers = [], []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    barriers.append(item)
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= EXPORT_BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for barrier in barriers:
+                barrier.set()
+
+    def _write(self, batch):
+        try:
+            self.exporter.export([span.to_dict() for span in batch])
+        except Exception as e:
+            logger.error(f"Error exporting {len(batch)} spans: {str(e)}")
+            with self._lock:
+                self.metrics['export_errors'] += 1
+            return
+        with self._lock:
+            self.metrics['exported'] += len(batch)
+
+    def flush(self, timeout=5):
+        """Wait until every span ended so far is exported; returns False on timeout."""
+        if self._thread is None:
+            return True
+        barrier = threading.Event()
+        try:
+            self._queue.put(barrier, timeout=timeout)
+        except queue.Full:
+            return False
+        return barrier.wait(timeout)
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self.flush()
+            self._queue.put(_STOP)
+            self._thread.join(timeout=5)
+        if self.exporter is not None:
+            self.exporter.close()
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self.metrics)
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'exporter': type(self.exporter).__name__ if self.exporter is not None else None,
+            'queued': self._queue.qsize(),
+            **metrics,
+        }
+
+
+tracer = Tracer()
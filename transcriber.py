@@ -3,32 +3,64 @@ import requests
 import traceback
 import time
 import os
+import uuid
 import logging
 from config import (
     AZURE_SPEECH_KEY,
     AZURE_SPEECH_REGION,
-    AZURE_OPENAI_API_KEY,
     AZURE_OPENAI_ENDPOINT,
-    AZURE_OPENAI_API_VERSION,
-    AZURE_OPENAI_DEPLOYMENT
+    AZURE_OPENAI_DEPLOYMENT,
+    SESSION_MAX_TRANSCRIPT_ENTRIES,
+    SESSION_TRANSCRIPT_MEMORY_BYTES,
+    ROLLING_SUMMARY_ENABLED,
+    AUDIO_INPUT_MODE,
+    AUDIO_FORMAT,
+    AUDIO_SAMPLE_RATE,
+    INTERIM_RESULTS_ENABLED,
+    DIARIZATION_BACKEND
 )
-import openai
 from flask_socketio import SocketIO
 import json
+from llm import OpenAIChatBackend
+from summarizer import RollingSummarizer, summarize_transcript
+from audio_ingest import AudioIngestSession, SpeechPushSink
+from emitter import TranscriptEmitter, InterimThrottle
+from segment_store import SegmentStore
+from diarization import ConversationRecognizer, LocalDiarizer, DiarizingSink, SpeakerLabels
+from metrics import RECOGNITION_CALLBACK_SECONDS, SOCKETIO_EMIT_SECONDS, SUMMARY_SECONDS
+from tracing import tracer
 
 # Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Configure OpenAI client
-openai.api_type = "azure"
-openai.api_base = AZURE_OPENAI_ENDPOINT
-openai.api_version = AZURE_OPENAI_API_VERSION
-openai.api_key = AZURE_OPENAI_API_KEY
-
 class MeetingTranscriber:
-    def __init__(self, socketio=None):
-        """Initialize the transcriber with Azure Speech Services configuration."""
+    def __init__(self, socketio=None, meeting_id=None, max_entries=SESSION_MAX_TRANSCRIPT_ENTRIES,
+                 llm=None, summarizer=None, audio_input=AUDIO_INPUT_MODE,
+                 audio_sink_factory=SpeechPushSink, emitter=None, recognizer_factory=None,
+                 interim_results=INTERIM_RESULTS_ENABLED, segment_writer=None,
+                 memory_budget=SESSION_TRANSCRIPT_MEMORY_BYTES, diarization=DIARIZATION_BACKEND,
+                 diarizer_factory=LocalDiarizer):
+        """Initialize the transcriber with Azure Speech Services configuration.
+
+        ``meeting_id`` scopes Socket.IO updates to that meeting's room.
+        ``max_entries`` and ``memory_budget`` (bytes) bound how much of the
+        transcript is kept in memory; older entries spill to a temp file.
+        ``llm`` is the chat backend used for summaries; ``summarizer`` condenses
+        the transcript while the meeting runs (a RollingSummarizer by default).
+        ``audio_input`` is 'microphone' to record on this host or 'push' to
+        recognize audio the client streams in through ``feed_audio()``.
+        ``emitter`` batches transcript updates to the room (one is created
+        for ``socketio`` if not given). ``recognizer_factory(speech_config,
+        audio_config)`` builds the recognizer, and ``interim_results`` streams
+        throttled partial hypotheses to the room while an utterance is still
+        being spoken. ``diarization`` picks who labels the speakers:
+        'conversation' recognizes with a ConversationTranscriber that reports
+        them, 'local' runs ``diarizer_factory()`` over the pushed PCM audio,
+        and 'none' attributes everything to one speaker.
+        With a ``segment_writer`` every entry is also persisted in the
+        background, and a meeting that was interrupted by a restart picks up
+        the entries it had already recorded.
+        """
         try:
             # Set environment variables for audio
             os.environ['PULSE_SERVER'] = 'unix:/tmp/pulse/native'
@@ -81,26 +113,53 @@ enable-shm = false
                 "true"
             )
             
-            # Configure audio with fallback options
-            try:
-                logger.info("Attempting to use default microphone...")
-                self.audio_config = speechsdk.audio.AudioConfig(use_default_microphone=True)
-            except Exception as e:
-                logger.warning(f"Failed to use default microphone: {str(e)}")
+            # Configure audio: streamed by the client, or the local microphone with fallback options
+            self.audio_input = audio_input
+            self.audio_sink_factory = audio_sink_factory
+            self.audio_ingest = None
+            self.audio_config = None
+            if audio_input == 'push':
+                logger.info("Audio will be streamed by the client")
+            else:
                 try:
-                    logger.info("Attempting to use default audio input...")
-                    self.audio_config = speechsdk.audio.AudioConfig()
+                    logger.info("Attempting to use default microphone...")
+                    self.audio_config = speechsdk.audio.AudioConfig(use_default_microphone=True)
                 except Exception as e:
-                    logger.error(f"Failed to configure audio: {str(e)}")
-                    raise
-            
-            self.transcript = []
-            self.speaker_transcript = []  # Store speaker-specific transcript
+                    logger.warning(f"Failed to use default microphone: {str(e)}")
+                    try:
+                        logger.info("Attempting to use default audio input...")
+                        self.audio_config = speechsdk.audio.AudioConfig()
+                    except Exception as e:
+                        logger.error(f"Failed to configure audio: {str(e)}")
+                        raise
+                if diarization == 'local':
+                    logger.warning("Local diarization needs audio streamed by the client; speakers will not be labelled")
+
+            self.segments = SegmentStore(memory_budget, max_entries)
             self.socketio = socketio
+            self.emitter = emitter or (TranscriptEmitter(socketio) if socketio else None)
+            self.meeting_id = meeting_id
+            self.recognizer_factory = recognizer_factory
+            self.diarization = diarization
+            self.diarizer_factory = diarizer_factory
+            self.diarizer = None
+            self.speaker_labels = SpeakerLabels()
+            self.session_id = uuid.uuid4().hex
+            self.utterance_id = 1
+            self.interim = InterimThrottle(self._send_interim) if interim_results and socketio else None
             self.recognizer = None
+            self.is_recording = False
             self.current_speaker = None
-            self.speaker_count = 0
-            self.last_speaker_time = time.time()
+            self.speaker_id = 1
+            self.last_activity = time.time()
+            self.llm = llm or OpenAIChatBackend()
+            if summarizer is None and ROLLING_SUMMARY_ENABLED:
+                summarizer = RollingSummarizer(self.llm)
+            self.summarizer = summarizer
+            self.segment_writer = segment_writer
+            self.recovered_entries = 0
+            if segment_writer and meeting_id:
+                self._recover()
             
         except Exception as e:
             logger.error(f"Error initializing transcriber: {str(e)}")
@@ -109,38 +168,137 @@ enable-shm = false
     def handle_result(self, evt):
         """Handle speech recognition results with speaker identification"""
         try:
-            result = evt.result
-            text = result.text
-            
-            # Simple speaker tracking based on silence duration
-            current_time = time.time()
-            if current_time - self.last_speaker_time > 2.0:  # If more than 2 seconds of silence
-                self.speaker_count = (self.speaker_count + 1) % 4  # Cycle through 4 speakers
-                self.current_speaker = f"Speaker {self.speaker_count + 1}"
-            
-            self.last_speaker_time = current_time
-            
-            # Create transcript entry with speaker information
-            transcript_entry = {
-                'text': text,
-                'speaker': self.current_speaker or "Speaker 1",
-                'timestamp': time.strftime('%H:%M:%S'),
-                'speaker_id': self.speaker_count + 1
-            }
-            
-            self.transcript.append(text)
-            self.speaker_transcript.append(transcript_entry)
-            
-            # Emit the transcript update through Socket.IO with speaker information
-            if self.socketio:
-                self.socketio.emit('transcript_update', transcript_entry)
-                print(f"Emitted transcript update: {json.dumps(transcript_entry)}")
-                
+            # The span stays current while the entry is queued, so its emit
+            # and persistence are traced as children of it
+            with tracer.span('utterance', baggage={'meeting_id': self.meeting_id}) as span:
+                if span.sampled:
+                    self._trace_recognition(span, evt.result)
+                with RECOGNITION_CALLBACK_SECONDS.time():
+                    entry = self.add_entry(evt.result.text, speaker=self._speaker_of(evt.result))
+                span.set_attribute('utterance_id', entry['utterance_id'])
         except Exception as e:
             print(f"Error in handle_result: {str(e)}")
             import traceback
             traceback.print_exc()
 
+    def _trace_recognition(self, span, result):
+        """Add where the utterance was in the audio and how long the Speech service took to recognize it."""
+        if isinstance(result.offset, int) and isinstance(result.duration, int):
+            # 100 ns ticks since the stream started
+            span.set_attribute('audio_offset_ms', result.offset // 10000)
+            span.set_attribute('audio_duration_ms', result.duration // 10000)
+        try:
+            latency_ms = int(result.properties.get(speechsdk.PropertyId.SpeechServiceResponse_RecognitionLatencyMs))
+        except (AttributeError, TypeError, ValueError):
+            return
+        span.record('speech.recognize', span.start_ns - latency_ms * 1_000_000, span.start_ns,
+                    latency_ms=latency_ms)
+
+    def handle_partial(self, evt):
+        """Forward an interim hypothesis for the utterance being spoken."""
+        try:
+            text = evt.result.text
+            if text and self.interim:
+                self.last_activity = time.time()
+                self.interim.offer(self.utterance_id, text)
+        except Exception as e:
+            logger.error(f"Error in handle_partial: {str(e)}")
+
+    def _speaker_of(self, result):
+        """Key of the speaker of a recognition result, or None if nobody knows yet."""
+        speaker_id = getattr(result, 'speaker_id', None)
+        if isinstance(speaker_id, str) and speaker_id:
+            return speaker_id
+        if self.diarizer and isinstance(result.offset, int):
+            # Result offsets and durations are in 100 ns ticks since the stream started
+            cluster = self.diarizer.speaker_at(result.offset / 1e7, (result.offset + result.duration) / 1e7)
+            return None if cluster is None else f"local-{cluster}"
+        return None
+
+    def _send_interim(self, utterance_id, text):
+        payload = {
+            'meeting_id': self.meeting_id,
+            'utterance_id': utterance_id,
+            'speaker': self.current_speaker or "Speaker 1",
+            'text': text,
+        }
+        with SOCKETIO_EMIT_SECONDS.labels('transcript_interim').time():
+            if self.meeting_id:
+                self.socketio.emit('transcript_interim', payload, to=self.meeting_id)
+            else:
+                self.socketio.emit('transcript_interim', payload)
+
+    def process_transcription(self, text):
+        """Add text recognized elsewhere (e.g. by the browser) to the transcript."""
+        return self.add_entry(text)
+
+    def add_entry(self, text, speaker=None):
+        """Record a recognized utterance and emit it to the meeting's listeners.
+
+        ``speaker`` is the diarization backend's key for who said it; without
+        one the utterance is attributed to the previous speaker.
+        """
+        number = self.speaker_labels.number(speaker)
+        if number is not None:
+            self.speaker_id = number
+            self.current_speaker = f"Speaker {number}"
+        self.last_activity = time.time()
+
+        # Create transcript entry with speaker information
+        transcript_entry = {
+            'text': text,
+            'speaker': self.current_speaker or "Speaker 1",
+            'timestamp': time.strftime('%H:%M:%S'),
+            'speaker_id': self.speaker_id,
+            'utterance_id': self.utterance_id
+        }
+        # The final text replaces the utterance's pending interim line
+        self.utterance_id += 1
+        if self.interim:
+            self.interim.finalize()
+
+        self.segments.append(transcript_entry['utterance_id'], transcript_entry['speaker_id'],
+                             transcript_entry['speaker'], transcript_entry['timestamp'], text)
+        if self.summarizer:
+            self.summarizer.add_entry(transcript_entry)
+
+        # Queue the update for the meeting's room; it goes out with the next batch
+        if self.emitter:
+            self.emitter.publish(self.meeting_id, transcript_entry)
+        if self.segment_writer:
+            self.segment_writer.append(self.meeting_id, transcript_entry)
+        return transcript_entry
+
+    def _recover(self):
+        """Reload the entries this meeting persisted before the worker restarted."""
+        entries = self.segment_writer.recover(self.meeting_id)
+        if not entries:
+            return
+        last = entries[-1]
+        for entry in entries:
+            self.segments.append(entry['utterance_id'], entry['speaker_id'], entry['speaker'],
+                                 entry['timestamp'], entry['text'])
+        self.utterance_id = last['utterance_id'] + 1
+        self.speaker_id = last['speaker_id'] or 1
+        self.current_speaker = last['speaker']
+        self.recovered_entries = len(entries)
+        if self.summarizer:
+            for entry in entries:
+                self.summarizer.add_entry(entry)
+        if self.emitter:
+            self.emitter.resume(self.meeting_id, entries)
+        logger.info(f"Recovered {len(entries)} transcript entries of meeting {self.meeting_id}")
+
+    @property
+    def transcript(self):
+        """Text of the entries still held in memory."""
+        return self.segments.texts()
+
+    @property
+    def speaker_transcript(self):
+        """Entries still held in memory, as dicts."""
+        return self.segments.since(0)
+
     def handle_canceled(self, evt):
         """Handle speech recognition cancellation"""
         try:
@@ -176,19 +334,25 @@ enable-shm = false
         try:
             logger.info("Starting recording...")
             logger.info("Configuring audio input...")
+            if self.audio_input == 'push':
+                self._open_audio_stream()
             
             # Create speech recognizer with error handling
+            recognizer_factory = self.recognizer_factory or (
+                ConversationRecognizer if self.diarization == 'conversation' else speechsdk.SpeechRecognizer)
             try:
-                self.recognizer = speechsdk.SpeechRecognizer(
+                self.recognizer = recognizer_factory(
                     speech_config=self.speech_config,
                     audio_config=self.audio_config
                 )
             except Exception as e:
                 logger.error(f"Error creating speech recognizer: {str(e)}")
+                if self.audio_input == 'push':
+                    raise
                 # Try alternative configuration
                 logger.info("Attempting alternative audio configuration...")
                 self.audio_config = speechsdk.audio.AudioConfig()
-                self.recognizer = speechsdk.SpeechRecognizer(
+                self.recognizer = recognizer_factory(
                     speech_config=self.speech_config,
                     audio_config=self.audio_config
                 )
@@ -196,12 +360,16 @@ enable-shm = false
             # Connect event handlers
             logger.info("Connecting event handlers...")
             self.recognizer.recognized.connect(self.handle_result)
+            if self.interim:
+                self.recognizer.recognizing.connect(self.handle_partial)
             self.recognizer.canceled.connect(self.handle_canceled)
             self.recognizer.session_started.connect(self.handle_session_started)
             self.recognizer.session_stopped.connect(self.handle_session_stopped)
             
             logger.info("Starting continuous recognition...")
             self.recognizer.start_continuous_recognition()
+            self.is_recording = True
+            self.last_activity = time.time()
             logger.info("Recording started successfully")
         except Exception as e:
             logger.error(f"Error starting recording: {str(e)}")
@@ -211,19 +379,19 @@ enable-shm = false
     def stop_recording(self):
         """Stop recording and return the transcript with speaker information."""
         try:
+            if self.audio_ingest:
+                # Flush buffered audio and end the stream before stopping
+                self.audio_ingest.close()
+                print(f"Audio ingest stats: {self.audio_ingest.stats()}")
             if self.recognizer:
                 print("Stopping continuous recognition...")
                 self.recognizer.stop_continuous_recognition()
+                self.is_recording = False
+                self.last_activity = time.time()
                 
-                # Format the transcript with speaker information
-                formatted_transcript = []
-                for entry in self.speaker_transcript:
-                    formatted_transcript.append(
-                        f"[{entry['timestamp']}] {entry['speaker']}: {entry['text']}"
-                    )
-                
-                full_transcript = "\n".join(formatted_transcript)
-                print(f"Full transcript with speakers: {full_transcript}")
+                # The transcript with speaker information, including entries spilled to disk
+                full_transcript = self.segments.formatted()
+                print(f"Full transcript with speakers: {len(self.segments)} entries, {len(full_transcript)} characters")
                 return full_transcript
             return ""
         except Exception as e:
@@ -232,19 +400,61 @@ enable-shm = false
             traceback.print_exc()
             return ""
 
-    def generate_summary(self, transcript=None):
-        """Generate a summary of the transcript using Azure OpenAI with speaker-specific action items."""
+    def _open_audio_stream(self):
+        """Start a fresh ingest pipeline for audio pushed by the client."""
+        sink = self.audio_sink_factory()
+        if self.diarization == 'local':
+            if AUDIO_FORMAT == 'pcm':
+                # The diarizer's clock starts with the stream, like the recognizer's result offsets
+                if self.diarizer:
+                    self.diarizer.close()
+                self.diarizer = self.diarizer_factory(AUDIO_SAMPLE_RATE)
+                sink = DiarizingSink(sink, self.diarizer)
+            else:
+                logger.warning(f"Local diarization needs pcm audio, not {AUDIO_FORMAT}; speakers will not be labelled")
+        self.audio_ingest = AudioIngestSession(sink, on_backpressure=self._emit_backpressure)
+        self.audio_config = sink.audio_config
+
+    def _emit_backpressure(self, paused):
+        if self.socketio:
+            payload = {'paused': paused, 'meeting_id': self.meeting_id}
+            if self.meeting_id:
+                self.socketio.emit('audio_backpressure', payload, to=self.meeting_id)
+            else:
+                self.socketio.emit('audio_backpressure', payload)
+
+    def feed_audio(self, data, seq=None):
+        """Queue an audio frame streamed by the client; returns False if it was dropped."""
+        if self.audio_ingest is None or not self.is_recording:
+            return False
+        self.last_activity = time.time()
+        return self.audio_ingest.feed(data, seq)
+
+    def generate_summary(self, transcript=None, on_token=None, raise_errors=False):
+        """Generate a summary of the transcript using Azure OpenAI with speaker-specific action items.
+
+        Without an explicit ``transcript``, the notes the rolling summarizer
+        built during the meeting are merged, so only one short request is left.
+        Otherwise the transcript is chunked and summarized with map-reduce.
+        ``on_token`` receives the final summary piece by piece as it streams in.
+        A failure is returned as an error message, or raised with ``raise_errors``.
+        """
+        start = time.perf_counter()
+        outcome = 'error'
         try:
+            if not transcript and self.summarizer and self.summarizer.has_notes():
+                print("Merging rolling summary notes...")
+                summary = self.summarizer.finalize(on_token=on_token)
+                print(f"Generated summary: {summary[:200]}...")
+                outcome = 'merged'
+                return summary
+
             if not transcript:
                 # Format the transcript with speaker information for better context
-                formatted_transcript = []
-                for entry in self.speaker_transcript:
-                    formatted_transcript.append(
-                        f"[{entry['timestamp']}] {entry['speaker']}: {entry['text']}"
-                    )
-                transcript = "\n".join(formatted_transcript)
+                transcript = self.segments.formatted()
             
             if not transcript:
+                outcome = 'empty'
                 return "No transcript available to summarize."
             
             print("Generating summary using Azure OpenAI...")
@@ -252,43 +462,28 @@ enable-shm = false
             print(f"Using endpoint: {AZURE_OPENAI_ENDPOINT}")
             print(f"Transcript length: {len(transcript)} characters")
             
-            response = openai.ChatCompletion.create(
-                model=AZURE_OPENAI_DEPLOYMENT,
-                messages=[
-                    {"role": "system", "content": """You are a helpful assistant that summarizes meeting transcripts. 
-                    Your response should be structured in three parts:
-                    1. A concise summary of the main points discussed
-                    2. A list of action items, organized by speaker
-                    3. A general list of action items that aren't speaker-specific
-                    
-                    For speaker-specific action items, use the format:
-                    [Speaker Name]'s Action Items:
-                    - Item 1
-                    - Item 2
-                    
-                    For general action items, use the format:
-                    General Action Items:
-                    - Item 1
-                    - Item 2"""},
-                    {"role": "user", "content": f"""Please provide a summary and action items for this meeting transcript:
-
-{transcript}
-
-Please structure your response as follows:
-1. First, provide a concise summary of the main points discussed
-2. Then, list all action items organized by speaker (if any speaker-specific items are identified)
-3. Finally, list any general action items that aren't specific to a particular speaker
-4. Format all action items as bulleted lists"""}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            summary = response.choices[0].message.content
+            summary = summarize_transcript(self.llm, transcript, on_token=on_token)
             print(f"Generated summary: {summary[:200]}...")
+            outcome = 'summarized'
             return summary
         except Exception as e:
             print(f"Error generating summary: {str(e)}")
             import traceback
             traceback.print_exc()
-            return f"Error generating summary: {str(e)}" 
\ No newline at end of file
+            if raise_errors:
+                raise
+            return f"Error generating summary: {str(e)}"
+        finally:
+            SUMMARY_SECONDS.labels(outcome).observe(time.perf_counter() - start)
+
+    def close(self):
+        """Release background resources held by this session."""
+        if self.emitter:
+            self.emitter.discard(self.meeting_id)
+        if self.audio_ingest:
+            self.audio_ingest.close()
+        if self.summarizer:
+            self.summarizer.close()
+        if self.diarizer:
+            self.diarizer.close()
+        self.segments.close()